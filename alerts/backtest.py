@@ -0,0 +1,180 @@
+"""Offline replay of the Telegram alert rules over a historical tremor series.
+
+``run_backtest`` steps through the series at the cron cadence and applies,
+for every user at once, ``evaluate_eligibility``: the same gates
+``TelegramService`` evaluates on every check (per-user threshold on the
+peak of the new samples, ``RATE_LIMIT`` cooldown, hysteresis re-arm at
+``threshold - delta`` or a recorded reset, and ``RENOTIFY_INTERVAL`` for
+persistent signals). Nothing touches the database or the network, so months
+of archived samples and thousands of synthetic users replay in seconds, and
+``rule_cpu_s`` measures the production rule.
+
+Latency is measured from the first armed crossing of the threshold at
+sample level (``evaluate_thresholds``) to the check that sends the alert;
+renotifications without a new crossing are not counted.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+import time
+from typing import Optional
+
+import numpy as np
+
+from .engine import RENOTIFY_INTERVAL, evaluate_eligibility, evaluate_thresholds
+
+
+@dataclass(frozen=True)
+class BacktestRules:
+    rate_limit: timedelta = timedelta(minutes=15)
+    renotify_interval: timedelta = RENOTIFY_INTERVAL
+    hysteresis_delta: float = 0.2
+    check_interval: timedelta = timedelta(minutes=5)
+
+
+@dataclass
+class BacktestReport:
+    users: int
+    samples: int
+    checks: int
+    sent: int
+    renotified: int
+    skipped_by_reason: dict[str, int]
+    alerts_per_user: dict[str, float]
+    latency_s: dict[str, Optional[float]]
+    rule_cpu_s: float
+    user_checks_per_s: Optional[float]
+    first_ts: Optional[str] = None
+    last_ts: Optional[str] = None
+    rules: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _latency_summary(latencies: np.ndarray) -> dict[str, Optional[float]]:
+    if not len(latencies):
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "max": None}
+    seconds = latencies.astype("timedelta64[ms]").astype("float64") / 1000.0
+    return {
+        "count": int(len(seconds)),
+        "mean": round(float(seconds.mean()), 1),
+        "p50": round(float(np.percentile(seconds, 50)), 1),
+        "p95": round(float(np.percentile(seconds, 95)), 1),
+        "max": round(float(seconds.max()), 1),
+    }
+
+
+def run_backtest(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    thresholds: np.ndarray,
+    rules: BacktestRules = BacktestRules(),
+) -> BacktestReport:
+    """Replay ``values`` (sorted by ``timestamps``) for users with ``thresholds``."""
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype="float64")
+    valid = ~np.isnan(values)
+    timestamps, values = timestamps[valid], values[valid]
+    thresholds = np.asarray(thresholds, dtype="float64")
+    users = len(thresholds)
+
+    delta = float(rules.hysteresis_delta)
+
+    nat = np.datetime64("NaT", "ns")
+    last_sent = np.full(users, nat)
+    last_reset = np.full(users, nat)
+    pending_crossing = np.full(users, nat)
+    sample_armed = np.ones(users, dtype=bool)
+    sent_per_user = np.zeros(users, dtype="int64")
+    skipped = {"below_threshold": 0, "cooldown": 0, "already_sent_hysteresis": 0}
+    renotified = 0
+    latencies: list[np.ndarray] = []
+    checks = 0
+
+    if len(timestamps):
+        step = np.timedelta64(rules.check_interval)
+        check_times = np.arange(timestamps[0], timestamps[-1] + step, step)
+        bounds = np.searchsorted(timestamps, check_times, side="right")
+    else:
+        check_times = np.empty(0, dtype="datetime64[ns]")
+        bounds = np.empty(0, dtype="int64")
+
+    started = time.process_time()
+    start = 0
+    for now, end in zip(check_times, bounds.tolist()):
+        if end == start:
+            continue  # no new points: the cron run returns before dispatching
+        batch_ts = timestamps[start:end]
+        batch_values = values[start:end]
+        start = end
+        checks += 1
+        peak = batch_values.max()
+
+        crossings = evaluate_thresholds(
+            batch_ts, batch_values, thresholds, hysteresis_delta=delta, armed=sample_armed
+        )
+        sample_armed = crossings.armed
+        new_crossing = np.isnat(pending_crossing) & crossings.triggered
+        pending_crossing[new_crossing] = crossings.crossing_ts[new_crossing]
+
+        gates = evaluate_eligibility(
+            thresholds,
+            peak,
+            now,
+            last_sent,
+            last_reset,
+            hysteresis_delta=delta,
+            rate_limit=rules.rate_limit,
+            renotify_interval=rules.renotify_interval,
+        )
+        last_reset[gates.hysteresis_release] = now
+        send = gates.send
+        eligible = gates.above & ~gates.rate_limited
+
+        skipped["below_threshold"] += int(np.count_nonzero(~gates.above))
+        skipped["cooldown"] += int(np.count_nonzero(gates.above & gates.rate_limited))
+        skipped["already_sent_hysteresis"] += int(np.count_nonzero(eligible & ~send))
+        renotified += int(
+            np.count_nonzero(send & gates.renotify_due & ~gates.hysteresis_rearmed)
+        )
+
+        timed = send & ~np.isnat(pending_crossing)
+        if timed.any():
+            latencies.append(now - pending_crossing[timed])
+        pending_crossing[send] = nat
+        last_sent[send] = now
+        sent_per_user += send
+    rule_cpu_s = time.process_time() - started
+
+    total_sent = int(sent_per_user.sum())
+    return BacktestReport(
+        users=users,
+        samples=int(len(values)),
+        checks=checks,
+        sent=total_sent,
+        renotified=renotified,
+        skipped_by_reason=skipped,
+        alerts_per_user={
+            "mean": round(float(sent_per_user.mean()), 2) if users else 0.0,
+            "max": int(sent_per_user.max()) if users else 0,
+        },
+        latency_s=_latency_summary(
+            np.concatenate(latencies) if latencies else np.empty(0, dtype="timedelta64[ns]")
+        ),
+        rule_cpu_s=round(rule_cpu_s, 3),
+        user_checks_per_s=round(checks * users / rule_cpu_s) if rule_cpu_s > 0 else None,
+        first_ts=str(timestamps[0]) if len(timestamps) else None,
+        last_ts=str(timestamps[-1]) if len(timestamps) else None,
+        rules={
+            "rate_limit_minutes": rules.rate_limit.total_seconds() / 60,
+            "renotify_interval_minutes": rules.renotify_interval.total_seconds() / 60,
+            "hysteresis_delta": delta,
+            "check_interval_minutes": rules.check_interval.total_seconds() / 60,
+        },
+    )
+
+
+__all__ = ["BacktestReport", "BacktestRules", "run_backtest"]
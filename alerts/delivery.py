@@ -0,0 +1,352 @@
+"""Concurrent Telegram delivery with a shared rate budget.
+
+``TelegramDeliveryPool`` sends a batch of messages from a small thread pool
+over one pooled ``requests.Session``. The calling thread schedules the work
+so that:
+
+* a global token bucket keeps the bot under Telegram's ~30 messages/s;
+* every chat gets at most one message per ``per_chat_interval`` seconds;
+* a 429 only delays its own chat: ``Retry-After`` (the header or
+  ``parameters.retry_after`` in the body) moves that chat's next slot while
+  the other chats keep flowing. Transient errors back off the same way,
+  without holding a worker thread.
+
+``deliver`` returns one ``DeliveryResult`` per message, in input order.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import heapq
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+import requests
+from requests import RequestException, Response
+from requests.adapters import HTTPAdapter
+
+from .notifier import (
+    DEFAULT_TIMEOUT,
+    INITIAL_BACKOFF,
+    MAX_BACKOFF,
+    MAX_RETRIES,
+    TELEGRAM_API_BASE,
+    _build_payload,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+GLOBAL_RATE_PER_SECOND = 25.0
+PER_CHAT_INTERVAL = 1.0
+MAX_RETRY_AFTER = 30.0
+BATCH_TIMEOUT = 60.0
+
+
+@dataclass(frozen=True)
+class OutgoingMessage:
+    chat_id: str
+    text: str
+    parse_mode: Optional[str] = None
+    disable_notification: bool = False
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    chat_id: str
+    ok: bool
+    status: str  # "sent", "failed", "rate_limited" or "timeout"
+    attempts: int
+    error: Optional[str] = None
+    http_status: Optional[int] = None
+
+    @property
+    def permanent(self) -> bool:
+        """Telegram rejected the message itself (bad chat, bot blocked): retrying won't help."""
+        return self.http_status is not None and 400 <= self.http_status < 500 and self.http_status != 429
+
+
+@dataclass(frozen=True)
+class _Attempt:
+    status: str  # "sent", "retry", "rate_limited" or "failed"
+    retry_after: Optional[float] = None
+    error: Optional[str] = None
+    http_status: Optional[int] = None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled with ``rate`` tokens per second."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token and return ``0.0``, or the seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+def _retry_after_seconds(response: Response) -> float:
+    header = response.headers.get("Retry-After")
+    if header is not None:
+        try:
+            return max(float(header), 0.0)
+        except (TypeError, ValueError):
+            pass
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if isinstance(body, dict):
+        retry_after = (body.get("parameters") or {}).get("retry_after")
+        if isinstance(retry_after, (int, float)):
+            return max(float(retry_after), 0.0)
+    return INITIAL_BACKOFF
+
+
+def _error_description(response: Response) -> str:
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    description = body.get("description") if isinstance(body, dict) else None
+    return f"HTTP {response.status_code}: {description}" if description else f"HTTP {response.status_code}"
+
+
+class TelegramDeliveryPool:
+    """Deliver message batches for one bot token under Telegram's rate limits."""
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        max_workers: int = DEFAULT_WORKERS,
+        global_rate: float = GLOBAL_RATE_PER_SECOND,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        max_retry_after: float = MAX_RETRY_AFTER,
+        batch_timeout: float = BATCH_TIMEOUT,
+        api_base: str = TELEGRAM_API_BASE,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.url = f"{api_base}/bot{token}/sendMessage"
+        self.max_workers = max(int(max_workers), 1)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max(int(max_retries), 1)
+        self.max_retry_after = max_retry_after
+        self.batch_timeout = batch_timeout
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self._clock = clock
+        self._chat_ready: dict[str, float] = {}
+        self._chat_lock = threading.Lock()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def _attempt(self, message: OutgoingMessage) -> _Attempt:
+        payload = _build_payload(
+            message.chat_id,
+            message.text,
+            parse_mode=message.parse_mode,
+            disable_notification=message.disable_notification,
+        )
+        try:
+            response = self.session.post(self.url, json=payload, timeout=DEFAULT_TIMEOUT)
+        except RequestException as exc:
+            return _Attempt("retry", error=str(exc))
+        status_code = response.status_code
+        if status_code == 429:
+            return _Attempt(
+                "rate_limited",
+                retry_after=_retry_after_seconds(response),
+                error="HTTP 429",
+                http_status=status_code,
+            )
+        if status_code >= 500:
+            return _Attempt("retry", error=f"HTTP {status_code}", http_status=status_code)
+        if status_code >= 400:
+            return _Attempt("failed", error=_error_description(response), http_status=status_code)
+        return _Attempt("sent", http_status=status_code)
+
+    def _run(self, index: int, message: OutgoingMessage, done: queue.Queue) -> None:
+        try:
+            outcome = self._attempt(message)
+        except Exception as exc:  # pragma: no cover - defensive guard
+            logger.exception("Unexpected error while sending Telegram message")
+            outcome = _Attempt("failed", error=str(exc))
+        done.put((index, outcome))
+
+    def _chat_ready_at(self, chat_id: str) -> float:
+        with self._chat_lock:
+            return self._chat_ready.get(chat_id, 0.0)
+
+    def _reserve_chat(self, chat_id: str, ready_at: float) -> None:
+        with self._chat_lock:
+            self._chat_ready[chat_id] = max(self._chat_ready.get(chat_id, 0.0), ready_at)
+
+    def _prune_chats(self, now: float) -> None:
+        with self._chat_lock:
+            for chat_id in [chat for chat, ready in self._chat_ready.items() if ready <= now]:
+                del self._chat_ready[chat_id]
+
+    def deliver(self, messages: Sequence[OutgoingMessage]) -> list[DeliveryResult]:
+        """Send ``messages`` concurrently; returns their results in input order."""
+        messages = list(messages)
+        results: list[Optional[DeliveryResult]] = [None] * len(messages)
+        attempts = [0] * len(messages)
+        start = self._clock()
+        stop_at = start + self.batch_timeout
+        self._prune_chats(start)
+
+        # (not_before, index): the earliest time a message may be (re)sent.
+        pending: list[tuple[float, int]] = [(0.0, index) for index in range(len(messages))]
+        heapq.heapify(pending)
+        done: queue.Queue = queue.Queue()
+        in_flight = 0
+
+        def finish(
+            index: int,
+            status: str,
+            error: Optional[str] = None,
+            http_status: Optional[int] = None,
+        ) -> None:
+            results[index] = DeliveryResult(
+                chat_id=messages[index].chat_id,
+                ok=status == "sent",
+                status=status,
+                attempts=attempts[index],
+                error=error,
+                http_status=http_status,
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="telegram-delivery",
+        ) as executor:
+            while pending or in_flight:
+                now = self._clock()
+                wake_at: Optional[float] = None
+                if now >= stop_at:
+                    while pending:
+                        finish(heapq.heappop(pending)[1], "timeout", "batch timeout")
+                while pending and in_flight < self.max_workers:
+                    not_before, index = pending[0]
+                    chat_id = messages[index].chat_id
+                    ready_at = max(not_before, self._chat_ready_at(chat_id))
+                    if ready_at > not_before:
+                        heapq.heapreplace(pending, (ready_at, index))
+                        continue
+                    if ready_at > now:
+                        wake_at = ready_at
+                        break
+                    wait = self.global_bucket.try_acquire()
+                    if wait > 0:
+                        wake_at = now + wait
+                        break
+                    heapq.heappop(pending)
+                    self._reserve_chat(chat_id, now + self.per_chat_interval)
+                    attempts[index] += 1
+                    in_flight += 1
+                    executor.submit(self._run, index, messages[index], done)
+
+                timeout = None if wake_at is None else max(min(wake_at, stop_at) - self._clock(), 0.0)
+                if not in_flight:
+                    if timeout:
+                        time.sleep(timeout)
+                    continue
+                try:
+                    index, outcome = done.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                in_flight -= 1
+                now = self._clock()
+                if outcome.status in {"sent", "failed"}:
+                    finish(index, outcome.status, outcome.error, outcome.http_status)
+                    continue
+
+                rate_limited = outcome.status == "rate_limited"
+                if rate_limited:
+                    delay = outcome.retry_after if outcome.retry_after is not None else INITIAL_BACKOFF
+                else:
+                    delay = min(INITIAL_BACKOFF * 2 ** (attempts[index] - 1), MAX_BACKOFF)
+                retry_at = now + delay
+                final_status = "rate_limited" if rate_limited else "failed"
+                if (
+                    attempts[index] >= self.max_retries
+                    or retry_at > stop_at
+                    or (rate_limited and delay > self.max_retry_after)
+                ):
+                    finish(index, final_status, outcome.error, outcome.http_status)
+                    continue
+                if rate_limited:
+                    logger.warning(
+                        "Rate limit Telegram (%s). Retry fra %s secondi.",
+                        messages[index].chat_id,
+                        delay,
+                    )
+                    self._reserve_chat(messages[index].chat_id, retry_at)
+                heapq.heappush(pending, (retry_at, index))
+
+        return [result for result in results if result is not None]
+
+
+_POOLS: dict[str, TelegramDeliveryPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_delivery_pool(token: str) -> TelegramDeliveryPool:
+    """Process-wide pool per bot token, so the HTTP session and rate budget are shared."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(token)
+        if pool is None:
+            pool = TelegramDeliveryPool(token)
+            _POOLS[token] = pool
+        return pool
+
+
+def deliver_telegram_messages(token: str, messages: Sequence[OutgoingMessage]) -> list[DeliveryResult]:
+    """Send ``messages`` with the shared pool of ``token``; one result per message."""
+    if not token:
+        logger.warning("Token mancante: niente invio")
+        return [
+            DeliveryResult(chat_id=message.chat_id, ok=False, status="failed", attempts=0, error="missing_token")
+            for message in messages
+        ]
+    if not messages:
+        return []
+    return get_delivery_pool(token).deliver(messages)
+
+
+__all__ = [
+    "DeliveryResult",
+    "OutgoingMessage",
+    "TelegramDeliveryPool",
+    "TokenBucket",
+    "deliver_telegram_messages",
+    "get_delivery_pool",
+]
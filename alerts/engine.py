@@ -1,10 +1,23 @@
-"""Alert evaluation engine."""
+"""Alert evaluation engine.
+
+``evaluate_threshold`` scores a finished list of samples. ``StreamingEvaluator``
+keeps the same moving-average window across checks so that each check only
+consumes the samples appended since the previous one.
+"""
 
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import timedelta
+import math
 from typing import Iterable, List, Optional, Sequence
 
+import numpy as np
+
+# Re-send an alert for a signal that stays above threshold after this long,
+# without a new crossing. Shared by the live service and the backtest.
+RENOTIFY_INTERVAL = timedelta(minutes=30)
+
 
 @dataclass
 class AlertComputation:
@@ -27,25 +40,57 @@ def _coerce_values(values: Iterable[float]) -> List[float]:
     return coerced
 
 
-def compute_moving_average(values: Sequence[float], window: int) -> Optional[float]:
-    """Return the moving average of the last ``window`` samples."""
+class RollingWindow:
+    """Ring buffer of the last ``size`` samples with a running sum."""
 
-    if window <= 0:
-        raise ValueError("window must be > 0")
+    def __init__(self, size: int) -> None:
+        if size <= 0:
+            raise ValueError("window must be > 0")
+        self.size = int(size)
+        self._buffer = [0.0] * self.size
+        self._count = 0
+        self._next = 0
+        self._sum = 0.0
 
-    data = _coerce_values(values)
-    if not data:
-        return None
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        self._count = 0
+        self._next = 0
+        self._sum = 0.0
 
-    if len(data) < window:
-        window_values = data
-    else:
-        window_values = data[-window:]
+    def push(self, value: float) -> None:
+        value = float(value)
+        if self._count == self.size:
+            self._sum -= self._buffer[self._next]
+        else:
+            self._count += 1
+        self._buffer[self._next] = value
+        self._sum += value
+        self._next = (self._next + 1) % self.size
+        if self._next == 0:
+            # Re-anchor the running sum once per lap so float error cannot drift.
+            self._sum = math.fsum(self._buffer[: self._count])
 
-    if not window_values:
-        return None
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.push(value)
 
-    return sum(window_values) / len(window_values)
+    @property
+    def mean(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+
+def compute_moving_average(values: Sequence[float], window: int) -> Optional[float]:
+    """Return the moving average of the last ``window`` samples."""
+
+    rolling = RollingWindow(window)
+    data = _coerce_values(values)
+    rolling.extend(data[-window:])
+    return rolling.mean
 
 
 def evaluate_threshold(
@@ -59,11 +104,264 @@ def evaluate_threshold(
     if not data:
         return AlertComputation(None, None, float(threshold), False, 0)
 
-    moving_avg = compute_moving_average(data, window)
-    latest_value = data[-1] if data else None
-    samples_used = min(len(data), window if len(data) >= window else len(data))
+    rolling = RollingWindow(window)
+    rolling.extend(data[-window:])
+    return _computation(rolling, data[-1], threshold)
+
 
+def _computation(
+    rolling: RollingWindow,
+    latest_value: Optional[float],
+    threshold: float,
+) -> AlertComputation:
+    moving_avg = rolling.mean
     triggered = moving_avg is not None and moving_avg > threshold
+    return AlertComputation(moving_avg, latest_value, float(threshold), triggered, len(rolling))
+
+
+@dataclass(frozen=True)
+class StreamUpdate:
+    """Samples consumed by one ``StreamingEvaluator.advance`` call."""
+
+    new_points: int
+    peak_value: Optional[float]
+    latest_value: Optional[float]
+    latest_ts: Optional[np.datetime64]
+    moving_average: Optional[float]
+
+
+class StreamingEvaluator:
+    """Incremental moving-average evaluation over an append-only series.
+
+    ``timestamps`` are sorted ``datetime64[ns]`` arrays and ``values`` the
+    matching floats; NaN samples are skipped. ``last_ts`` is the checkpoint:
+    ``advance`` binary-searches it and only reads the rows after it, so its
+    cost depends on the number of new samples, not on the history length.
+    Samples before the checkpoint are never re-read once the window is
+    seeded.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = RollingWindow(window)
+        self.last_ts: Optional[np.datetime64] = None
+        self.latest_value: Optional[float] = None
+
+    def seed(
+        self,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        last_ts: Optional[np.datetime64],
+    ) -> None:
+        """Reset the window to the samples at or before ``last_ts``."""
+        self.window.clear()
+        self.last_ts = last_ts
+        self.latest_value = None
+        if last_ts is None:
+            return
+        end = int(np.searchsorted(timestamps, last_ts, side="right"))
+        # Walk back until the window is full, skipping NaN samples.
+        tail: list[float] = []
+        index = end - 1
+        while index >= 0 and len(tail) < self.window.size:
+            value = float(values[index])
+            if not math.isnan(value):
+                tail.append(value)
+            index -= 1
+        self.window.extend(reversed(tail))
+        self.latest_value = tail[0] if tail else None
+
+    def advance(self, timestamps: np.ndarray, values: np.ndarray) -> StreamUpdate:
+        """Consume the samples after the checkpoint and move it forward."""
+        start = 0
+        if self.last_ts is not None:
+            start = int(np.searchsorted(timestamps, self.last_ts, side="right"))
+        new_values = np.asarray(values[start:], dtype="float64")
+        valid = np.flatnonzero(~np.isnan(new_values))
+        if not len(valid):
+            return StreamUpdate(0, None, None, None, self.window.mean)
+
+        batch = new_values[valid]
+        tail = batch[-self.window.size:]
+        self.window.extend(tail.tolist())
+        self.latest_value = float(batch[-1])
+        self.last_ts = timestamps[start + int(valid[-1])]
+        return StreamUpdate(
+            new_points=int(len(batch)),
+            peak_value=float(batch.max()),
+            latest_value=self.latest_value,
+            latest_ts=self.last_ts,
+            moving_average=self.window.mean,
+        )
+
+    def evaluate(self, threshold: float) -> AlertComputation:
+        return _computation(self.window, self.latest_value, threshold)
+
+
+
+@dataclass(frozen=True)
+class ThresholdBatch:
+    """Per-user outcome of ``evaluate_thresholds``; every array has one entry per user."""
+
+    moving_average: np.ndarray  # signal at the last sample
+    peak: np.ndarray  # highest signal over the series
+    above: np.ndarray  # last sample at/over the threshold
+    triggered: np.ndarray  # crossed the threshold while armed at least once
+    crossing_ts: np.ndarray  # first such crossing, NaT when none
+    armed: np.ndarray  # hysteresis state after the last sample
+
+
+# Cells of the (samples x users) comparison matrices processed per block.
+_BLOCK_CELLS = 1 << 22
+
+
+def _rolling_means(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean at every sample, over at most ``window`` samples."""
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+
+def evaluate_thresholds(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    thresholds: np.ndarray,
+    windows: np.ndarray | int = 1,
+    *,
+    hysteresis_delta: float = 0.0,
+    armed: Optional[np.ndarray] = None,
+    strict: bool = False,
+) -> ThresholdBatch:
+    """Evaluate one series against many users' thresholds in a single pass.
+
+    Each user's signal is the trailing moving average of ``values`` over its
+    own window (``1`` means the raw samples). The hysteresis rule is the one
+    applied to Telegram alerts: an armed user fires when the signal reaches
+    the threshold (exceeds it with ``strict``) and is disarmed until the
+    signal drops to ``threshold - hysteresis_delta``. ``armed`` is the state
+    before the first sample (default: armed). NaN samples are ignored.
+
+    Users are grouped by window, so the moving averages cost one cumulative
+    sum per distinct window, and the state machine is resolved with array
+    operations instead of a per-user loop.
+    """
+    timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype="float64")
+    thresholds = np.asarray(thresholds, dtype="float64")
+    count = len(thresholds)
+    windows = np.broadcast_to(np.asarray(windows, dtype="int64"), (count,))
+    if count and windows.min() <= 0:
+        raise ValueError("window must be > 0")
+    armed_before = (
+        np.ones(count, dtype=bool) if armed is None else np.asarray(armed, dtype=bool).copy()
+    )
+
+    valid = ~np.isnan(values)
+    values = values[valid]
+    timestamps = timestamps[valid]
+    samples = len(values)
+
+    batch = ThresholdBatch(
+        moving_average=np.full(count, np.nan),
+        peak=np.full(count, np.nan),
+        above=np.zeros(count, dtype=bool),
+        triggered=np.zeros(count, dtype=bool),
+        crossing_ts=np.full(count, np.datetime64("NaT"), dtype="datetime64[ns]"),
+        armed=armed_before,
+    )
+    if not samples or not count:
+        return batch
+
+    rows = np.arange(samples)[:, None]
+    block = max(1, _BLOCK_CELLS // samples)
+    for window in np.unique(windows).tolist():
+        signal = _rolling_means(values, window)
+        members = np.flatnonzero(windows == window)
+        batch.moving_average[members] = signal[-1]
+        batch.peak[members] = signal.max()
+        for offset in range(0, len(members), block):
+            cols = members[offset:offset + block]
+            limits = thresholds[cols]
+            up = signal[:, None] > limits if strict else signal[:, None] >= limits
+            down = (signal[:, None] <= limits - hysteresis_delta) & ~up
+            # Index of the latest up/down sample at or before each row; the
+            # state after it is "armed" exactly when that sample was a down.
+            last_event = np.maximum.accumulate(np.where(up | down, rows, -1), axis=0)
+            previous = np.vstack([np.full((1, len(cols)), -1), last_event[:-1]])
+            was_down = np.take_along_axis(down, np.maximum(previous, 0), axis=0)
+            armed_at = np.where(previous < 0, armed_before[cols], was_down)
+            fires = up & armed_at
+
+            fired = fires.any(axis=0)
+            first = fires.argmax(axis=0)
+            batch.above[cols] = up[-1]
+            batch.triggered[cols] = fired
+            batch.crossing_ts[cols[fired]] = timestamps[first[fired]]
+            final = last_event[-1]
+            batch.armed[cols] = np.where(
+                final < 0,
+                armed_before[cols],
+                down[np.maximum(final, 0), np.arange(len(cols))],
+            )
+    return batch
+
+
+@dataclass(frozen=True)
+class AlertGates:
+    """Per-user Telegram alert gates of one check; see ``evaluate_eligibility``."""
+
+    above: np.ndarray  # peak at/over the threshold
+    rate_limited: np.ndarray  # last alert less than ``rate_limit`` ago
+    hysteresis_rearmed: np.ndarray  # a crossing now would be a new alert
+    hysteresis_release: np.ndarray  # back under the band since the last alert
+    renotify_due: np.ndarray  # last alert at least ``renotify_interval`` ago
+
+    @property
+    def send(self) -> np.ndarray:
+        """Premium decision: above, out of cooldown, re-armed or due to renotify."""
+        return self.above & ~self.rate_limited & (self.hysteresis_rearmed | self.renotify_due)
+
+
+def evaluate_eligibility(
+    thresholds: np.ndarray,
+    peak: float,
+    now: np.datetime64,
+    last_sent: np.ndarray,
+    last_reset: np.ndarray,
+    *,
+    hysteresis_delta: float,
+    rate_limit: timedelta,
+    renotify_interval: timedelta = RENOTIFY_INTERVAL,
+) -> AlertGates:
+    """Threshold, cooldown, hysteresis and renotify gates for every user at once.
 
-    return AlertComputation(moving_avg, latest_value, float(threshold), triggered, samples_used)
+    ``last_sent`` and ``last_reset`` hold each user's last alert and last
+    recorded hysteresis reset (NaT when none). Users with a NaN threshold are
+    not evaluated. This is the rule ``TelegramService`` applies on every
+    check and the one the backtest replays.
+    """
+    thresholds = np.asarray(thresholds, dtype="float64")
+    evaluated = ~np.isnan(thresholds)
+    now = np.datetime64(now, "ns")
+    last_sent = np.asarray(last_sent, dtype="datetime64[ns]")
+    last_reset = np.asarray(last_reset, dtype="datetime64[ns]")
+    elapsed = now - last_sent
+    has_sent = ~np.isnat(last_sent)
 
+    # Users are armed unless they were alerted and the signal has not gone
+    # back below the hysteresis band since (NaT compares False).
+    armed_before = ~has_sent | (last_reset > last_sent)
+    batch = evaluate_thresholds(
+        np.array([now]),
+        np.array([peak], dtype="float64"),
+        np.where(evaluated, thresholds, np.inf),
+        hysteresis_delta=float(hysteresis_delta),
+        armed=armed_before,
+    )
+    return AlertGates(
+        above=batch.above,
+        rate_limited=has_sent & (elapsed < np.timedelta64(rate_limit)),
+        hysteresis_rearmed=batch.triggered | batch.armed,
+        hysteresis_release=evaluated & ~armed_before & batch.armed,
+        renotify_due=has_sent & (elapsed >= np.timedelta64(renotify_interval)),
+    )
@@ -2,15 +2,16 @@
 
 from __future__ import annotations
 
+import logging
 import time
 from typing import Any, Dict, Optional
 
 import requests
 from requests import RequestException, Response
 
-from app.utils.logger import get_logger
-
-logger = get_logger(__name__)
+# Plain stdlib logger: importing app.utils would initialize the app package,
+# which imports this module back through the Telegram service.
+logger = logging.getLogger(__name__)
 
 TELEGRAM_API_BASE = "https://api.telegram.org"
 DEFAULT_TIMEOUT = 10
@@ -1171,6 +1171,12 @@ def create_app(config_overrides: dict | None = None):
         else:
             cache_exempt_prefixes = ("/auth", "/dashboard", "/api")
             if any(request.path.startswith(prefix) for prefix in cache_exempt_prefixes):
+                # ETag-validated responses (e.g. /api/curva) may be kept by the
+                # client as long as it revalidates them.
+                if "ETag" in response.headers and "no-cache" in response.headers.get(
+                    "Cache-Control", ""
+                ):
+                    return response
                 response.headers.pop("Cache-Control", None)
                 response.headers.setdefault(
                     "Cache-Control", "no-store, private, max-age=0"
@@ -28,6 +28,7 @@ from .hotspots_record import HotspotsRecord
 from .copernicus_image import CopernicusImage
 from .cron_run import CronRun
 from .alert_state import AlertState
+from .alert_outbox import AlertOutbox
 from .telegram_link_token import TelegramLinkToken
 from .api_access import ApiClient, ApiKey, ApiUsage, ApiUsageDaily, ApiUsageMinute
 from .tremor_prediction import TremorPrediction
@@ -70,6 +71,7 @@ __all__ = [
     'CopernicusImage',
     'CronRun',
     'AlertState',
+    'AlertOutbox',
     'TelegramLinkToken',
     'ApiClient',
     'ApiKey',
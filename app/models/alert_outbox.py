@@ -0,0 +1,50 @@
+"""Outbound Telegram alert queue (transactional outbox)."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from . import db
+
+
+class AlertOutbox(db.Model):
+    __tablename__ = "alert_outbox"
+    __table_args__ = (
+        db.Index("ix_alert_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # "<event_id>:<user_id>:<kind>": one delivery per recipient and tremor event.
+    idempotency_key = db.Column(db.String(191), nullable=False, unique=True)
+    event_id = db.Column(db.String(64), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    kind = db.Column(db.String(32), nullable=False)
+    chat_id = db.Column(db.String(64), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    next_attempt_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=db.func.now(),
+    )
+    locked_until = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=db.func.now(),
+    )
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<AlertOutbox {self.idempotency_key} status={self.status} attempts={self.attempts}>"
+
+
+__all__ = ["AlertOutbox"]
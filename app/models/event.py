@@ -14,6 +14,8 @@ class Event(db.Model):
     value = db.Column(db.Float, nullable=True)  # tremor value for alerts
     threshold = db.Column(db.Float, nullable=True)  # threshold at time of event
     message = db.Column(db.String(255), nullable=True)
+    # Idempotency key of the alert_outbox row this event was recorded for.
+    outbox_key = db.Column(db.String(191), nullable=True, index=True)
     
     user = db.relationship('User', backref=db.backref('events', lazy=True))
     
@@ -77,7 +77,7 @@ from ..services.copernicus_smart_view import (
     load_copernicus_log,
     load_copernicus_status,
 )
-from ..services.copernicus_swir import refresh_swir_image
+from ..services.copernicus_swir import get_swir_refresh_status, refresh_swir_image
 from ..services.partner_categories import (
     CATEGORY_FORM_FIELDS,
     ensure_partner_categories,
@@ -218,6 +218,7 @@ def debug_static_copernicus():
             "files": files,
             "s1_latest": _file_meta(copernicus_dir / "s1_latest.png"),
             "s2_latest": _file_meta(copernicus_dir / "s2_latest.png"),
+            "swir_refresh": get_swir_refresh_status(),
         }
     )
 
@@ -3323,7 +3324,11 @@ def test_colored_extraction():
 
     try:
         png_path = download_colored_png(colored_url)
-        timestamps, values, debug_paths = extract_series_from_colored(png_path)
+        timestamps, values, debug_paths = extract_series_from_colored(
+            png_path,
+            debug_artifacts="always",
+            debug_background=False,
+        )
         total_points = len(timestamps)
         nonfinite_count = 0
         clean_pairs = []
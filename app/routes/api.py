@@ -1,3 +1,4 @@
+import hashlib
 import os
 from uuid import uuid4
 from datetime import datetime, timedelta, timezone
@@ -10,27 +11,68 @@ from sqlalchemy.exc import SQLAlchemyError
 from ..utils.metrics import record_csv_error, record_csv_read, record_csv_update
 from ..utils.auth import get_current_user, is_owner_or_admin
 from ..utils.config import get_curva_csv_path, get_temporal_status_from_timestamp, warn_if_stale_timestamp
+from ..utils.curva_payload import CurvaPayloadCache
+from ..utils.downsample import DEFAULT_DOWNSAMPLE_METHOD, DOWNSAMPLE_METHODS
+from ..utils.tremor_store import (
+    TremorSnapshot,
+    get_tremor_history,
+    get_tremor_rollups,
+    get_tremor_snapshot,
+)
 from ..models.hotspots_cache import HotspotsCache
 from ..models.hotspots_record import HotspotsRecord
 from ..services.copernicus_smart_view import build_copernicus_view_payload
 from backend.utils.extract_colored import process_colored_png_to_csv
 from backend.utils.time import to_iso_utc
+from backend.utils.tremor_rollups import ROLLUP_RESOLUTIONS
 from backend.services.hotspots.config import HotspotsConfig
 from backend.services.hotspots.diagnostics import diagnose_firms
+from backend.services.hotspots.payload import (
+    LATEST_ITEMS_LIMIT,
+    LATEST_WINDOW_HOURS,
+    build_latest_responses,
+    latest_cache_key,
+    serialize_latest_response,
+)
 from backend.services.hotspots.significance import is_significant_record
 from ..services.sentieri_geojson import read_geojson_file, validate_feature_collection
 
+# Long ranges are served from the binary archive (see backend.utils.tremor_archive);
+# it keeps TREMOR_ARCHIVE_RETENTION_DAYS (90) of history after the CSV is trimmed.
+_MAX_LIMIT = 25920
+
 _RANGE_LIMITS: dict[str, int] = {
     "24h": 288,
     "3d": 864,
     "7d": 2016,
     "14d": 4032,
-    "all": 4032,
+    "30d": 8640,
+    "90d": 25920,
+    "all": _MAX_LIMIT,
 }
 
 _DEFAULT_LIMIT = 2016
 _MIN_LIMIT = 1
-_MAX_LIMIT = 4032
+
+# Point budgets for ``?resolution=``; ``?max_points=`` sets one explicitly.
+_RESOLUTION_POINTS: dict[str, int | None] = {
+    "low": 500,
+    "medium": 1000,
+    "high": 2000,
+    "full": None,
+}
+_MIN_MAX_POINTS = 10
+
+_CURVA_PAYLOADS = CurvaPayloadCache(max_rows=_MAX_LIMIT)
+
+# Rollups outlive the raw retention window; ``None`` returns every bucket.
+_ROLLUP_RANGE_DAYS: dict[str, int | None] = {
+    "7d": 7,
+    "30d": 30,
+    "90d": 90,
+    "1y": 365,
+    "all": None,
+}
 
 api_bp = Blueprint("api", __name__)
 
@@ -40,80 +82,24 @@ def _require_admin_user() -> bool:
     return bool(user and user.is_admin)
 
 
-def _hotspot_payload(item: HotspotsRecord) -> dict:
-    brightness = item.bright_ti4
-    if brightness is None:
-        brightness = item.brightness
-    if brightness is None:
-        brightness = item.bright_ti5
-    unit = item.intensity_unit
-    if not unit:
-        if item.frp is not None:
-            unit = "MW"
-        elif brightness is not None:
-            unit = "K"
-        else:
-            unit = "unknown"
-    return {
-        "id": item.fingerprint,
-        "time_utc": to_iso_utc(item.acq_datetime),
-        "lat": item.lat,
-        "lon": item.lon,
-        "source": item.source,
-        "satellite": item.satellite,
-        "instrument": item.instrument,
-        "confidence": item.confidence,
-        "bright_ti4": item.bright_ti4,
-        "bright_ti5": item.bright_ti5,
-        "frp": item.frp,
-        "daynight": item.daynight,
-        "version": item.version,
-        "intensity": {
-            "frp": item.frp,
-            "brightness": brightness,
-            "unit": unit,
-        },
-        "status": item.status or "unknown",
-        "maps_url": f"https://www.google.com/maps?q={item.lat},{item.lon}",
-    }
-
-
-def _prepare_tremor_dataframe(raw_df: pd.DataFrame) -> tuple[pd.DataFrame, str | None, dict]:
-    """Normalise timestamp typing and detect empty datasets."""
-    stats = {
-        "raw_rows": int(len(raw_df)),
-        "parsed_rows": 0,
-        "rows_after_dropna": 0,
-        "invalid_timestamp_samples": [],
-    }
-    if "timestamp" not in raw_df.columns:
-        return pd.DataFrame(columns=["timestamp", "value"]), "missing_timestamp", stats
-
-    df = raw_df.copy()
-    parsed_ts = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-    invalid_mask = parsed_ts.isna() & df["timestamp"].notna()
-    stats["parsed_rows"] = int(parsed_ts.notna().sum())
-    stats["invalid_timestamp_samples"] = (
-        df.loc[invalid_mask, "timestamp"].astype(str).head(3).tolist()
-    )
-    df["timestamp"] = parsed_ts
-    df = df.dropna(subset=["timestamp"])
-    stats["rows_after_dropna"] = int(len(df))
-    if "value" not in df.columns:
-        if "value_max" in df.columns:
-            df["value"] = df["value_max"]
-        elif "value_avg" in df.columns:
-            df["value"] = df["value_avg"]
-
-    if df.empty:
-        return df, "empty_data", stats
+def _load_tremor_snapshot(
+    csv_path: Path, *, history: bool = False
+) -> tuple[TremorSnapshot | None, str | None]:
+    """Fetch the shared parsed series and map store reasons to API reasons.
 
-    return df, None, stats
+    ``history`` reads the archive, which covers the 30d/90d ranges.
+    """
+    snapshot = get_tremor_history(csv_path) if history else get_tremor_snapshot(csv_path)
+    if snapshot is None:
+        return None, "csv_missing"
+    if snapshot.reason == "empty":
+        return snapshot, "empty_data"
+    return snapshot, snapshot.reason
 
 
 @api_bp.get("/api/curva")
 def get_curva():
-    """Return curva.csv data as JSON with no-cache headers"""
+    """Return curva.csv data as JSON, revalidated through a per-version ETag"""
     user = get_current_user()
     if not user:
         return jsonify({"ok": False, "error": "unauthorized"}), 401
@@ -147,8 +133,8 @@ def get_curva():
             record_csv_error(str(e))
 
     try:
-        raw_df = pd.read_csv(csv_path)
-        df, reason, stats = _prepare_tremor_dataframe(raw_df)
+        snapshot, reason = _load_tremor_snapshot(csv_path, history=True)
+        stats = snapshot.stats if snapshot else {}
 
         current_app.logger.warning(
             "[API] curva csv stats path=%s raw_rows=%s parsed_rows=%s rows_after_dropna=%s",
@@ -181,19 +167,18 @@ def get_curva():
                 payload["csv_path_used"] = str(csv_path)
             return jsonify(payload), status_code
 
-        df = df.sort_values("timestamp")
-        if len(df) < 10:
+        if snapshot.rows < 10:
             current_app.logger.warning(
                 "[API] curva dataset insufficient reason=insufficient_valid_data path=%s rows=%s",
                 csv_path,
-                len(df),
+                snapshot.rows,
             )
             record_csv_error("insufficient_valid_data")
             payload = {
                 "ok": False,
                 "error": "Insufficient valid data",
                 "reason": "insufficient_valid_data",
-                "rows": len(df),
+                "rows": snapshot.rows,
             }
             if include_csv_path:
                 payload["csv_path_used"] = str(csv_path)
@@ -221,8 +206,35 @@ def get_curva():
                 400,
             )
 
-        df = df.tail(limit)
-        if df.empty:
+        max_points = request.args.get("max_points", type=int)
+        resolution = request.args.get("resolution")
+        if max_points is None and resolution:
+            max_points = _RESOLUTION_POINTS.get(resolution, -1)
+        method = request.args.get("downsample") or DEFAULT_DOWNSAMPLE_METHOD
+        if (
+            max_points is not None and not _MIN_MAX_POINTS <= max_points <= _MAX_LIMIT
+        ) or method not in DOWNSAMPLE_METHODS:
+            return (
+                jsonify(
+                    {
+                        "ok": False,
+                        "error": "invalid_downsample",
+                        "reason": "invalid_downsample",
+                        "rows": 0,
+                    }
+                ),
+                400,
+            )
+
+        curva_slice = _CURVA_PAYLOADS.get(
+            snapshot,
+            limit,
+            dumps=current_app.json.dumps,
+            presets=_RANGE_LIMITS.values(),
+            max_points=max_points,
+            method=method,
+        )
+        if not curva_slice.rows:
             current_app.logger.warning(
                 "[API] curva dataset empty reason=limit path=%s limit=%s",
                 csv_path,
@@ -239,27 +251,27 @@ def get_curva():
                 payload["csv_path_used"] = str(csv_path)
             return jsonify(payload), 200
 
-        last_ts = df["timestamp"].iloc[-1]
+        last_ts = curva_slice.last_ts
         temporal_status = get_temporal_status_from_timestamp(last_ts)
         warn_if_stale_timestamp(last_ts, current_app.logger, "api_curva")
-        record_csv_read(len(df), last_ts.to_pydatetime())
-
-        response_df = df.copy()
-        response_df["timestamp"] = response_df["timestamp"].apply(to_iso_utc)
-
-        data = response_df.to_dict(orient="records")
+        record_csv_read(curva_slice.source_rows, last_ts.to_pydatetime())
 
         payload = {
             "ok": True,
-            "data": data,
             "last_ts": to_iso_utc(last_ts),
-            "rows": len(data),
+            "rows": curva_slice.rows,
+            "source_rows": curva_slice.source_rows,
             "csv_mtime_utc": csv_mtime_utc,
             "source": "file",
             "updated_at": temporal_status.get("updated_at_iso"),
             "detected_today": temporal_status.get("detected_today"),
             "is_stale": temporal_status.get("is_stale"),
         }
+        if curva_slice.downsampled:
+            payload["downsampled"] = {
+                "method": curva_slice.method,
+                "max_points": curva_slice.max_points,
+            }
         if extraction_error:
             payload["source"] = "fallback"
             payload["warning"] = extraction_error
@@ -267,17 +279,26 @@ def get_curva():
         if include_csv_path:
             payload["csv_path_used"] = str(csv_path)
 
-        response = jsonify(payload)
+        # The data array is spliced in pre-serialized; the ETag covers the
+        # data version, the limit and every other field of the payload.
+        meta_json = current_app.json.dumps(payload)
+        meta_digest = hashlib.sha1(meta_json.encode("utf-8")).hexdigest()[:12]
+        etag = (
+            f"{curva_slice.version}.{curva_slice.limit}."
+            f"{curva_slice.max_points or 'raw'}.{meta_digest}"
+        )
+        body = '{"data":' + curva_slice.data_json + "," + meta_json.lstrip()[1:]
 
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        response = current_app.response_class(body, mimetype="application/json")
+        response.set_etag(etag)
+        # Clients may keep a copy but must revalidate it on every poll.
+        response.headers['Cache-Control'] = 'private, no-cache, must-revalidate, max-age=0'
         if include_csv_path:
             response.headers["X-Csv-Path-Used"] = str(csv_path)
             response.headers["X-Csv-Last-Ts"] = payload.get("last_ts") or ""
-        
-        return response
-        
+
+        return response.make_conditional(request)
+
     except Exception as e:
         current_app.logger.exception("[API] Failed to read curva.csv")
         record_csv_error(str(e))
@@ -289,6 +310,74 @@ def get_curva():
             payload["csv_path_used"] = str(csv_path)
         return jsonify(payload), 500
 
+@api_bp.get("/api/curva/rollups")
+def get_curva_rollups():
+    """Return hourly/daily tremor rollups for month and year views."""
+    user = get_current_user()
+    if not user:
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+
+    resolution = request.args.get("resolution") or "1h"
+    range_key = request.args.get("range") or "30d"
+    if resolution not in ROLLUP_RESOLUTIONS or range_key not in _ROLLUP_RANGE_DAYS:
+        return (
+            jsonify(
+                {
+                    "ok": False,
+                    "error": "invalid_rollup",
+                    "reason": "invalid_rollup",
+                    "rows": 0,
+                }
+            ),
+            400,
+        )
+
+    csv_path = get_curva_csv_path()
+    try:
+        rollups, version = get_tremor_rollups(csv_path, resolution)
+    except Exception as e:
+        current_app.logger.exception("[API] Failed to read curva rollups")
+        return jsonify({"ok": False, "error": str(e)}), 500
+    if rollups is None or not len(rollups):
+        payload = {
+            "ok": False,
+            "error": "Insufficient valid data",
+            "reason": "no_rollups",
+            "rows": 0,
+        }
+        return jsonify(payload), 200
+
+    days = _ROLLUP_RANGE_DAYS[range_key]
+    if days is not None:
+        cutoff = int(rollups["bucket_start"][-1]) - days * 86400
+        rollups = rollups[rollups["bucket_start"] > cutoff]
+
+    data = [
+        {
+            "timestamp": to_iso_utc(datetime.fromtimestamp(bucket_start, tz=timezone.utc)),
+            "count": count,
+            "min": low,
+            "max": high,
+            "mean": mean,
+            "p95": p95,
+        }
+        for bucket_start, count, low, high, mean, p95 in rollups.tolist()
+    ]
+    response = jsonify(
+        {
+            "ok": True,
+            "resolution": resolution,
+            "range": range_key,
+            "rows": len(data),
+            "data": data,
+            "last_ts": data[-1]["timestamp"],
+        }
+    )
+    response.set_etag(f"{version}.{resolution}.{range_key}")
+    response.headers['Cache-Control'] = 'private, no-cache, must-revalidate, max-age=0'
+    return response.make_conditional(request)
+
+
 @api_bp.route("/api/status")
 def get_status():
     """Return current status and metrics"""
@@ -304,16 +393,14 @@ def get_status():
     
     try:
         if csv_path.exists():
-            raw_df = pd.read_csv(csv_path)
-            df, reason, _stats = _prepare_tremor_dataframe(raw_df)
+            snapshot, reason = _load_tremor_snapshot(csv_path)
 
             if reason is None:
-                df = df.sort_values("timestamp")
-                last_ts = df["timestamp"].iloc[-1]
+                last_ts = snapshot.last_timestamp
                 temporal_status = get_temporal_status_from_timestamp(last_ts)
-                record_csv_read(len(df), last_ts.to_pydatetime())
+                record_csv_read(snapshot.rows, last_ts.to_pydatetime())
 
-                current_value = float(df["value"].iloc[-1])
+                current_value = float(snapshot.values[-1])
                 above_threshold = current_value > threshold
 
                 return jsonify({
@@ -325,7 +412,7 @@ def get_status():
                     "updated_at": temporal_status.get("updated_at_iso"),
                     "detected_today": temporal_status.get("detected_today"),
                     "is_stale": temporal_status.get("is_stale"),
-                    "total_points": len(df)
+                    "total_points": snapshot.rows
                 })
 
             record_csv_error(f"status::{reason}")
@@ -386,79 +473,92 @@ def get_hotspots_latest():
             "items": [],
             "mode": mode,
         }
-    else:
-        try:
-            record = HotspotsCache.query.filter_by(key="etna_latest").one_or_none()
-        except SQLAlchemyError:
-            current_app.logger.exception("[API] Hotspots cache lookup failed")
-            record = None
-
-        payload = record.payload if record and isinstance(record.payload, dict) else {}
-        last_fetch_at = payload.get("last_fetch_at")
-        last_fetch_count = payload.get("last_fetch_count")
-        last_nonzero_at = payload.get("last_nonzero_at")
-        count_significant_cache = payload.get("count_significant")
-        if not isinstance(last_fetch_count, int):
-            last_fetch_count = record.count if record else 0
-        if not last_fetch_at and record:
-            last_fetch_at = to_iso_utc(record.generated_at)
-        else:
-            last_fetch_at = to_iso_utc(last_fetch_at)
-        last_nonzero_at = to_iso_utc(last_nonzero_at)
-
-        window_start = datetime.now(timezone.utc) - timedelta(hours=24)
-        try:
-            raw_query = HotspotsRecord.query.filter(HotspotsRecord.acq_datetime >= window_start)
-            count_raw = raw_query.count()
-            items_raw = (
-                raw_query.order_by(HotspotsRecord.acq_datetime.desc())
-                .limit(500)
-                .all()
-            )
-            records_all = raw_query.all()
-        except SQLAlchemyError:
-            current_app.logger.exception("[API] Hotspots records lookup failed")
-            count_raw = 0
-            items_raw = []
-            records_all = []
+        response = jsonify(cache_response)
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+        return response
 
-        items_significant = [item for item in items_raw if is_significant_record(item, config)]
+    materialized = _load_materialized_hotspots(mode, config)
+    if materialized is None:
+        materialized = _build_live_hotspots(mode, config)
 
-        if isinstance(count_significant_cache, int):
-            count_significant = count_significant_cache
-        else:
-            count_significant = len([item for item in records_all if is_significant_record(item, config)])
+    response = current_app.response_class(materialized["body"], mimetype="application/json")
+    response.set_etag(materialized["etag"])
+    # Clients may keep a copy but must revalidate it on every poll.
+    response.headers["Cache-Control"] = "no-cache, must-revalidate, max-age=0"
+    return response.make_conditional(request)
 
-        items_payload_raw = [_hotspot_payload(item) for item in items_raw]
-        items_payload_significant = [_hotspot_payload(item) for item in items_significant]
 
-        if mode == "significant":
-            items_payload = items_payload_significant
-        else:
-            items_payload = items_payload_raw
-
-        cache_response = {
-            "available": True if config.enabled else False,
-            "last_fetch_at": last_fetch_at,
-            "last_fetch_count": last_fetch_count,
-            "count_24h": count_raw,
-            "count_all": count_raw,
-            "count_24h_raw": count_raw,
-            "count_24h_significant": count_significant,
-            "count_significant": count_significant,
-            "last_nonzero_at": last_nonzero_at,
-            "items_24h": items_payload,
-            "items": items_payload,
-            "items_24h_raw": items_payload_raw,
-            "items_24h_significant": items_payload_significant,
-            "mode": mode,
-        }
+def _load_materialized_hotspots(mode: str, config: HotspotsConfig) -> dict | None:
+    """Response stored by the hotspots ingest, while it is at most one ingest TTL old.
 
-    response = jsonify(cache_response)
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    Past ``cache_ttl_min`` its 24 h window has drifted (or the ingest has
+    stalled), so the caller falls back to the live query.
+    """
+    try:
+        record = HotspotsCache.query.filter_by(key=latest_cache_key(mode)).one_or_none()
+    except SQLAlchemyError:
+        current_app.logger.exception("[API] Hotspots cache lookup failed")
+        return None
+    payload = record.payload if record and isinstance(record.payload, dict) else {}
+    if not payload.get("body") or not payload.get("etag"):
+        return None
+    generated_at = record.generated_at
+    if generated_at.tzinfo is None:
+        generated_at = generated_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - generated_at > timedelta(minutes=config.cache_ttl_min):
+        return None
+    return payload
+
+
+def _build_live_hotspots(mode: str, config: HotspotsConfig) -> dict:
+    """Query the records directly; used until the ingest has materialized a response."""
+    try:
+        record = HotspotsCache.query.filter_by(key="etna_latest").one_or_none()
+    except SQLAlchemyError:
+        current_app.logger.exception("[API] Hotspots cache lookup failed")
+        record = None
+
+    payload = record.payload if record and isinstance(record.payload, dict) else {}
+    last_fetch_at = payload.get("last_fetch_at")
+    last_fetch_count = payload.get("last_fetch_count")
+    count_significant = payload.get("count_significant")
+    if not isinstance(last_fetch_count, int):
+        last_fetch_count = record.count if record else 0
+    if not last_fetch_at and record:
+        last_fetch_at = record.generated_at
+
+    now = datetime.now(timezone.utc)
+    window_start = now - timedelta(hours=LATEST_WINDOW_HOURS)
+    try:
+        raw_query = HotspotsRecord.query.filter(HotspotsRecord.acq_datetime >= window_start)
+        count_raw = raw_query.count()
+        items_raw = (
+            raw_query.order_by(HotspotsRecord.acq_datetime.desc())
+            .limit(LATEST_ITEMS_LIMIT)
+            .all()
+        )
+        if not isinstance(count_significant, int):
+            count_significant = sum(
+                1 for item in raw_query.yield_per(500) if is_significant_record(item, config)
+            )
+    except SQLAlchemyError:
+        current_app.logger.exception("[API] Hotspots records lookup failed")
+        count_raw = 0
+        items_raw = []
+        count_significant = 0
+
+    responses = build_latest_responses(
+        items_raw,
+        count_raw,
+        count_significant,
+        config,
+        last_fetch_at=last_fetch_at,
+        last_fetch_count=last_fetch_count,
+        last_nonzero_at=payload.get("last_nonzero_at"),
+    )
+    return serialize_latest_response(responses[mode], now)
 
 
 @api_bp.get("/api/hotspots/diagnose")
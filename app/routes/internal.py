@@ -15,8 +15,14 @@ from sqlalchemy import or_, text
 
 from app.models import CronRun, db
 from app.models.user import User
+from app.services.alert_outbox import (
+    drain_alert_outbox,
+    outbox_backlog,
+    start_background_drain,
+)
 from app.services.runlog_service import log_cron_run
 from app.services.telegram_service import TelegramService
+from app.services.tremor_summary import start_ai_summary_precompute
 from app.utils.config import get_curva_csv_path, load_curva_dataframe
 from config import Config
 
@@ -272,6 +278,7 @@ def cron_check_alerts():
     authorized = _is_authorized_cron()
     status_code = 200
     sent = 0
+    queued = 0
     skipped = 0
     cooldown_skipped = 0
     free_candidates_count = 0
@@ -394,8 +401,19 @@ def cron_check_alerts():
                 result = telegram_service.check_and_send_alerts(
                     raise_on_error=True,
                     allow_free=True,
+                    use_outbox=Config.ALERT_OUTBOX_ENABLED,
                 )
                 sent = int(result.get("sent", 0))
+                queued = int(result.get("queued", 0))
+                if queued and Config.ALERT_OUTBOX_BACKGROUND_DRAIN:
+                    # Delivery runs after the response; the scheduler or
+                    # /cron/drain-alerts picks up whatever this misses.
+                    start_background_drain(
+                        current_app._get_current_object(),
+                        telegram_service._resolve_bot_token(),
+                    )
+                if result.get("reason") != "no_new_points":
+                    start_ai_summary_precompute(current_app._get_current_object())
                 skipped = int(result.get("skipped", 0))
                 cooldown_skipped = int(result.get("cooldown_skipped", 0))
                 free_candidates_count = int(result.get("free_candidates_count", 0))
@@ -412,6 +430,7 @@ def cron_check_alerts():
                 response_payload = {
                     "ok": True,
                     "sent": sent,
+                    "queued": queued,
                     "skipped": skipped,
                     "reason": reason,
                     "skipped_by_reason": skipped_by_reason,
@@ -449,6 +468,7 @@ def cron_check_alerts():
                     normalized_reasons.setdefault(key, 0)
                 response_payload["skipped_by_reason"] = normalized_reasons
                 diagnostic_snapshot["sent_count"] = sent
+                diagnostic_snapshot["queued_count"] = queued
                 diagnostic_snapshot["skipped_count"] = skipped
                 diagnostic_snapshot["cooldown_skipped_count"] = cooldown_skipped
                 diagnostic_snapshot["free_candidates_count"] = free_candidates_count
@@ -507,9 +527,10 @@ def cron_check_alerts():
             except Exception as exc:  # pragma: no cover - defensive log
                 current_app.logger.exception("[CRON] Failed to store cron run log: %s", exc)
         current_app.logger.info(
-            "[CRON] check-alerts finished request_id=%s sent=%s skipped=%s reason=%s duration_ms=%.1f",
+            "[CRON] check-alerts finished request_id=%s sent=%s queued=%s skipped=%s reason=%s duration_ms=%.1f",
             request_id,
             sent,
+            queued,
             skipped,
             reason,
             duration_ms,
@@ -517,6 +538,33 @@ def cron_check_alerts():
     return jsonify(response_payload), status_code
 
 
+@internal_bp.route("/cron/drain-alerts", methods=["POST"])
+def cron_drain_alerts():
+    if not _is_authorized_cron():
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+
+    started_at = perf_counter()
+    token = TelegramService()._resolve_bot_token()
+    if not token:
+        return jsonify({"ok": True, "skipped": True, "reason": "no_token_configured"}), 200
+    try:
+        stats = drain_alert_outbox(token)
+        backlog = outbox_backlog()
+    except Exception as exc:  # pragma: no cover - defensive guard
+        db.session.rollback()
+        current_app.logger.exception("[CRON] drain-alerts failed: %s", exc)
+        return jsonify({"ok": False, "error": "exception", "message": str(exc)}), 500
+    return jsonify(
+        {
+            "ok": True,
+            **stats,
+            "backlog": backlog,
+            "duration_ms": round((perf_counter() - started_at) * 1000, 1),
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }
+    ), 200
+
+
 @internal_bp.route("/cron/debug-user", methods=["GET"])
 def cron_debug_user():
     if not _is_authorized_cron():
@@ -2,9 +2,9 @@ from datetime import datetime, timedelta, timezone
 import copy
 import json
 from pathlib import Path
-from math import isfinite
 from zoneinfo import ZoneInfo
 
+import numpy as np
 import pandas as pd
 import requests
 from flask import (
@@ -43,7 +43,11 @@ from backend.services.hotspots.storage import read_cache, unavailable_payload
 from config import DEFAULT_GA_MEASUREMENT_ID, Config
 from app.models.hotspots_record import HotspotsRecord
 from app.services.copernicus_smart_view import build_copernicus_view_payload
-from app.services.copernicus_swir import refresh_swir_image
+from app.services.copernicus_swir import (
+    get_swir_image,
+    get_swir_refresh_status,
+    refresh_swir_image,
+)
 from app.services.tremor_summary import build_tremor_summary
 from app.utils.meteo import (
     DEFAULT_POI_ID,
@@ -58,6 +62,7 @@ from ..utils.config import (
     load_curva_dataframe,
     warn_if_stale_timestamp,
 )
+from ..utils.tremor_store import get_tremor_snapshot
 from plotly import io as plotly_io
 
 bp = Blueprint("main", __name__)
@@ -286,7 +291,6 @@ def index():
                     current_app.logger.warning("[HOME] CSV validation failed: %s", load_reason)
                 record_csv_error(str(load_reason))
             elif df is not None:
-                df = df.sort_values("timestamp")
                 timestamps = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
                 values = df["value"].tolist()
                 data_points = len(df)
@@ -312,18 +316,14 @@ def index():
                 latest_timestamp_display = temporal_end_display.strftime("%d/%m/%Y %H:%M")
                 record_csv_read(len(df), temporal_end.to_pydatetime())
 
-                plot_df = df[df["value"].notna()].copy()
-                clean_pairs = []
-                if not plot_df.empty:
-                    for ts, value in zip(
-                        plot_df["timestamp"].tolist(), plot_df["value"].tolist()
-                    ):
-                        if value is None or not isfinite(value) or value <= 0:
-                            continue
-                        if ts is None:
-                            continue
-                        timestamp = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else ts
-                        clean_pairs.append((timestamp, float(value)))
+                plot_values = df["value"].to_numpy(dtype="float64")
+                plot_df = df[np.isfinite(plot_values) & (plot_values > 0)]
+                clean_pairs = list(
+                    zip(
+                        pd.DatetimeIndex(plot_df["timestamp"]).to_pydatetime().tolist(),
+                        plot_df["value"].astype("float64").tolist(),
+                    )
+                )
                 if clean_pairs:
                     threshold_level = Config.ALERT_THRESHOLD_DEFAULT
                     user = get_current_user()
@@ -642,13 +642,15 @@ def eruzione_oggi():
     
     if csv_path.exists():
         try:
-            df = pd.read_csv(csv_path)
-            if "timestamp" in df.columns and not df.empty:
-                df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-                df = df.dropna(subset=["timestamp"])
+            snapshot = get_tremor_snapshot(csv_path)
+            if (
+                snapshot is not None
+                and snapshot.reason != "missing_timestamp"
+                and snapshot.stats.get("raw_rows")
+            ):
+                df = snapshot.frame
                 
                 if not df.empty:
-                    df = df.sort_values("timestamp")
                     preview_slice = df.tail(2016)
                     preview_rows = []
                     for row in preview_slice.itertuples(index=False):
@@ -1014,16 +1016,16 @@ def observatory():
 
     if csv_path.exists():
         try:
-            df = pd.read_csv(csv_path)
-            if "timestamp" not in df.columns:
+            snapshot = get_tremor_snapshot(csv_path)
+            if snapshot is None:
+                placeholder_reason = "missing"
+            elif snapshot.reason == "missing_timestamp":
                 placeholder_reason = "missing_timestamp"
             else:
-                df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-                df = df.dropna(subset=["timestamp"])
+                df = snapshot.frame
                 if df.empty:
                     placeholder_reason = "empty"
                 else:
-                    df = df.sort_values("timestamp")
                     data_points = len(df)
                     preview_slice = df.tail(2016)
                     preview_rows = [
@@ -1096,7 +1098,7 @@ def observatory():
         s2_meta.get("product_id"),
     )
 
-    swir_refresh = refresh_swir_image()
+    swir_refresh = get_swir_image()
     swir_image_path = Path(current_app.static_folder) / "copernicus" / "s2_latest.png"
     swir_image_available = swir_image_path.exists()
     swir_cache_bust = (
@@ -1107,10 +1109,18 @@ def observatory():
         swir_status_label = "Aggiornata ora"
         swir_status_class = "observatory-badge--success"
         swir_status_message = "Download completato da Sentinel Hub."
+    elif swir_refresh.ok and swir_refresh.used_cache and swir_refresh.refreshing:
+        swir_status_label = "Cache attiva"
+        swir_status_class = "observatory-badge--info"
+        swir_status_message = "Immagine in cache; aggiornamento da Sentinel Hub in corso."
     elif swir_refresh.ok and swir_refresh.used_cache:
         swir_status_label = "Cache attiva"
         swir_status_class = "observatory-badge--info"
         swir_status_message = "Immagine in cache aggiornata di recente."
+    elif swir_refresh.refreshing and not swir_refresh.used_cache:
+        swir_status_label = "In aggiornamento"
+        swir_status_class = "observatory-badge--info"
+        swir_status_message = "Download da Sentinel Hub in corso."
     elif swir_refresh.used_cache:
         swir_status_label = "Cache disponibile"
         swir_status_class = "observatory-badge--warning"
@@ -1175,7 +1185,8 @@ def observatory_swir_image():
 
         if not png.exists():
             current_app.logger.info("[SWIR] PNG missing, generating")
-            refresh_swir_image(force=True)
+            # Concurrent requests wait on the same download instead of repeating it.
+            refresh_swir_image()
             if not png.exists():
                 return ("SWIR image unavailable", 503)
 
@@ -1550,6 +1561,7 @@ def healthcheck():
         "ok": ok,
         "uptime_seconds": uptime,
         "csv": csv_metrics,
+        "swir_refresh": get_swir_refresh_status(),
         "telegram_bot": telegram_status,
         "premium_users": premium_count,
         "premium_users_error": premium_error,
@@ -0,0 +1,276 @@
+"""Durable delivery of Telegram alerts through the ``alert_outbox`` table.
+
+Alert evaluation (``TelegramService`` with ``use_outbox=True``) inserts one
+row per recipient in the same transaction that records the alert ``Event``
+and the cooldown state. Rows are keyed by ``<event_id>:<user_id>:<kind>``, so
+a retried or overlapping cron request cannot enqueue the same alert twice,
+and a request killed before its commit leaves neither state nor rows behind.
+
+``drain_alert_outbox`` claims due rows under a lease with a conditional
+``UPDATE`` per row (plus ``SKIP LOCKED`` on PostgreSQL), delivers them with
+the shared Telegram pool and stores the outcome. Transient failures are retried with exponential backoff. Rows are
+dead-lettered (``status="dead"``, with their last error) after
+``ALERT_OUTBOX_MAX_ATTEMPTS``, on a permanent Telegram error, or once older
+than ``ALERT_OUTBOX_TTL_MINUTES``; the alert state recorded at enqueue time is
+rolled back for them (its events are kept, marked undelivered), so an
+undelivered alert neither spends the free trial nor counts as sent. A drain that dies mid-batch leaves its rows
+``sending`` until the lease expires; they are claimed again afterwards, so
+only that window is at-least-once.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, or_, update
+
+from alerts.delivery import OutgoingMessage, deliver_telegram_messages
+from app.models import db
+from app.models.alert_outbox import AlertOutbox
+from app.models.event import Event
+from app.models.user import User
+from app.utils.background import SingleFlight
+from app.utils.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+CLAIM_BATCH_SIZE = 200
+CLAIM_LEASE = timedelta(minutes=5)
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(minutes=30)
+KEY_CHUNK_SIZE = 500
+
+_background_drain = SingleFlight("alert-outbox-drain")
+
+
+def outbox_key(event_id: str, user_id: int, kind: str) -> str:
+    return f"{event_id}:{user_id}:{kind}"
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def existing_keys(keys: Iterable[str]) -> set[str]:
+    """Return the idempotency keys among ``keys`` that are already queued."""
+    keys = list(keys)
+    found: set[str] = set()
+    for offset in range(0, len(keys), KEY_CHUNK_SIZE):
+        chunk = keys[offset:offset + KEY_CHUNK_SIZE]
+        found.update(
+            key
+            for (key,) in db.session.query(AlertOutbox.idempotency_key).filter(
+                AlertOutbox.idempotency_key.in_(chunk)
+            )
+        )
+    return found
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+
+
+def _due(now: datetime):
+    return or_(
+        and_(
+            AlertOutbox.status == AlertOutbox.STATUS_PENDING,
+            AlertOutbox.next_attempt_at <= now,
+        ),
+        and_(
+            AlertOutbox.status == AlertOutbox.STATUS_SENDING,
+            AlertOutbox.locked_until <= now,
+        ),
+    )
+
+
+def _due_candidates(now: datetime, limit: int) -> list[int]:
+    query = (
+        db.session.query(AlertOutbox.id)
+        .filter(_due(now))
+        .order_by(AlertOutbox.id.asc())
+        .limit(limit)
+    )
+    if db.engine.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    return [row_id for (row_id,) in query]
+
+
+def _claim_due(now: datetime, limit: int) -> list[AlertOutbox]:
+    """Lease up to ``limit`` due rows to this drain.
+
+    Each candidate is taken with a conditional ``UPDATE`` that repeats the due
+    predicate, so a row another drain leased in the meantime matches nothing
+    and is skipped. This holds on every backend, not only where ``SKIP
+    LOCKED`` keeps concurrent drains off the same candidates.
+    """
+    claimed = []
+    for row_id in _due_candidates(now, limit):
+        result = db.session.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.id == row_id, _due(now))
+            .values(
+                status=AlertOutbox.STATUS_SENDING,
+                locked_until=now + CLAIM_LEASE,
+                attempts=func.coalesce(AlertOutbox.attempts, 0) + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            claimed.append(row_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return (
+        AlertOutbox.query.filter(AlertOutbox.id.in_(claimed))
+        .order_by(AlertOutbox.id.asc())
+        .all()
+    )
+
+
+UNDELIVERED_SUFFIX = "_undelivered"
+
+
+def _revert_queued_state(row: AlertOutbox, now: datetime) -> None:
+    """Undo what ``TelegramService`` recorded when ``row`` was queued.
+
+    The events recorded for the row (``Event.outbox_key``) are kept for the
+    audit trail but re-typed ``<type>_undelivered``, so they no longer count
+    as sent, and a ``delivery_failed`` event records why. A free trial spent
+    on this event is given back, and the cooldown timestamp and 30-day
+    counter are recomputed from the alerts that remain.
+    """
+    queued = Event.query.filter(
+        Event.outbox_key == row.idempotency_key,
+        ~Event.event_type.endswith(UNDELIVERED_SUFFIX),
+    )
+    for event in queued:
+        event.event_type = f"{event.event_type}{UNDELIVERED_SUFFIX}"
+    db.session.add(
+        Event(
+            user_id=row.user_id,
+            event_type="delivery_failed",
+            message=f"Telegram {row.kind} not delivered: {row.last_error}"[:255],
+            outbox_key=row.idempotency_key,
+        )
+    )
+    if row.kind == "upsell":
+        return
+    user = db.session.get(User, row.user_id)
+    if user is None:
+        return
+    if row.kind == "free_trial" and user.free_alert_event_id == row.event_id:
+        user.free_alert_consumed = max((user.free_alert_consumed or 0) - 1, 0)
+        user.free_alert_event_id = None
+    alerts = Event.query.filter(Event.user_id == user.id, Event.event_type == "alert")
+    if user.last_alert_sent_at is not None:
+        user.last_alert_sent_at = alerts.with_entities(func.max(Event.timestamp)).scalar()
+    window_start = now - timedelta(days=30)
+    user.alert_count_30d = alerts.filter(Event.timestamp >= window_start).count()
+
+
+def _dead_letter(row: AlertOutbox, error: Optional[str], now: datetime) -> None:
+    row.status = AlertOutbox.STATUS_DEAD
+    row.locked_until = None
+    row.last_error = (error or "unknown")[:255]
+    _revert_queued_state(row, now)
+    logger.error(
+        "[OUTBOX] dead-lettered key=%s attempts=%s error=%s",
+        row.idempotency_key,
+        row.attempts,
+        row.last_error,
+    )
+
+
+def _drain_batch(token: str, now: datetime, limit: int) -> dict[str, int]:
+    stats = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0}
+    rows = _claim_due(now, limit)
+    stats["claimed"] = len(rows)
+    if not rows:
+        return stats
+
+    expires_before = now - timedelta(minutes=Config.ALERT_OUTBOX_TTL_MINUTES)
+    live = []
+    for row in rows:
+        if _utc(row.created_at) < expires_before:
+            _dead_letter(row, "expired", now)
+            stats["dead"] += 1
+        else:
+            live.append(row)
+
+    results = deliver_telegram_messages(
+        token,
+        [OutgoingMessage(chat_id=row.chat_id, text=row.message) for row in live],
+    )
+    finished_at = datetime.now(timezone.utc)
+    for row, result in zip(live, results):
+        if result.ok:
+            row.status = AlertOutbox.STATUS_SENT
+            row.sent_at = finished_at
+            row.locked_until = None
+            row.last_error = None
+            stats["sent"] += 1
+        elif result.permanent or row.attempts >= Config.ALERT_OUTBOX_MAX_ATTEMPTS:
+            _dead_letter(row, result.error or result.status, finished_at)
+            stats["dead"] += 1
+        else:
+            row.status = AlertOutbox.STATUS_PENDING
+            row.locked_until = None
+            row.next_attempt_at = finished_at + retry_delay(row.attempts)
+            row.last_error = (result.error or result.status)[:255]
+            stats["retried"] += 1
+    db.session.commit()
+    return stats
+
+
+def drain_alert_outbox(
+    token: str,
+    *,
+    batch_size: int = CLAIM_BATCH_SIZE,
+    time_budget_s: float = 50.0,
+) -> dict[str, int]:
+    """Deliver due outbox rows batch by batch until none is left or time runs out."""
+    totals = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0}
+    if not token:
+        logger.warning("[OUTBOX] drain skipped: missing bot token")
+        return totals
+    started = perf_counter()
+    while True:
+        stats = _drain_batch(token, datetime.now(timezone.utc), batch_size)
+        for key, value in stats.items():
+            totals[key] += value
+        if stats["claimed"] < batch_size or perf_counter() - started >= time_budget_s:
+            break
+    if totals["claimed"]:
+        logger.info(
+            "[OUTBOX] drained claimed=%s sent=%s retried=%s dead=%s",
+            totals["claimed"],
+            totals["sent"],
+            totals["retried"],
+            totals["dead"],
+        )
+    return totals
+
+
+def outbox_backlog() -> dict[str, int]:
+    """Row count per status, for diagnostics."""
+    rows = db.session.query(AlertOutbox.status, func.count()).group_by(AlertOutbox.status)
+    return {status: int(count) for status, count in rows}
+
+
+def start_background_drain(app, token: str) -> bool:
+    """Drain the outbox in a daemon thread; returns False if a drain is already running."""
+    return _background_drain.start(lambda: drain_alert_outbox(token), app=app, logger=logger)
+
+
+__all__ = [
+    "drain_alert_outbox",
+    "existing_keys",
+    "outbox_backlog",
+    "outbox_key",
+    "retry_delay",
+    "start_background_drain",
+]
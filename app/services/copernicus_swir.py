@@ -1,4 +1,13 @@
-"""Fetch and cache Sentinel Hub SWIR preview for the observatory page."""
+"""Fetch and cache Sentinel Hub SWIR preview for the observatory page.
+
+Page views call ``get_swir_image``, which only looks at the cached
+``s2_latest.png``: a stale or missing image starts one background refresh
+and the page renders with whatever is on disk. ``refresh_swir_image`` is the
+synchronous download (admin refresh, boot, missing-image route); all
+refreshes go through the ``_refresh`` single-flight so at most one WMS
+download runs per process, and waiters reuse its result instead of
+downloading again.
+"""
 
 from __future__ import annotations
 
@@ -6,11 +15,13 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import time
+from typing import Any
 
 import requests
 from flask import current_app
 
 from app.services.copernicus import ETNA_BBOX_EPSG4326
+from app.utils.background import SingleFlight
 
 INSTANCE_ID = "bdceb943-164b-475a-aa72-8011ec5500ab"
 LAYER_NAME = "SWIR"
@@ -20,6 +31,12 @@ RETRY_DELAYS = [0.0, 1.0, 2.0]
 DEFAULT_WIDTH = 1280
 DEFAULT_HEIGHT = 720
 MAX_CACHE_AGE = timedelta(minutes=30)
+# Minimum spacing of background attempts, so an unreachable WMS is not
+# retried on every page view.
+REFRESH_RETRY_INTERVAL = timedelta(minutes=5)
+
+_session: requests.Session | None = None
+_refresh = SingleFlight("swir-refresh", retry_interval=REFRESH_RETRY_INTERVAL)
 
 
 @dataclass(frozen=True)
@@ -29,6 +46,7 @@ class SwirRefreshResult:
     used_cache: bool
     error: str | None
     updated_at: datetime | None
+    refreshing: bool = False
 
 
 def _swir_image_path() -> Path:
@@ -74,6 +92,13 @@ def _request_with_retry(session: requests.Session, url: str, params: dict[str, s
     raise RuntimeError("SWIR download failed")
 
 
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
 def _is_stale(path: Path) -> bool:
     if not path.exists():
         return True
@@ -81,11 +106,54 @@ def _is_stale(path: Path) -> bool:
     return datetime.now(timezone.utc) - mtime > MAX_CACHE_AGE
 
 
+def _mtime(path: Path) -> datetime | None:
+    try:
+        return datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+    except OSError:
+        return None
+
+
+def get_swir_image() -> SwirRefreshResult:
+    """Cached SWIR image state for page views; never waits on Sentinel Hub."""
+    target_path = _swir_image_path()
+    updated_at = _mtime(target_path)
+    stale = _is_stale(target_path)
+    if stale:
+        schedule_swir_refresh(current_app._get_current_object())
+    error = _refresh.last_failure()
+    return SwirRefreshResult(
+        ok=not stale or error is None,
+        updated=False,
+        used_cache=updated_at is not None,
+        error=error,
+        updated_at=updated_at,
+        refreshing=_refresh.running,
+    )
+
+
+def schedule_swir_refresh(app) -> bool:
+    """Refresh the image in a daemon thread; False if one is running or ran recently."""
+    return _refresh.start(lambda: _refresh_locked(force=False), app=app)
+
+
+def get_swir_refresh_status() -> dict[str, Any]:
+    return _refresh.status()
+
+
 def refresh_swir_image(*, force: bool = False, bypass_owner: bool = False) -> SwirRefreshResult:
+    """Download the image now unless it is fresh; joins a refresh already in flight."""
+    _ = bypass_owner
+    # A caller that waited for a running download reuses its image.
+    return _refresh.run(
+        lambda: _refresh_locked(force=force),
+        joined=lambda: _refresh_locked(force=False),
+    )
+
+
+def _refresh_locked(*, force: bool) -> SwirRefreshResult:
     target_path = _swir_image_path()
     target_path.parent.mkdir(parents=True, exist_ok=True)
     cached_exists = target_path.exists()
-    _ = bypass_owner
 
     if not force and cached_exists and not _is_stale(target_path):
         updated_at = datetime.fromtimestamp(target_path.stat().st_mtime, tz=timezone.utc)
@@ -97,16 +165,18 @@ def refresh_swir_image(*, force: bool = False, bypass_owner: bool = False) -> Sw
             updated_at=updated_at,
         )
 
+    started_at = datetime.now(timezone.utc)
+    started = time.monotonic()
     try:
         params = _build_wms_params(ETNA_BBOX_EPSG4326, DEFAULT_WIDTH, DEFAULT_HEIGHT)
         request_url = requests.Request("GET", WMS_URL, params=params).prepare().url
         current_app.logger.info("[SWIR] WMS request URL: %s", request_url)
-        session = requests.Session()
-        content = _request_with_retry(session, WMS_URL, params)
+        content = _request_with_retry(_get_session(), WMS_URL, params)
         temp_path = target_path.with_suffix(".tmp")
         temp_path.write_bytes(content)
         temp_path.replace(target_path)
         current_app.logger.info("[SWIR] image written to %s", target_path.resolve())
+        _refresh.record(started_at, started, None)
         updated_at = datetime.fromtimestamp(target_path.stat().st_mtime, tz=timezone.utc)
         return SwirRefreshResult(
             ok=True,
@@ -116,6 +186,7 @@ def refresh_swir_image(*, force: bool = False, bypass_owner: bool = False) -> Sw
             updated_at=updated_at,
         )
     except Exception as exc:  # noqa: BLE001 - return status to frontend
+        _refresh.record(started_at, started, str(exc))
         updated_at = None
         if cached_exists:
             updated_at = datetime.fromtimestamp(target_path.stat().st_mtime, tz=timezone.utc)
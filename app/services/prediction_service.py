@@ -36,13 +36,18 @@ def compute_tremor_outcome(
     if df is None or df.empty:
         return None
 
-    df = df.copy()
     if "timestamp" not in df.columns or "value" not in df.columns:
         return None
 
-    df = df.dropna(subset=["timestamp", "value"]).sort_values("timestamp")
+    # The shared snapshot frame is already clean and sorted: only copy when
+    # it is not, so resolving many predictions does not copy the history.
+    if df["timestamp"].isna().any() or df["value"].isna().any():
+        df = df.dropna(subset=["timestamp", "value"])
+    if not df["timestamp"].is_monotonic_increasing:
+        df = df.sort_values("timestamp")
     if df.empty:
         return None
+    timestamps = df["timestamp"]
 
     reference_time = _normalize_reference_time(reference_time)
     if reference_time is None:
@@ -53,16 +58,19 @@ def compute_tremor_outcome(
     if reference_time.tzinfo is None:
         reference_time = reference_time.replace(tzinfo=timezone.utc)
 
-    df_before = df[df["timestamp"] <= reference_time]
-    if df_before.empty:
-        df_before = df
+    before_end = int(timestamps.searchsorted(pd.Timestamp(reference_time), side="right"))
+    if before_end == 0:
+        before_end = len(df)
 
-    now_window = df_before.tail(max(1, NOW_WINDOW_POINTS))
-    now_value = float(now_window["value"].max())
+    now_start = max(before_end - max(1, NOW_WINDOW_POINTS), 0)
+    now_value = float(df["value"].iloc[now_start:before_end].max())
 
-    prev_target = reference_time - timedelta(hours=horizon_hours)
-    prev_idx = (df["timestamp"] - prev_target).abs().idxmin()
-    prev_value = float(df.loc[prev_idx, "value"])
+    # Nearest sample to the target; ties go to the earlier one.
+    prev_target = pd.Timestamp(reference_time - timedelta(hours=horizon_hours))
+    position = int(timestamps.searchsorted(prev_target, side="left"))
+    candidates = [idx for idx in (position - 1, position) if 0 <= idx < len(df)]
+    prev_pos = min(candidates, key=lambda idx: abs(timestamps.iloc[idx] - prev_target))
+    prev_value = float(df["value"].iloc[prev_pos])
 
     if prev_value <= 0:
         outcome = "FLAT"
@@ -2,9 +2,13 @@ from datetime import datetime, timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from app.utils.ingv_bands import refresh_ingv_bands
 from app.utils.logger import get_logger
+from config import Config
+from .alert_outbox import drain_alert_outbox
 from .telegram_service import TelegramService
 from .prediction_service import resolve_expired_predictions
+from .tremor_summary import precompute_ai_summary
 import atexit
 
 logger = get_logger(__name__)
@@ -27,6 +31,34 @@ class SchedulerService:
             name='Check tremor levels and send Telegram alerts',
             replace_existing=True
         )
+        self.scheduler.add_job(
+            func=self._drain_alert_outbox_with_context,
+            trigger=IntervalTrigger(seconds=30),
+            id="alert_outbox",
+            name="Deliver queued Telegram alerts",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        self.scheduler.add_job(
+            func=self._refresh_ingv_bands,
+            trigger=IntervalTrigger(hours=1),
+            id="ingv_bands",
+            name="Verify INGV colour band thresholds",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(timezone.utc),
+        )
+        self.scheduler.add_job(
+            func=self._precompute_ai_summary_with_context,
+            trigger=IntervalTrigger(minutes=5),
+            id="ai_summary",
+            name="Precompute the AI tremor summary for the latest point",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
         self.scheduler.add_job(
             func=self._resolve_predictions_with_context,
             trigger=IntervalTrigger(minutes=10),
@@ -57,7 +89,10 @@ class SchedulerService:
                 extra={"job_id": "telegram_alerts", "started_at": started_at.isoformat()},
             )
             try:
-                self.telegram_service.check_and_send_alerts(allow_free=True)
+                self.telegram_service.check_and_send_alerts(
+                    allow_free=True,
+                    use_outbox=Config.ALERT_OUTBOX_ENABLED,
+                )
             except Exception:  # pragma: no cover - defensive guard
                 logger.exception("[WORKER] scheduler.job.error", extra={"job_id": "telegram_alerts"})
             else:
@@ -72,6 +107,31 @@ class SchedulerService:
                     },
                 )
 
+    def _drain_alert_outbox_with_context(self):
+        """Deliver due rows of the alert outbox within Flask app context"""
+        from flask import current_app
+        with current_app.app_context():
+            try:
+                drain_alert_outbox(self.telegram_service._resolve_bot_token(), time_budget_s=25.0)
+            except Exception:  # pragma: no cover - defensive guard
+                logger.exception("[WORKER] scheduler.job.error", extra={"job_id": "alert_outbox"})
+
+    def _refresh_ingv_bands(self):
+        """Verify (and if needed re-detect) the cached INGV bands once they are stale"""
+        try:
+            refresh_ingv_bands(logger)
+        except Exception:  # pragma: no cover - defensive guard
+            logger.exception("[WORKER] scheduler.job.error", extra={"job_id": "ingv_bands"})
+
+    def _precompute_ai_summary_with_context(self):
+        """Fill the shared AI summary cache when a new tremor point has landed"""
+        from flask import current_app
+        with current_app.app_context():
+            try:
+                precompute_ai_summary()
+            except Exception:  # pragma: no cover - defensive guard
+                logger.exception("[WORKER] scheduler.job.error", extra={"job_id": "ai_summary"})
+
     def _resolve_predictions_with_context(self):
         from flask import current_app
         with current_app.app_context():
@@ -1,37 +1,111 @@
 import os
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal, InvalidOperation
 from numbers import Integral
-from typing import Optional
+import threading
+from typing import Callable, Optional
 
+import numpy as np
 import pandas as pd
 from flask import current_app, has_app_context
 from sqlalchemy import and_, func, or_
 
 from app.models import db
+from app.models.alert_outbox import AlertOutbox
 from app.models.alert_state import AlertState
 from app.models.event import Event
 from app.models.user import User
+from app.services.alert_outbox import existing_keys, outbox_key
 from app.utils.config import get_curva_csv_path, warn_if_stale_timestamp
 from app.utils.logger import get_logger
 from app.utils.metrics import record_csv_error, record_csv_read
+from app.utils.tremor_store import TremorSnapshot, get_tremor_snapshot
+from alerts.delivery import DeliveryResult, OutgoingMessage, deliver_telegram_messages
+from alerts.engine import (
+    RENOTIFY_INTERVAL,
+    StreamUpdate,
+    StreamingEvaluator,
+    evaluate_eligibility,
+)
 from alerts.notifier import send_telegram_alert
 from app import bot_messages
 from config import Config
 
 logger = get_logger(__name__)
 
+# Users per IN (...) clause when prefetching alert history.
+HISTORY_CHUNK_SIZE = 500
+
+# Rolling alert window per (curva path, window size), shared by the service
+# instances of this process; ``AlertState.last_checked_ts`` stays the source
+# of truth for the checkpoint.
+_STREAMS: dict[tuple[str, int], StreamingEvaluator] = {}
+_STREAMS_LOCK = threading.Lock()
+
+
+@dataclass
+class _AlertHistory:
+    """Event history of the dispatched users, fetched with a few set-based queries."""
+
+    last_alert_value: dict[int, Optional[float]] = field(default_factory=dict)
+    last_reset_at: dict[int, datetime] = field(default_factory=dict)
+    last_upsell_at: dict[int, datetime] = field(default_factory=dict)
+    alerts_30d: dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Eligibility:
+    """Per-user gates of one dispatch, aligned with the candidate user list."""
+
+    thresholds: np.ndarray
+    threshold_fallback: np.ndarray
+    above: np.ndarray
+    rate_limited: np.ndarray
+    hysteresis_rearmed: np.ndarray
+    hysteresis_release: np.ndarray
+    renotify_due: np.ndarray
+
+
+@dataclass
+class _PlannedSend:
+    """A message decided during evaluation, delivered with the rest of the batch.
+
+    ``on_sent``/``on_failed`` apply the outcome and return the decision reason.
+    """
+
+    chat_id: Optional[str]
+    text: str
+    on_sent: Callable[[], str]
+    on_failed: Callable[[], str]
+    user_id: Optional[int] = None
+    kind: str = "alert"
+    result: Optional[DeliveryResult] = None
+    reason: Optional[str] = None
+
+    @property
+    def sent(self) -> bool:
+        return self.result is not None and self.result.ok
+
+    @property
+    def queued(self) -> bool:
+        return self.sent and self.result.status == "queued"
+
 
 class TelegramService:
     """Handle tremor alerts for Telegram subscribers."""
 
     RATE_LIMIT = timedelta(minutes=Config.ALERT_RATE_LIMIT_MINUTES)
-    RENOTIFY_INTERVAL = timedelta(minutes=30)
+    RENOTIFY_INTERVAL = RENOTIFY_INTERVAL
     MOVING_AVG_WINDOW = Config.ALERT_MOVING_AVG_WINDOW
     UPSELL_COOLDOWN = timedelta(hours=24)
 
     def __init__(self) -> None:
         self._cooldown_skipped_count = 0
+        self._pending_events: Optional[list[Event]] = None
+        self._queuing_key: Optional[str] = None
+        self._outbox: Optional[list[_PlannedSend]] = None
+        self._use_outbox = False
 
     def _alerts_debug_enabled(self) -> bool:
         return os.getenv("ETNAMONITOR_DEBUG_ALERTS") == "1"
@@ -205,8 +279,19 @@ class TelegramService:
             cooldown_seconds,
         )
     
-    def check_and_send_alerts(self, raise_on_error: bool = False, *, allow_free: bool = False):
-        """Evaluate tremor data and deliver alerts based on the user's plan."""
+    def check_and_send_alerts(
+        self,
+        raise_on_error: bool = False,
+        *,
+        allow_free: bool = False,
+        use_outbox: bool = False,
+    ):
+        """Evaluate tremor data and deliver alerts based on the user's plan.
+
+        With ``use_outbox`` the messages are queued in ``alert_outbox`` in the
+        same transaction as the alert state and delivered later by
+        ``app.services.alert_outbox.drain_alert_outbox``.
+        """
 
         try:
             self._cooldown_skipped_count = 0
@@ -223,8 +308,8 @@ class TelegramService:
                     "reason": "no_token",
                 }
 
-            dataset = self._load_dataset()
-            if dataset is None:
+            snapshot = self._load_snapshot()
+            if snapshot is None:
                 return {
                     "sent": 0,
                     "skipped": 0,
@@ -237,20 +322,16 @@ class TelegramService:
                     "reason": "dataset_invalid",
                 }
 
-            dataset = dataset.sort_values("timestamp").reset_index(drop=True)
             alert_state = self._get_alert_state()
             last_checked_ts = self._utc(alert_state.last_checked_ts)
+            window_size = max(1, int(self.MOVING_AVG_WINDOW))
+            update = self._advance_stream(snapshot, last_checked_ts, window_size)
 
-            if last_checked_ts:
-                new_points = dataset[dataset["timestamp"] > last_checked_ts]
-            else:
-                new_points = dataset
-
-            if new_points.empty:
+            if not update.new_points:
                 logger.info(
                     "alert_check no new points last_checked_ts=%s total_points=%s",
                     self._format_timestamp(last_checked_ts),
-                    len(dataset),
+                    snapshot.rows,
                 )
                 return {
                     "sent": 0,
@@ -264,25 +345,16 @@ class TelegramService:
                     "reason": "no_new_points",
                 }
 
-            peak_value = float(new_points["value"].max())
-            latest_row = new_points.iloc[-1]
-            current_value = float(latest_row["value"])
-            timestamp = latest_row["timestamp"]
-            event_ts = timestamp.to_pydatetime() if hasattr(timestamp, "to_pydatetime") else timestamp
-            event_ts = self._utc(event_ts)
+            peak_value = float(update.peak_value)
+            current_value = float(update.latest_value)
+            event_ts = pd.Timestamp(update.latest_ts).tz_localize("UTC").to_pydatetime()
             event_id = self._compute_event_id(event_ts, peak_value)
-            window_size = max(1, int(self.MOVING_AVG_WINDOW))
-            moving_avg_real = float(
-                self.calculate_moving_average(
-                    dataset["value"].tolist(),
-                    window_size=window_size,
-                )
-            )
+            moving_avg_real = float(update.moving_average)
 
             logger.info(
                 "alert_check last_checked_ts=%s new_points=%s last_point_ts=%s peak_value=%.3f",
                 self._format_timestamp(last_checked_ts),
-                len(new_points),
+                update.new_points,
                 self._format_timestamp(event_ts),
                 peak_value,
             )
@@ -303,6 +375,7 @@ class TelegramService:
                 now,
                 window_size=window_size,
                 allow_free=allow_free,
+                use_outbox=use_outbox,
             )
             alert_state.last_checked_ts = event_ts
             alert_state.touch()
@@ -328,7 +401,7 @@ class TelegramService:
 
     # --- Internal helpers -------------------------------------------------
 
-    def _load_dataset(self) -> Optional[pd.DataFrame]:
+    def _load_snapshot(self) -> Optional[TremorSnapshot]:
         curva_file = str(get_curva_csv_path())
 
         if not os.path.exists(curva_file):
@@ -336,16 +409,17 @@ class TelegramService:
             record_csv_error("curva.csv not found")
             return None
 
-        df = pd.read_csv(curva_file)
-        if 'timestamp' not in df.columns or 'value' not in df.columns:
+        snapshot = get_tremor_snapshot(curva_file)
+        if snapshot is None:
+            logger.warning("No tremor data available for alert checking")
+            record_csv_error("curva.csv not found")
+            return None
+        if snapshot.reason in {"missing_timestamp", "missing_value"}:
             logger.warning("Tremor CSV missing required columns")
             record_csv_error("curva.csv missing required columns")
             return None
 
-        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, errors='coerce')
-        df = df.dropna(subset=['timestamp'])
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        df = df.dropna(subset=['value'])
+        df = snapshot.valid_frame
 
         if df.empty:
             logger.warning("Empty tremor data file")
@@ -357,7 +431,39 @@ class TelegramService:
         warn_if_stale_timestamp(last_ts, logger, "telegram_alerts")
         record_csv_read(len(df), last_ts)
 
-        return df
+        return snapshot
+
+    def _load_dataset(self) -> Optional[pd.DataFrame]:
+        snapshot = self._load_snapshot()
+        return snapshot.valid_frame if snapshot is not None else None
+
+    @staticmethod
+    def _advance_stream(
+        snapshot: TremorSnapshot,
+        last_checked_ts: Optional[datetime],
+        window_size: int,
+    ) -> StreamUpdate:
+        """Feed the samples after ``last_checked_ts`` to the process-wide evaluator.
+
+        The evaluator is reused while its checkpoint matches the persisted
+        ``AlertState``; otherwise (first check, another worker advanced the
+        state, a rolled back run) its window is re-seeded from the samples
+        preceding the checkpoint.
+        """
+        checkpoint = (
+            None
+            if last_checked_ts is None
+            else np.datetime64(last_checked_ts.astimezone(timezone.utc).replace(tzinfo=None), "ns")
+        )
+        key = (str(snapshot.path), window_size)
+        with _STREAMS_LOCK:
+            stream = _STREAMS.get(key)
+            if stream is None:
+                stream = StreamingEvaluator(window_size)
+                _STREAMS[key] = stream
+            if stream.last_ts is None or stream.last_ts != checkpoint:
+                stream.seed(snapshot.timestamps, snapshot.values, checkpoint)
+            return stream.advance(snapshot.timestamps, snapshot.values)
 
     def _compute_event_id(self, timestamp: datetime, peak_value: float) -> str:
         window_start = timestamp.replace(second=0, microsecond=0)
@@ -410,6 +516,7 @@ class TelegramService:
         window_size: Optional[int],
         *,
         allow_free: bool = False,
+        use_outbox: bool = False,
     ) -> dict:
         users = self._get_candidate_users()
         if not users:
@@ -426,6 +533,39 @@ class TelegramService:
                 "reason": "no_subscribers",
             }
 
+        self._pending_events = []
+        self._outbox = []
+        self._use_outbox = use_outbox
+        try:
+            return self._dispatch_to_users(
+                users,
+                event_id,
+                current_value,
+                peak_value,
+                moving_avg_real,
+                now,
+                window_size,
+                allow_free=allow_free,
+            )
+        finally:
+            # Alert, reset and upsell events are written in one batch.
+            db.session.add_all(self._pending_events)
+            self._pending_events = None
+            self._outbox = None
+            self._use_outbox = False
+
+    def _dispatch_to_users(
+        self,
+        users: list[User],
+        event_id: str,
+        current_value: float,
+        peak_value: float,
+        moving_avg_real: Optional[float],
+        now: datetime,
+        window_size: Optional[int],
+        *,
+        allow_free: bool,
+    ) -> dict:
         sent = 0
         skipped = 0
         skipped_by_reason: dict[str, int] = {}
@@ -434,8 +574,29 @@ class TelegramService:
         free_trial_sent_count = 0
         skipped_free_already_consumed_count = 0
         skipped_not_premium_count = 0
+        queued = 0
+        planned: list[tuple[User, float, bool, Optional[datetime], _PlannedSend]] = []
+
+        chat_ids = [
+            self._resolve_effective_chat_id(user, allow_update=True) if user.telegram_opt_in else None
+            for user in users
+        ]
+        premium_access = [user.has_premium_access for user in users]
+        evaluated = [
+            bool(user.telegram_opt_in and chat_id and (premium or allow_free))
+            for user, chat_id, premium in zip(users, chat_ids, premium_access)
+        ]
+        history = self._prefetch_alert_history(
+            [user.id for user, flag in zip(users, evaluated) if flag],
+            now,
+        )
+        gates = self._evaluate_eligibility(users, evaluated, premium_access, history, peak_value, now)
+        for index in np.flatnonzero(gates.hysteresis_release).tolist():
+            self._record_hysteresis_release(
+                users[index], float(gates.thresholds[index]), peak_value, now, history
+            )
 
-        for user in users:
+        for index, user in enumerate(users):
             if not user.telegram_opt_in:
                 self._log_alert_decision(
                     user,
@@ -455,7 +616,7 @@ class TelegramService:
                 skipped_by_reason["opt_in_false"] = skipped_by_reason.get("opt_in_false", 0) + 1
                 continue
 
-            chat_id = self._resolve_effective_chat_id(user, allow_update=True)
+            chat_id = chat_ids[index]
             if not chat_id:
                 self._log_alert_decision(
                     user,
@@ -477,7 +638,7 @@ class TelegramService:
                 )
                 continue
 
-            if not user.has_premium_access and not allow_free:
+            if not premium_access[index] and not allow_free:
                 threshold, _ = self._resolve_threshold(user)
                 self._log_alert_evaluation(
                     user,
@@ -507,15 +668,15 @@ class TelegramService:
                 )
                 continue
 
-            threshold, threshold_fallback_used = self._resolve_threshold(user)
-            last_alert = self._get_last_alert_event(user)
+            threshold = float(gates.thresholds[index])
+            threshold_fallback_used = bool(gates.threshold_fallback[index])
+            last_alert_value = history.last_alert_value.get(user.id)
             last_alert_sent_at = self._utc(user.last_alert_sent_at)
-            self._register_hysteresis_release(user, threshold, peak_value, now, last_alert_sent_at)
 
-            state_prev = "above" if last_alert and last_alert.value is not None and last_alert.value >= threshold else "below"
-            state_new = "above" if peak_value >= threshold else "below"
+            state_prev = "above" if last_alert_value is not None and last_alert_value >= threshold else "below"
+            state_new = "above" if gates.above[index] else "below"
 
-            if peak_value < threshold:
+            if not gates.above[index]:
                 self._log_alert_decision(
                     user,
                     bool(chat_id),
@@ -557,11 +718,11 @@ class TelegramService:
                 )
                 continue
 
-            if not user.has_premium_access and allow_free:
+            if not premium_access[index] and allow_free:
                 free_candidates_count += 1
 
-            if user.has_premium_access:
-                sent_alert, decision_reason = self._process_premium_user(
+            if premium_access[index]:
+                plan, decision_reason = self._process_premium_user(
                     user,
                     event_id,
                     current_value,
@@ -570,14 +731,17 @@ class TelegramService:
                     threshold_fallback_used,
                     now,
                     last_alert_sent_at,
-                    last_alert,
                     chat_id,
                     window_size,
                     state_prev,
                     state_new,
+                    rate_limited=bool(gates.rate_limited[index]),
+                    hysteresis_rearmed=bool(gates.hysteresis_rearmed[index]),
+                    renotify_due=bool(gates.renotify_due[index]),
+                    history=history,
                 )
             else:
-                sent_alert, decision_reason = self._process_free_user(
+                plan, decision_reason = self._process_free_user(
                     user,
                     event_id,
                     current_value,
@@ -588,49 +752,67 @@ class TelegramService:
                     window_size,
                     state_prev,
                     state_new,
+                    history=history,
                 )
-            if sent_alert:
+            if plan is not None:
+                planned.append((user, threshold, threshold_fallback_used, last_alert_sent_at, plan))
+                continue
+            skipped += 1
+            skipped_by_reason[decision_reason] = skipped_by_reason.get(decision_reason, 0) + 1
+            if decision_reason == "free_trial_already_consumed":
+                skipped_free_already_consumed_count += 1
+            self._record_premium_sample(
+                premium_samples,
+                user,
+                threshold,
+                threshold_fallback_used,
+                peak_value,
+                moving_avg_real,
+                last_alert_sent_at,
+                self._next_allowed_at_short(last_alert_sent_at),
+                self._next_allowed_at_renotify(last_alert_sent_at),
+                user.has_premium_access,
+                False,
+                decision_reason,
+            )
+
+        # Every alert and upsell of this run goes out in one concurrent batch,
+        # or into the outbox within the caller's transaction.
+        if self._use_outbox:
+            self._enqueue_planned(self._outbox, event_id)
+        else:
+            self._deliver_planned(self._outbox)
+        for user, threshold, threshold_fallback_used, last_alert_sent_at, plan in planned:
+            decision_reason = plan.reason or "error"
+            if plan.queued:
+                queued += 1
+                if decision_reason == "sent_free_trial":
+                    free_trial_sent_count += 1
+            elif plan.sent:
                 sent += 1
                 if decision_reason == "sent_free_trial":
                     free_trial_sent_count += 1
-                self._record_premium_sample(
-                    premium_samples,
-                    user,
-                    threshold,
-                    threshold_fallback_used,
-                    peak_value,
-                    moving_avg_real,
-                    last_alert_sent_at,
-                    self._next_allowed_at_short(last_alert_sent_at),
-                    self._next_allowed_at_renotify(last_alert_sent_at),
-                    user.has_premium_access,
-                    True,
-                    decision_reason or "sent",
-                )
             else:
                 skipped += 1
-                if decision_reason is None:
-                    decision_reason = "error"
                 skipped_by_reason[decision_reason] = skipped_by_reason.get(decision_reason, 0) + 1
-                if decision_reason == "free_trial_already_consumed":
-                    skipped_free_already_consumed_count += 1
-                self._record_premium_sample(
-                    premium_samples,
-                    user,
-                    threshold,
-                    threshold_fallback_used,
-                    peak_value,
-                    moving_avg_real,
-                    last_alert_sent_at,
-                    self._next_allowed_at_short(last_alert_sent_at),
-                    self._next_allowed_at_renotify(last_alert_sent_at),
-                    user.has_premium_access,
-                    False,
-                    decision_reason,
-                )
+            self._record_premium_sample(
+                premium_samples,
+                user,
+                threshold,
+                threshold_fallback_used,
+                peak_value,
+                moving_avg_real,
+                last_alert_sent_at,
+                self._next_allowed_at_short(last_alert_sent_at),
+                self._next_allowed_at_renotify(last_alert_sent_at),
+                user.has_premium_access,
+                plan.sent,
+                decision_reason,
+            )
 
         return {
             "sent": sent,
+            "queued": queued,
             "skipped": skipped,
             "cooldown_skipped": self._cooldown_skipped_count,
             "skipped_by_reason": skipped_by_reason,
@@ -711,42 +893,244 @@ class TelegramService:
             return user.chat_id
         return None
 
-    def _get_last_alert_event(self, user: User) -> Optional[Event]:
-        return (
-            Event.query.filter_by(user_id=user.id, event_type='alert')
-            .order_by(Event.timestamp.desc())
-            .first()
-        )
+    def _queue_event(self, event: Event) -> None:
+        if self._queuing_key is not None:
+            event.outbox_key = self._queuing_key
+        if self._pending_events is not None:
+            self._pending_events.append(event)
+        else:
+            db.session.add(event)
 
-    def _register_hysteresis_release(
+    def _plan_send(
         self,
-        user: User,
-        threshold: float,
-        peak_value: float,
-        now: datetime,
-        last_alert_sent_at: Optional[datetime],
-    ) -> None:
-        if not last_alert_sent_at:
-            return
+        chat_id: int | str | None,
+        text: str,
+        on_sent: Callable[[], str],
+        on_failed: Callable[[], str],
+        *,
+        user: Optional[User] = None,
+        kind: str = "alert",
+    ) -> _PlannedSend:
+        plan = _PlannedSend(
+            self._normalize_chat_id(chat_id),
+            text,
+            on_sent,
+            on_failed,
+            user_id=user.id if user is not None else None,
+            kind=kind,
+        )
+        if self._outbox is not None:
+            self._outbox.append(plan)
+        else:
+            self._deliver_planned([plan])
+        return plan
 
-        lower_bound = threshold - Config.ALERT_HYSTERESIS_DELTA
-        if peak_value > lower_bound:
-            return
+    def _deliver_planned(self, plans: list[_PlannedSend]) -> None:
+        """Send ``plans`` as one concurrent batch, then apply every outcome in order."""
+        token = self._resolve_bot_token()
+        deliverable = [plan for plan in plans if plan.chat_id]
+        if len(deliverable) < len(plans):
+            logger.warning("Missing chat_id for %s planned messages", len(plans) - len(deliverable))
+        results = deliver_telegram_messages(
+            token,
+            [OutgoingMessage(chat_id=plan.chat_id, text=plan.text) for plan in deliverable],
+        )
+        for plan, result in zip(deliverable, results):
+            plan.result = result
+        for plan in plans:
+            if plan.sent:
+                logger.info("Telegram message sent to %s", plan.chat_id)
+                plan.reason = plan.on_sent()
+            else:
+                logger.error(
+                    "Failed to send Telegram message to %s status=%s error=%s",
+                    plan.chat_id,
+                    plan.result.status if plan.result else "no_chat_id",
+                    plan.result.error if plan.result else None,
+                )
+                plan.reason = plan.on_failed()
+
+    def _enqueue_planned(self, plans: list[_PlannedSend], event_id: str) -> None:
+        """Queue ``plans`` in ``alert_outbox`` and apply their state as if sent.
+
+        Nothing is delivered here: the rows and the alert state commit together,
+        and a key already queued by an earlier or concurrent run is skipped. The
+        events recorded for a row carry its key in ``outbox_key``, so the drain
+        can roll that state back if the row is dead-lettered later.
+        """
+        keys = {
+            id(plan): outbox_key(event_id, plan.user_id, plan.kind)
+            for plan in plans
+            if plan.chat_id and plan.user_id is not None
+        }
+        already_queued = existing_keys(keys.values())
+        rows: list[AlertOutbox] = []
+        for plan in plans:
+            key = keys.get(id(plan))
+            if key is None:
+                logger.warning("Cannot queue Telegram message without chat_id/user")
+                plan.reason = plan.on_failed()
+                continue
+            if key in already_queued:
+                logger.info("Telegram message already queued key=%s", key)
+                plan.result = DeliveryResult(
+                    chat_id=plan.chat_id, ok=False, status="duplicate", attempts=0
+                )
+                plan.reason = "already_queued"
+                continue
+            already_queued.add(key)
+            plan.result = DeliveryResult(chat_id=plan.chat_id, ok=True, status="queued", attempts=0)
+            self._queuing_key = key
+            try:
+                plan.reason = plan.on_sent()
+            finally:
+                self._queuing_key = None
+            rows.append(
+                AlertOutbox(
+                    idempotency_key=key,
+                    event_id=event_id,
+                    user_id=plan.user_id,
+                    kind=plan.kind,
+                    chat_id=plan.chat_id,
+                    message=plan.text,
+                )
+            )
+        db.session.add_all(rows)
 
-        reset_exists = (
-            Event.query.filter(
-                Event.user_id == user.id,
-                Event.event_type == 'hysteresis_reset',
-                Event.timestamp > last_alert_sent_at,
+    def _prefetch_alert_history(self, user_ids: list[int], now: datetime) -> _AlertHistory:
+        """Load the alert history of ``user_ids`` with three queries per chunk.
+
+        The last alert per user comes from a ``ROW_NUMBER()`` window, reset and
+        upsell timestamps from grouped ``MAX()`` and the 30-day counters from a
+        grouped ``COUNT()``, so the number of round trips does not depend on the
+        number of subscribers.
+        """
+        history = _AlertHistory()
+        window_start = now - timedelta(days=30)
+        for offset in range(0, len(user_ids), HISTORY_CHUNK_SIZE):
+            chunk = user_ids[offset:offset + HISTORY_CHUNK_SIZE]
+            ranked = (
+                db.session.query(
+                    Event.user_id.label("user_id"),
+                    Event.value.label("value"),
+                    func.row_number()
+                    .over(
+                        partition_by=Event.user_id,
+                        order_by=(Event.timestamp.desc(), Event.id.desc()),
+                    )
+                    .label("position"),
+                )
+                .filter(Event.user_id.in_(chunk), Event.event_type == 'alert')
+                .subquery()
             )
-            .order_by(Event.timestamp.desc())
-            .first()
+            for user_id, value in db.session.query(ranked.c.user_id, ranked.c.value).filter(
+                ranked.c.position == 1
+            ):
+                history.last_alert_value[user_id] = value
+
+            latest = (
+                db.session.query(Event.user_id, Event.event_type, func.max(Event.timestamp))
+                .filter(
+                    Event.user_id.in_(chunk),
+                    Event.event_type.in_(('hysteresis_reset', 'upsell')),
+                )
+                .group_by(Event.user_id, Event.event_type)
+            )
+            for user_id, event_type, timestamp in latest:
+                target = (
+                    history.last_reset_at
+                    if event_type == 'hysteresis_reset'
+                    else history.last_upsell_at
+                )
+                target[user_id] = self._utc(timestamp)
+
+            counts = (
+                db.session.query(Event.user_id, func.count())
+                .filter(
+                    Event.user_id.in_(chunk),
+                    Event.event_type == 'alert',
+                    Event.timestamp >= window_start,
+                )
+                .group_by(Event.user_id)
+            )
+            for user_id, count in counts:
+                history.alerts_30d[user_id] = int(count or 0)
+        return history
+
+    @staticmethod
+    def _as_datetime64(value: Optional[datetime]) -> np.datetime64:
+        if value is None:
+            return np.datetime64("NaT", "us")
+        return np.datetime64(value.astimezone(timezone.utc).replace(tzinfo=None), "us")
+
+    def _evaluate_eligibility(
+        self,
+        users: list[User],
+        evaluated: list[bool],
+        premium_access: list[bool],
+        history: _AlertHistory,
+        peak_value: float,
+        now: datetime,
+    ) -> _Eligibility:
+        """Resolve every user's threshold and apply ``evaluate_eligibility`` to all of them."""
+        evaluated_mask = np.array(evaluated, dtype=bool)
+        premium_mask = np.array(premium_access, dtype=bool)
+        user_thresholds = np.array(
+            [np.nan if user.threshold is None else float(user.threshold) for user in users],
+            dtype="float64",
+        )
+        # Same resolution as ``_resolve_threshold``, for every user at once.
+        threshold_fallback = evaluated_mask & premium_mask & np.isnan(user_thresholds)
+        thresholds = np.where(
+            premium_mask,
+            np.where(np.isnan(user_thresholds), float(Config.PREMIUM_DEFAULT_THRESHOLD), user_thresholds),
+            float(Config.ALERT_THRESHOLD_DEFAULT),
         )
+        thresholds[~evaluated_mask] = np.nan
+        for index in np.flatnonzero(threshold_fallback).tolist():
+            logger.info(
+                "threshold_fallback_used=true user_id=%s email=%s",
+                users[index].id,
+                users[index].email,
+            )
 
-        if reset_exists:
-            return
+        last_sent = np.array(
+            [self._as_datetime64(self._utc(user.last_alert_sent_at)) for user in users],
+            dtype="datetime64[us]",
+        )
+        last_reset = np.array(
+            [self._as_datetime64(history.last_reset_at.get(user.id)) for user in users],
+            dtype="datetime64[us]",
+        )
+        gates = evaluate_eligibility(
+            thresholds,
+            peak_value,
+            self._as_datetime64(now),
+            last_sent,
+            last_reset,
+            hysteresis_delta=float(Config.ALERT_HYSTERESIS_DELTA),
+            rate_limit=self.RATE_LIMIT,
+            renotify_interval=self.RENOTIFY_INTERVAL,
+        )
+        return _Eligibility(
+            thresholds=thresholds,
+            threshold_fallback=threshold_fallback,
+            above=gates.above,
+            rate_limited=gates.rate_limited,
+            hysteresis_rearmed=gates.hysteresis_rearmed,
+            hysteresis_release=gates.hysteresis_release,
+            renotify_due=gates.renotify_due,
+        )
 
-        db.session.add(
+    def _record_hysteresis_release(
+        self,
+        user: User,
+        threshold: float,
+        peak_value: float,
+        now: datetime,
+        history: _AlertHistory,
+    ) -> None:
+        self._queue_event(
             Event(
                 user_id=user.id,
                 event_type='hysteresis_reset',
@@ -755,6 +1139,7 @@ class TelegramService:
                 message='Signal returned below hysteresis threshold',
             )
         )
+        history.last_reset_at[user.id] = now
         logger.info("Hysteresis reset recorded for %s", user.email)
 
     def _process_premium_user(
@@ -767,13 +1152,19 @@ class TelegramService:
         threshold_fallback_used: bool,
         now: datetime,
         last_alert_sent_at: Optional[datetime],
-        last_alert: Optional[Event],
         chat_id: Optional[int],
         window_size: Optional[int],
         state_prev: str,
         state_new: str,
-    ) -> tuple[bool, Optional[str]]:
-        if self._is_rate_limited(user, now):
+        *,
+        rate_limited: Optional[bool] = None,
+        hysteresis_rearmed: Optional[bool] = None,
+        renotify_due: Optional[bool] = None,
+        history: Optional[_AlertHistory] = None,
+    ) -> tuple[Optional["_PlannedSend"], str]:
+        if rate_limited is None:
+            rate_limited = self._is_rate_limited(user, now)
+        if rate_limited:
             logger.debug("Rate limit active for %s", user.email)
             self._cooldown_skipped_count += 1
             cooldown_remaining = self.RATE_LIMIT - (now - self._utc(user.last_alert_sent_at))
@@ -805,18 +1196,20 @@ class TelegramService:
                 "cooldown",
                 cooldown_remaining=cooldown_remaining,
             )
-            return False, "cooldown"
+            return None, "cooldown"
 
-        hysteresis_rearmed = self._passed_hysteresis(
-            user,
-            threshold,
-            peak_value,
-            last_alert_sent_at,
-        )
-        renotify_due = (
-            last_alert_sent_at is not None
-            and now - last_alert_sent_at >= self.RENOTIFY_INTERVAL
-        )
+        if hysteresis_rearmed is None:
+            hysteresis_rearmed = self._passed_hysteresis(
+                user,
+                threshold,
+                peak_value,
+                last_alert_sent_at,
+            )
+        if renotify_due is None:
+            renotify_due = (
+                last_alert_sent_at is not None
+                and now - last_alert_sent_at >= self.RENOTIFY_INTERVAL
+            )
 
         if not hysteresis_rearmed and not renotify_due:
             logger.debug("Hysteresis gate blocked alert for %s", user.email)
@@ -841,7 +1234,7 @@ class TelegramService:
                 "skip",
                 "already_sent_hysteresis",
             )
-            return False, "already_sent_hysteresis"
+            return None, "already_sent_hysteresis"
 
         send_reason = (
             "persistent_above_threshold_renotify"
@@ -849,7 +1242,8 @@ class TelegramService:
             else "sent"
         )
         message = self._build_premium_message(current_value, peak_value, threshold)
-        if self.send_message(chat_id, message):
+
+        def on_sent() -> str:
             user.last_alert_sent_at = now
             alert_event = Event(
                 user_id=user.id,
@@ -858,8 +1252,8 @@ class TelegramService:
                 threshold=threshold,
                 message=f'Telegram alert sent (event_id={event_id})',
             )
-            db.session.add(alert_event)
-            self._update_alert_counters(user, now)
+            self._queue_event(alert_event)
+            self._update_alert_counters(user, now, history=history)
             logger.info("Premium alert delivered to %s", user.email)
             self._log_alert_evaluation(
                 user,
@@ -882,8 +1276,9 @@ class TelegramService:
                 True,
                 send_reason,
             )
-            return True, send_reason
-        else:
+            return send_reason
+
+        def on_failed() -> str:
             logger.error("Failed to deliver premium alert to %s", user.email)
             self._log_alert_evaluation(
                 user,
@@ -906,7 +1301,12 @@ class TelegramService:
                 False,
                 "error",
             )
-            return False, "error"
+            return "error"
+
+        return (
+            self._plan_send(chat_id, message, on_sent, on_failed, user=user, kind="premium_alert"),
+            send_reason,
+        )
 
     def _process_free_user(
         self,
@@ -920,10 +1320,13 @@ class TelegramService:
         window_size: Optional[int],
         state_prev: str,
         state_new: str,
-    ) -> tuple[bool, Optional[str]]:
+        *,
+        history: Optional[_AlertHistory] = None,
+    ) -> tuple[Optional["_PlannedSend"], str]:
         if (user.free_alert_consumed or 0) == 0 and user.free_alert_event_id != event_id:
             message = self._build_free_trial_message(current_value, peak_value, threshold)
-            if self.send_message(chat_id, message):
+
+            def on_sent() -> str:
                 user.free_alert_consumed = (user.free_alert_consumed or 0) + 1
                 user.free_alert_event_id = event_id
                 user.last_alert_sent_at = now
@@ -934,8 +1337,8 @@ class TelegramService:
                     threshold=threshold,
                     message=f'Free trial alert sent (event_id={event_id})',
                 )
-                db.session.add(alert_event)
-                db.session.add(
+                self._queue_event(alert_event)
+                self._queue_event(
                     Event(
                         user_id=user.id,
                         event_type='free_trial_consumed',
@@ -944,7 +1347,7 @@ class TelegramService:
                         message='Free Telegram alert consumed',
                     )
                 )
-                self._update_alert_counters(user, now)
+                self._update_alert_counters(user, now, history=history)
                 logger.info("Free trial alert delivered to %s", user.email)
                 self._log_alert_evaluation(
                     user,
@@ -967,8 +1370,9 @@ class TelegramService:
                     True,
                     "sent_free_trial",
                 )
-                return True, "sent_free_trial"
-            else:
+                return "sent_free_trial"
+
+            def on_failed() -> str:
                 logger.error("Failed to deliver free trial alert to %s", user.email)
                 self._log_alert_evaluation(
                     user,
@@ -991,7 +1395,12 @@ class TelegramService:
                     False,
                     "error",
                 )
-                return False, "error"
+                return "error"
+
+            return (
+                self._plan_send(chat_id, message, on_sent, on_failed, user=user, kind="free_trial"),
+                "sent_free_trial",
+            )
 
         self._log_alert_decision(
             user,
@@ -1014,32 +1423,55 @@ class TelegramService:
             "skip",
             "free_trial_already_consumed",
         )
-        self._send_upsell(user, now, chat_id)
-        return False, "free_trial_already_consumed"
+        self._send_upsell(user, now, chat_id, history=history)
+        return None, "free_trial_already_consumed"
 
-    def _send_upsell(self, user: User, now: datetime, chat_id: Optional[int]) -> None:
-        last_upsell = (
-            Event.query.filter_by(user_id=user.id, event_type='upsell')
-            .order_by(Event.timestamp.desc())
-            .first()
-        )
-        last_upsell_ts = self._utc(last_upsell.timestamp) if last_upsell else None
+    def _send_upsell(
+        self,
+        user: User,
+        now: datetime,
+        chat_id: Optional[int],
+        *,
+        history: Optional[_AlertHistory] = None,
+    ) -> None:
+        if history is not None:
+            last_upsell_ts = history.last_upsell_at.get(user.id)
+        else:
+            last_upsell = (
+                Event.query.filter_by(user_id=user.id, event_type='upsell')
+                .order_by(Event.timestamp.desc())
+                .first()
+            )
+            last_upsell_ts = self._utc(last_upsell.timestamp) if last_upsell else None
         if last_upsell_ts and now - last_upsell_ts < self.UPSELL_COOLDOWN:
             logger.debug("Upsell cooldown active for %s", user.email)
             return
 
-        message = self._build_upsell_message()
-        if self.send_message(chat_id, message):
-            db.session.add(
+        def on_sent() -> str:
+            self._queue_event(
                 Event(
                     user_id=user.id,
                     event_type='upsell',
                     message='Upsell message sent to promote Premium plan',
                 )
             )
+            if history is not None:
+                history.last_upsell_at[user.id] = now
             logger.info("Upsell message sent to %s", user.email)
-        else:
+            return "upsell_sent"
+
+        def on_failed() -> str:
             logger.error("Failed to send upsell message to %s", user.email)
+            return "error"
+
+        self._plan_send(
+            chat_id,
+            self._build_upsell_message(),
+            on_sent,
+            on_failed,
+            user=user,
+            kind="upsell",
+        )
 
     def _is_rate_limited(self, user: User, now: datetime) -> bool:
         if not user.last_alert_sent_at:
@@ -1093,7 +1525,19 @@ class TelegramService:
             return None
         return last_alert_sent_at + self.RENOTIFY_INTERVAL
 
-    def _update_alert_counters(self, user: User, now: datetime) -> None:
+    def _update_alert_counters(
+        self,
+        user: User,
+        now: datetime,
+        *,
+        history: Optional[_AlertHistory] = None,
+    ) -> None:
+        """Refresh ``alert_count_30d`` after an alert was just recorded."""
+        if history is not None:
+            count = history.alerts_30d.get(user.id, 0) + 1
+            history.alerts_30d[user.id] = count
+            user.alert_count_30d = count
+            return
         window_start = now - timedelta(days=30)
         count = (
             Event.query.filter(
@@ -1166,8 +1610,8 @@ class TelegramService:
             if rate_limit_minutes is None
             else rate_limit_minutes
         )
-        renotify_interval = timedelta(
-            minutes=30 if renotify_minutes is None else renotify_minutes
+        renotify_interval = (
+            RENOTIFY_INTERVAL if renotify_minutes is None else timedelta(minutes=renotify_minutes)
         )
         last_alert_sent_at: Optional[datetime] = None
         last_hysteresis_reset_at: Optional[datetime] = None
@@ -1,21 +1,38 @@
+"""Tremor trend summary for the homepage, with an optional AI-written text.
+
+The AI text is never fetched on the request path: ``build_tremor_summary``
+serves it from the per-process ``_AI_CACHE`` or from the shared entry
+(Redis when ``REDIS_URL`` is set, otherwise ``ai_summary_cache.json`` in
+``DATA_DIR``), keyed by ``ts_utc`` and trend status. A miss starts one
+background OpenAI call; a cross-worker lock keeps the other workers from
+repeating it. ``precompute_ai_summary`` fills the entry as soon as a new
+tremor point lands (cron check and scheduler).
+"""
 from __future__ import annotations
 
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 import json
 import os
 import logging
-from typing import Any
+from pathlib import Path
+import threading
+from typing import Any, Iterator
 
 import pandas as pd
 from flask import current_app
 from openai import OpenAI
 
+from ..extensions import cache
+from ..utils.background import SingleFlight
 from ..utils.config import get_curva_csv_path, get_temporal_status_from_timestamp
 from ..utils.ingv_bands import get_ingv_band_thresholds
+from ..utils.tremor_store import get_tremor_snapshot
 from backend.utils.time import to_iso_utc
 from config import Config
 
 _AI_CACHE: dict[str, Any] = {
+    "key": None,
     "ts_utc": None,
     "expires_at": None,
     "payload": None,
@@ -23,6 +40,19 @@ _AI_CACHE: dict[str, Any] = {
     "last_error_at": None,
 }
 
+# The text only depends on the cache key, so an entry is refreshed rarely;
+# once expired it is still served while the refresh runs.
+AI_CACHE_TTL = timedelta(hours=1)
+# Minimum spacing of OpenAI attempts for the same key (failures included).
+AI_RETRY_INTERVAL = timedelta(minutes=1)
+# A cross-worker lock older than this belongs to a dead worker.
+AI_LOCK_TIMEOUT = timedelta(seconds=60)
+
+_SHARED_CACHE_KEY = "ai-summary:latest"
+_SHARED_LOCK_KEY = "ai-summary:lock"
+
+_ai_refresh = SingleFlight("ai-summary-refresh", retry_interval=AI_RETRY_INTERVAL)
+
 _DEFAULT_DISCLAIMER = "Solo informativo, non previsione; fai riferimento alle fonti ufficiali."
 
 
@@ -40,27 +70,16 @@ def load_tremor_dataframe() -> tuple[pd.DataFrame | None, str | None]:
         return None, "missing_data"
 
     try:
-        raw_df = pd.read_csv(csv_path)
+        snapshot = get_tremor_snapshot(csv_path)
     except Exception:
         return None, "read_error"
 
-    if "timestamp" not in raw_df.columns:
-        return None, "missing_timestamp"
-
-    df = raw_df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-    df = df.dropna(subset=["timestamp"])
-
-    if "value" not in df.columns:
-        if "value_max" in df.columns:
-            df["value"] = df["value_max"]
-        elif "value_avg" in df.columns:
-            df["value"] = df["value_avg"]
-
-    if "value" not in df.columns:
-        return None, "missing_value"
+    if snapshot is None:
+        return None, "missing_data"
+    if snapshot.reason in {"missing_timestamp", "missing_value"}:
+        return None, snapshot.reason
 
-    df = df.dropna(subset=["value"]).sort_values("timestamp")
+    df = snapshot.valid_frame
     if df.empty:
         return None, "empty_data"
 
@@ -79,12 +98,17 @@ def calculate_trend(df: pd.DataFrame, window_minutes: int = 60) -> dict | None:
             "source": "INGV",
         }
 
-    latest_ts = df["timestamp"].max()
+    if not df["timestamp"].is_monotonic_increasing:
+        df = df.sort_values("timestamp")
+    latest_ts = df["timestamp"].iloc[-1]
     window_start = latest_ts - timedelta(minutes=window_minutes)
     prev_start = latest_ts - timedelta(minutes=window_minutes * 2)
 
-    last_df = df[df["timestamp"] >= window_start].copy()
-    prev_df = df[(df["timestamp"] < window_start) & (df["timestamp"] >= prev_start)].copy()
+    # Both windows sit at the end of the sorted series: slice them by
+    # position instead of masking the whole history.
+    window_idx, prev_idx = df["timestamp"].searchsorted([window_start, prev_start])
+    last_df = df.iloc[window_idx:]
+    prev_df = df.iloc[prev_idx:window_idx]
 
     if last_df.empty or prev_df.empty:
         return {
@@ -246,14 +270,118 @@ def _ai_cache_valid(ts_utc: str | None) -> bool:
     return datetime.now(timezone.utc) < expires_at
 
 
-def _store_ai_cache(ts_utc: str, payload: dict[str, Any]) -> None:
+def _ai_cache_key(payload: dict[str, Any]) -> str | None:
+    ts_utc = payload.get("ts_utc")
+    if not ts_utc or payload.get("value_mv") is None:
+        return None
+    return f"{ts_utc}|{payload.get('status')}"
+
+
+def _store_ai_cache(key: str, ts_utc: str, payload: dict[str, Any], expires_at: datetime) -> None:
+    _AI_CACHE["key"] = key
     _AI_CACHE["ts_utc"] = ts_utc
     _AI_CACHE["payload"] = payload
-    _AI_CACHE["expires_at"] = datetime.now(timezone.utc) + timedelta(minutes=5)
+    _AI_CACHE["expires_at"] = expires_at
     _AI_CACHE["last_error"] = None
     _AI_CACHE["last_error_at"] = None
 
 
+def _record_ai_error(message: str) -> None:
+    _AI_CACHE["last_error"] = message
+    _AI_CACHE["last_error_at"] = datetime.now(timezone.utc).isoformat()
+
+
+def _shared_backend() -> str:
+    return "redis" if os.getenv("REDIS_URL") else "disk"
+
+
+def _shared_cache_path() -> Path:
+    return Path(os.getenv("DATA_DIR", "data")) / "ai_summary_cache.json"
+
+
+def _load_shared_entry() -> dict[str, Any] | None:
+    try:
+        if _shared_backend() == "redis":
+            entry = cache.get(_SHARED_CACHE_KEY)
+        else:
+            path = _shared_cache_path()
+            if not path.exists():
+                return None
+            entry = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        _get_logger().warning("[AI_SUMMARY] Shared cache read failed: %s", exc)
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _store_shared_entry(entry: dict[str, Any]) -> None:
+    try:
+        if _shared_backend() == "redis":
+            cache.set(_SHARED_CACHE_KEY, entry, timeout=int(AI_CACHE_TTL.total_seconds() * 24))
+            return
+        path = _shared_cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        _get_logger().warning("[AI_SUMMARY] Shared cache write failed: %s", exc)
+
+
+@contextmanager
+def _shared_refresh_lock() -> Iterator[bool]:
+    """Cross-worker lock around the OpenAI call; yields False if another worker holds it."""
+    if _shared_backend() == "redis":
+        acquired = bool(cache.add(_SHARED_LOCK_KEY, os.getpid(), timeout=int(AI_LOCK_TIMEOUT.total_seconds())))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(_SHARED_LOCK_KEY)
+        return
+
+    lock_path = _shared_cache_path().with_suffix(".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    acquired = False
+    for _ in range(2):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+        except FileExistsError:
+            try:
+                age = datetime.now(timezone.utc).timestamp() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < AI_LOCK_TIMEOUT.total_seconds():
+                break
+            lock_path.unlink(missing_ok=True)
+            continue
+        os.write(fd, str(os.getpid()).encode("utf-8"))
+        os.close(fd)
+        acquired = True
+        break
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock_path.unlink(missing_ok=True)
+
+
+def _cached_ai_summary(key: str) -> tuple[dict[str, Any] | None, bool]:
+    """(payload, fresh) for ``key`` from the process cache, else the shared entry."""
+    if _AI_CACHE.get("key") != key or _AI_CACHE.get("payload") is None:
+        entry = _load_shared_entry()
+        if not entry or entry.get("key") != key or not entry.get("payload"):
+            return None, False
+        try:
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            expires_at = datetime.now(timezone.utc)
+        _store_ai_cache(key, entry.get("ts_utc"), entry["payload"], expires_at)
+    expires_at = _AI_CACHE.get("expires_at")
+    fresh = expires_at is not None and datetime.now(timezone.utc) < expires_at
+    return _AI_CACHE.get("payload"), fresh
+
+
 def get_ai_cache_status() -> dict[str, Any]:
     expires_at = _AI_CACHE.get("expires_at")
     expires_at_iso = expires_at.isoformat() if expires_at else None
@@ -265,6 +393,9 @@ def get_ai_cache_status() -> dict[str, Any]:
         "last_error": _AI_CACHE.get("last_error"),
         "last_error_at": _AI_CACHE.get("last_error_at"),
         "valid": _ai_cache_valid(_AI_CACHE.get("ts_utc")),
+        "key": _AI_CACHE.get("key"),
+        "shared_backend": _shared_backend(),
+        "refreshing": _ai_refresh.running,
     }
 
 
@@ -334,36 +465,134 @@ def _fetch_ai_summary(payload: dict[str, Any]) -> dict[str, Any] | None:
     return _sanitize_ai_payload(parsed)
 
 
+def _ai_request_payload(
+    status: str | None,
+    direction: str | None,
+    value_mv: float | None,
+    ts_utc: str | None,
+    window_min: int,
+) -> dict[str, Any]:
+    return {
+        "status": status,
+        "direction": direction,
+        "value_mv": value_mv,
+        "ts_utc": ts_utc,
+        "window_min": window_min,
+        "threshold": float(Config.ALERT_THRESHOLD_DEFAULT),
+    }
+
+
 def _get_ai_summary(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """Cached AI text for a request; a miss schedules the fetch and returns None."""
     if not _ai_enabled():
         return None
 
-    ts_utc = payload.get("ts_utc")
-    if not ts_utc or payload.get("value_mv") is None:
+    key = _ai_cache_key(payload)
+    if not key:
         return None
-    if _ai_cache_valid(ts_utc):
-        return _AI_CACHE.get("payload")
+    cached, fresh = _cached_ai_summary(key)
+    if not fresh:
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            return cached
+        schedule_ai_summary(app, payload)
+    return cached
 
-    logger = _get_logger()
-    try:
-        ai_payload = _fetch_ai_summary(payload)
-    except Exception as exc:
-        _AI_CACHE["last_error"] = str(exc)
-        _AI_CACHE["last_error_at"] = datetime.now(timezone.utc).isoformat()
-        logger.warning("[AI_SUMMARY] OpenAI request failed: %s", exc)
+
+def schedule_ai_summary(app, payload: dict[str, Any]) -> bool:
+    """Fetch the AI text in a daemon thread.
+
+    False if a fetch is already running, or one for the same key started less
+    than ``AI_RETRY_INTERVAL`` ago (failures included).
+    """
+    return _ai_refresh.start(lambda: _refresh_ai_locked(payload), app=app, key=_ai_cache_key(payload))
+
+
+def refresh_ai_summary(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """Fetch the AI text for ``payload`` unless a fresh one is already cached."""
+    if not _ai_enabled() or not _ai_cache_key(payload):
         return None
+    return _ai_refresh.run(lambda: _refresh_ai_locked(payload))
 
-    if not ai_payload:
-        _AI_CACHE["last_error"] = "Invalid or empty AI payload"
-        _AI_CACHE["last_error_at"] = datetime.now(timezone.utc).isoformat()
-        logger.warning("[AI_SUMMARY] Invalid AI payload")
+
+def _refresh_ai_locked(payload: dict[str, Any]) -> dict[str, Any] | None:
+    key = _ai_cache_key(payload)
+    if not key:
         return None
+    cached, fresh = _cached_ai_summary(key)
+    if fresh:
+        return cached
 
-    if ts_utc:
-        _store_ai_cache(ts_utc, ai_payload)
+    logger = _get_logger()
+    with _shared_refresh_lock() as acquired:
+        if not acquired:
+            # Another worker is calling OpenAI for this point; its result
+            # reaches this process through the shared entry.
+            return cached
+        cached, fresh = _cached_ai_summary(key)
+        if fresh:
+            return cached
+        try:
+            ai_payload = _fetch_ai_summary(payload)
+        except Exception as exc:
+            _record_ai_error(str(exc))
+            logger.warning("[AI_SUMMARY] OpenAI request failed: %s", exc)
+            return cached
+
+        if not ai_payload:
+            _record_ai_error("Invalid or empty AI payload")
+            logger.warning("[AI_SUMMARY] Invalid AI payload")
+            return cached
+
+        expires_at = datetime.now(timezone.utc) + AI_CACHE_TTL
+        _store_ai_cache(key, payload["ts_utc"], ai_payload, expires_at)
+        _store_shared_entry(
+            {
+                "key": key,
+                "ts_utc": payload["ts_utc"],
+                "payload": ai_payload,
+                "expires_at": expires_at.isoformat(),
+            }
+        )
     return ai_payload
 
 
+def precompute_ai_summary(window_minutes: int = 60) -> dict[str, Any] | None:
+    """Fill the AI cache for the latest tremor point, so page views find it ready."""
+    if not _ai_enabled():
+        return None
+    df, reason = load_tremor_dataframe()
+    if df is None or reason:
+        return None
+    trend = calculate_trend(df, window_minutes=window_minutes) or {}
+    return refresh_ai_summary(
+        _ai_request_payload(
+            trend.get("status"),
+            trend.get("direction"),
+            trend.get("value_mv"),
+            trend.get("ts_utc"),
+            trend.get("window_min", window_minutes),
+        )
+    )
+
+
+def start_ai_summary_precompute(app, window_minutes: int = 60) -> bool:
+    """Run ``precompute_ai_summary`` in a daemon thread (no-op when AI is disabled)."""
+    if not _ai_enabled():
+        return False
+
+    def _run() -> None:
+        try:
+            with app.app_context():
+                precompute_ai_summary(window_minutes)
+        except Exception:  # pragma: no cover - defensive logging
+            app.logger.exception("[AI_SUMMARY] precompute failed")
+
+    threading.Thread(target=_run, daemon=True, name="ai-summary-precompute").start()
+    return True
+
+
 def build_tremor_summary(window_minutes: int = 60) -> dict[str, Any]:
     df, reason = load_tremor_dataframe()
     trend = calculate_trend(df, window_minutes=window_minutes) if df is not None and not reason else None
@@ -453,16 +682,7 @@ def build_tremor_summary(window_minutes: int = 60) -> dict[str, Any]:
         "disclaimer": _DEFAULT_DISCLAIMER,
     }
 
-    ai_payload = _get_ai_summary(
-        {
-            "status": status,
-            "direction": direction,
-            "value_mv": value_mv,
-            "ts_utc": ts_utc,
-            "window_min": window_min,
-            "threshold": float(Config.ALERT_THRESHOLD_DEFAULT),
-        }
-    )
+    ai_payload = _get_ai_summary(_ai_request_payload(status, direction, value_mv, ts_utc, window_min))
     if ai_payload:
         summary.update(
             {
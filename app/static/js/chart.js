@@ -5,6 +5,8 @@
   const FORCE_UPDATE_ENDPOINT = '/api/force_update';
   const DEFAULT_LIMIT = 2016;
   const LIMIT_BOUNDS = { min: 1, max: 4032 };
+  // Server-side min/max decimation: enough for any chart width, peaks kept.
+  const CHART_MAX_POINTS = 1500;
   const FETCH_TIMEOUTS = [5000, 20000];
   const RETRY_DELAYS = [800];
   const LOG_SCALE_MIN = 0.1;
@@ -143,10 +145,13 @@
     return clampLimit(parsed);
   }
 
-  function buildCurvaUrl(limit) {
+  function buildCurvaUrl(limit, maxPoints) {
     const params = new URLSearchParams();
     const resolved = clampLimit(limit);
     params.set('limit', String(resolved));
+    if (maxPoints && resolved > maxPoints) {
+      params.set('max_points', String(maxPoints));
+    }
     return `${CURVA_ENDPOINT}?${params.toString()}`;
   }
 
@@ -383,7 +388,9 @@
       lastUpdateEl.textContent = formatDate(lastTimestamp);
     }
     if (pointsEl) {
-      const count = typeof payload.rows === 'number' ? payload.rows : rows.length;
+      const count = typeof payload.source_rows === 'number'
+        ? payload.source_rows
+        : (typeof payload.rows === 'number' ? payload.rows : rows.length);
       pointsEl.textContent = count.toLocaleString('it-IT');
     }
     if (lastRecord && typeof lastRecord.value !== 'undefined') {
@@ -624,8 +631,8 @@
       showSpinner();
     }
     try {
-      const response = await fetchWithTimeout(buildCurvaUrl(limit), {
-        cache: 'no-store',
+      const response = await fetchWithTimeout(buildCurvaUrl(limit, CHART_MAX_POINTS), {
+        cache: 'no-cache',
         headers: { 'Cache-Control': 'no-cache' }
       }, timeout);
       if (!response.ok) {
@@ -722,7 +729,7 @@
     let errorMessage = null;
     try {
       const response = await fetchWithTimeout(endpoint, {
-        cache: 'no-store',
+        cache: 'no-cache',
         headers: { 'Cache-Control': 'no-cache' }
       });
       responseStatus = response.status;
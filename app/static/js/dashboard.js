@@ -557,7 +557,7 @@ class EtnaDashboard {
     async loadData() {
         try {
             const limit = this.getSelectedLimit();
-            const result = await this.fetchDashboardJson(`/api/curva?limit=${limit}`);
+            const result = await this.fetchDashboardJson(`/api/curva?limit=${limit}`, { cache: 'no-cache' });
             if (!result.ok) {
                 this.handleDashboardError(result.error, 'Errore nel caricamento dati');
                 return;
@@ -1179,7 +1179,7 @@ class EtnaDashboard {
         try {
             if (format === 'csv') {
                 const limit = this.getSelectedLimit();
-                const result = await this.fetchDashboardJson(`/api/curva?limit=${limit}`);
+                const result = await this.fetchDashboardJson(`/api/curva?limit=${limit}`, { cache: 'no-cache' });
                 if (!result.ok) {
                     this.handleDashboardError(result.error, 'Esportazione fallita');
                     return;
@@ -8,9 +8,9 @@ const chartMaxRetries = 3;
 
 async function fetchCurva(limit = 2016) {
   try {
-    const url = limit ? `/api/curva?limit=${limit}` : '/api/curva';
+    const url = limit ? `/api/curva?limit=${limit}&resolution=medium` : '/api/curva?resolution=medium';
     const response = await fetch(url, {
-      cache: 'no-store',
+      cache: 'no-cache',
       headers: {
         'Cache-Control': 'no-cache'
       }
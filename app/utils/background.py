@@ -0,0 +1,158 @@
+"""Single-flight background runs for refresh-on-read caches.
+
+A page view that finds a cache stale serves it as is and starts a refresh;
+``SingleFlight`` makes sure that is one refresh per process. It holds a
+non-blocking lock, runs the work in a daemon thread (inside an app context
+when given one), spaces attempts by ``retry_interval`` so a failing upstream
+is not hit on every request, and keeps run counters that worker threads
+update under their own lock.
+"""
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """At most one run at a time per process, plus its attempt metrics."""
+
+    def __init__(self, name: str, *, retry_interval: timedelta | None = None, history: int = 50) -> None:
+        self.name = name
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._last_start: tuple[Hashable, float] | None = None
+        self._durations: deque[float] = deque(maxlen=history)
+        self._metrics: dict[str, Any] = {
+            "attempts": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "last_outcome": None,
+            "last_error": None,
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_duration_ms": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def start(
+        self,
+        target: Callable[[], Any],
+        *,
+        app=None,
+        key: Hashable = None,
+        logger: logging.Logger | None = None,
+    ) -> bool:
+        """Run ``target`` in a daemon thread.
+
+        Returns False when a run is already in flight, or when the last start
+        for the same ``key`` is more recent than ``retry_interval``.
+        """
+        if not self._lock.acquire(blocking=False):
+            self._count("coalesced")
+            return False
+        now = time.monotonic()
+        with self._state_lock:
+            last = self._last_start
+            if (
+                self.retry_interval is not None
+                and last is not None
+                and last[0] == key
+                and now - last[1] < self.retry_interval.total_seconds()
+            ):
+                self._lock.release()
+                return False
+            self._last_start = (key, now)
+        if logger is None:
+            logger = app.logger if app is not None else _logger
+
+        def _run() -> None:
+            try:
+                if app is None:
+                    target()
+                else:
+                    with app.app_context():
+                        target()
+            except Exception:  # pragma: no cover - defensive logging
+                logger.exception("[%s] background run failed", self.name)
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=_run, daemon=True, name=self.name).start()
+        return True
+
+    def run(self, target: Callable[[], T], *, joined: Callable[[], T] | None = None) -> T:
+        """Run ``target`` now; if a run is in flight, wait for it and call ``joined`` instead."""
+        if not self._lock.acquire(blocking=False):
+            self._count("coalesced")
+            self._lock.acquire()
+            target = joined or target
+        try:
+            return target()
+        finally:
+            self._lock.release()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Block until no run is in flight; False if ``timeout`` seconds pass first."""
+        if not self._lock.acquire(timeout=timeout):
+            return False
+        self._lock.release()
+        return True
+
+    def record(self, started_at: datetime, started: float, error: str | None) -> None:
+        """Store the outcome of an attempt that began at ``started`` (``time.monotonic()``)."""
+        duration_ms = round((time.monotonic() - started) * 1000, 1)
+        with self._state_lock:
+            self._durations.append(duration_ms)
+            self._metrics.update(
+                last_started_at=started_at,
+                last_finished_at=datetime.now(timezone.utc),
+                last_duration_ms=duration_ms,
+                last_outcome="failed" if error else "ok",
+                last_error=error,
+            )
+            self._metrics["attempts"] += 1
+            self._metrics["failed" if error else "succeeded"] += 1
+
+    def last_failure(self) -> str | None:
+        """Error of the last attempt if it failed, else None."""
+        with self._state_lock:
+            if self._metrics["last_outcome"] != "failed":
+                return None
+            return self._metrics["last_error"] or "unknown"
+
+    def status(self) -> dict[str, Any]:
+        with self._state_lock:
+            metrics = dict(self._metrics)
+            durations = sorted(self._durations)
+
+        def _iso(value: datetime | None) -> str | None:
+            return value.isoformat() if value else None
+
+        metrics.update(
+            in_progress=self.running,
+            last_started_at=_iso(metrics["last_started_at"]),
+            last_finished_at=_iso(metrics["last_finished_at"]),
+            duration_ms_p50=durations[len(durations) // 2] if durations else None,
+            duration_ms_max=durations[-1] if durations else None,
+        )
+        return metrics
+
+    def _count(self, name: str) -> None:
+        with self._state_lock:
+            self._metrics[name] += 1
+
+
+__all__ = ["SingleFlight"]
@@ -7,6 +7,7 @@ from pathlib import Path
 import pandas as pd
 
 from backend.utils.time import to_iso_utc
+from .tremor_store import get_tremor_snapshot
 
 _DEFAULT_STALE_HOURS = int(os.getenv("CURVA_STALE_HOURS", "6"))
 
@@ -27,32 +28,6 @@ def get_curva_csv_path() -> Path:
     return CURVA_CANONICAL_PATH
 
 
-def _prepare_curva_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, str | None]:
-    if "timestamp" not in df.columns:
-        return pd.DataFrame(columns=["timestamp", "value"]), "missing_timestamp"
-
-    df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-    df = df.dropna(subset=["timestamp"])
-
-    if "value" not in df.columns:
-        if "value_max" in df.columns:
-            df["value"] = df["value_max"]
-        elif "value_avg" in df.columns:
-            df["value"] = df["value_avg"]
-
-    if "value" not in df.columns:
-        return pd.DataFrame(columns=["timestamp", "value"]), "missing_value"
-
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df = df.dropna(subset=["value"])
-
-    if df.empty:
-        return df, "empty"
-
-    return df, None
-
-
 def _normalize_timestamp_utc(value) -> datetime | None:
     if value is None:
         return None
@@ -97,17 +72,24 @@ def get_temporal_status_from_timestamp(
 
 
 def load_curva_dataframe(path: Path) -> tuple[pd.DataFrame | None, str | None]:
-    if not path.exists():
-        return None, "csv_missing"
+    """Return the parsed tremor series for ``path`` from the shared store.
 
+    The returned frame is sorted by timestamp and shared across callers;
+    copy it before mutating.
+    """
     try:
-        raw_df = pd.read_csv(path)
+        snapshot = get_tremor_snapshot(path)
     except Exception as exc:
         return None, f"read_error::{exc}"
 
-    df, reason = _prepare_curva_dataframe(raw_df)
-    if reason:
-        return None, reason
+    if snapshot is None:
+        return None, "csv_missing"
+    if snapshot.reason:
+        return None, snapshot.reason
+
+    df = snapshot.valid_frame
+    if df.empty:
+        return None, "empty"
 
     return df, None
 
@@ -0,0 +1,162 @@
+"""Per-version cache of the serialized ``/api/curva`` data arrays.
+
+Dashboards poll ``/api/curva`` far more often than the cron rewrites
+curva.csv, so the JSON ``data`` array is built once per tremor snapshot
+version: every row is serialized a single time and the arrays for the range
+presets are joined up front. Other limits, and downsampled views of any
+limit (see ``app.utils.downsample``), are joined on first use and kept until
+the data changes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.time import to_iso_utc
+
+from .downsample import DEFAULT_DOWNSAMPLE_METHOD, downsample_indices
+from .tremor_store import TremorSnapshot
+
+Dumps = Callable[[object], str]
+
+
+@dataclass(frozen=True)
+class CurvaSlice:
+    """The last ``source_rows`` samples of one snapshot, ready to embed in a response.
+
+    ``rows`` is the number of samples actually serialized: it is smaller than
+    ``source_rows`` when the slice was downsampled to ``max_points``.
+    """
+
+    version: str
+    limit: int
+    rows: int
+    source_rows: int
+    last_ts: pd.Timestamp
+    data_json: str
+    max_points: int | None = None
+    method: str | None = None
+
+    @property
+    def downsampled(self) -> bool:
+        return self.rows < self.source_rows
+
+
+SliceKey = tuple[int, int | None, str | None]
+
+
+class _VersionEntry:
+    def __init__(
+        self,
+        version: str,
+        row_json: list[str],
+        x: np.ndarray,
+        y: np.ndarray,
+        last_ts: pd.Timestamp,
+    ) -> None:
+        self.version = version
+        self.row_json = row_json
+        self.x = x
+        self.y = y
+        self.last_ts = last_ts
+        self.slices: dict[SliceKey, CurvaSlice] = {}
+
+    def slice(self, key: SliceKey) -> CurvaSlice:
+        cached = self.slices.get(key)
+        if cached is not None:
+            return cached
+        limit, max_points, method = key
+        start = max(len(self.row_json) - limit, 0)
+        source_rows = len(self.row_json) - start
+        if max_points is not None and max_points < source_rows:
+            picked = downsample_indices(self.x[start:], self.y[start:], max_points, method) + start
+            rows = [self.row_json[idx] for idx in picked.tolist()]
+        else:
+            rows = self.row_json[start:]
+        cached = CurvaSlice(
+            version=self.version,
+            limit=limit,
+            rows=len(rows),
+            source_rows=source_rows,
+            last_ts=self.last_ts,
+            data_json="[" + ",".join(rows) + "]",
+            max_points=max_points,
+            method=method if max_points is not None else None,
+        )
+        self.slices[key] = cached
+        return cached
+
+
+class CurvaPayloadCache:
+    """Serialize each snapshot version once and share the slices between requests."""
+
+    def __init__(self, max_rows: int, max_extra_limits: int = 64) -> None:
+        self.max_rows = max_rows
+        self.max_extra_limits = max_extra_limits
+        self._lock = threading.Lock()
+        self._entries: dict[str, _VersionEntry] = {}
+        self._presets: dict[str, frozenset[SliceKey]] = {}
+        self.build_count = 0
+
+    def _build(self, snapshot: TremorSnapshot, dumps: Dumps) -> _VersionEntry:
+        frame = snapshot.tail_frame(self.max_rows)
+        start = snapshot.rows - len(frame)
+        x = snapshot.timestamps[start:].astype("int64") / 1e9
+        y = snapshot.values[start:]
+        last_ts = frame["timestamp"].iloc[-1] if len(frame) else None
+        frame["timestamp"] = frame["timestamp"].apply(to_iso_utc)
+        row_json = [dumps(record) for record in frame.to_dict(orient="records")]
+        return _VersionEntry(snapshot.version, row_json, x, y, last_ts)
+
+    def get(
+        self,
+        snapshot: TremorSnapshot,
+        limit: int,
+        *,
+        dumps: Dumps,
+        presets: Iterable[int] = (),
+        max_points: int | None = None,
+        method: str = DEFAULT_DOWNSAMPLE_METHOD,
+    ) -> CurvaSlice:
+        """Return the last ``limit`` rows of ``snapshot``, optionally downsampled.
+
+        On the first call for a new version, the slices for ``presets`` are
+        built as well so the following polls for any range preset are lookups.
+        """
+        key = os.path.abspath(snapshot.path)
+        slice_key: SliceKey = (limit, max_points, method if max_points is not None else None)
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == snapshot.version:
+            cached = entry.slices.get(slice_key)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != snapshot.version:
+                entry = self._build(snapshot, dumps)
+                preset_keys = frozenset((preset, None, None) for preset in presets)
+                for preset_key in preset_keys:
+                    entry.slice(preset_key)
+                self._presets[key] = preset_keys
+                self._entries[key] = entry
+                self.build_count += 1
+            if slice_key not in entry.slices:
+                preset_keys = self._presets.get(key, frozenset())
+                extra = [cached for cached in entry.slices if cached not in preset_keys]
+                if len(extra) >= self.max_extra_limits:
+                    entry.slices.pop(extra[0], None)
+            return entry.slice(slice_key)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._presets.clear()
+
+
+__all__ = ["CurvaPayloadCache", "CurvaSlice"]
@@ -0,0 +1,136 @@
+"""Peak-preserving decimation of the tremor series for charts.
+
+Both decimators return sorted indices into the input arrays, so callers can
+pick rows (or pre-serialized rows) without copying the series:
+
+* ``minmax_indices`` keeps the minimum and the maximum of every bucket,
+  fully vectorized. Every local peak survives, which is what the alert
+  threshold line is compared against.
+* ``lttb_indices`` is Largest-Triangle-Three-Buckets: one point per bucket,
+  chosen to preserve the visual shape of the line.
+
+The first and last samples are always kept, so budgets below ``MIN_POINTS``
+are raised to it. NaN values never win a bucket; a bucket made only of NaN
+keeps its first sample.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+DEFAULT_DOWNSAMPLE_METHOD = "minmax"
+MIN_POINTS = 3
+
+
+def _bucket_ids(count: int, buckets: int) -> np.ndarray:
+    """Assign ``count`` consecutive samples to ``buckets`` equal-count buckets."""
+    return (np.arange(count, dtype=np.int64) * buckets) // count
+
+
+def _first_match_per_bucket(match: np.ndarray, bucket_ids: np.ndarray, buckets: int) -> np.ndarray:
+    positions = np.flatnonzero(match)
+    found, first = np.unique(bucket_ids[positions], return_index=True)
+    result = np.full(buckets, -1, dtype=np.int64)
+    result[found] = positions[first]
+    return result
+
+
+def minmax_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the per-bucket minimum and maximum, at most ``max_points``."""
+    values = np.asarray(values, dtype="float64")
+    count = len(values)
+    if max_points >= count:
+        return np.arange(count, dtype=np.int64)
+    max_points = max(int(max_points), MIN_POINTS)
+    inner = values[1:-1]
+    buckets = (max_points - 2) // 2
+    if buckets == 0:
+        # No room for a min/max pair: keep the peak between the endpoints.
+        highs = np.where(np.isnan(inner), -np.inf, inner)
+        return np.array([0, int(np.argmax(highs)) + 1, count - 1], dtype=np.int64)
+    ids = _bucket_ids(len(inner), buckets)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+
+    finite = ~np.isnan(inner)
+    highs = np.where(finite, inner, -np.inf)
+    lows = np.where(finite, inner, np.inf)
+    bucket_max = np.maximum.reduceat(highs, starts)
+    bucket_min = np.minimum.reduceat(lows, starts)
+    argmax = _first_match_per_bucket(highs == bucket_max[ids], ids, buckets)
+    argmin = _first_match_per_bucket(lows == bucket_min[ids], ids, buckets)
+    # All-NaN buckets match -inf/inf everywhere, so they resolve to their start.
+    picked = np.concatenate([argmin, argmax]) + 1
+    return np.unique(np.concatenate([[0], picked, [count - 1]]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets selection of at most ``max_points`` indices.
+
+    The selection is inherently sequential (each bucket depends on the point
+    picked in the previous one), so the loop runs per bucket while the
+    triangle areas inside a bucket are computed with NumPy.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    count = len(y)
+    if max_points >= count:
+        return np.arange(count, dtype=np.int64)
+    max_points = max(int(max_points), MIN_POINTS)
+    buckets = max_points - 2
+    edges = 1 + (np.arange(buckets + 1, dtype=np.int64) * (count - 2)) // buckets
+
+    finite = ~np.isnan(y)
+    y_filled = np.where(finite, y, 0.0)
+    csum_x = np.concatenate([[0.0], np.cumsum(np.where(finite, x, 0.0))])
+    csum_y = np.concatenate([[0.0], np.cumsum(y_filled)])
+    csum_n = np.concatenate([[0], np.cumsum(finite)])
+
+    selected = np.empty(buckets + 2, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    anchor = 0
+    for bucket in range(buckets):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < buckets:
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_stop = count - 1, count
+        next_n = csum_n[next_stop] - csum_n[next_start]
+        if next_n:
+            avg_x = (csum_x[next_stop] - csum_x[next_start]) / next_n
+            avg_y = (csum_y[next_stop] - csum_y[next_start]) / next_n
+        else:
+            avg_x = x[next_start:next_stop].mean()
+            avg_y = y_filled[anchor]
+
+        ax, ay = x[anchor], y_filled[anchor]
+        areas = np.abs(
+            (ax - avg_x) * (y_filled[start:stop] - ay)
+            - (ax - x[start:stop]) * (avg_y - ay)
+        )
+        areas[~finite[start:stop]] = -1.0
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def downsample_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int,
+    method: str = DEFAULT_DOWNSAMPLE_METHOD,
+) -> np.ndarray:
+    if method == "lttb":
+        return lttb_indices(x, y, max_points)
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    raise ValueError(f"unknown downsample method: {method}")
+
+
+__all__ = [
+    "DEFAULT_DOWNSAMPLE_METHOD",
+    "DOWNSAMPLE_METHODS",
+    "downsample_indices",
+    "lttb_indices",
+    "minmax_indices",
+]
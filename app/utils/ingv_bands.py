@@ -1,3 +1,12 @@
+"""INGV colour-band thresholds (t1/t2/t3) detected from the coloured tremor PNG.
+
+Request handlers only call ``get_ingv_band_thresholds``, which serves an
+in-memory snapshot of ``ingv_bands.json`` and never touches the network.
+When the snapshot is missing or its verification is older than
+``VERIFY_INTERVAL`` it is still served (stale-while-revalidate) and a single
+background refresh is started through the ``_refresh`` single-flight. ``refresh_ingv_bands`` does the actual
+download, verification and re-detection; the scheduler also runs it.
+"""
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
@@ -5,17 +14,22 @@ import json
 import logging
 import os
 from pathlib import Path
+import threading
 from typing import Any
 
 import cv2
 import numpy as np
 
+from app.utils.background import SingleFlight
 from backend.utils.extract_colored import _crop_plot_area, download_png
 from config import Config
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
 CACHE_PATH = DATA_DIR / "ingv_bands.json"
 VERIFY_INTERVAL = timedelta(hours=12)
+# Minimum spacing of background refresh attempts, so a failing INGV server
+# is not hit on every page view.
+REFRESH_RETRY_INTERVAL = timedelta(minutes=10)
 
 LOG_MIN = -1.0
 LOG_MAX = 1.0
@@ -24,49 +38,57 @@ FALLBACK_T2 = float(os.getenv("INGV_BAND_FALLBACK_T2", str(Config.ALERT_THRESHOL
 FALLBACK_T1 = float(os.getenv("INGV_BAND_FALLBACK_T1", f"{FALLBACK_T2 / 2}"))
 FALLBACK_T3 = float(os.getenv("INGV_BAND_FALLBACK_T3", f"{FALLBACK_T2 * 2}"))
 
+# Vertical strips of the right-hand sample classified alongside its median,
+# so a curve or a label crossing part of the sample does not move a boundary.
+DETECTION_STRIPS = 3
+
+# Class codes of ``_classify_bands``; 0 is an unrecognised colour.
+_BAND_LABELS: tuple[str | None, ...] = (None, "GREEN", "YELLOW", "ORANGE", "RED")
+_GREEN, _YELLOW, _ORANGE, _RED = 1, 2, 3, 4
+
 
 def _get_logger(logger: logging.Logger | None = None) -> logging.Logger:
     return logger or logging.getLogger(__name__)
 
 
-def detect_band_boundaries_px(img_crop: np.ndarray) -> dict[str, Any]:
+def detect_band_boundaries_px(img_crop: np.ndarray, strips: int = DETECTION_STRIPS) -> dict[str, Any]:
+    """Row boundaries between the colour bands of the cropped plot.
+
+    The right-hand sample is reduced to its median column and, with
+    ``strips > 1``, to one median column per vertical strip as well; all of
+    them go through a single HSV conversion and each row takes the majority
+    class, the full median deciding ties.
+    """
     height, width = img_crop.shape[:2]
     sample_width = min(30, max(8, width // 8))
     start_x = max(0, width - sample_width)
     sample = img_crop[:, start_x:width]
 
-    median_bgr = np.median(sample, axis=1).astype(np.uint8)
-    hsv = cv2.cvtColor(median_bgr[np.newaxis, :, :], cv2.COLOR_BGR2HSV)[0]
-
-    classes: list[str | None] = []
-    for y in range(height):
-        classes.append(_classify_band(hsv[y]))
-
-    classes = _fill_missing_classes(classes)
-    classes_found = []
-    for label in classes:
-        if label and label not in classes_found:
-            classes_found.append(label)
-
+    median_bgr = np.median(sample, axis=1, keepdims=True)
+    strip_width = sample.shape[1] // max(strips, 1)
+    if strips > 1 and strip_width:
+        parts = sample[:, : strip_width * strips].reshape(height, strips, strip_width, -1)
+        median_bgr = np.concatenate([median_bgr, np.median(parts, axis=2)], axis=1)
+    median_bgr = median_bgr.astype(np.uint8)
+    codes = _vote_bands(_classify_bands(cv2.cvtColor(median_bgr, cv2.COLOR_BGR2HSV)))
+    codes = _fill_missing_codes(codes)
+
+    known = codes[codes != 0]
+    found, first_seen = np.unique(known, return_index=True)
+    classes_found = [_BAND_LABELS[code] for code in found[np.argsort(first_seen)]]
+
+    change = np.flatnonzero(np.diff(codes) != 0) + 1
+    prev, curr = codes[change - 1], codes[change]
+    low, high = np.minimum(prev, curr), np.maximum(prev, curr)
+    transitions = {
+        "green_yellow": (low == _GREEN) & (high == _YELLOW),
+        "yellow_orange": (low == _YELLOW) & (high == _ORANGE),
+        "orange_red": ((low == _ORANGE) | (low == _YELLOW)) & (high == _RED),
+    }
     boundaries = {
-        "green_yellow": None,
-        "yellow_orange": None,
-        "orange_red": None,
+        key: int(change[mask][0]) if mask.any() else None for key, mask in transitions.items()
     }
 
-    for y in range(1, height):
-        prev = classes[y - 1]
-        curr = classes[y]
-        if not prev or not curr or prev == curr:
-            continue
-        transition = {prev, curr}
-        if transition == {"GREEN", "YELLOW"} and boundaries["green_yellow"] is None:
-            boundaries["green_yellow"] = y
-        elif transition == {"YELLOW", "ORANGE"} and boundaries["yellow_orange"] is None:
-            boundaries["yellow_orange"] = y
-        elif transition in ({"ORANGE", "RED"}, {"YELLOW", "RED"}) and boundaries["orange_red"] is None:
-            boundaries["orange_red"] = y
-
     return {
         **boundaries,
         "classes_found": classes_found,
@@ -107,8 +129,89 @@ def load_cached_thresholds() -> dict[str, Any] | None:
 
 def save_cached_thresholds(payload: dict[str, Any]) -> None:
     CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with CACHE_PATH.open("w", encoding="utf-8") as handle:
+    # Readers in other processes must never see a half-written file.
+    tmp_path = CACHE_PATH.with_name(f".{CACHE_PATH.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
         json.dump(payload, handle, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+_snapshot_lock = threading.Lock()
+_snapshot: tuple[tuple[int, int] | None, dict[str, Any] | None] = (None, None)
+_refresh = SingleFlight("ingv-bands-refresh", retry_interval=REFRESH_RETRY_INTERVAL)
+
+
+def _cache_signature() -> tuple[int, int] | None:
+    try:
+        stat = CACHE_PATH.stat()
+    except OSError:
+        return None
+    return (int(stat.st_mtime_ns), int(stat.st_size))
+
+
+def _read_snapshot() -> dict[str, Any] | None:
+    """Cached payload, re-read only when ``ingv_bands.json`` changes on disk."""
+    global _snapshot
+    signature = _cache_signature()
+    cached_signature, payload = _snapshot
+    if signature is not None and signature == cached_signature:
+        return payload
+    with _snapshot_lock:
+        payload = load_cached_thresholds() if signature is not None else None
+        _snapshot = (signature, payload)
+    return payload
+
+
+def _verification_fresh(payload: dict[str, Any], now: datetime) -> bool:
+    checked_at = (payload.get("verification") or {}).get("checked_at")
+    if not checked_at:
+        return False
+    try:
+        checked_dt = datetime.fromisoformat(checked_at)
+    except (TypeError, ValueError):
+        return False
+    if checked_dt.tzinfo is None:
+        checked_dt = checked_dt.replace(tzinfo=timezone.utc)
+    return now - checked_dt < VERIFY_INTERVAL
+
+
+def _needs_refresh(payload: dict[str, Any] | None, now: datetime) -> bool:
+    if not payload or not _thresholds_valid(payload):
+        return True
+    return not _verification_fresh(payload, now)
+
+
+def schedule_band_refresh(logger: logging.Logger | None = None) -> bool:
+    """Start a background ``refresh_ingv_bands`` unless one is running or ran recently."""
+    if not (os.getenv("INGV_COLORED_URL") or "").strip():
+        return False
+    logger = _get_logger(logger)
+    return _refresh.start(lambda: _refresh_locked(logger), logger=logger)
+
+
+def refresh_ingv_bands(logger: logging.Logger | None = None, *, force: bool = False) -> dict[str, Any] | None:
+    """Verify or re-detect the bands now (blocking); used by the scheduler.
+
+    Returns the payload in ``ingv_bands.json`` afterwards, or ``None`` when
+    nothing could be detected. Waits for a refresh already in progress.
+    """
+    logger = _get_logger(logger)
+    return _refresh.run(lambda: _refresh_locked(logger, force=force))
+
+
+def _refresh_locked(logger: logging.Logger, *, force: bool = False) -> dict[str, Any] | None:
+    now = datetime.now(timezone.utc)
+    cached = load_cached_thresholds()
+    if cached and _thresholds_valid(cached):
+        if force:
+            cached.setdefault("verification", {})["checked_at"] = None
+        result = _maybe_verify_cached(cached, logger, now)
+    else:
+        result = _detect_thresholds(logger)
+        if result:
+            save_cached_thresholds(result)
+    _read_snapshot()
+    return result
 
 
 def verify_cached_bands(img_crop: np.ndarray, bands_px: dict[str, int | None]) -> dict[str, Any]:
@@ -118,6 +221,7 @@ def verify_cached_bands(img_crop: np.ndarray, bands_px: dict[str, int | None]) -
     sample = img_crop[:, start_x:width]
     median_bgr = np.median(sample, axis=1).astype(np.uint8)
     hsv = cv2.cvtColor(median_bgr[np.newaxis, :, :], cv2.COLOR_BGR2HSV)[0]
+    codes = _classify_bands(hsv)
 
     checks = []
     status = "ok"
@@ -130,8 +234,8 @@ def verify_cached_bands(img_crop: np.ndarray, bands_px: dict[str, int | None]) -
             return
         y_above = max(0, y_boundary - 2)
         y_below = min(height - 1, y_boundary + 2)
-        class_above = _classify_band(hsv[y_above])
-        class_below = _classify_band(hsv[y_below])
+        class_above = _BAND_LABELS[codes[y_above]]
+        class_below = _BAND_LABELS[codes[y_below]]
         checks.append((key, class_above, class_below))
         if not class_above or not class_below:
             status = "warning" if status == "ok" else status
@@ -157,21 +261,18 @@ def verify_cached_bands(img_crop: np.ndarray, bands_px: dict[str, int | None]) -
 
 
 def get_ingv_band_thresholds(logger: logging.Logger | None = None) -> dict[str, Any]:
-    logger = _get_logger(logger)
-    cached = load_cached_thresholds()
-    now = datetime.now(timezone.utc)
+    """Current band thresholds for request handlers; never blocks on INGV."""
+    cached = _read_snapshot()
+    if _needs_refresh(cached, datetime.now(timezone.utc)):
+        schedule_band_refresh(logger)
 
     if cached and _thresholds_valid(cached):
-        cached = _maybe_verify_cached(cached, logger, now)
         return _normalize_cached_result(cached)
 
-    detected = _detect_thresholds(logger)
-    if detected:
-        save_cached_thresholds(detected)
-        return _normalize_cached_result(detected)
-
     fallback = _fallback_thresholds()
-    logger.warning("[INGV_BANDS] Using fallback thresholds t1=%.3f t2=%.3f t3=%.3f", *fallback)
+    _get_logger(logger).warning(
+        "[INGV_BANDS] Using fallback thresholds t1=%.3f t2=%.3f t3=%.3f", *fallback
+    )
     return {
         "thresholds_mv": {"t1": fallback[0], "t2": fallback[1], "t3": fallback[2]},
         "bands_px": {},
@@ -183,7 +284,7 @@ def get_ingv_band_thresholds(logger: logging.Logger | None = None) -> dict[str,
     }
 
 
-def _detect_thresholds(logger: logging.Logger) -> dict[str, Any] | None:
+def _download_colored_image(logger: logging.Logger, purpose: str) -> np.ndarray | None:
     colored_url = (os.getenv("INGV_COLORED_URL") or "").strip()
     if not colored_url:
         logger.warning("[INGV_BANDS] INGV_COLORED_URL not configured")
@@ -191,14 +292,22 @@ def _detect_thresholds(logger: logging.Logger) -> dict[str, Any] | None:
 
     try:
         png_path = download_png(colored_url)
+        image = cv2.imread(str(png_path))
     except Exception as exc:
-        logger.warning("[INGV_BANDS] PNG download failed: %s", exc)
+        logger.warning("[INGV_BANDS] %s download failed: %s", purpose, exc)
         return None
 
-    image = cv2.imread(str(png_path))
     if image is None:
-        logger.warning("[INGV_BANDS] Failed to read PNG %s", png_path)
+        logger.warning("[INGV_BANDS] Failed to read %s PNG %s", purpose, png_path)
         return None
+    return image
+
+
+def _detect_thresholds(logger: logging.Logger, image: np.ndarray | None = None) -> dict[str, Any] | None:
+    if image is None:
+        image = _download_colored_image(logger, "PNG")
+        if image is None:
+            return None
 
     cropped, offsets, _ = _safe_crop_plot_area(image)
     bands_px = detect_band_boundaries_px(cropped)
@@ -238,19 +347,8 @@ def _maybe_verify_cached(cached: dict[str, Any], logger: logging.Logger, now: da
     if checked_dt and now - checked_dt < VERIFY_INTERVAL:
         return cached
 
-    colored_url = (os.getenv("INGV_COLORED_URL") or "").strip()
-    if not colored_url:
-        return cached
-
-    try:
-        png_path = download_png(colored_url)
-        image = cv2.imread(str(png_path))
-    except Exception as exc:
-        logger.warning("[INGV_BANDS] verification download failed: %s", exc)
-        return cached
-
+    image = _download_colored_image(logger, "verification")
     if image is None:
-        logger.warning("[INGV_BANDS] verification image missing")
         return cached
 
     cropped, _, _ = _safe_crop_plot_area(image)
@@ -264,7 +362,8 @@ def _maybe_verify_cached(cached: dict[str, Any], logger: logging.Logger, now: da
         return cached
 
     logger.warning("[INGV_BANDS] cached bands verification failed: %s", verification.get("notes"))
-    redetected = _detect_thresholds(logger)
+    # Re-detect on the image just downloaded instead of fetching it again.
+    redetected = _detect_thresholds(logger, image)
     if not redetected:
         cached["verification"]["status"] = "warning"
         cached["verification"]["notes"] = (
@@ -364,31 +463,42 @@ def _normalize_cached_result(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def _fill_missing_classes(classes: list[str | None]) -> list[str | None]:
-    filled = classes[:]
-    last = None
-    for idx, value in enumerate(filled):
-        if value is None and last is not None:
-            filled[idx] = last
-        else:
-            last = value
-    if filled and filled[0] is None:
-        first = next((val for val in filled if val is not None), None)
-        if first is not None:
-            filled = [first if val is None else val for val in filled]
+def _fill_missing_codes(codes: np.ndarray) -> np.ndarray:
+    """Forward-fill unknown (0) rows; leading ones take the first known class."""
+    known = codes != 0
+    if not known.any():
+        return codes
+    last_known = np.where(known, np.arange(len(codes)), 0)
+    np.maximum.accumulate(last_known, out=last_known)
+    filled = codes[last_known]
+    filled[: np.argmax(known)] = codes[np.argmax(known)]
     return filled
 
 
+def _vote_bands(codes: np.ndarray) -> np.ndarray:
+    """Per-row majority of ``(rows, columns)`` class codes; column 0 wins ties."""
+    if codes.shape[1] == 1:
+        return codes[:, 0]
+    counts = np.stack([(codes == code).sum(axis=1) for code in range(1, len(_BAND_LABELS))], axis=1)
+    best = counts.argmax(axis=1)
+    reference = codes[:, 0]
+    rows = np.arange(len(codes))
+    reference_count = np.where(reference != 0, counts[rows, np.maximum(reference - 1, 0)], 0)
+    return np.where(counts[rows, best] > reference_count, best + 1, reference).astype(codes.dtype)
+
+
+def _classify_bands(hsv: np.ndarray) -> np.ndarray:
+    """Class codes (see ``_BAND_LABELS``) for HSV pixels of any shape ``(..., 3)``."""
+    hsv = np.asarray(hsv, dtype=np.int16)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    codes = np.zeros(h.shape, dtype=np.int8)
+    codes[(h > 35) & (h <= 85)] = _GREEN
+    codes[(h > 20) & (h <= 35)] = _YELLOW
+    codes[(h > 10) & (h <= 20)] = _ORANGE
+    codes[(h <= 10) | (h >= 170)] = _RED
+    codes[(s < 40) | (v < 40)] = 0
+    return codes
+
+
 def _classify_band(hsv_pixel: np.ndarray) -> str | None:
-    h, s, v = (int(hsv_pixel[0]), int(hsv_pixel[1]), int(hsv_pixel[2]))
-    if s < 40 or v < 40:
-        return None
-    if h <= 10 or h >= 170:
-        return "RED"
-    if 10 < h <= 20:
-        return "ORANGE"
-    if 20 < h <= 35:
-        return "YELLOW"
-    if 35 < h <= 85:
-        return "GREEN"
-    return None
+    return _BAND_LABELS[_classify_bands(hsv_pixel)[()]]
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from collections.abc import Sequence
 import math
+import numpy as np
 import plotly.graph_objects as go
 from plotly import offline as plotly_offline
 
+from .downsample import minmax_indices
 from .plot_thresholds import get_plot_band_thresholds
 
 Y_AXIS_MIN_MV = 0.1
@@ -16,6 +18,20 @@ MOBILE_LINE_WIDTH = 3.5
 MOBILE_MODAL_MARGIN = {"l": 45, "r": 10, "t": 20, "b": 45}
 MOBILE_MODAL_TICK_FONT_SIZE = 13
 MOBILE_MODAL_LINE_WIDTH = 3.2
+# A chart is a few hundred pixels wide: past this many points the figure JSON
+# only grows, so longer windows are decimated keeping every bucket's min/max.
+DEFAULT_MAX_PLOT_POINTS = 2000
+
+
+def _downsample_pairs(
+    clean_pairs: Sequence[tuple[str, float]], max_points: int | None
+) -> Sequence[tuple[str, float]]:
+    if not max_points or len(clean_pairs) <= max_points:
+        return clean_pairs
+    values = np.fromiter((pair[1] for pair in clean_pairs), dtype="float64", count=len(clean_pairs))
+    return [clean_pairs[idx] for idx in minmax_indices(values, max_points).tolist()]
+
+
 def _compute_log_range(plot_values: Sequence[float]) -> tuple[list[float], float]:
     max_y = max(plot_values) if plot_values else Y_AXIS_MIN_MV
     y_max = max(10.0, max_y * 2)
@@ -205,6 +221,7 @@ def build_tremor_figure(
     min_points: int = 10,
     eps: float = 1e-2,
     add_background_bands: bool = False,
+    max_points: int | None = DEFAULT_MAX_PLOT_POINTS,
 ) -> go.Figure | None:
     layout = _build_tremor_layout(mode=mode, shapes=shapes)
     is_home_variant = mode in {"home", "desktop", "home_mobile_modal"}
@@ -237,6 +254,7 @@ def build_tremor_figure(
         trace_kwargs=trace_kwargs,
         add_background_bands=add_background_bands,
         mobile_tuning=mode == "home",
+        max_points=max_points,
     )
 
 
@@ -253,9 +271,11 @@ def build_plotly_html_from_pairs(
     trace_kwargs: dict | None = None,
     add_background_bands: bool = False,
     mobile_tuning: bool = False,
+    max_points: int | None = None,
 ) -> str | None:
     if len(clean_pairs) < min_points:
         return None
+    clean_pairs = _downsample_pairs(clean_pairs, max_points)
     plot_timestamps = [pair[0] for pair in clean_pairs]
     plot_values = [max(pair[1], eps) for pair in clean_pairs]
     trace_options = {
@@ -289,9 +309,11 @@ def build_plotly_figure_from_pairs(
     trace_kwargs: dict | None = None,
     add_background_bands: bool = False,
     mobile_tuning: bool = False,
+    max_points: int | None = None,
 ) -> go.Figure | None:
     if len(clean_pairs) < min_points:
         return None
+    clean_pairs = _downsample_pairs(clean_pairs, max_points)
     plot_timestamps = [pair[0] for pair in clean_pairs]
     plot_values = [max(pair[1], eps) for pair in clean_pairs]
     trace_options = {
@@ -0,0 +1,335 @@
+"""Process-wide cache of the parsed tremor series (curva.csv).
+
+Every hot route used to run ``pd.read_csv`` + ``pd.to_datetime`` on each
+request. The store parses a file once per ``(inode, mtime, size)`` signature
+and hands every caller the same immutable snapshot until the file changes.
+Snapshots cover the CSV retention window. Long-range readers use
+``get_tremor_history``: when the binary archive written by the cron
+(``curva_colored.bin``) is at least as recent as the CSV, it is memory-mapped
+instead, with the longer history the archive keeps, and its DataFrame is
+only built for callers that ask for one.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import cached_property
+import os
+from pathlib import Path
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backend.utils.tremor_archive import archive_path_for, open_archive
+from backend.utils.tremor_rollups import (
+    ROLLUP_RESOLUTIONS,
+    compute_rollups,
+    read_rollups,
+    rollup_path_for,
+)
+
+FileSignature = tuple[int, ...]
+
+
+def _file_signature(path: Path) -> FileSignature | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (int(stat.st_ino), int(stat.st_mtime_ns), int(stat.st_size))
+
+
+@dataclass(frozen=True)
+class TremorSnapshot:
+    """Immutable, parsed view of the tremor CSV.
+
+    ``frame`` holds every row with a valid timestamp, sorted by time, with
+    ``value`` coerced to float (it may still contain NaN). ``timestamps`` and
+    ``values`` are read-only NumPy arrays over the same rows. The frame is
+    shared between callers: copy it before mutating.
+
+    Archive snapshots keep the memory-mapped columns in ``_columns`` and
+    build ``frame`` on first access; array-only readers never pay for it.
+    """
+
+    path: Path
+    signature: FileSignature
+    timestamps: np.ndarray
+    values: np.ndarray
+    reason: str | None
+    stats: dict
+    loaded_at: datetime
+    source: str = "csv"
+    _frame: pd.DataFrame | None = field(default=None, repr=False, compare=False)
+    _columns: dict[str, np.ndarray] | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def version(self) -> str:
+        return "-".join(f"{part:x}" for part in self.signature)
+
+    @property
+    def mtime_utc(self) -> str:
+        return datetime.fromtimestamp(self.signature[1] / 1e9, tz=timezone.utc).isoformat()
+
+    @property
+    def rows(self) -> int:
+        return int(len(self.timestamps))
+
+    @property
+    def last_timestamp(self) -> pd.Timestamp | None:
+        if not len(self.timestamps):
+            return None
+        return pd.Timestamp(self.timestamps[-1]).tz_localize("UTC")
+
+    @cached_property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is not None:
+            return self._frame
+        return self.tail_frame(self.rows)
+
+    def tail_frame(self, count: int) -> pd.DataFrame:
+        """New DataFrame with the last ``count`` rows, safe to mutate."""
+        if self._columns is None:
+            return self.frame.tail(count).copy()
+        start = max(self.rows - count, 0)
+        columns = {"timestamp": pd.DatetimeIndex(self.timestamps[start:]).tz_localize("UTC")}
+        for name, column in self._columns.items():
+            columns[name] = np.array(column[start:], dtype="float64")
+        return pd.DataFrame(columns)
+
+    @cached_property
+    def valid_frame(self) -> pd.DataFrame:
+        """Rows with a usable numeric ``value`` (computed once per snapshot)."""
+        if "value" not in self.frame.columns:
+            return self.frame.iloc[0:0]
+        mask = ~np.isnan(self.values)
+        if mask.all():
+            return self.frame
+        return self.frame[mask].reset_index(drop=True)
+
+
+def _build_archive_snapshot(path: Path, signature: FileSignature, archive) -> TremorSnapshot:
+    count = int(len(archive))
+    # Epoch seconds need one conversion to datetime64[ns]; the value columns
+    # stay views into the read-only map.
+    timestamps = (np.asarray(archive["ts"], dtype="int64") * 1_000_000_000).view("datetime64[ns]")
+    timestamps.flags.writeable = False
+    columns = {}
+    for name in ("value", "value_max", "value_avg"):
+        columns[name] = np.asarray(archive[name])
+        columns[name].flags.writeable = False
+    return TremorSnapshot(
+        path=path,
+        signature=signature,
+        timestamps=timestamps,
+        values=columns["value"],
+        reason=None if count else "empty",
+        stats={
+            "raw_rows": count,
+            "parsed_rows": count,
+            "rows_after_dropna": count,
+            "invalid_timestamp_samples": [],
+        },
+        loaded_at=datetime.now(timezone.utc),
+        source="archive",
+        _columns=columns,
+    )
+
+
+def _build_snapshot(path: Path, signature: FileSignature, raw_df: pd.DataFrame) -> TremorSnapshot:
+    stats = {
+        "raw_rows": int(len(raw_df)),
+        "parsed_rows": 0,
+        "rows_after_dropna": 0,
+        "invalid_timestamp_samples": [],
+    }
+    reason: str | None = None
+
+    if "timestamp" not in raw_df.columns:
+        df = pd.DataFrame(
+            {
+                "timestamp": pd.Series([], dtype="datetime64[ns, UTC]"),
+                "value": pd.Series([], dtype="float64"),
+            }
+        )
+        reason = "missing_timestamp"
+    else:
+        df = raw_df.copy()
+        # pandas 3 infers microseconds here; the archive path builds
+        # nanoseconds, and both sources must yield the same frame.
+        parsed_ts = pd.to_datetime(df["timestamp"], utc=True, errors="coerce").dt.as_unit("ns")
+        invalid_mask = parsed_ts.isna() & df["timestamp"].notna()
+        stats["parsed_rows"] = int(parsed_ts.notna().sum())
+        stats["invalid_timestamp_samples"] = (
+            df.loc[invalid_mask, "timestamp"].astype(str).head(3).tolist()
+        )
+        df["timestamp"] = parsed_ts
+        df = df.dropna(subset=["timestamp"])
+        stats["rows_after_dropna"] = int(len(df))
+
+        if "value" not in df.columns:
+            if "value_max" in df.columns:
+                df["value"] = df["value_max"]
+            elif "value_avg" in df.columns:
+                df["value"] = df["value_avg"]
+
+        if "value" in df.columns:
+            df["value"] = pd.to_numeric(df["value"], errors="coerce").astype("float64")
+        else:
+            reason = "missing_value"
+
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        if reason is None and df.empty:
+            reason = "empty"
+
+    timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    timestamps.flags.writeable = False
+    if "value" in df.columns:
+        values = df["value"].to_numpy(dtype="float64")
+    else:
+        values = np.full(len(df), np.nan, dtype="float64")
+    values.flags.writeable = False
+
+    return TremorSnapshot(
+        path=path,
+        signature=signature,
+        timestamps=timestamps,
+        values=values,
+        reason=reason,
+        stats=stats,
+        loaded_at=datetime.now(timezone.utc),
+        _frame=df,
+    )
+
+
+class TremorSeriesStore:
+    """Parse each tremor CSV once per file version and share the result."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: dict[tuple[str, bool], TremorSnapshot] = {}
+        self.parse_count = 0
+
+    def get(self, path: Path | str, *, prefer_archive: bool = False) -> TremorSnapshot | None:
+        """Return the snapshot for ``path`` or ``None`` when the file is missing.
+
+        With ``prefer_archive`` a fresh binary archive is read instead of the
+        CSV; it may hold history the CSV retention already dropped.
+        Read errors from ``pd.read_csv`` propagate to the caller.
+        """
+        path = Path(path)
+        key = (os.path.abspath(path), prefer_archive)
+        signature = _file_signature(path)
+        if signature is None:
+            with self._lock:
+                self._snapshots.pop(key, None)
+            return None
+        use_archive = False
+        if prefer_archive:
+            archive_path = archive_path_for(path)
+            archive_signature = _file_signature(archive_path)
+            # The cron writes the CSV first and the archive right after: an
+            # archive older than the CSV was not produced from it.
+            use_archive = archive_signature is not None and archive_signature[1] >= signature[1]
+            if use_archive:
+                signature = signature + archive_signature
+
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.signature == signature:
+                return snapshot
+            # The signature is taken before reading: if the file is replaced
+            # mid-read the next call simply re-parses it.
+            archive = open_archive(archive_path) if use_archive else None
+            if archive is not None:
+                snapshot = _build_archive_snapshot(path, signature, archive)
+            else:
+                raw_df = pd.read_csv(path)
+                snapshot = _build_snapshot(path, signature, raw_df)
+            self._snapshots[key] = snapshot
+            self.parse_count += 1
+            return snapshot
+
+    def invalidate(self, path: Path | str | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._snapshots.clear()
+            else:
+                key = os.path.abspath(Path(path))
+                self._snapshots.pop((key, False), None)
+                self._snapshots.pop((key, True), None)
+
+
+_STORE = TremorSeriesStore()
+
+
+def get_tremor_store() -> TremorSeriesStore:
+    return _STORE
+
+
+def get_tremor_snapshot(path: Path | str) -> TremorSnapshot | None:
+    return _STORE.get(path)
+
+
+def get_tremor_history(path: Path | str) -> TremorSnapshot | None:
+    """Snapshot for long ranges, read from the archive when it is fresh."""
+    return _STORE.get(path, prefer_archive=True)
+
+
+_ROLLUPS_LOCK = threading.Lock()
+_ROLLUPS: dict[tuple[str, str], tuple[FileSignature, np.ndarray]] = {}
+
+
+def _cached_rollups(key: tuple[str, str], signature: FileSignature, compute) -> np.ndarray:
+    cached = _ROLLUPS.get(key)
+    if cached is None or cached[0] != signature:
+        with _ROLLUPS_LOCK:
+            cached = _ROLLUPS.get(key)
+            if cached is None or cached[0] != signature:
+                cached = (signature, compute())
+                _ROLLUPS[key] = cached
+    return cached[1]
+
+
+def get_tremor_rollups(path: Path | str, resolution: str) -> tuple[np.ndarray | None, str]:
+    """Return ``(rollups, version)`` for the tremor CSV at ``path``.
+
+    The rollup file written by the cron is read once per file version. Until
+    it exists (first deploy, rollups disabled) the buckets are computed from
+    the raw snapshot, once per snapshot version; that only covers the raw
+    retention window.
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"unknown rollup resolution: {resolution}")
+    rollup_path = rollup_path_for(path, resolution)
+    signature = _file_signature(rollup_path)
+    if signature is None:
+        snapshot = get_tremor_history(path)
+        if snapshot is None or snapshot.reason:
+            return None, ""
+
+        def compute() -> np.ndarray:
+            epochs = snapshot.timestamps.astype("int64") // 1_000_000_000
+            return compute_rollups(epochs, snapshot.values, ROLLUP_RESOLUTIONS[resolution])
+
+        key = (os.path.abspath(path), resolution)
+        return _cached_rollups(key, snapshot.signature, compute), f"raw-{snapshot.version}"
+
+    key = (os.path.abspath(rollup_path), resolution)
+    rollups = _cached_rollups(key, signature, lambda: read_rollups(rollup_path))
+    return rollups, "-".join(f"{part:x}" for part in signature)
+
+
+__all__ = [
+    "TremorSeriesStore",
+    "TremorSnapshot",
+    "get_tremor_history",
+    "get_tremor_rollups",
+    "get_tremor_snapshot",
+    "get_tremor_store",
+]
@@ -2,23 +2,33 @@ from __future__ import annotations
 
 import logging
 import os
+import time
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import JSON, DateTime, Float, Integer, String, create_engine, delete, func, select
+from sqlalchemy import JSON, DateTime, Float, Integer, String, create_engine, delete, func, insert, select
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.engine import Engine
 from sqlalchemy.engine.url import URL, make_url
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
 from backend.services.hotspots.config import HotspotsConfig
-from backend.services.hotspots.firms_provider import FirmsFetchResult, fetch_firms_records
-from backend.services.hotspots.normalize import normalize_records
+from backend.services.hotspots.firms_provider import FirmsFetchResult, fetch_firms_sources
+from backend.services.hotspots.normalize import HotspotBatch, normalize_batch
+from backend.services.hotspots.payload import (
+    LATEST_ITEMS_LIMIT,
+    LATEST_WINDOW_HOURS,
+    build_latest_responses,
+    latest_cache_key,
+    serialize_latest_response,
+)
 from backend.services.hotspots.scoring import apply_status, deduplicate_items
-from backend.services.hotspots.significance import is_significant_item
 from backend.services.hotspots.storage import is_cache_valid
 from backend.services.hotspots.sources import build_sources
 
 
+INSERT_CHUNK_SIZE = 1000
+
+
 def _json_type() -> JSON:
     return JSON().with_variant(JSONB, "postgresql")
 
@@ -122,28 +132,45 @@ def _records_from_items(
     return records
 
 
-def _insert_records(session: Session, engine: Engine, records: list[dict]) -> int:
-    if not records:
-        return 0
+def _insert_chunk_on_conflict(session: Session, dialect: str, chunk: list[dict]) -> int:
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(HotspotRecord.__table__)
+    stmt = stmt.on_conflict_do_nothing(index_elements=["fingerprint"])
+    result = session.execute(stmt, chunk)
+    return result.rowcount or 0
 
-    if engine.dialect.name == "postgresql":
-        from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-        stmt = pg_insert(HotspotRecord).values(records)
-        stmt = stmt.on_conflict_do_nothing(index_elements=["fingerprint"])
-        result = session.execute(stmt)
-        return result.rowcount or 0
+def _existing_fingerprints(session: Session, fingerprints: set[str]) -> set[str]:
+    return set(
+        session.execute(
+            select(HotspotRecord.fingerprint).where(HotspotRecord.fingerprint.in_(fingerprints))
+        ).scalars()
+    )
 
-    if engine.dialect.name == "sqlite":
-        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-        stmt = sqlite_insert(HotspotRecord).values(records)
-        stmt = stmt.on_conflict_do_nothing(index_elements=["fingerprint"])
-        result = session.execute(stmt)
-        return result.rowcount or 0
+def _insert_chunk_executemany(session: Session, chunk: list[dict]) -> int:
+    """Insert the chunk's unseen fingerprints with a single executemany."""
+    existing = _existing_fingerprints(session, {record["fingerprint"] for record in chunk})
+    fresh: dict[str, dict] = {}
+    for record in chunk:
+        if record["fingerprint"] not in existing:
+            fresh.setdefault(record["fingerprint"], record)
+    if not fresh:
+        return 0
+    try:
+        with session.begin_nested():
+            session.execute(insert(HotspotRecord.__table__), list(fresh.values()))
+        return len(fresh)
+    except IntegrityError:
+        # Another writer inserted some of these since the lookup.
+        pass
 
     inserted = 0
-    for record in records:
+    for record in fresh.values():
         try:
             with session.begin_nested():
                 session.add(HotspotRecord(**record))
@@ -153,6 +180,44 @@ def _insert_records(session: Session, engine: Engine, records: list[dict]) -> in
     return inserted
 
 
+def _insert_records(
+    session: Session,
+    engine: Engine,
+    records: list[dict],
+    logger: logging.Logger | None = None,
+) -> int:
+    """Insert records in ``INSERT_CHUNK_SIZE`` executemany batches, skipping stored fingerprints.
+
+    Each row binds its own parameters, so large backfills stay clear of the
+    per-statement parameter limits of a single multi-row ``VALUES``.
+    """
+    if not records:
+        return 0
+
+    started = time.perf_counter()
+    dialect = engine.dialect.name
+    inserted = 0
+    for start in range(0, len(records), INSERT_CHUNK_SIZE):
+        chunk = records[start:start + INSERT_CHUNK_SIZE]
+        if dialect in ("postgresql", "sqlite"):
+            inserted += _insert_chunk_on_conflict(session, dialect, chunk)
+        else:
+            inserted += _insert_chunk_executemany(session, chunk)
+
+    if logger is not None:
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "[HOTSPOTS] Inserted %s/%s records in %s chunks (%.0f ms, %.0f rows/s, dialect=%s)",
+            inserted,
+            len(records),
+            -(-len(records) // INSERT_CHUNK_SIZE),
+            elapsed * 1000,
+            len(records) / elapsed if elapsed > 0 else 0.0,
+            dialect,
+        )
+    return inserted
+
+
 def _cleanup_records(session: Session, cutoff: datetime) -> int:
     result = session.execute(
         delete(HotspotRecord).where(HotspotRecord.acq_datetime < cutoff)
@@ -160,37 +225,6 @@ def _cleanup_records(session: Session, cutoff: datetime) -> int:
     return result.rowcount or 0
 
 
-def _is_in_bbox(
-    lat: float,
-    lon: float,
-    bbox_coords: tuple[float, float, float, float],
-) -> bool:
-    west, south, east, north = bbox_coords
-    return west <= lon <= east and south <= lat <= north
-
-
-def _filter_geo(items: list[dict], bbox_coords: tuple[float, float, float, float]) -> list[dict]:
-    return [
-        item
-        for item in items
-        if item.get("lat") is not None
-        and item.get("lon") is not None
-        and _is_in_bbox(float(item["lat"]), float(item["lon"]), bbox_coords)
-    ]
-
-
-def _filter_recent(items: list[dict], now_utc: datetime, window_hours: float) -> list[dict]:
-    window_start = now_utc - timedelta(hours=window_hours)
-    filtered: list[dict] = []
-    for item in items:
-        acq_time = _parse_time_utc(item.get("time_utc"))
-        if acq_time is None:
-            continue
-        if window_start <= acq_time <= now_utc:
-            filtered.append(item)
-    return filtered
-
-
 def _load_previous_cache(session: Session) -> dict | None:
     record = session.execute(
         select(HotspotsCache).where(HotspotsCache.key == "etna_latest")
@@ -200,14 +234,19 @@ def _load_previous_cache(session: Session) -> dict | None:
     return record.payload
 
 
-def _upsert_cache(session: Session, payload: dict, generated_at: datetime) -> None:
+def _upsert_cache(
+    session: Session,
+    payload: dict,
+    generated_at: datetime,
+    key: str = "etna_latest",
+) -> None:
     record = session.execute(
-        select(HotspotsCache).where(HotspotsCache.key == "etna_latest")
+        select(HotspotsCache).where(HotspotsCache.key == key)
     ).scalar_one_or_none()
     count = int(payload.get("count", 0))
     if record is None:
         record = HotspotsCache(
-            key="etna_latest",
+            key=key,
             generated_at=generated_at,
             count=count,
             payload=payload,
@@ -219,6 +258,43 @@ def _upsert_cache(session: Session, payload: dict, generated_at: datetime) -> No
         record.payload = payload
 
 
+def _materialize_latest_responses(
+    session: Session,
+    config: HotspotsConfig,
+    generated_at: datetime,
+    *,
+    count_significant: int,
+    last_fetch_count: int,
+    last_nonzero_at: str | None,
+) -> int:
+    """Store the ``/api/hotspots/latest`` response of each mode; returns the window count."""
+    window_start = generated_at - timedelta(hours=LATEST_WINDOW_HOURS)
+    in_window = HotspotRecord.acq_datetime >= window_start
+    count_raw = session.execute(
+        select(func.count()).select_from(HotspotRecord).where(in_window)
+    ).scalar_one()
+    recent = session.execute(
+        select(HotspotRecord)
+        .where(in_window)
+        .order_by(HotspotRecord.acq_datetime.desc())
+        .limit(LATEST_ITEMS_LIMIT)
+    ).scalars().all()
+    responses = build_latest_responses(
+        recent,
+        count_raw,
+        count_significant,
+        config,
+        last_fetch_at=generated_at,
+        last_fetch_count=last_fetch_count,
+        last_nonzero_at=last_nonzero_at,
+    )
+    for mode, response in responses.items():
+        payload = serialize_latest_response(response, generated_at)
+        payload["count"] = count_raw
+        _upsert_cache(session, payload, generated_at, key=latest_cache_key(mode))
+    return count_raw
+
+
 def _normalize_database_url(raw_url: str) -> URL:
     url = make_url(raw_url)
     if url.drivername == "postgresql":
@@ -285,16 +361,12 @@ def main() -> int:
                 config.include_modis,
             )
 
-            results: list[FirmsFetchResult] = []
-            for source in sources:
-                results.append(
-                    fetch_firms_records(
-                        config,
-                        logger,
-                        source=source,
-                        bbox=config.fetch_bbox,
-                    )
-                )
+            results: list[FirmsFetchResult] = fetch_firms_sources(
+                config,
+                logger,
+                sources,
+                bbox=config.fetch_bbox,
+            )
 
             raw_count = 0
             for result in results:
@@ -313,24 +385,30 @@ def main() -> int:
                     result.url_public,
                 )
                 raw_count += len(result.records)
-            normalized: list[dict] = []
-            for result in results:
-                if not result.records:
-                    continue
-                normalized.extend(
-                    normalize_records(result.records, result.source, config)
-                )
+            batch = HotspotBatch.concat(
+                normalize_batch(result.records, result.source)
+                for result in results
+                if result.records
+            )
+            normalized = batch.to_items()
 
             generated_at_dt = datetime.now(timezone.utc)
-            recent_filtered = _filter_recent(normalized, generated_at_dt, 24.0)
-            geo_filtered = _filter_geo(recent_filtered, config.bbox_coords)
+            window = batch.select(
+                batch.recent_mask(generated_at_dt, 24.0)
+                & batch.bbox_mask(config.bbox_coords)
+            )
+            geo_filtered = window.to_items()
             scored = apply_status(
                 geo_filtered,
                 previous_items,
                 config.dedup_km,
                 config.new_window_hours,
             )
-            significant_items = [item for item in scored if is_significant_item(item, config)]
+            significant_items = [
+                item
+                for item, significant in zip(scored, window.significant_mask(config))
+                if significant
+            ]
             deduped_significant = deduplicate_items(
                 significant_items,
                 config.dedup_km,
@@ -341,15 +419,11 @@ def main() -> int:
             if raw_24h_count > 0:
                 last_nonzero_at = generated_at_dt.isoformat().replace("+00:00", "Z")
 
-            acq_times = [
-                _parse_time_utc(item.get("time_utc")) for item in normalized
-            ]
-            acq_times = [t for t in acq_times if t is not None]
-            if acq_times:
+            if len(batch):
                 logger.info(
                     "[HOTSPOTS] FIRMS acquisition range min=%s max=%s",
-                    min(acq_times).isoformat().replace("+00:00", "Z"),
-                    max(acq_times).isoformat().replace("+00:00", "Z"),
+                    batch.time_utc[batch.time_us.argmin()],
+                    batch.time_utc[batch.time_us.argmax()],
                 )
 
             window_start = generated_at_dt - timedelta(hours=24)
@@ -365,7 +439,7 @@ def main() -> int:
                 if item.get("id")
             }
             records = _records_from_items(normalized, status_by_id)
-            inserted_count = _insert_records(session, engine, records)
+            inserted_count = _insert_records(session, engine, records, logger)
             cleanup_cutoff = generated_at_dt - timedelta(hours=48)
             _cleanup_records(session, cleanup_cutoff)
             payload = {
@@ -396,6 +470,15 @@ def main() -> int:
                 "items_24h_significant": deduped_significant,
             }
             _upsert_cache(session, payload, generated_at_dt)
+            session.flush()
+            _materialize_latest_responses(
+                session,
+                config,
+                generated_at_dt,
+                count_significant=significant_count,
+                last_fetch_count=raw_count,
+                last_nonzero_at=last_nonzero_at,
+            )
             session.commit()
             logger.info(
                 "[HOTSPOTS] FIRMS fetch bbox=%s (raw=%s, pad=%.3f, fetch=%s) sources=%s raw_count=%s geo_count=%s all_count=%s significant_count=%s inserted_count=%s",
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
 import csv
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from dataclasses import dataclass
-from typing import Any
+import threading
+from typing import Any, Iterable, Iterator, Sequence
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .config import HotspotsConfig
 
+FETCH_TIMEOUT = 30
+FETCH_MAX_WORKERS = 4
+STREAM_CHUNK_SIZE = 64 * 1024
+BODY_PREVIEW_CHARS = 500
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
 
 def _mask_key(key: str) -> str:
     if len(key) <= 6:
@@ -16,6 +27,18 @@ def _mask_key(key: str) -> str:
     return f"{key[:3]}***{key[-3:]}"
 
 
+def _get_session() -> requests.Session:
+    """Pooled session shared by the concurrent per-source fetches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_MAX_WORKERS)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
 def build_firms_url(
     config: HotspotsConfig,
     *,
@@ -76,72 +99,121 @@ def fetch_firms_records(
         config.day_range,
         masked_key,
     )
-    response = requests.get(url, timeout=30)
-    try:
-        response.raise_for_status()
-    except requests.HTTPError:
-        body_preview = response.text[:500] if response.text else ""
-        logger.warning(
-            "[HOTSPOTS] FIRMS request failed status=%s body=%s",
-            response.status_code,
-            body_preview,
-        )
-        if allow_error:
-            return FirmsFetchResult(
-                source=final_source,
-                url_public=build_firms_url_public(
-                    config, source=final_source, bbox=final_bbox
-                ),
-                status_code=response.status_code,
-                body_preview=body_preview,
-                records=[],
+    public_url = build_firms_url_public(config, source=final_source, bbox=final_bbox)
+    with _get_session().get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            body_preview = response.text[:BODY_PREVIEW_CHARS] if response.text else ""
+            logger.warning(
+                "[HOTSPOTS] FIRMS request failed status=%s body=%s",
+                response.status_code,
+                body_preview,
+            )
+            if allow_error:
+                return FirmsFetchResult(
+                    source=final_source,
+                    url_public=public_url,
+                    status_code=response.status_code,
+                    body_preview=body_preview,
+                    records=[],
+                )
+            raise
+
+        preview: list[str] = []
+        records = list(iter_firms_records(_iter_response_lines(response, preview)))
+        body_preview = "\n".join(preview)[:BODY_PREVIEW_CHARS]
+        if not body_preview.strip():
+            logger.info(
+                "[HOTSPOTS] FIRMS response empty status=%s body=%s",
+                response.status_code,
+                body_preview,
             )
-        raise
-
-    text = response.content.decode("utf-8-sig", errors="replace")
-    lines = [line for line in text.splitlines() if line.strip()]
-    if not lines:
-        body_preview = text[:500]
-        logger.info(
-            "[HOTSPOTS] FIRMS response empty status=%s body=%s",
-            response.status_code,
-            body_preview,
-        )
         return FirmsFetchResult(
             source=final_source,
-            url_public=build_firms_url_public(config, source=final_source, bbox=final_bbox),
+            url_public=public_url,
             status_code=response.status_code,
             body_preview=body_preview,
-            records=[],
+            records=records,
         )
 
-    reader = csv.DictReader(lines)
-    records: list[dict[str, Any]] = []
+
+def fetch_firms_sources(
+    config: HotspotsConfig,
+    logger: logging.Logger,
+    sources: Sequence[str],
+    *,
+    bbox: str | None = None,
+    allow_error: bool = False,
+) -> list[FirmsFetchResult]:
+    """Fetch every source concurrently; results keep the order of ``sources``.
+
+    Wall time is that of the slowest source. The first request error is
+    re-raised, as with sequential ``fetch_firms_records`` calls.
+    """
+    if len(sources) <= 1:
+        return [
+            fetch_firms_records(config, logger, source=source, bbox=bbox, allow_error=allow_error)
+            for source in sources
+        ]
+    with ThreadPoolExecutor(
+        max_workers=min(len(sources), FETCH_MAX_WORKERS),
+        thread_name_prefix="firms-fetch",
+    ) as executor:
+        futures = [
+            executor.submit(
+                fetch_firms_records,
+                config,
+                logger,
+                source=source,
+                bbox=bbox,
+                allow_error=allow_error,
+            )
+            for source in sources
+        ]
+        return [future.result() for future in futures]
+
+
+def _iter_response_lines(response: requests.Response, preview: list[str]) -> Iterator[str]:
+    """Decoded non-blank lines of a streamed body; the first ones go to ``preview``."""
+    preview_size = 0
+    first = True
+    for raw in response.iter_lines(chunk_size=STREAM_CHUNK_SIZE):
+        line = raw.decode("utf-8", errors="replace")
+        if first:
+            line = line.lstrip("\ufeff")
+            first = False
+        if preview_size < BODY_PREVIEW_CHARS:
+            preview.append(line)
+            preview_size += len(line) + 1
+        if line.strip():
+            yield line
+
+
+def iter_firms_records(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Parse FIRMS CSV lines into stripped records, skipping rows with no values."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [str(key).strip() for key in header]
+    width = len(keys)
     for row in reader:
         if not row:
             continue
-        cleaned: dict[str, Any] = {}
-        has_value = False
-        for key, value in row.items():
-            if key is None:
-                continue
-            cleaned_key = str(key).strip()
-            if value is None:
-                cleaned_value = ""
-            else:
-                cleaned_value = str(value).strip()
-            if cleaned_value:
-                has_value = True
-            cleaned[cleaned_key] = cleaned_value
-        if has_value:
-            records.append(cleaned)
-    return FirmsFetchResult(
-        source=final_source,
-        url_public=build_firms_url_public(config, source=final_source, bbox=final_bbox),
-        status_code=response.status_code,
-        body_preview=text[:500],
-        records=records,
-    )
-
-
-__all__ = ["fetch_firms_records", "build_firms_url", "build_firms_url_public", "FirmsFetchResult"]
+        values = [value.strip() for value in row[:width]]
+        if not any(values):
+            continue
+        if len(values) < width:
+            values.extend([""] * (width - len(values)))
+        yield dict(zip(keys, values))
+
+
+__all__ = [
+    "fetch_firms_records",
+    "fetch_firms_sources",
+    "iter_firms_records",
+    "build_firms_url",
+    "build_firms_url_public",
+    "FirmsFetchResult",
+]
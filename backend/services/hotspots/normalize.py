@@ -1,12 +1,29 @@
+"""FIRMS rows to hotspot items.
+
+A batch of rows is loaded into typed NumPy columns (``HotspotBatch``) so
+the time, bbox and significance filters run as array masks; values that
+repeat across a batch (acquisition times, confidence, satellite) are
+parsed once per distinct value. ``normalize_records`` is the list-of-items
+view of the same path.
+"""
+
 from __future__ import annotations
 
+from dataclasses import dataclass, fields
 import hashlib
-from datetime import datetime, timezone
-from typing import Any
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Hashable, Iterable, Sequence
+
+import numpy as np
 
 from backend.utils.time import to_iso_utc
 
 from .config import HotspotsConfig
+from .significance import _confidence_rank
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
 
 
 def _parse_float(value: Any) -> float | None:
@@ -72,78 +89,285 @@ def _satellite_from_source(source: str) -> str:
     return "UNKNOWN"
 
 
-def _build_stable_id(lat: float, lon: float, time_utc: datetime, satellite: str, source: str) -> str:
-    lat_round = round(lat, 3)
-    lon_round = round(lon, 3)
-    time_bucket = time_utc.strftime("%Y%m%d%H")
-    raw = f"{lat_round}|{lon_round}|{time_bucket}|{satellite}|{source}"
+def _stable_id(lat: float, lon: float, time_bucket: str, satellite: str, source: str) -> str:
+    raw = f"{round(lat, 3)}|{round(lon, 3)}|{time_bucket}|{satellite}|{source}"
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
+def _build_stable_id(lat: float, lon: float, time_utc: datetime, satellite: str, source: str) -> str:
+    return _stable_id(lat, lon, time_utc.strftime("%Y%m%d%H"), satellite, source)
+
+
+def _epoch_us(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+_FIELDS = (
+    "latitude",
+    "longitude",
+    "timestamp",
+    "acq_date",
+    "acq_time",
+    "satellite",
+    "instrument",
+    "confidence",
+    "daynight",
+    "version",
+    "frp",
+    "brightness",
+    "bright_ti4",
+    "bright_ti5",
+)
+
+
+def _columns(records: Sequence[dict[str, Any]]) -> dict[str, tuple[Any, ...]]:
+    """``_FIELDS`` as columns; rows from one CSV share their keys, so transpose in one pass."""
+    empty = ("",) * len(records)
+    names = [name for name in _FIELDS if records and name in records[0]]
+    try:
+        if len(names) > 1:
+            values = zip(*map(itemgetter(*names), records))
+        else:
+            values = ([record[name] for record in records] for name in names)
+        columns = dict(zip(names, values))
+    except KeyError:
+        columns = {name: [record.get(name) for record in records] for name in _FIELDS}
+    for name in _FIELDS:
+        columns.setdefault(name, empty)
+    return columns
+
+
+def _map_distinct(values: Iterable[Hashable], func: Callable[[Any], Any]) -> list[Any]:
+    """``func`` applied once per distinct value, spread back over ``values``."""
+    values = list(values)
+    mapping = {value: func(value) for value in set(values)}
+    return [mapping[value] for value in values]
+
+
+def _float_column(values: Sequence[Any]) -> np.ndarray:
+    """``_parse_float`` over a column; unparseable or empty cells become NaN."""
+    cells = np.asarray(values, dtype=object)
+    parsed = np.full(len(values), np.nan)
+    present = (cells != "") & (cells != None)  # noqa: E711 - elementwise
+    if not present.any():
+        return parsed
+    try:
+        parsed[present] = np.asarray(cells[present], dtype=np.float64)
+    except (TypeError, ValueError):
+        parsed[present] = [
+            np.nan if (number := _parse_float(value)) is None else number
+            for value in cells[present]
+        ]
+    return parsed
+
+
+def _text(func: Callable[[str], str | None]) -> Callable[[Any], str | None]:
+    return lambda value: func(value.strip()) if isinstance(value, str) else func("")
+
+
+def _optional(values: np.ndarray) -> list[float | None]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+@dataclass(frozen=True)
+class HotspotBatch:
+    """Normalized FIRMS rows as aligned columns; NaN marks a missing number."""
+
+    id: np.ndarray
+    time_us: np.ndarray
+    time_utc: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    satellite: np.ndarray
+    instrument: np.ndarray
+    source: np.ndarray
+    confidence: np.ndarray
+    frp: np.ndarray
+    brightness: np.ndarray
+    bright_ti4: np.ndarray
+    bright_ti5: np.ndarray
+    unit: np.ndarray
+    daynight: np.ndarray
+    version: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def concat(cls, batches: Iterable["HotspotBatch"]) -> "HotspotBatch":
+        batches = list(batches)
+        if not batches:
+            return normalize_batch([], "")
+        return cls(
+            **{
+                field.name: np.concatenate([getattr(batch, field.name) for batch in batches])
+                for field in fields(cls)
+            }
+        )
+
+    def select(self, mask: np.ndarray) -> "HotspotBatch":
+        return HotspotBatch(**{field.name: getattr(self, field.name)[mask] for field in fields(self)})
+
+    def recent_mask(self, now_utc: datetime, window_hours: float) -> np.ndarray:
+        """Rows acquired within ``window_hours`` up to ``now_utc`` (inclusive)."""
+        end = _epoch_us(now_utc)
+        start = _epoch_us(now_utc - timedelta(hours=window_hours))
+        return (self.time_us >= start) & (self.time_us <= end)
+
+    def bbox_mask(self, bbox_coords: tuple[float, float, float, float]) -> np.ndarray:
+        west, south, east, north = bbox_coords
+        return (west <= self.lon) & (self.lon <= east) & (south <= self.lat) & (self.lat <= north)
+
+    def significant_mask(self, config: HotspotsConfig) -> np.ndarray:
+        """``is_significant_item`` for every row."""
+        min_rank = _confidence_rank(config.significant_confidence_min)
+        ranks = np.array(_map_distinct(self.confidence, _confidence_rank), dtype=np.int8)
+        with np.errstate(invalid="ignore"):
+            intense = (self.brightness >= config.significant_brightness_min) | (
+                self.frp >= config.significant_frp_min
+            )
+        return (ranks >= min_rank) & intense
+
+    def to_items(self) -> list[dict[str, Any]]:
+        items: list[dict[str, Any]] = []
+        for (
+            item_id,
+            time_utc,
+            lat,
+            lon,
+            satellite,
+            instrument,
+            source,
+            confidence,
+            frp,
+            brightness,
+            unit,
+            bright_ti4,
+            bright_ti5,
+            daynight,
+            version,
+        ) in zip(
+            self.id.tolist(),
+            self.time_utc.tolist(),
+            self.lat.tolist(),
+            self.lon.tolist(),
+            self.satellite.tolist(),
+            self.instrument.tolist(),
+            self.source.tolist(),
+            self.confidence.tolist(),
+            _optional(self.frp),
+            _optional(self.brightness),
+            self.unit.tolist(),
+            _optional(self.bright_ti4),
+            _optional(self.bright_ti5),
+            self.daynight.tolist(),
+            self.version.tolist(),
+        ):
+            items.append(
+                {
+                    "id": item_id,
+                    "time_utc": time_utc,
+                    "lat": lat,
+                    "lon": lon,
+                    "satellite": satellite,
+                    "instrument": instrument,
+                    "source": source,
+                    "confidence": confidence,
+                    "intensity": {
+                        "frp": frp,
+                        "brightness": brightness,
+                        "unit": unit,
+                    },
+                    "bright_ti4": bright_ti4,
+                    "bright_ti5": bright_ti5,
+                    "daynight": daynight,
+                    "version": version,
+                    "status": "new",
+                    "maps_url": f"https://www.google.com/maps?q={lat},{lon}",
+                }
+            )
+        return items
+
+
+def _parse_acquisition(key: tuple[Any, Any, Any]) -> tuple[int, str, str] | None:
+    timestamp, acq_date, acq_time = key
+    parsed = _parse_time({"timestamp": timestamp, "acq_date": acq_date, "acq_time": acq_time})
+    if parsed is None:
+        return None
+    return _epoch_us(parsed), to_iso_utc(parsed), parsed.strftime("%Y%m%d%H")
+
+
+def _objects(values: Iterable[Any]) -> np.ndarray:
+    values = list(values)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def normalize_batch(raw_records: Iterable[dict[str, Any]], source: str) -> HotspotBatch:
+    """Load FIRMS rows into a ``HotspotBatch``, dropping rows without position or time."""
+    records = raw_records if isinstance(raw_records, list) else list(raw_records)
+    columns = _columns(records)
+
+    lat = _float_column(columns["latitude"])
+    lon = _float_column(columns["longitude"])
+    acquisitions = _map_distinct(
+        zip(columns["timestamp"], columns["acq_date"], columns["acq_time"]),
+        _parse_acquisition,
+    )
+    parsed = np.fromiter((value is not None for value in acquisitions), dtype=bool, count=len(records))
+    keep = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon) & parsed)
+    acquisitions = [acquisitions[index] for index in keep.tolist()]
+
+    fallback_satellite = _satellite_from_source(source)
+    satellite = _objects(
+        _map_distinct(columns["satellite"], _text(lambda value: value.upper() or fallback_satellite))
+    )[keep]
+    frp = _float_column(columns["frp"])[keep]
+    bright_ti4 = _float_column(columns["bright_ti4"])[keep]
+    bright_ti5 = _float_column(columns["bright_ti5"])[keep]
+    brightness = np.where(np.isnan(bright_ti4), _float_column(columns["brightness"])[keep], bright_ti4)
+    brightness = np.where(np.isnan(brightness), bright_ti5, brightness)
+    unit = np.where(~np.isnan(frp), "MW", np.where(~np.isnan(brightness), "K", "unknown"))
+    lat = lat[keep]
+    lon = lon[keep]
+
+    ids = [
+        _stable_id(lat_value, lon_value, acquisition[2], satellite_value, source)
+        for lat_value, lon_value, acquisition, satellite_value in zip(
+            lat.tolist(), lon.tolist(), acquisitions, satellite.tolist()
+        )
+    ]
+
+    def distinct(name: str, func: Callable[[Any], Any]) -> np.ndarray:
+        return _objects(_map_distinct(columns[name], func))[keep]
+
+    return HotspotBatch(
+        id=_objects(ids),
+        time_us=np.array([acquisition[0] for acquisition in acquisitions], dtype=np.int64),
+        time_utc=_objects(acquisition[1] for acquisition in acquisitions),
+        lat=lat,
+        lon=lon,
+        satellite=satellite,
+        instrument=distinct("instrument", _text(lambda value: value.upper() or None)),
+        source=_objects([source] * len(keep)),
+        confidence=distinct("confidence", _normalize_confidence),
+        frp=frp,
+        brightness=brightness,
+        bright_ti4=bright_ti4,
+        bright_ti5=bright_ti5,
+        unit=unit.astype(object),
+        daynight=distinct("daynight", _text(lambda value: value.upper() or None)),
+        version=distinct("version", _text(lambda value: value or None)),
+    )
+
+
 def normalize_records(
-    raw_records: list[dict[str, Any]],
+    raw_records: Iterable[dict[str, Any]],
     source: str,
     config: HotspotsConfig,
 ) -> list[dict[str, Any]]:
-    items: list[dict[str, Any]] = []
-    for record in raw_records:
-        lat = _parse_float(record.get("latitude"))
-        lon = _parse_float(record.get("longitude"))
-        if lat is None or lon is None:
-            continue
-
-        timestamp = _parse_time(record)
-        if timestamp is None:
-            continue
-
-        satellite = (record.get("satellite") or "").strip().upper()
-        if not satellite:
-            satellite = _satellite_from_source(source)
-
-        confidence = _normalize_confidence(record.get("confidence"))
-
-        instrument = (record.get("instrument") or "").strip().upper() or None
-        daynight = (record.get("daynight") or "").strip().upper() or None
-        version = (record.get("version") or "").strip() or None
-
-        frp = _parse_float(record.get("frp"))
-        bright_ti4 = _parse_float(record.get("bright_ti4"))
-        bright_ti5 = _parse_float(record.get("bright_ti5"))
-        brightness = _parse_float(record.get("brightness"))
-        if bright_ti4 is not None:
-            brightness = bright_ti4
-        elif brightness is None:
-            brightness = bright_ti5
-        if frp is not None:
-            unit = "MW"
-        elif brightness is not None:
-            unit = "K"
-        else:
-            unit = "unknown"
-
-        item = {
-            "id": _build_stable_id(lat, lon, timestamp, satellite, source),
-            "time_utc": to_iso_utc(timestamp),
-            "lat": lat,
-            "lon": lon,
-            "satellite": satellite if satellite else "UNKNOWN",
-            "instrument": instrument,
-            "source": source,
-            "confidence": confidence,
-            "intensity": {
-                "frp": frp,
-                "brightness": brightness,
-                "unit": unit,
-            },
-            "bright_ti4": bright_ti4,
-            "bright_ti5": bright_ti5,
-            "daynight": daynight,
-            "version": version,
-            "status": "new",
-            "maps_url": f"https://www.google.com/maps?q={lat},{lon}",
-        }
-        items.append(item)
-    return items
-
-
-__all__ = ["normalize_records"]
+    return normalize_batch(raw_records, source).to_items()
+
+
+__all__ = ["HotspotBatch", "normalize_batch", "normalize_records"]
@@ -0,0 +1,137 @@
+"""Serialized ``/api/hotspots/latest`` responses, built once per ingest.
+
+``update_hotspots`` materializes one response per mode into
+``hotspots_cache`` (``latest_cache_key(mode)``) together with its JSON body
+and ETag, so the API serves it with a single keyed lookup. The same
+builders back the API's live fallback.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+import hashlib
+import json
+from typing import Any, Iterable, Mapping
+
+from backend.utils.time import to_iso_utc
+
+from .config import HotspotsConfig
+from .significance import is_significant_record
+
+LATEST_MODES = ("all", "significant")
+LATEST_ITEMS_LIMIT = 500
+LATEST_WINDOW_HOURS = 24
+
+
+def latest_cache_key(mode: str) -> str:
+    return f"etna_latest:{mode}"
+
+
+def _field(record: Any, name: str) -> Any:
+    if isinstance(record, Mapping):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def hotspot_payload(record: Any) -> dict[str, Any]:
+    """API item for a stored hotspot (ORM row or record dict)."""
+    brightness = _field(record, "bright_ti4")
+    if brightness is None:
+        brightness = _field(record, "brightness")
+    if brightness is None:
+        brightness = _field(record, "bright_ti5")
+    frp = _field(record, "frp")
+    unit = _field(record, "intensity_unit")
+    if not unit:
+        if frp is not None:
+            unit = "MW"
+        elif brightness is not None:
+            unit = "K"
+        else:
+            unit = "unknown"
+    lat = _field(record, "lat")
+    lon = _field(record, "lon")
+    return {
+        "id": _field(record, "fingerprint"),
+        "time_utc": to_iso_utc(_field(record, "acq_datetime")),
+        "lat": lat,
+        "lon": lon,
+        "source": _field(record, "source"),
+        "satellite": _field(record, "satellite"),
+        "instrument": _field(record, "instrument"),
+        "confidence": _field(record, "confidence"),
+        "bright_ti4": _field(record, "bright_ti4"),
+        "bright_ti5": _field(record, "bright_ti5"),
+        "frp": frp,
+        "daynight": _field(record, "daynight"),
+        "version": _field(record, "version"),
+        "intensity": {
+            "frp": frp,
+            "brightness": brightness,
+            "unit": unit,
+        },
+        "status": _field(record, "status") or "unknown",
+        "maps_url": f"https://www.google.com/maps?q={lat},{lon}",
+    }
+
+
+def build_latest_responses(
+    recent_records: Iterable[Any],
+    count_raw: int,
+    count_significant: int,
+    config: HotspotsConfig,
+    *,
+    last_fetch_at: Any,
+    last_fetch_count: int,
+    last_nonzero_at: Any,
+) -> dict[str, dict[str, Any]]:
+    """Responses per mode from the newest ``LATEST_ITEMS_LIMIT`` records of the window."""
+    items_raw: list[dict[str, Any]] = []
+    items_significant: list[dict[str, Any]] = []
+    for record in recent_records:
+        item = hotspot_payload(record)
+        items_raw.append(item)
+        if is_significant_record(record, config):
+            items_significant.append(item)
+
+    responses = {}
+    for mode in LATEST_MODES:
+        items = items_significant if mode == "significant" else items_raw
+        responses[mode] = {
+            "available": True,
+            "last_fetch_at": to_iso_utc(last_fetch_at),
+            "last_fetch_count": last_fetch_count,
+            "count_24h": count_raw,
+            "count_all": count_raw,
+            "count_24h_raw": count_raw,
+            "count_24h_significant": count_significant,
+            "count_significant": count_significant,
+            "last_nonzero_at": to_iso_utc(last_nonzero_at),
+            "items_24h": items,
+            "items": items,
+            "items_24h_raw": items_raw,
+            "items_24h_significant": items_significant,
+            "mode": mode,
+        }
+    return responses
+
+
+def serialize_latest_response(response: dict[str, Any], generated_at: datetime) -> dict[str, Any]:
+    """Cache payload for one mode: ready JSON body plus its ETag."""
+    body = json.dumps(response, ensure_ascii=False, separators=(",", ":"))
+    return {
+        "generated_at": to_iso_utc(generated_at),
+        "etag": hashlib.sha1(body.encode("utf-8")).hexdigest()[:16],
+        "body": body,
+    }
+
+
+__all__ = [
+    "LATEST_ITEMS_LIMIT",
+    "LATEST_MODES",
+    "LATEST_WINDOW_HOURS",
+    "build_latest_responses",
+    "hotspot_payload",
+    "latest_cache_key",
+    "serialize_latest_response",
+]
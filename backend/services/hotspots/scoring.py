@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any
+import math
+from typing import Any, NamedTuple
 
-from .utils_geo import haversine_km
+from .utils_geo import EARTH_RADIUS_KM, haversine_km
 
 
 def _parse_time(value: str | None) -> datetime | None:
@@ -43,15 +45,85 @@ def _is_same_event(
     return delta_hours <= max_hours
 
 
+class _Event(NamedTuple):
+    lat: float
+    lon: float
+    time: datetime
+    epoch_s: float
+
+
+def _event(item: dict[str, Any]) -> _Event | None:
+    """Coordinates and parsed time of ``item``; None if it can never match."""
+    if item.get("lat") is None or item.get("lon") is None:
+        return None
+    time = _parse_time(item.get("time_utc"))
+    if time is None:
+        return None
+    return _Event(float(item["lat"]), float(item["lon"]), time, time.timestamp())
+
+
+class _EventIndex:
+    """Events bucketed by space cell and time bucket, for same-event lookups.
+
+    Cells are cubes over Earth-centred x/y/z coordinates whose side is the
+    chord spanned by ``max_km``, so any event within ``max_km`` lies in one
+    of the 27 cells around a point, at every latitude. Time buckets are
+    ``max_hours`` wide. Candidates are confirmed with the exact haversine
+    and time checks of ``_is_same_event``.
+    """
+
+    def __init__(self, max_km: float, max_hours: float) -> None:
+        self.max_km = max_km
+        self.max_hours = max_hours
+        half_angle = min(max(max_km, 0.0) / (2 * EARTH_RADIUS_KM), math.pi / 2)
+        self._cell_km = max(2 * EARTH_RADIUS_KM * math.sin(half_angle), 1e-6) * (1 + 1e-9)
+        self._bucket_s = max(max_hours * 3600, 1.0)
+        self._buckets: dict[tuple[int, int, int, int], list[_Event]] = defaultdict(list)
+
+    def _key(self, event: _Event) -> tuple[int, int, int, int]:
+        lat = math.radians(event.lat)
+        lon = math.radians(event.lon)
+        scale = EARTH_RADIUS_KM / self._cell_km
+        return (
+            math.floor(scale * math.cos(lat) * math.cos(lon)),
+            math.floor(scale * math.cos(lat) * math.sin(lon)),
+            math.floor(scale * math.sin(lat)),
+            math.floor(event.epoch_s / self._bucket_s),
+        )
+
+    def add(self, event: _Event) -> None:
+        self._buckets[self._key(event)].append(event)
+
+    def matches(self, event: _Event) -> bool:
+        x, y, z, t = self._key(event)
+        for dt in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for dz in (-1, 0, 1):
+                        bucket = self._buckets.get((x + dx, y + dy, z + dz, t + dt))
+                        if bucket and any(self._same_event(event, other) for other in bucket):
+                            return True
+        return False
+
+    def _same_event(self, event: _Event, other: _Event) -> bool:
+        if abs((event.time - other.time).total_seconds()) / 3600 > self.max_hours:
+            return False
+        return haversine_km(event.lat, event.lon, other.lat, other.lon) <= self.max_km
+
+
 def deduplicate_items(
     items: list[dict[str, Any]],
     max_km: float,
     max_hours: float,
 ) -> list[dict[str, Any]]:
     deduped: list[dict[str, Any]] = []
+    index = _EventIndex(max_km, max_hours)
     for item in items:
-        if any(_is_same_event(item, existing, max_km, max_hours) for existing in deduped):
-            continue
+        event = _event(item)
+        if event is not None:
+            if index.matches(event):
+                continue
+            index.add(event)
         deduped.append(item)
     return deduped
 
@@ -68,16 +140,17 @@ def apply_status(
         return items
 
     now = datetime.now(timezone.utc)
-    recent_previous = []
+    recent_previous = _EventIndex(max_km, window_hours)
     for prev in previous_items:
-        prev_time = _parse_time(prev.get("time_utc"))
-        if prev_time is None:
+        event = _event(prev)
+        if event is None:
             continue
-        if (now - prev_time).total_seconds() <= window_hours * 3600:
-            recent_previous.append(prev)
+        if (now - event.time).total_seconds() <= window_hours * 3600:
+            recent_previous.add(event)
 
     for item in items:
-        if any(_is_same_event(item, prev, max_km, window_hours) for prev in recent_previous):
+        event = _event(item)
+        if event is not None and recent_previous.matches(event):
             item["status"] = "persistent"
         else:
             item["status"] = "new"
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import math
 
+EARTH_RADIUS_KM = 6371.0088
+
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Return the great-circle distance between two points in kilometers."""
-    radius_km = 6371.0088
     lat1_rad = math.radians(lat1)
     lon1_rad = math.radians(lon1)
     lat2_rad = math.radians(lat2)
@@ -19,7 +20,7 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
     )
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return radius_km * c
+    return EARTH_RADIUS_KM * c
 
 
-__all__ = ["haversine_km"]
+__all__ = ["EARTH_RADIUS_KM", "haversine_km"]
@@ -1,6 +1,9 @@
+import itertools
 import json
 import logging
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from uuid import uuid4
@@ -55,9 +58,27 @@ BIAS_IQR_THRESHOLD = 0.7
 TRUE_MASK_MIN_COLUMN_PCT = 90.0
 FRAME_LINE_THICKNESS = 3
 
+# Debug overlays/masks/CSVs: "off", "anomaly" (only runs flagged as bad),
+# "sampled" (anomalies plus 1 run in DEBUG_SAMPLE_EVERY) or "always".
+DEBUG_ARTIFACT_POLICIES = ("off", "anomaly", "sampled", "always")
+DEBUG_ARTIFACT_POLICY = os.getenv("INGV_COLORED_DEBUG_ARTIFACTS", "anomaly").strip().lower()
+DEBUG_SAMPLE_EVERY = int(os.getenv("INGV_COLORED_DEBUG_SAMPLE_EVERY", "20"))
+DEBUG_BACKGROUND = os.getenv("INGV_COLORED_DEBUG_BACKGROUND", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+}
+DEBUG_ANOMALY_TAIL_MISSING = int(os.getenv("INGV_COLORED_DEBUG_TAIL_MISSING", "10"))
+DEBUG_ANOMALY_MEAN_SPAN_PX = float(os.getenv("INGV_COLORED_DEBUG_MEAN_SPAN_PX", "12"))
+
 
 logger = logging.getLogger(__name__)
 
+_debug_run_counter = itertools.count(1)
+_debug_lock = threading.Lock()
+_debug_executor: ThreadPoolExecutor | None = None
+_debug_futures: list[Future] = []
+
 
 def process_colored_png_to_csv(url: str, output_path: str | Path | None = None) -> dict:
     if not url:
@@ -95,14 +116,18 @@ def download_png(url: str) -> Path:
     }
     response = requests.get(url, headers=headers, timeout=30)
     response.raise_for_status()
+    return save_png(response.content)
 
+
+def save_png(content: bytes) -> Path:
+    """Persist downloaded colored PNG bytes under ``INGV_COLORED_DIR``."""
     data_dir = Path(os.getenv("DATA_DIR", "data"))
     target_dir = Path(os.getenv("INGV_COLORED_DIR", data_dir / "ingv_colored"))
     target_dir.mkdir(parents=True, exist_ok=True)
 
     filename = f"colored_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:6]}.png"
     path = target_dir / filename
-    path.write_bytes(response.content)
+    path.write_bytes(content)
     return path
 
 
@@ -116,8 +141,21 @@ def _resolve_series_end_time(path_png: Path) -> datetime:
     return datetime.now(timezone.utc)
 
 
-def extract_series_from_colored(path_png: str | Path):
-    """Extract (timestamp, mV) series from the colored PNG."""
+def extract_series_from_colored(
+    path_png: str | Path,
+    *,
+    debug_artifacts: str | None = None,
+    debug_background: bool | None = None,
+):
+    """Extract (timestamp, mV) series from the colored PNG.
+
+    ``debug_artifacts`` overrides ``INGV_COLORED_DEBUG_ARTIFACTS`` for this
+    call. Artifacts are rendered on a background thread unless
+    ``debug_background`` is False; the returned ``debug_paths`` is empty when
+    nothing was written synchronously.
+    """
+    policy = _resolve_debug_policy(debug_artifacts)
+    background = DEBUG_BACKGROUND if debug_background is None else debug_background
     image_path = Path(path_png)
     image = cv2.imread(str(image_path))
     if image is None:
@@ -132,7 +170,7 @@ def extract_series_from_colored(path_png: str | Path):
         reasons,
         border_components,
         mask_meta,
-    ) = _extract_curve_points(cropped, bbox)
+    ) = _extract_curve_points(cropped, bbox, failure_artifacts=policy != "off")
 
     xs_px = list(range(mask_candidate.shape[1]))
     y_offset = offsets["top"]
@@ -157,27 +195,33 @@ def extract_series_from_colored(path_png: str | Path):
         timestamps.append(timestamp)
         values.append(_pixel_to_mv(y, mask_candidate.shape[0]))
 
-    debug_paths = _write_debug_artifacts(
-        cropped,
-        mask_meta["mask_raw"],
-        mask_candidate,
-        mask_polyline,
-        xs_px,
-        raw_points,
-        filtered_points,
-        mask_meta["column_ranges"],
-        y_offset,
-        mask_ink=mask_meta.get("mask_ink"),
-        mask_ink_core=mask_meta.get("mask_ink_core"),
-        mask_ink_thin=mask_meta.get("mask_ink_thin"),
-        mask_ink_combined=mask_meta.get("mask_ink_combined"),
-        mask_pretty=mask_meta.get("mask_pretty"),
-        pick_tops=mask_meta.get("pick_tops"),
-        pick_mids=mask_meta.get("pick_mids"),
-        spike_columns=mask_meta.get("spike_columns"),
-        debug_payload=mask_meta.get("debug_payload"),
-    )
     error_stats = _estimate_column_error(mask_meta["column_ranges"], filtered_points)
+    anomalies = _debug_anomaly_reasons(valid_ratio, missing_tail, error_stats)
+    debug_paths: dict = {}
+    if _should_write_debug_artifacts(policy, anomalies):
+        if anomalies:
+            logger.warning("[INGV COLORED][debug] anomalous run (%s): writing artifacts", anomalies)
+        debug_paths = _emit_debug_artifacts(
+            background,
+            cropped,
+            mask_meta["mask_raw"],
+            mask_candidate,
+            mask_polyline,
+            xs_px,
+            raw_points,
+            filtered_points,
+            mask_meta["column_ranges"],
+            y_offset,
+            mask_ink=mask_meta.get("mask_ink"),
+            mask_ink_core=mask_meta.get("mask_ink_core"),
+            mask_ink_thin=mask_meta.get("mask_ink_thin"),
+            mask_ink_combined=mask_meta.get("mask_ink_combined"),
+            mask_pretty=mask_meta.get("mask_pretty"),
+            pick_tops=mask_meta.get("pick_tops"),
+            pick_mids=mask_meta.get("pick_mids"),
+            spike_columns=mask_meta.get("spike_columns"),
+            debug_payload=mask_meta.get("debug_payload"),
+        )
     pick_modes = mask_meta["pick_modes"]
     pick_thicknesses = mask_meta["pick_thicknesses"]
     continuity_adjusted = mask_meta["continuity_adjusted"]
@@ -329,11 +373,13 @@ def _fallback_bbox_from_pct(height: int, width: int) -> tuple[int, int, int, int
 def _extract_curve_points(
     cropped: np.ndarray,
     bbox: tuple[int, int, int, int],
+    *,
+    failure_artifacts: bool = True,
 ) -> tuple[
     list[int | None],
     list[int | None],
     np.ndarray,
-    np.ndarray,
+    np.ndarray | None,
     list[str],
     int,
     dict,
@@ -362,63 +408,18 @@ def _extract_curve_points(
             candidate_col_pct,
         )
 
-    raw_points: list[int | None] = []
-    column_ranges: list[tuple[int | None, int | None]] = []
-    pick_modes: list[str | None] = []
-    pick_thicknesses: list[int | None] = []
-    pick_tops: list[int | None] = []
-    pick_mids: list[int | None] = []
-    pick_bots: list[int | None] = []
-    pick_runs: list[int | None] = []
-    pick_spikes: list[bool] = []
-    continuity_adjusted = 0
-    invalid_raw = 0
-    previous_pick = None
-    for x in range(width):
-        column = np.where(mask_final[:, x] == 255)[0]
-        (
-            candidate_y,
-            y_min,
-            y_max,
-            pick_mode,
-            adjusted,
-            thickness,
-            y_top,
-            y_mid,
-            y_bot,
-            runs,
-            is_spike,
-        ) = _pick_column_y(
-            column,
-            previous_pick,
-            height,
-        )
-        if candidate_y is None or candidate_y <= 0 or candidate_y >= height - 1:
-            raw_points.append(None)
-            column_ranges.append((None, None))
-            pick_modes.append(None)
-            pick_thicknesses.append(None)
-            pick_tops.append(None)
-            pick_mids.append(None)
-            pick_bots.append(None)
-            pick_runs.append(None)
-            pick_spikes.append(False)
-            previous_pick = None
-            if candidate_y is not None:
-                invalid_raw += 1
-        else:
-            raw_points.append(candidate_y)
-            column_ranges.append((y_min, y_max))
-            pick_modes.append(pick_mode)
-            pick_thicknesses.append(thickness)
-            pick_tops.append(y_top)
-            pick_mids.append(y_mid)
-            pick_bots.append(y_bot)
-            pick_runs.append(runs)
-            pick_spikes.append(is_spike)
-            previous_pick = candidate_y
-        if adjusted:
-            continuity_adjusted += 1
+    picks = _pick_columns(mask_final, height)
+    raw_points: list[int | None] = picks["points"]
+    column_ranges: list[tuple[int | None, int | None]] = picks["ranges"]
+    pick_modes: list[str | None] = picks["modes"]
+    pick_thicknesses: list[int | None] = picks["thicknesses"]
+    pick_tops: list[int | None] = picks["tops"]
+    pick_mids: list[int | None] = picks["mids"]
+    pick_bots: list[int | None] = picks["bots"]
+    pick_runs: list[int | None] = picks["runs"]
+    pick_spikes: list[bool] = picks["spikes"]
+    continuity_adjusted = picks["continuity_adjusted"]
+    invalid_raw = picks["invalid_raw"]
 
     thickness_values = [value for value in pick_thicknesses if value is not None]
     thickness_median = float(np.median(thickness_values)) if thickness_values else 0.0
@@ -445,7 +446,8 @@ def _extract_curve_points(
         y_stddev=pre_bias_stddev,
     )
 
-    mask_polyline = _build_polyline_mask(height, width, corrected_points)
+    # Only debug artifacts draw the polyline; they build it on demand.
+    mask_polyline = None
     empty_columns = sum(1 for y in raw_points if y is None)
     continuity_reject_count = sum(1 for reason in reasons if reason == "continuity_reject")
     clamped_invalid = sum(
@@ -526,26 +528,27 @@ def _extract_curve_points(
             longest_equal_run,
             debug_payload.get("pick_samples"),
         )
-        _write_debug_artifacts(
-            cropped,
-            mask_raw,
-            mask_candidate,
-            mask_polyline,
-            list(range(width)),
-            raw_points,
-            corrected_points,
-            column_ranges,
-            0,
-            mask_ink=mask_ink,
-            mask_ink_core=mask_meta.get("mask_ink_core"),
-            mask_ink_thin=mask_meta.get("mask_ink_thin"),
-            mask_ink_combined=mask_meta.get("mask_ink_combined"),
-            mask_pretty=mask_meta.get("mask_pretty"),
-            pick_tops=pick_tops,
-            pick_mids=pick_mids,
-            spike_columns=pick_spikes,
-            debug_payload=debug_payload,
-        )
+        if failure_artifacts:
+            _write_debug_artifacts(
+                cropped,
+                mask_raw,
+                mask_candidate,
+                mask_polyline,
+                list(range(width)),
+                raw_points,
+                corrected_points,
+                column_ranges,
+                0,
+                mask_ink=mask_ink,
+                mask_ink_core=mask_meta.get("mask_ink_core"),
+                mask_ink_thin=mask_meta.get("mask_ink_thin"),
+                mask_ink_combined=mask_meta.get("mask_ink_combined"),
+                mask_pretty=mask_meta.get("mask_pretty"),
+                pick_tops=pick_tops,
+                pick_mids=pick_mids,
+                spike_columns=pick_spikes,
+                debug_payload=debug_payload,
+            )
         raise ValueError(
             "Colored PNG extraction failed: curve is flat or missing (stddev/coverage guard)."
         )
@@ -980,112 +983,153 @@ def _count_tail_reasons(reasons: list[str], tail_columns: int) -> dict[str, int]
     return summary
 
 
-def _pick_column_y(
-    ys: np.ndarray,
-    previous_y: int | None,
-    height: int,
-) -> tuple[
-    int | None,
-    int | None,
-    int | None,
-    str | None,
-    bool,
-    int | None,
-    int | None,
-    int | None,
-    int | None,
-    int,
-    bool,
-]:
-    if ys.size == 0:
-        return None, None, None, None, False, None, None, None, None, 0, False
-    ys_sorted = np.sort(ys)
-    y_min = int(ys_sorted[0])
-    y_max = int(ys_sorted[-1])
-    thickness = int(y_max - y_min + 1)
-
-    y_top = y_min
-    y_mid = int(np.median(ys_sorted))
-    y_bot = y_max
-
-    runs = 1
-    if ys_sorted.size > 1:
-        diffs = np.diff(ys_sorted)
-        runs = int(np.sum(diffs > 1)) + 1
-
-    candidates = [
-        ("top", y_top),
-        ("mid", y_mid),
-        ("bot", y_bot),
-    ]
+def _column_stats(mask: np.ndarray) -> dict[str, np.ndarray]:
+    """Per-column ink statistics for the whole mask at once.
 
-    valid_candidates: list[tuple[str, int]] = []
-    for name, value in candidates:
-        if value <= EDGE_GUARD_PX or value >= height - EDGE_GUARD_PX - 1:
-            continue
-        if (
-            name == "bot"
-            and thickness >= BASELINE_THICKNESS_PX
-            and value >= height - BASELINE_BOTTOM_MARGIN_PX
-        ):
-            continue
-        valid_candidates.append((name, value))
-
-    if not valid_candidates:
-        return None, y_min, y_max, None, False, thickness, y_top, y_mid, y_bot, runs, False
-
-    if previous_y is not None and abs(y_top - previous_y) >= SPIKE_DELTA_ABS_PX:
-        return (
-            y_top,
-            y_min,
-            y_max,
-            "spike_top",
-            True,
-            thickness,
-            y_top,
-            y_mid,
-            y_bot,
-            runs,
-            True,
-        )
+    For every column ``x`` of the ink rows ``np.where(mask[:, x] == 255)``:
+    ``top``/``bot`` are the first/last ink rows, ``mid`` the truncated median
+    row, ``runs`` the number of contiguous ink segments.
+    """
+    ink = mask == 255
+    height = ink.shape[0]
+    counts = ink.sum(axis=0)
+    present = counts > 0
+    tops = np.argmax(ink, axis=0)
+    bots = height - 1 - np.argmax(ink[::-1], axis=0)
+
+    # The k-th ink row of a column is the first row where the running count
+    # reaches k + 1; np.median averages the two middle rows for even counts.
+    cumulative = np.cumsum(ink, axis=0, dtype=np.int32)
+    lower = np.argmax(cumulative >= (counts - 1) // 2 + 1, axis=0)
+    upper = np.argmax(cumulative >= counts // 2 + 1, axis=0)
+    mids = (lower + upper) // 2
+
+    starts = ink.copy()
+    starts[1:] &= ~ink[:-1]
+    runs = starts.sum(axis=0)
+    return {
+        "present": present,
+        "tops": tops,
+        "mids": mids,
+        "bots": bots,
+        "thicknesses": bots - tops + 1,
+        "runs": runs,
+    }
 
-    if previous_y is None:
-        pick_name, pick_value = (
-            ("top", y_top) if thickness <= THICKNESS_THRESHOLD_PX else ("mid", y_mid)
-        )
-        if pick_name not in {name for name, _ in valid_candidates}:
-            pick_name, pick_value = valid_candidates[0]
-        return (
-            pick_value,
-            y_min,
-            y_max,
-            pick_name,
-            False,
-            thickness,
-            y_top,
-            y_mid,
-            y_bot,
-            runs,
-            False,
-        )
 
-    pick_name, pick_value = min(
-        valid_candidates,
-        key=lambda item: abs(item[1] - previous_y),
+def _pick_columns(mask: np.ndarray, height: int) -> dict:
+    """Pick one y per column from its top/mid/bot ink rows.
+
+    Candidates near the edges (and a thick baseline's bottom) are rejected;
+    a jump of ``SPIKE_DELTA_ABS_PX`` from the previous pick takes the top, the
+    first column takes top or mid by thickness, later ones the candidate
+    closest to the previous pick.
+
+    Column statistics and candidate guards are computed with array ops; only
+    the continuity step (which depends on the previous pick) stays a loop,
+    over plain Python ints.
+    """
+    stats = _column_stats(mask)
+    tops = stats["tops"]
+    mids = stats["mids"]
+    bots = stats["bots"]
+    thicknesses = stats["thicknesses"]
+    low_guard = EDGE_GUARD_PX
+    high_guard = height - EDGE_GUARD_PX - 1
+    top_ok = (tops > low_guard) & (tops < high_guard)
+    mid_ok = (mids > low_guard) & (mids < high_guard)
+    bot_ok = (
+        (bots > low_guard)
+        & (bots < high_guard)
+        & ~(
+            (thicknesses >= BASELINE_THICKNESS_PX)
+            & (bots >= height - BASELINE_BOTTOM_MARGIN_PX)
+        )
     )
-    return (
-        pick_value,
-        y_min,
-        y_max,
-        pick_name,
-        True,
-        thickness,
-        y_top,
-        y_mid,
-        y_bot,
-        runs,
-        False,
+    present = stats["present"]
+    usable = present & (top_ok | mid_ok | bot_ok)
+
+    result: dict = {
+        "points": [],
+        "ranges": [],
+        "modes": [],
+        "thicknesses": [],
+        "tops": [],
+        "mids": [],
+        "bots": [],
+        "runs": [],
+        "spikes": [],
+        "continuity_adjusted": 0,
+        "invalid_raw": 0,
+    }
+    columns = zip(
+        usable.tolist(),
+        tops.tolist(),
+        mids.tolist(),
+        bots.tolist(),
+        thicknesses.tolist(),
+        stats["runs"].tolist(),
+        top_ok.tolist(),
+        mid_ok.tolist(),
+        bot_ok.tolist(),
     )
+    previous_pick = None
+    for is_usable, y_top, y_mid, y_bot, thickness, runs, t_ok, m_ok, b_ok in columns:
+        candidate_y = None
+        pick_mode = None
+        is_spike = False
+        if is_usable:
+            valid = [
+                (name, value)
+                for name, value, ok in (
+                    ("top", y_top, t_ok),
+                    ("mid", y_mid, m_ok),
+                    ("bot", y_bot, b_ok),
+                )
+                if ok
+            ]
+            if previous_pick is not None and abs(y_top - previous_pick) >= SPIKE_DELTA_ABS_PX:
+                pick_mode, candidate_y = "spike_top", y_top
+                is_spike = True
+                result["continuity_adjusted"] += 1
+            elif previous_pick is None:
+                preferred = "top" if thickness <= THICKNESS_THRESHOLD_PX else "mid"
+                pick_mode, candidate_y = next(
+                    (item for item in valid if item[0] == preferred),
+                    valid[0],
+                )
+            else:
+                pick_mode, candidate_y = min(
+                    valid,
+                    key=lambda item: abs(item[1] - previous_pick),
+                )
+                result["continuity_adjusted"] += 1
+
+        if candidate_y is None or candidate_y <= 0 or candidate_y >= height - 1:
+            result["points"].append(None)
+            result["ranges"].append((None, None))
+            result["modes"].append(None)
+            result["thicknesses"].append(None)
+            result["tops"].append(None)
+            result["mids"].append(None)
+            result["bots"].append(None)
+            result["runs"].append(None)
+            result["spikes"].append(False)
+            previous_pick = None
+            if candidate_y is not None:
+                result["invalid_raw"] += 1
+        else:
+            result["points"].append(candidate_y)
+            result["ranges"].append((y_top, y_bot))
+            result["modes"].append(pick_mode)
+            result["thicknesses"].append(thickness)
+            result["tops"].append(y_top)
+            result["mids"].append(y_mid)
+            result["bots"].append(y_bot)
+            result["runs"].append(runs)
+            result["spikes"].append(is_spike)
+            previous_pick = candidate_y
+    return result
 
 
 def _apply_bias_correction(
@@ -1230,11 +1274,73 @@ def _pixel_to_mv(y_pixel: int, height: int) -> float:
     return float(10 ** log_val)
 
 
+def _resolve_debug_policy(policy: str | None) -> str:
+    policy = (policy or DEBUG_ARTIFACT_POLICY).strip().lower()
+    if policy not in DEBUG_ARTIFACT_POLICIES:
+        logger.warning("[INGV COLORED][debug] unknown artifact policy %r, using 'anomaly'", policy)
+        return "anomaly"
+    return policy
+
+
+def _debug_anomaly_reasons(
+    valid_ratio: float,
+    missing_tail: int,
+    error_stats: dict[str, float],
+) -> list[str]:
+    reasons = []
+    if missing_tail >= DEBUG_ANOMALY_TAIL_MISSING:
+        reasons.append("tail_missing")
+    if valid_ratio < TRUE_MASK_MIN_COLUMN_PCT:
+        reasons.append("low_coverage")
+    if error_stats["mean_span"] > DEBUG_ANOMALY_MEAN_SPAN_PX:
+        reasons.append("wide_columns")
+    return reasons
+
+
+def _should_write_debug_artifacts(policy: str, anomalies: list[str]) -> bool:
+    if policy == "always":
+        return True
+    if policy == "off":
+        return False
+    if anomalies:
+        return True
+    if policy == "sampled":
+        return next(_debug_run_counter) % max(DEBUG_SAMPLE_EVERY, 1) == 0
+    return False
+
+
+def _emit_debug_artifacts(background: bool, *args, **kwargs) -> dict:
+    """Write artifacts now, or queue them on the single debug writer thread."""
+    if not background:
+        return _write_debug_artifacts(*args, **kwargs)
+    global _debug_executor
+    with _debug_lock:
+        if _debug_executor is None:
+            _debug_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingv-debug")
+        _debug_futures[:] = [future for future in _debug_futures if not future.done()]
+        _debug_futures.append(_debug_executor.submit(_write_debug_artifacts, *args, **kwargs))
+    return {}
+
+
+def wait_for_debug_artifacts(timeout: float | None = None) -> list[dict]:
+    """Block until queued artifacts are written; returns their path maps."""
+    with _debug_lock:
+        pending = list(_debug_futures)
+        _debug_futures.clear()
+    results = []
+    for future in pending:
+        try:
+            results.append(future.result(timeout=timeout))
+        except Exception:  # pragma: no cover - debug output must never break extraction
+            logger.exception("[INGV COLORED][debug] background artifact write failed")
+    return results
+
+
 def _write_debug_artifacts(
     cropped: np.ndarray,
     mask_raw: np.ndarray,
     mask_candidate: np.ndarray,
-    mask_polyline: np.ndarray,
+    mask_polyline: np.ndarray | None,
     xs: list[int],
     raw_points: list[int | None],
     filtered_points: list[int | None],
@@ -1254,6 +1360,8 @@ def _write_debug_artifacts(
     data_dir = Path(os.getenv("DATA_DIR", "data"))
     debug_dir = Path(os.getenv("INGV_COLORED_DEBUG_DIR", data_dir / "debug"))
     debug_dir.mkdir(parents=True, exist_ok=True)
+    if mask_polyline is None:
+        mask_polyline = _build_polyline_mask(cropped.shape[0], cropped.shape[1], filtered_points)
 
     overlay = cropped.copy()
     segment: list[tuple[int, int]] = []
@@ -1,4 +1,5 @@
 import csv
+import io
 import logging
 import os
 from datetime import datetime, timedelta, timezone
@@ -28,8 +29,13 @@ def download_png(url="https://www.ct.ingv.it/RMS_Etna/2.png"):
     response = requests.get(url, headers=headers, timeout=30)
     response.raise_for_status()
 
+    png_bytes = response.content
+    return png_bytes, resolve_reference_time(png_bytes, response.headers.get("Last-Modified"))
+
+
+def resolve_reference_time(png_bytes, last_modified: str | None = None) -> datetime:
+    """Reference UTC time of an INGV PNG (OCR of the "updated" label)."""
     reference_time = datetime.now(timezone.utc)
-    last_modified = response.headers.get("Last-Modified")
     if last_modified:
         try:
             parsed_dt = parsedate_to_datetime(last_modified)
@@ -42,7 +48,6 @@ def download_png(url="https://www.ct.ingv.it/RMS_Etna/2.png"):
             else:
                 reference_time = parsed_dt.astimezone(timezone.utc)
 
-    png_bytes = response.content
     image = cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_COLOR)
     try:
         reference_time = extract_updated_timestamp_from_image(image)
@@ -50,7 +55,7 @@ def download_png(url="https://www.ct.ingv.it/RMS_Etna/2.png"):
         logger.error("[INGV OCR] impossibile estrarre timestamp dal PNG INGV: %s", exc)
         raise
 
-    return png_bytes, reference_time
+    return reference_time
 
 def extract_green_curve_from_png(
     png_bytes,
@@ -155,13 +160,11 @@ def _format_timestamp(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def clean_and_save_data(data, output_path=None):
-    """Clean signal from noise/duplicates and save to CSV"""
-    if output_path is None:
-        DATA_DIR = os.getenv('DATA_DIR', 'data')
-        output_path = os.path.join(DATA_DIR, 'curva.csv')
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+CSV_HEADER = ["timestamp", "value", "value_max", "value_avg"]
 
+
+def _clean_rows(data) -> list[dict]:
+    """Drop invalid points, keep the max value per second and sort by time."""
     cleaned = {}
 
     for item in data:
@@ -189,7 +192,8 @@ def clean_and_save_data(data, output_path=None):
             continue
         if numeric <= 0:
             continue
-        key = dt.isoformat()
+        # Rows are written with second precision: dedup on the written key.
+        key = _format_timestamp(dt)
         if key in cleaned and numeric <= cleaned[key]["value"]:
             continue
         cleaned[key] = {
@@ -199,23 +203,119 @@ def clean_and_save_data(data, output_path=None):
             "value_avg": numeric_avg if numeric_avg > 0 else numeric,
         }
 
-    cleaned_rows = sorted(cleaned.values(), key=lambda row: row["timestamp"])
+    return sorted(cleaned.values(), key=lambda row: row["timestamp"])
+
+
+def _format_csv_rows(rows, *, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_HEADER)
+    for row in rows:
+        writer.writerow(
+            [
+                _format_timestamp(row["timestamp"]),
+                f"{row['value']}",
+                f"{row['value_max']}",
+                f"{row['value_avg']}",
+            ]
+        )
+    return buffer.getvalue()
+
+
+def read_csv_header(path) -> list[str] | None:
+    """Return the header of an existing curva CSV or ``None`` if unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            first_line = handle.readline()
+    except OSError:
+        return None
+    if not first_line.strip():
+        return None
+    return next(csv.reader([first_line]))
+
+
+def _read_csv_rows(path) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        return list(csv.DictReader(handle))
+
+
+def load_clean_rows(path) -> list[dict]:
+    """Read an existing curva CSV back into cleaned, sorted rows."""
+    return _clean_rows(_read_csv_rows(path))
+
+
+def clean_and_save_data(data, output_path=None):
+    """Clean signal from noise/duplicates and save to CSV"""
+    if output_path is None:
+        DATA_DIR = os.getenv('DATA_DIR', 'data')
+        output_path = os.path.join(DATA_DIR, 'curva.csv')
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    cleaned_rows = _clean_rows(data)
 
     with open(output_path, "w", encoding="utf-8", newline="") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(["timestamp", "value", "value_max", "value_avg"])
-        for row in cleaned_rows:
-            writer.writerow(
-                [
-                    _format_timestamp(row["timestamp"]),
-                    f"{row['value']}",
-                    f"{row['value_max']}",
-                    f"{row['value_avg']}",
-                ]
-            )
+        handle.write(_format_csv_rows(cleaned_rows, header=True))
 
     return output_path, cleaned_rows
 
+
+def append_clean_data(data, output_path, after: datetime | None = None):
+    """Append only the cleaned rows newer than ``after`` to an existing CSV.
+
+    The new rows are encoded up front and written with a single ``O_APPEND``
+    write, so the I/O cost scales with the number of new points rather than
+    the history. Existing rows are never truncated or swapped, but a reader
+    racing the write may see a partial last line; the write changes the
+    file's size and mtime, so the tremor store re-parses on its next call.
+    Returns ``(output_path, cleaned_rows, appended_rows)``.
+    """
+    cleaned_rows = _clean_rows(data)
+    after = _to_datetime_utc(after)
+    appended_rows = [
+        row
+        for row in cleaned_rows
+        if after is None or row["timestamp"].replace(microsecond=0) > after
+    ]
+    if not appended_rows:
+        return output_path, cleaned_rows, appended_rows
+
+    payload = _format_csv_rows(appended_rows).encode("utf-8")
+    fd = os.open(output_path, os.O_RDWR | os.O_APPEND)
+    try:
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            payload = b"\n" + payload
+        view = memoryview(payload)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    return output_path, cleaned_rows, appended_rows
+
+
+def compact_csv(output_path, data=(), retention: timedelta | None = None):
+    """Merge the existing CSV with ``data``, dedup, sort and atomically rewrite.
+
+    When ``retention`` is given, rows older than ``retention`` before the
+    newest point are dropped.
+    """
+    cleaned_rows = _clean_rows([*_read_csv_rows(output_path), *data])
+    if retention is not None and cleaned_rows:
+        cutoff = cleaned_rows[-1]["timestamp"] - retention
+        cleaned_rows = [row for row in cleaned_rows if row["timestamp"] >= cutoff]
+
+    temp_path = Path(output_path).with_suffix(".tmp")
+    clean_and_save_data(cleaned_rows, str(temp_path))
+    temp_path.replace(output_path)
+    return output_path, cleaned_rows
+
+
 def process_png_bytes_to_csv(png_bytes, reference_time, output_path=None):
     """Process downloaded PNG bytes, extract curve, and save CSV."""
     data, metadata = extract_green_curve_from_png(
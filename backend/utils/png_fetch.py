@@ -0,0 +1,119 @@
+"""Conditional PNG downloads backed by a small JSON validator cache.
+
+INGV republishes the same PNG for several ticks in a row. ``PngFetchCache``
+sends ``If-None-Match``/``If-Modified-Since`` from the last processed
+response and hashes the body, so callers can skip decoding and extraction
+when nothing changed. Validators are only remembered via ``commit`` once the
+caller has processed the image: a failed run never poisons the cache.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+from pathlib import Path
+import threading
+
+import requests
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    status: str  # "changed", "unchanged" (same bytes) or "not_modified" (HTTP 304)
+    content: bytes | None
+    sha256: str | None
+    etag: str | None
+    last_modified: str | None
+
+    @property
+    def changed(self) -> bool:
+        return self.status == "changed"
+
+
+class PngFetchCache:
+    """Per-URL ETag/Last-Modified/sha256 state persisted as JSON."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, url: str) -> dict:
+        return self._load().get(url) or {}
+
+    def fetch(
+        self,
+        url: str,
+        *,
+        conditional: bool = True,
+        headers: dict | None = None,
+        timeout: float = 30,
+    ) -> FetchResult:
+        """GET ``url``; with ``conditional`` unchanged content is reported, not returned as new."""
+        entry = self.get(url) if conditional else {}
+        request_headers = {**DEFAULT_HEADERS, **(headers or {})}
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = requests.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry.get("sha256"):
+            return FetchResult(
+                url=url,
+                status="not_modified",
+                content=None,
+                sha256=entry["sha256"],
+                etag=response.headers.get("ETag") or entry.get("etag"),
+                last_modified=response.headers.get("Last-Modified") or entry.get("last_modified"),
+            )
+        response.raise_for_status()
+
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        unchanged = conditional and digest == entry.get("sha256")
+        return FetchResult(
+            url=url,
+            status="unchanged" if unchanged else "changed",
+            content=content,
+            sha256=digest,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    def commit(self, result: FetchResult) -> None:
+        """Remember ``result`` as the last successfully processed version."""
+        if result.sha256 is None:
+            return
+        with self._lock:
+            state = self._load()
+            state[result.url] = {
+                "etag": result.etag,
+                "last_modified": result.last_modified,
+                "sha256": result.sha256,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                temp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+                temp_path.replace(self.path)
+            except OSError:
+                logger.warning("[PNG] unable to persist fetch state to %s", self.path, exc_info=True)
+
+
+__all__ = ["FetchResult", "PngFetchCache"]
@@ -0,0 +1,169 @@
+"""Fixed-width binary archive of the tremor series, written next to curva.csv.
+
+Each record stores the epoch second (int64) and ``value``/``value_max``/
+``value_avg`` (float64) behind a small magic header. Readers ``np.memmap`` the
+file and get typed column views without any text parsing; the cron appends
+records with a single ``O_APPEND`` write and rewrites atomically on compaction.
+Compaction only trims the CSV: records older than the rewritten rows are kept
+for ``TREMOR_ARCHIVE_RETENTION_DAYS`` (default 90, the longest API range).
+
+Only NumPy is required, so the cron image (no pandas) can write it.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import os
+from pathlib import Path
+
+import numpy as np
+
+ARCHIVE_SUFFIX = ".bin"
+ARCHIVE_MAGIC = b"ETNATRS1"
+HEADER_SIZE = 32
+DEFAULT_ARCHIVE_RETENTION_DAYS = 90
+RECORD_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("value", "<f8"),
+        ("value_max", "<f8"),
+        ("value_avg", "<f8"),
+    ]
+)
+
+
+def archive_path_for(csv_path: str | Path) -> Path:
+    return Path(csv_path).with_suffix(ARCHIVE_SUFFIX)
+
+
+def archive_enabled() -> bool:
+    return os.getenv("TREMOR_ARCHIVE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def archive_retention_days() -> float:
+    return float(
+        os.getenv("TREMOR_ARCHIVE_RETENTION_DAYS", str(DEFAULT_ARCHIVE_RETENTION_DAYS))
+    )
+
+
+def _epoch_seconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def rows_to_records(rows) -> np.ndarray:
+    """Convert cleaned rows (``timestamp`` datetime + values) to records."""
+    records = np.empty(len(rows), dtype=RECORD_DTYPE)
+    for index, row in enumerate(rows):
+        value = float(row["value"])
+        records[index] = (
+            _epoch_seconds(row["timestamp"]),
+            value,
+            float(row.get("value_max", value)),
+            float(row.get("value_avg", value)),
+        )
+    return records
+
+
+def _header() -> bytes:
+    return ARCHIVE_MAGIC.ljust(HEADER_SIZE, b"\0")
+
+
+def _write_records(path: Path, records: np.ndarray) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, "wb") as handle:
+        handle.write(_header())
+        handle.write(records.tobytes())
+        handle.flush()
+        os.fsync(handle.fileno())
+    temp_path.replace(path)
+    return path
+
+
+def write_archive(path: str | Path, rows) -> Path:
+    """Atomically replace the archive with ``rows``."""
+    return _write_records(Path(path), rows_to_records(rows))
+
+
+def merge_archive(path: str | Path, rows, *, retention_days: float | None = None) -> Path:
+    """Atomically replace the records from the first of ``rows`` onwards.
+
+    Older records already in the archive are kept, minus those more than
+    ``retention_days`` (default :func:`archive_retention_days`) before the
+    newest record, so the archive outlives the trimmed CSV.
+    """
+    path = Path(path)
+    records = rows_to_records(rows)
+    existing = open_archive(path)
+    if existing is None or not len(existing):
+        return _write_records(path, records)
+    if retention_days is None:
+        retention_days = archive_retention_days()
+    newest = int(records["ts"][-1]) if len(records) else int(existing["ts"][-1])
+    cutoff = newest - int(retention_days * 86400)
+    older = existing["ts"] >= cutoff
+    if len(records):
+        older &= existing["ts"] < records["ts"][0]
+    # Copy out of the map before the file is replaced underneath it.
+    kept = np.array(existing[older], dtype=RECORD_DTYPE)
+    return _write_records(path, np.concatenate([kept, records]))
+
+
+def append_archive(path: str | Path, rows) -> int:
+    """Append ``rows`` with one ``O_APPEND`` write; returns the record count."""
+    records = rows_to_records(rows)
+    if not len(records):
+        return 0
+    payload = memoryview(records.tobytes())
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        while payload:
+            written = os.write(fd, payload)
+            payload = payload[written:]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return len(records)
+
+
+def open_archive(path: str | Path) -> np.memmap | np.ndarray | None:
+    """Memory-map the archive read-only; ``None`` if missing or invalid.
+
+    A trailing partial record (torn append) is ignored.
+    """
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as handle:
+            magic = handle.read(len(ARCHIVE_MAGIC))
+    except OSError:
+        return None
+    if magic != ARCHIVE_MAGIC or size < HEADER_SIZE:
+        return None
+    count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def read_last_epoch(path: str | Path) -> int | None:
+    archive = open_archive(path)
+    if archive is None or not len(archive):
+        return None
+    return int(archive["ts"][-1])
+
+
+__all__ = [
+    "ARCHIVE_SUFFIX",
+    "RECORD_DTYPE",
+    "append_archive",
+    "archive_enabled",
+    "archive_path_for",
+    "archive_retention_days",
+    "merge_archive",
+    "open_archive",
+    "read_last_epoch",
+    "rows_to_records",
+    "write_archive",
+]
@@ -0,0 +1,166 @@
+"""Hourly and daily rollups of the tremor series, written next to curva.csv.
+
+Each rollup row summarizes one UTC bucket with ``count``, ``min``, ``max``,
+``mean`` and ``p95`` of ``value``. The files are small CSVs
+(``curva_colored.rollup_1h.csv`` / ``curva_colored.rollup_1d.csv``): a
+90-day hourly rollup is ~2k rows, a year of daily rollups 365.
+
+Raw points are trimmed after ``CSV_RETENTION_DAYS`` but rollups are not:
+on every update the buckets fully covered by the raw series are recomputed
+and older buckets are kept from the previous file, which is what makes
+month and year views possible. Only NumPy is required, so the cron image
+(no pandas) can write them.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+
+import numpy as np
+
+ROLLUP_RESOLUTIONS: dict[str, int] = {
+    "1h": 3600,
+    "1d": 86400,
+}
+ROLLUP_FIELDS = ("bucket_start", "count", "min", "max", "mean", "p95")
+ROLLUP_DTYPE = np.dtype(
+    [
+        ("bucket_start", "<i8"),
+        ("count", "<i8"),
+        ("min", "<f8"),
+        ("max", "<f8"),
+        ("mean", "<f8"),
+        ("p95", "<f8"),
+    ]
+)
+PERCENTILE = 0.95
+
+
+def rollup_path_for(csv_path: str | Path, resolution: str) -> Path:
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"unknown rollup resolution: {resolution}")
+    csv_path = Path(csv_path)
+    return csv_path.with_name(f"{csv_path.stem}.rollup_{resolution}.csv")
+
+
+def rollups_enabled() -> bool:
+    return os.getenv("TREMOR_ROLLUPS_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def compute_rollups(epochs: np.ndarray, values: np.ndarray, bucket_seconds: int) -> np.ndarray:
+    """Aggregate ``values`` into UTC buckets of ``bucket_seconds``; NaN is ignored.
+
+    ``p95`` uses linear interpolation, like ``numpy.percentile``.
+    """
+    epochs = np.asarray(epochs, dtype="int64")
+    values = np.asarray(values, dtype="float64")
+    finite = np.isfinite(values)
+    epochs, values = epochs[finite], values[finite]
+    if not len(values):
+        return np.empty(0, dtype=ROLLUP_DTYPE)
+
+    buckets = (epochs // bucket_seconds) * bucket_seconds
+    order = np.lexsort((values, buckets))
+    buckets, values = buckets[order], values[order]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+
+    position = starts + PERCENTILE * (counts - 1)
+    lower = np.floor(position).astype("int64")
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    fraction = position - lower
+
+    result = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+    result["bucket_start"] = buckets[starts]
+    result["count"] = counts
+    result["min"] = values[starts]
+    result["max"] = values[starts + counts - 1]
+    result["mean"] = np.add.reduceat(values, starts) / counts
+    result["p95"] = values[lower] + (values[upper] - values[lower]) * fraction
+    return result
+
+
+def merge_rollups(existing: np.ndarray, computed: np.ndarray, covered_from: int) -> np.ndarray:
+    """Keep ``existing`` buckets before ``covered_from`` and ``computed`` ones after.
+
+    Older computed buckets (partially covered by the trimmed raw series) only
+    fill gaps the existing rollup does not have.
+    """
+    kept = existing[existing["bucket_start"] < covered_from]
+    partial = computed[computed["bucket_start"] < covered_from]
+    partial = partial[~np.isin(partial["bucket_start"], kept["bucket_start"])]
+    fresh = computed[computed["bucket_start"] >= covered_from]
+    merged = np.concatenate([kept, partial, fresh])
+    return merged[np.argsort(merged["bucket_start"], kind="stable")]
+
+
+def read_rollups(path: str | Path) -> np.ndarray | None:
+    """Load a rollup CSV; ``None`` if it does not exist."""
+    path = Path(path)
+    try:
+        handle = open(path, "r", encoding="utf-8", newline="")
+    except OSError:
+        return None
+    with handle:
+        reader = csv.DictReader(handle)
+        rows = [
+            (
+                int(row["bucket_start"]),
+                int(row["count"]),
+                float(row["min"]),
+                float(row["max"]),
+                float(row["mean"]),
+                float(row["p95"]),
+            )
+            for row in reader
+        ]
+    return np.array(rows, dtype=ROLLUP_DTYPE)
+
+
+def write_rollups(path: str | Path, rollups: np.ndarray) -> Path:
+    """Atomically replace the rollup CSV at ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(ROLLUP_FIELDS)
+        for row in rollups.tolist():
+            bucket_start, count, *stats = row
+            writer.writerow([bucket_start, count, *(repr(value) for value in stats)])
+    temp_path.replace(path)
+    return path
+
+
+def update_rollups(csv_path: str | Path, epochs: np.ndarray, values: np.ndarray) -> dict[str, int]:
+    """Refresh every rollup resolution from the raw series; returns row counts."""
+    epochs = np.asarray(epochs, dtype="int64")
+    counts: dict[str, int] = {}
+    if not len(epochs):
+        return counts
+    for resolution, bucket_seconds in ROLLUP_RESOLUTIONS.items():
+        path = rollup_path_for(csv_path, resolution)
+        computed = compute_rollups(epochs, values, bucket_seconds)
+        existing = read_rollups(path)
+        if existing is not None:
+            # First bucket that starts at or after the oldest raw point.
+            covered_from = -(-int(epochs.min()) // bucket_seconds) * bucket_seconds
+            computed = merge_rollups(existing, computed, covered_from)
+        write_rollups(path, computed)
+        counts[resolution] = int(len(computed))
+    return counts
+
+
+__all__ = [
+    "ROLLUP_DTYPE",
+    "ROLLUP_FIELDS",
+    "ROLLUP_RESOLUTIONS",
+    "compute_rollups",
+    "merge_rollups",
+    "read_rollups",
+    "rollup_path_for",
+    "rollups_enabled",
+    "update_rollups",
+    "write_rollups",
+]
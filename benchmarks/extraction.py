@@ -0,0 +1,351 @@
+"""Speed and accuracy benchmark for the INGV PNG extractors.
+
+Runs ``extract_series_from_colored``, ``extract_green_curve_from_png`` and
+``detect_band_boundaries_px`` over the PNG corpus listed in
+``benchmarks/corpus/manifest.json`` and reports, for every corpus entry:
+
+* per-stage timings (min/median over ``--repeat`` runs). Colored stages are
+  measured by wrapping the module helpers, so ``candidate_selection``
+  includes ``mask_build``; debug artifacts are forced on and synchronous so
+  their cost stays visible;
+* peak traced memory of one run (Python/NumPy allocations via
+  ``tracemalloc``; OpenCV's internal buffers are not traced);
+* the diff of the output against the golden file in ``benchmarks/golden``.
+
+Usage::
+
+    python -m benchmarks.extraction --repeat 5
+    python -m benchmarks.extraction --update-golden   # after an intended change
+
+The exit code is 1 when an output no longer matches its golden file.
+"""
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import csv
+from datetime import datetime
+import functools
+import json
+import logging
+import os
+from pathlib import Path
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+
+from app.utils import ingv_bands
+from backend.utils import extract_colored, extract_png
+
+BENCH_DIR = Path(__file__).resolve().parent
+CORPUS_DIR = BENCH_DIR / "corpus"
+GOLDEN_DIR = BENCH_DIR / "golden"
+MANIFEST_PATH = CORPUS_DIR / "manifest.json"
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 1e-9
+
+COLORED_STAGES = {
+    "crop": ("_crop_plot_area",),
+    "mask_build": ("_build_ink_mask", "_clean_ink_mask"),
+    "candidate_selection": ("_select_candidate_mask",),
+    "column_picks": ("_pick_columns",),
+    "bias_correction": ("_apply_bias_correction",),
+    "debug_artifacts": ("_write_debug_artifacts",),
+}
+BAND_KEYS = ("green_yellow", "yellow_orange", "orange_red")
+
+
+class StageTimer:
+    """Accumulate wall-clock seconds per named stage for a single run."""
+
+    def __init__(self) -> None:
+        self.totals: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def wrap(self, name: str, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+@contextmanager
+def _instrumented(module, stages: dict[str, tuple[str, ...]], timer: StageTimer):
+    originals = {}
+    try:
+        for stage, names in stages.items():
+            for name in names:
+                originals[name] = getattr(module, name)
+                setattr(module, name, timer.wrap(stage, originals[name]))
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(module, name, func)
+
+
+@contextmanager
+def _env(**values: str):
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _series_rows(timestamps, values) -> list[tuple[float, float]]:
+    """Key samples by seconds before the last one, so runs on different days compare."""
+    if not timestamps:
+        return []
+    end = timestamps[-1]
+    return [
+        (round((ts - end).total_seconds(), 3), float(value))
+        for ts, value in zip(timestamps, values)
+    ]
+
+
+def _run_colored(entry: dict, timer: StageTimer):
+    with tempfile.TemporaryDirectory() as debug_dir, _env(INGV_COLORED_DEBUG_DIR=debug_dir):
+        with _instrumented(extract_colored, COLORED_STAGES, timer):
+            timestamps, values, _ = extract_colored.extract_series_from_colored(
+                entry["path"],
+                debug_artifacts="always",
+                debug_background=False,
+            )
+    return _series_rows(timestamps, values)
+
+
+def _run_green(entry: dict, timer: StageTimer):
+    png_bytes = entry["path"].read_bytes()
+    end_time = entry.get("end_time")
+    if end_time:
+        end_time = datetime.fromisoformat(end_time.replace("Z", "+00:00"))
+    data, _ = extract_png.extract_green_curve_from_png(png_bytes, end_time=end_time)
+    return _series_rows([row["timestamp"] for row in data], [row["value"] for row in data])
+
+
+def _run_bands(entry: dict, timer: StageTimer):
+    with timer.stage("decode"):
+        image = cv2.imread(str(entry["path"]))
+    with timer.stage("crop"):
+        cropped, _, _ = ingv_bands._safe_crop_plot_area(image)
+    with timer.stage("classify"):
+        result = ingv_bands.detect_band_boundaries_px(cropped)
+    return {key: result.get(key) for key in BAND_KEYS}
+
+
+EXTRACTORS = {
+    "colored": _run_colored,
+    "green": _run_green,
+    "bands": _run_bands,
+}
+
+
+def _golden_path(name: str, extractor: str) -> Path:
+    suffix = "json" if extractor == "bands" else "csv"
+    return GOLDEN_DIR / f"{name}.{extractor}.{suffix}"
+
+
+def load_golden(path: Path):
+    if not path.exists():
+        return None
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        return [(float(row["offset_s"]), float(row["value"])) for row in csv.DictReader(handle)]
+
+
+def save_golden(path: Path, output) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".json":
+        path.write_text(json.dumps(output, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        return
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["offset_s", "value"])
+        for offset, value in output:
+            writer.writerow([repr(offset), repr(value)])
+
+
+def diff_series(current, golden, tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    current_map = dict(current)
+    golden_map = dict(golden)
+    shared = current_map.keys() & golden_map.keys()
+    abs_diffs = [abs(current_map[key] - golden_map[key]) for key in shared]
+    rel_diffs = [
+        abs(current_map[key] - golden_map[key]) / max(abs(golden_map[key]), 1e-12)
+        for key in shared
+    ]
+    missing = len(golden_map.keys() - current_map.keys())
+    extra = len(current_map.keys() - golden_map.keys())
+    max_rel = max(rel_diffs, default=0.0)
+    return {
+        "rows": len(current),
+        "golden_rows": len(golden),
+        "missing": missing,
+        "extra": extra,
+        "max_abs_diff": max(abs_diffs, default=0.0),
+        "mean_abs_diff": statistics.fmean(abs_diffs) if abs_diffs else 0.0,
+        "max_rel_diff": max_rel,
+        "ok": missing == 0 and extra == 0 and max_rel <= tolerance,
+    }
+
+
+def diff_bands(current: dict, golden: dict) -> dict:
+    deltas = {}
+    for key in BAND_KEYS:
+        now, expected = current.get(key), golden.get(key)
+        deltas[key] = None if now is None or expected is None else now - expected
+    return {
+        "deltas_px": deltas,
+        "ok": all(current.get(key) == golden.get(key) for key in BAND_KEYS),
+    }
+
+
+def _summarize(samples: list[float]) -> dict:
+    return {
+        "min_ms": round(min(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+    }
+
+
+def benchmark_entry(entry: dict, extractor: str, *, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Run one extractor on one corpus PNG; the first run also traces memory."""
+    runner = EXTRACTORS[extractor]
+    result: dict = {"corpus": entry["name"], "extractor": extractor, "status": "ok"}
+
+    tracemalloc.start()
+    try:
+        output = runner(entry, StageTimer())
+    except Exception as exc:  # the benchmark reports failures instead of stopping
+        result.update(status="error", error=f"{type(exc).__name__}: {exc}")
+        return result
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_traced_bytes"] = peak
+
+    totals: list[float] = []
+    stages: dict[str, list[float]] = {}
+    for _ in range(max(repeat, 1)):
+        timer = StageTimer()
+        start = time.perf_counter()
+        runner(entry, timer)
+        totals.append(time.perf_counter() - start)
+        for name, seconds in timer.totals.items():
+            stages.setdefault(name, []).append(seconds)
+
+    result["total"] = _summarize(totals)
+    result["timings"] = {name: _summarize(samples) for name, samples in stages.items()}
+    result["output"] = output
+    return result
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> list[dict]:
+    entries = json.loads(Path(path).read_text(encoding="utf-8"))
+    for entry in entries:
+        entry["path"] = Path(path).parent / entry["png"]
+    return entries
+
+
+def run_benchmark(
+    manifest: Path = MANIFEST_PATH,
+    *,
+    repeat: int = DEFAULT_REPEAT,
+    tolerance: float = DEFAULT_TOLERANCE,
+    update_golden: bool = False,
+) -> list[dict]:
+    results = []
+    for entry in load_manifest(manifest):
+        for extractor in entry["extractors"]:
+            result = benchmark_entry(entry, extractor, repeat=repeat)
+            output = result.pop("output", None)
+            golden_path = _golden_path(entry["name"], extractor)
+            if result["status"] != "ok":
+                result["diff"] = {"ok": False}
+            elif update_golden:
+                save_golden(golden_path, output)
+                result["diff"] = {"ok": True, "updated": str(golden_path)}
+            else:
+                golden = load_golden(golden_path)
+                if golden is None:
+                    result["diff"] = {"ok": False, "golden": "missing"}
+                elif extractor == "bands":
+                    result["diff"] = diff_bands(output, golden)
+                else:
+                    result["diff"] = diff_series(output, golden, tolerance)
+            results.append(result)
+    return results
+
+
+def format_report(results: list[dict]) -> str:
+    lines = [
+        f"{'corpus':<28} {'extractor':<9} {'status':<6} {'median_ms':>10} "
+        f"{'min_ms':>9} {'peak_MiB':>9}  golden"
+    ]
+    for result in results:
+        total = result.get("total", {})
+        peak = result.get("peak_traced_bytes", 0) / (1024 * 1024)
+        diff = result.get("diff", {})
+        golden = "ok" if diff.get("ok") else "DIFF"
+        if "max_rel_diff" in diff and not diff["ok"]:
+            golden += (
+                f" rows={diff['rows']}/{diff['golden_rows']} "
+                f"max_rel={diff['max_rel_diff']:.3g}"
+            )
+        elif "deltas_px" in diff and not diff["ok"]:
+            golden += f" {diff['deltas_px']}"
+        lines.append(
+            f"{result['corpus']:<28} {result['extractor']:<9} {result['status']:<6} "
+            f"{total.get('median_ms', float('nan')):>10.2f} "
+            f"{total.get('min_ms', float('nan')):>9.2f} {peak:>9.2f}  {golden}"
+        )
+        if result.get("error"):
+            lines.append(f"    error: {result['error']}")
+        for stage, timing in result.get("timings", {}).items():
+            lines.append(
+                f"    {stage:<22} {timing['median_ms']:>10.2f} {timing['min_ms']:>9.2f}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the INGV PNG extractors.")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--json", type=Path, default=None, help="Write the raw report here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run_benchmark(
+        args.manifest,
+        repeat=args.repeat,
+        tolerance=args.tolerance,
+        update_golden=args.update_golden,
+    )
+    print(format_report(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    return 0 if all(result["diff"]["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
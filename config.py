@@ -113,6 +113,12 @@ class Config:
     ALERT_RATE_LIMIT_MINUTES = int(os.getenv("ALERT_RATE_LIMIT_MINUTES", "15"))
     ALERT_RENOTIFY_HOURS = int(os.getenv("ALERT_RENOTIFY_HOURS", "6"))
     ALERT_MOVING_AVG_WINDOW = int(os.getenv("ALERT_MOVING_AVG_WINDOW", "5"))
+    ALERT_OUTBOX_ENABLED = os.getenv("ALERT_OUTBOX_ENABLED", "1").lower() in {"1", "true", "yes"}
+    ALERT_OUTBOX_BACKGROUND_DRAIN = (
+        os.getenv("ALERT_OUTBOX_BACKGROUND_DRAIN", "1").lower() in {"1", "true", "yes"}
+    )
+    ALERT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("ALERT_OUTBOX_MAX_ATTEMPTS", "5"))
+    ALERT_OUTBOX_TTL_MINUTES = int(os.getenv("ALERT_OUTBOX_TTL_MINUTES", "180"))
 
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
@@ -11,6 +11,7 @@ import requests
 
 from app.utils.logger import configure_logging
 from backend.utils.archive import ArchiveManager
+from backend.utils.png_fetch import PngFetchCache
 
 os.makedirs("grafici", exist_ok=True)
 os.makedirs("log", exist_ok=True)
@@ -22,6 +23,7 @@ URL_INGV = os.getenv(
 )
 GRAFICO_LOCALE = "grafici/etna_latest.png"
 CSV_LOG = os.path.join(os.getenv("LOG_DIR", "log"), "log.csv")
+PNG_FETCH_CACHE = PngFetchCache(os.path.join(os.getenv("LOG_DIR", "log"), "png_fetch_state.json"))
 configure_logging()
 logger = logging.getLogger(__name__)
 TOKEN_TELEGRAM = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -34,16 +36,26 @@ MIN_COMPONENT_AREA = int(os.getenv("INGV_MIN_COMPONENT_AREA", "12"))
 archive_manager = ArchiveManager()
 last_archived_date = None
 
-def scarica_grafico(url: str) -> bool:
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
-    r = requests.get(url, headers=headers)
-    if r.status_code == 200:
-        with open(GRAFICO_LOCALE, 'wb') as f:
-            f.write(r.content)
-        return True
-    return False
+def scarica_grafico(url: str, *, conditional: bool = False):
+    """Salva il PNG in GRAFICO_LOCALE.
+
+    Con ``conditional`` restituisce il ``FetchResult`` se il PNG è nuovo e
+    ``None`` se è identico all'ultimo elaborato (ETag/Last-Modified o hash).
+    """
+    try:
+        fetched = PNG_FETCH_CACHE.fetch(
+            url,
+            conditional=conditional and os.path.exists(GRAFICO_LOCALE),
+            headers={"User-Agent": "Mozilla/5.0"},
+        )
+    except Exception as exc:
+        logger.error("Download PNG fallito per %s: %s", url, exc)
+        return False
+    if not fetched.changed:
+        return None
+    with open(GRAFICO_LOCALE, 'wb') as f:
+        f.write(fetched.content)
+    return fetched
 
 def crop_plot_area(img: np.ndarray) -> np.ndarray:
     height, width = img.shape[:2]
@@ -226,8 +238,12 @@ def archive_daily_graph():
 if __name__ == "__main__":
     while True:
         logger.info("Download e aggiornamento in corso...")
-        if scarica_grafico(URL_INGV):
+        scaricato = scarica_grafico(URL_INGV, conditional=True)
+        if scaricato is None:
+            logger.info("PNG invariato: estrazione saltata")
+        elif scaricato:
             aggiorna_log()
+            PNG_FETCH_CACHE.commit(scaricato)
             archive_daily_graph()  # Archive after successful download
             logger.info("Aggiornamento completato")
         else:
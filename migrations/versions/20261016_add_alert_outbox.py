@@ -0,0 +1,60 @@
+"""Add outbound Telegram alert queue."""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261016_add_alert_outbox"
+down_revision = "20260202_add_user_missions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alert_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("idempotency_key", sa.String(length=191), nullable=False),
+        sa.Column("event_id", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("chat_id", sa.String(length=64), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.String(length=255), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.UniqueConstraint("idempotency_key", name="uq_alert_outbox_idempotency_key"),
+    )
+    op.create_index("ix_alert_outbox_event_id", "alert_outbox", ["event_id"])
+    op.create_index("ix_alert_outbox_user_id", "alert_outbox", ["user_id"])
+    op.create_index(
+        "ix_alert_outbox_status_next_attempt_at",
+        "alert_outbox",
+        ["status", "next_attempt_at"],
+    )
+    op.add_column("events", sa.Column("outbox_key", sa.String(length=191), nullable=True))
+    op.create_index("ix_events_outbox_key", "events", ["outbox_key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_outbox_key", table_name="events")
+    op.drop_column("events", "outbox_key")
+    op.drop_index("ix_alert_outbox_status_next_attempt_at", table_name="alert_outbox")
+    op.drop_index("ix_alert_outbox_user_id", table_name="alert_outbox")
+    op.drop_index("ix_alert_outbox_event_id", table_name="alert_outbox")
+    op.drop_table("alert_outbox")
@@ -0,0 +1,133 @@
+"""Replay archived tremor data through the alert rules, offline.
+
+Examples::
+
+    python -m scripts.alert_backtest --data data/curva_colored.csv --users 5000
+    python -m scripts.alert_backtest --users-db sqlite:///instance/etna_monitor.db --json
+
+The series comes from the tremor CSV (or its ``.bin`` archive); users are
+either synthetic (uniform thresholds) or the opted-in premium users of a
+SQLite database, read-only. No Telegram message is sent.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import timedelta
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from alerts.backtest import BacktestRules, run_backtest
+from alerts.engine import RENOTIFY_INTERVAL
+from backend.utils.tremor_archive import archive_path_for, open_archive
+from config import Config
+
+
+def load_series(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Timestamps (UTC ``datetime64[ns]``) and values, preferring the binary archive.
+
+    The ``app`` package builds the Flask app on import (network bootstrap
+    included), so the series is read here without going through it.
+    """
+    archive_path = path if path.suffix == ".bin" else archive_path_for(path)
+    # Same rule as the tremor store: an archive older than the CSV is stale.
+    use_archive = archive_path.exists() and (
+        archive_path == path
+        or not path.exists()
+        or archive_path.stat().st_mtime_ns >= path.stat().st_mtime_ns
+    )
+    archive = open_archive(archive_path) if use_archive else None
+    if archive is not None:
+        timestamps = (np.asarray(archive["ts"], dtype="int64") * 1_000_000_000).view("datetime64[ns]")
+        return timestamps, np.asarray(archive["value"], dtype="float64")
+    if not path.exists() or path.suffix == ".bin":
+        raise SystemExit(f"Serie non disponibile: {path}")
+
+    df = pd.read_csv(path)
+    value_column = next((name for name in ("value", "value_max", "value_avg") if name in df.columns), None)
+    if "timestamp" not in df.columns or value_column is None:
+        raise SystemExit(f"Colonne mancanti in {path}")
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    df = df.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+    return (
+        df["timestamp"].to_numpy(dtype="datetime64[ns]"),
+        pd.to_numeric(df[value_column], errors="coerce").to_numpy(dtype="float64"),
+    )
+
+
+def load_db_thresholds(url: str) -> np.ndarray:
+    engine = create_engine(url)
+    query = text(
+        "SELECT threshold FROM users "
+        "WHERE telegram_opt_in = 1 AND (is_premium = 1 OR plan_type = 'premium')"
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(query).all()
+    default = float(Config.PREMIUM_DEFAULT_THRESHOLD)
+    return np.array([default if row[0] is None else float(row[0]) for row in rows], dtype="float64")
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=Path(os.getenv("CURVA_CSV_PATH", "data/curva_colored.csv")),
+        help="curva CSV or its .bin archive",
+    )
+    parser.add_argument("--since", help="replay only samples at/after this ISO timestamp")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users")
+    parser.add_argument("--users-db", help="SQLite URL to take real premium thresholds from")
+    parser.add_argument("--threshold-min", type=float, default=0.5)
+    parser.add_argument("--threshold-max", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limit-minutes", type=float, default=Config.ALERT_RATE_LIMIT_MINUTES)
+    parser.add_argument(
+        "--renotify-minutes", type=float, default=RENOTIFY_INTERVAL.total_seconds() / 60
+    )
+    parser.add_argument("--hysteresis-delta", type=float, default=Config.ALERT_HYSTERESIS_DELTA)
+    parser.add_argument("--check-minutes", type=float, default=5)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    timestamps, values = load_series(args.data)
+    if args.since:
+        since = pd.Timestamp(args.since)
+        since = since.tz_convert("UTC") if since.tzinfo else since.tz_localize("UTC")
+        keep = timestamps >= since.tz_localize(None).to_datetime64()
+        timestamps, values = timestamps[keep], values[keep]
+
+    if args.users_db:
+        thresholds = load_db_thresholds(args.users_db)
+    else:
+        rng = np.random.default_rng(args.seed)
+        thresholds = rng.uniform(args.threshold_min, args.threshold_max, size=args.users).round(1)
+
+    rules = BacktestRules(
+        rate_limit=timedelta(minutes=args.rate_limit_minutes),
+        renotify_interval=timedelta(minutes=args.renotify_minutes),
+        hysteresis_delta=args.hysteresis_delta,
+        check_interval=timedelta(minutes=args.check_minutes),
+    )
+    report = run_backtest(timestamps, values, thresholds, rules).as_dict()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Periodo: {report['first_ts']} -> {report['last_ts']}")
+        print(f"Utenti: {report['users']}  campioni: {report['samples']}  check: {report['checks']}")
+        print(f"Alert inviati: {report['sent']} (renotify: {report['renotified']})")
+        print(f"Alert per utente: {report['alerts_per_user']}")
+        print(f"Scartati: {report['skipped_by_reason']}")
+        print(f"Latenza superamento->invio (s): {report['latency_s']}")
+        print(f"CPU regole: {report['rule_cpu_s']}s  ({report['user_checks_per_s']} utenti-check/s)")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import csv
-import hashlib
 import json
 import logging
 import os
@@ -18,10 +17,31 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from backend.utils.extract_colored import download_png as download_colored_png
 from backend.utils.extract_colored import extract_series_from_colored
-from backend.utils.extract_png import download_png as download_white_png
-from backend.utils.extract_png import clean_and_save_data, process_png_bytes_to_csv
+from backend.utils.extract_colored import save_png as save_colored_png
+from backend.utils.extract_png import (
+    CSV_HEADER,
+    append_clean_data,
+    clean_and_save_data,
+    compact_csv,
+    extract_green_curve_from_png,
+    load_clean_rows,
+    process_png_bytes_to_csv,
+    read_csv_header,
+    resolve_reference_time,
+)
+from backend.utils.png_fetch import FetchResult, PngFetchCache
+from backend.utils.tremor_archive import (
+    append_archive,
+    archive_enabled,
+    archive_path_for,
+    merge_archive,
+    open_archive,
+    read_last_epoch,
+    rows_to_records,
+)
+from backend.utils.tremor_rollups import rollups_enabled, update_rollups
+from backend.utils.time import to_iso_utc
 
 
 DEFAULT_INTERVAL_SECONDS = 3600
@@ -29,6 +49,9 @@ MAX_RETRIES = 3
 RETRY_BACKOFF_SECONDS = 30
 DEFAULT_STALE_THRESHOLD = 8
 DEFAULT_PIPELINE_MODE = "colored"
+DEFAULT_WRITE_MODE = "incremental"
+DEFAULT_COMPACT_INTERVAL_HOURS = 24
+DEFAULT_RETENTION_DAYS = 7
 TMP_BASE_DIR = Path("/tmp/etnamonitor")
 TMP_DATA_DIR = TMP_BASE_DIR / "data"
 
@@ -123,43 +146,79 @@ def _record_csv_update(
     path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
 
 
-def _read_csv_last_timestamp(csv_path: Path) -> datetime | None:
-    """
-    Read the last valid timestamp from CSV, filtering out obsolete data.
-    
-    Timestamps with year < current year are considered obsolete/corrupted
-    and are skipped to prevent graph visualization issues.
+def _iter_lines_reversed(csv_path: Path, block_size: int = 8192):
+    """Yield the lines of ``csv_path`` from last to first, reading from the tail."""
+    with csv_path.open("rb") as handle:
+        handle.seek(0, os.SEEK_END)
+        position = handle.tell()
+        remainder = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            handle.seek(position)
+            chunk = handle.read(step) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line.decode("utf-8", errors="replace")
+        if remainder:
+            yield remainder.decode("utf-8", errors="replace")
+
+
+def _read_csv_tail_timestamp(csv_path: Path, *, min_year: int | None = None) -> datetime | None:
+    """Last parseable timestamp of the CSV, scanned backwards from the tail.
+
+    Rows older than ``min_year`` are skipped when it is given. Returns None
+    when the file is missing, unreadable or holds no usable timestamp.
     """
     if not csv_path.exists():
         return None
 
-    current_year = datetime.now(timezone.utc).year
-    
     try:
-        with csv_path.open("r", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            last_ts = None
-            for row in reader:
-                ts = row.get("timestamp")
-                if not ts:
-                    continue
-                candidate = _parse_iso_timestamp(ts)
-                if candidate is not None:
-                    # Filter out obsolete timestamps from previous years
-                    if candidate.year < current_year:
-                        log.warning(
-                            "Skipping obsolete timestamp from CSV: %s (year %d < %d)",
-                            candidate.isoformat(),
-                            candidate.year,
-                            current_year
-                        )
-                        continue
-                    last_ts = candidate
-            return last_ts
+        header = None
+        with csv_path.open("r", encoding="utf-8", newline="") as handle:
+            header = next(csv.reader(handle), None)
+        if not header or "timestamp" not in header:
+            return None
+        ts_index = header.index("timestamp")
+        for line in _iter_lines_reversed(csv_path):
+            if not line.strip():
+                continue
+            row = next(csv.reader([line]), [])
+            if row == header or len(row) <= ts_index:
+                continue
+            ts = row[ts_index]
+            if not ts:
+                continue
+            candidate = _parse_iso_timestamp(ts)
+            if candidate is None:
+                continue
+            # Filter out obsolete timestamps from previous years
+            if min_year is not None and candidate.year < min_year:
+                log.warning(
+                    "Skipping obsolete timestamp from CSV: %s (year %d < %d)",
+                    candidate.isoformat(),
+                    candidate.year,
+                    min_year
+                )
+                continue
+            return candidate
+        return None
     except Exception:
         return None
 
 
+def _read_csv_last_timestamp(csv_path: Path) -> datetime | None:
+    """
+    Read the last valid timestamp from CSV, filtering out obsolete data.
+    
+    Timestamps with year < current year are considered obsolete/corrupted
+    and are skipped to prevent graph visualization issues. The file is
+    scanned backwards from the tail, so the cost does not grow with history.
+    """
+    return _read_csv_tail_timestamp(csv_path, min_year=datetime.now(timezone.utc).year)
+
+
 def _parse_iso_timestamp(value: str | datetime | None) -> datetime | None:
     if value is None:
         return None
@@ -239,15 +298,195 @@ def _update_hash_state(current_hash: str, threshold: int) -> tuple[int, bool]:
     return count, count >= threshold
 
 
+def _resolve_fetch_state_path() -> Path:
+    return _tmp_data_path("INGV_FETCH_STATE", "ingv_fetch_state.json")
+
+
+def _conditional_fetch_enabled() -> bool:
+    return (os.getenv("INGV_CONDITIONAL_FETCH") or "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _fetch_png(url: str, csv_path: Path) -> FetchResult:
+    """Conditional GET of ``url``; content is only reported unchanged while the CSV exists."""
+    conditional = _conditional_fetch_enabled() and csv_path.exists()
+    return PngFetchCache(_resolve_fetch_state_path()).fetch(url, conditional=conditional)
+
+
+def _commit_fetches(fetches: list[FetchResult]) -> None:
+    cache = PngFetchCache(_resolve_fetch_state_path())
+    for fetched in fetches:
+        cache.commit(fetched)
+
+
+def _resolve_write_mode() -> str:
+    mode = (os.getenv("CSV_WRITE_MODE") or DEFAULT_WRITE_MODE).strip().lower()
+    return mode if mode in {"incremental", "rewrite"} else DEFAULT_WRITE_MODE
+
+
+def _resolve_compaction_state_path() -> Path:
+    return _tmp_data_path("CSV_COMPACTION_STATE", "csv_compaction.json")
+
+
+def _load_compaction_state() -> dict:
+    path = _resolve_compaction_state_path()
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def _store_compaction_state(state: dict) -> None:
+    path = _resolve_compaction_state_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+
+def _compaction_due(state: dict, output_path: Path) -> bool:
+    if state.get("csv_path") != str(output_path):
+        return True
+    if read_csv_header(output_path) != CSV_HEADER:
+        return True
+    last_compacted_at = _parse_iso_timestamp(state.get("last_compacted_at"))
+    if last_compacted_at is None:
+        return True
+    interval = timedelta(
+        hours=float(os.getenv("CSV_COMPACT_INTERVAL_HOURS", str(DEFAULT_COMPACT_INTERVAL_HOURS)))
+    )
+    return datetime.now(timezone.utc) - ensure_utc_aware(last_compacted_at) >= interval
+
+
+def _sync_archive(
+    csv_path: Path,
+    *,
+    rows: list | None = None,
+    appended_rows: list | None = None,
+    previous_last_ts: datetime | None = None,
+) -> None:
+    """Mirror the CSV into the binary archive read by the web workers.
+
+    Rewrites only replace the archive from the first CSV row onwards: the
+    history the CSV retention dropped stays in the archive.
+    """
+    if not archive_enabled():
+        return
+    archive_path = archive_path_for(csv_path)
+    try:
+        if appended_rows is not None:
+            last_epoch = read_last_epoch(archive_path)
+            previous_epoch = (
+                int(ensure_utc_aware(previous_last_ts).timestamp()) if previous_last_ts else None
+            )
+            if last_epoch is not None and last_epoch == previous_epoch:
+                append_archive(archive_path, appended_rows)
+                return
+        if rows is None:
+            rows = load_clean_rows(csv_path)
+        merge_archive(archive_path, rows)
+    except Exception:  # pragma: no cover - the CSV stays the source of truth
+        log.exception("[CSV] Failed to update binary archive %s", archive_path)
+
+
+def _sync_rollups(csv_path: Path) -> None:
+    """Refresh the hourly/daily rollups from the (already updated) raw series."""
+    if not rollups_enabled():
+        return
+    try:
+        records = open_archive(archive_path_for(csv_path)) if archive_enabled() else None
+        if records is None or not len(records):
+            records = rows_to_records(load_clean_rows(csv_path))
+        counts = update_rollups(csv_path, records["ts"], records["value"])
+        log.info("[CSV] rollups updated %s", counts)
+    except Exception:  # pragma: no cover - the CSV stays the source of truth
+        log.exception("[CSV] Failed to update rollups for %s", csv_path)
+
+
+def _compact_csv_output(rows: list, output_path: Path) -> dict:
+    retention = timedelta(
+        days=float(os.getenv("CSV_RETENTION_DAYS", str(DEFAULT_RETENTION_DAYS)))
+    )
+    _, cleaned_rows = compact_csv(str(output_path), rows, retention=retention)
+    if not cleaned_rows:
+        raise ValueError("Nessun punto valido estratto; CSV non aggiornato.")
+    _store_compaction_state(
+        {
+            "csv_path": str(output_path),
+            "last_compacted_at": datetime.now(timezone.utc).isoformat(),
+            "rows": len(cleaned_rows),
+        }
+    )
+    _sync_archive(output_path, rows=cleaned_rows)
+    log.info("[CSV] compacted rows=%s output=%s", len(cleaned_rows), output_path)
+    return {
+        "rows": len(cleaned_rows),
+        "appended": None,
+        "write_mode": "compact",
+        "first_ts": cleaned_rows[0]["timestamp"],
+        "last_ts": cleaned_rows[-1]["timestamp"],
+        "output_path": str(output_path),
+        "cleaned_rows": cleaned_rows,
+    }
+
+
+def _write_csv_incremental(rows: list, output_path: Path) -> dict:
+    state = _load_compaction_state()
+    if not output_path.exists() or _compaction_due(state, output_path):
+        return _compact_csv_output(rows, output_path)
+
+    # The append checkpoint is the file's real tail, whatever its year: a
+    # missing checkpoint would re-append the whole PNG window.
+    previous_last_ts = _read_csv_tail_timestamp(output_path)
+    if previous_last_ts is None:
+        log.warning("[CSV] no readable tail timestamp in %s; compacting instead", output_path)
+        return _compact_csv_output(rows, output_path)
+
+    _, cleaned_rows, appended_rows = append_clean_data(
+        rows, str(output_path), after=previous_last_ts
+    )
+    if not cleaned_rows:
+        raise ValueError("Nessun punto valido estratto; CSV non aggiornato.")
+    total_rows = int(state.get("rows") or 0) + len(appended_rows)
+    if appended_rows:
+        state["rows"] = total_rows
+        _store_compaction_state(state)
+        _sync_archive(
+            output_path,
+            appended_rows=appended_rows,
+            previous_last_ts=previous_last_ts,
+        )
+    last_ts = appended_rows[-1]["timestamp"] if appended_rows else previous_last_ts
+    log.info(
+        "[CSV] appended rows=%s total_rows=%s output=%s",
+        len(appended_rows),
+        total_rows,
+        output_path,
+    )
+    return {
+        "rows": total_rows,
+        "appended": len(appended_rows),
+        "write_mode": "append",
+        "first_ts": cleaned_rows[0]["timestamp"],
+        "last_ts": last_ts,
+        "output_path": str(output_path),
+        "cleaned_rows": cleaned_rows,
+    }
+
+
 def _write_csv_safely(rows: list, output_path: Path) -> dict:
+    if _resolve_write_mode() == "incremental":
+        return _write_csv_incremental(rows, output_path)
+
     temp_path = output_path.with_suffix(".tmp")
     _, cleaned_rows = clean_and_save_data(rows, str(temp_path))
     if not cleaned_rows:
         temp_path.unlink(missing_ok=True)
         raise ValueError("Nessun punto valido estratto; CSV non aggiornato.")
     temp_path.replace(output_path)
+    _sync_archive(output_path, rows=cleaned_rows)
     return {
         "rows": len(cleaned_rows),
+        "write_mode": "rewrite",
         "first_ts": cleaned_rows[0]["timestamp"] if cleaned_rows else None,
         "last_ts": cleaned_rows[-1]["timestamp"] if cleaned_rows else None,
         "output_path": str(output_path),
@@ -256,12 +495,27 @@ def _write_csv_safely(rows: list, output_path: Path) -> dict:
 
 
 def _process_white_png(png_bytes: bytes, reference_time: datetime, csv_path: Path) -> dict:
+    if _resolve_write_mode() == "incremental":
+        data, metadata = extract_green_curve_from_png(png_bytes, end_time=reference_time)
+        result = _write_csv_incremental(data, csv_path)
+        interval_seconds = metadata.get("interval_seconds")
+        result.update(
+            {
+                "start_time": to_iso_utc(metadata.get("start_time")),
+                "end_time": to_iso_utc(metadata.get("end_time")),
+                "interval_minutes": interval_seconds / 60 if interval_seconds else None,
+                "pixel_columns": metadata.get("pixel_columns"),
+            }
+        )
+        return result
+
     temp_path = csv_path.with_suffix(".tmp")
     result = process_png_bytes_to_csv(png_bytes, reference_time, str(temp_path))
     if not result.get("rows"):
         temp_path.unlink(missing_ok=True)
         raise ValueError("Estratti 0 punti dal PNG bianco.")
     temp_path.replace(csv_path)
+    _sync_archive(csv_path)
     result["output_path"] = str(csv_path)
     return result
 
@@ -298,26 +552,41 @@ def update_with_retries(ingv_url: str, colored_url: str | None, csv_path: Path)
     pipeline_mode = _resolve_pipeline_mode()
 
     for attempt in range(1, MAX_RETRIES + 1):
+        unchanged: FetchResult | None = None
+        fetches: list[FetchResult] = []
+        result: dict = {}
         try:
             if pipeline_mode == "white":
-                png_bytes, reference_time = download_white_png(ingv_url)
-                png_hash = hashlib.sha256(png_bytes).hexdigest()
-                stale_count, is_stale = _update_hash_state(png_hash, stale_threshold)
+                white_fetch = _fetch_png(ingv_url, csv_path)
+                fetches.append(white_fetch)
+                stale_count, is_stale = _update_hash_state(white_fetch.sha256, stale_threshold)
 
                 if is_stale:
                     if not colored_url:
                         raise ValueError("Sorgente bianca stale e INGV_COLORED_URL non configurato.")
-                    colored_path = download_colored_png(colored_url)
-                    result = _process_colored_png(colored_path, csv_path)
-                    result["source"] = "colored"
-                    result["stale_count"] = stale_count
-                    log.info(
-                        "[CSV] fallback colored source=colored stale_count=%s output=%s",
-                        stale_count,
-                        result.get("output_path"),
-                    )
+                    colored_fetch = _fetch_png(colored_url, csv_path)
+                    fetches = [colored_fetch]
+                    if not colored_fetch.changed:
+                        unchanged = colored_fetch
+                        result = {"source": "colored", "stale_count": stale_count}
+                    else:
+                        colored_path = save_colored_png(colored_fetch.content)
+                        result = _process_colored_png(colored_path, csv_path)
+                        result["source"] = "colored"
+                        result["stale_count"] = stale_count
+                        log.info(
+                            "[CSV] fallback colored source=colored stale_count=%s output=%s",
+                            stale_count,
+                            result.get("output_path"),
+                        )
+                elif not white_fetch.changed:
+                    unchanged = white_fetch
+                    result = {"source": "white", "stale_count": stale_count}
                 else:
-                    result = _process_white_png(png_bytes, reference_time, csv_path)
+                    reference_time = resolve_reference_time(
+                        white_fetch.content, white_fetch.last_modified
+                    )
+                    result = _process_white_png(white_fetch.content, reference_time, csv_path)
                     result["source"] = "white"
                     result["stale_count"] = stale_count
                     log.info(
@@ -329,15 +598,21 @@ def update_with_retries(ingv_url: str, colored_url: str | None, csv_path: Path)
             else:
                 if not colored_url:
                     raise ValueError("INGV_COLORED_URL non configurato.")
-                colored_path = download_colored_png(colored_url)
-                result = _process_colored_png(colored_path, csv_path)
-                result["source"] = "colored"
-                result["stale_count"] = None
-                log.info(
-                    "[CSV] update source=colored rows=%s output=%s",
-                    result.get("rows"),
-                    result.get("output_path"),
-                )
+                colored_fetch = _fetch_png(colored_url, csv_path)
+                fetches.append(colored_fetch)
+                if not colored_fetch.changed:
+                    unchanged = colored_fetch
+                    result = {"source": "colored", "stale_count": None}
+                else:
+                    colored_path = save_colored_png(colored_fetch.content)
+                    result = _process_colored_png(colored_path, csv_path)
+                    result["source"] = "colored"
+                    result["stale_count"] = None
+                    log.info(
+                        "[CSV] update source=colored rows=%s output=%s",
+                        result.get("rows"),
+                        result.get("output_path"),
+                    )
             last_exception = None
         except Exception as exc:
             last_error = str(exc)
@@ -348,6 +623,45 @@ def update_with_retries(ingv_url: str, colored_url: str | None, csv_path: Path)
                 time.sleep(RETRY_BACKOFF_SECONDS * attempt)
             continue
 
+        if unchanged is not None:
+            # Same PNG as the last processed tick: skip decode/extract/CSV write.
+            log.info(
+                "[CSV] source unchanged (%s) url=%s sha256=%s: extraction skipped",
+                unchanged.status,
+                unchanged.url,
+                unchanged.sha256,
+            )
+            try:
+                _log_cron_run(
+                    csv_path,
+                    ok=True,
+                    reason="unchanged",
+                    duration_ms=(perf_counter() - started_at) * 1000,
+                    pipeline_id=pipeline_id,
+                    payload={
+                        "ingv_url": ingv_url,
+                        "ingv_colored_url": colored_url,
+                        "attempts": attempt,
+                        "rows": 0,
+                        "last_ts": to_iso_utc(previous_last_ts),
+                        "source": result.get("source"),
+                        "stale_count": result.get("stale_count"),
+                        "fetch_status": unchanged.status,
+                        "sha256": unchanged.sha256,
+                        "etag": unchanged.etag,
+                    },
+                )
+            except Exception:  # pragma: no cover - defensive logging
+                log.exception("[CSV] Failed to persist cron run log")
+            return {
+                "ok": True,
+                "updated": False,
+                "unchanged": True,
+                "last_ts": previous_last_ts,
+            }
+
+        _commit_fetches(fetches)
+        _sync_rollups(csv_path)
         last_ts = _read_csv_last_timestamp(csv_path)
         try:
             stat = csv_path.stat()
@@ -375,6 +689,8 @@ def update_with_retries(ingv_url: str, colored_url: str | None, csv_path: Path)
                     "ingv_colored_url": colored_url,
                     "attempts": attempt,
                     "rows": result.get("rows"),
+                    "appended": result.get("appended"),
+                    "write_mode": result.get("write_mode"),
                     "first_ts": result.get("first_ts"),
                     "last_ts": result.get("last_ts"),
                     "start_ref": result.get("start_time"),
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from alerts.backtest import BacktestRules, run_backtest
+from app.services.telegram_service import TelegramService
+
+
+def _series(values, minutes=1):
+    start = np.datetime64("2026-01-01T00:00:00", "ns")
+    return start + np.arange(len(values)) * np.timedelta64(minutes, "m"), np.asarray(values, dtype="float64")
+
+
+def test_backtest_matches_single_user_simulation():
+    rng = np.random.default_rng(3)
+    values = np.clip(np.cumsum(rng.normal(0, 0.3, size=600)) + 2.0, 0, None).round(2)
+    timestamps, values = _series(values)
+    thresholds = [1.5, 2.0, 2.5, 3.0]
+    rules = BacktestRules(
+        rate_limit=timedelta(minutes=15),
+        renotify_interval=timedelta(minutes=30),
+        hysteresis_delta=0.2,
+        check_interval=timedelta(minutes=1),
+    )
+
+    report = run_backtest(timestamps, values, thresholds, rules)
+
+    expected = 0
+    expected_renotify = 0
+    for threshold in thresholds:
+        decisions = TelegramService.simulate_premium_alert_flow(
+            values.tolist(),
+            threshold=threshold,
+            start_time=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            hysteresis_delta=0.2,
+            rate_limit_minutes=15,
+            renotify_minutes=30,
+        )
+        expected += sum(decision["sent"] for decision in decisions)
+        expected_renotify += sum(
+            decision["reason"] == "persistent_above_threshold_renotify" for decision in decisions
+        )
+    assert report.checks == 600
+    assert report.sent == expected
+    assert report.renotified == expected_renotify
+
+
+def test_backtest_reports_latency_from_crossing_to_check():
+    # Samples every minute, checks every 5: the crossing at minute 7 is sent at minute 10.
+    timestamps, values = _series([1.0] * 7 + [3.0] * 5)
+    report = run_backtest(
+        timestamps,
+        values,
+        np.array([2.0]),
+        BacktestRules(check_interval=timedelta(minutes=5)),
+    )
+
+    assert report.sent == 1
+    assert report.latency_s["count"] == 1
+    assert report.latency_s["max"] == pytest.approx(180.0)
+    assert report.skipped_by_reason == {"below_threshold": 2, "cooldown": 1, "already_sent_hysteresis": 0}
+
+
+def test_backtest_handles_empty_series():
+    report = run_backtest(np.empty(0, dtype="datetime64[ns]"), np.empty(0), np.array([2.0]))
+
+    assert report.checks == 0 and report.sent == 0
+    assert report.latency_s["count"] == 0
+
+
+def test_default_rules_use_the_service_renotify_interval():
+    assert BacktestRules().renotify_interval == TelegramService.RENOTIFY_INTERVAL
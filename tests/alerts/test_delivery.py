@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from alerts.delivery import OutgoingMessage, TelegramDeliveryPool, TokenBucket
+
+
+class FakeTelegram:
+    """Minimal Bot API ``sendMessage`` endpoint with scripted replies per chat."""
+
+    def __init__(self, script: dict[str, list[tuple[int, dict, dict]]]):
+        self.script = {chat: list(replies) for chat, replies in script.items()}
+        self.requests: list[tuple[str, float]] = []
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # noqa: N802 - http.server API
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length))
+                chat_id = payload["chat_id"]
+                with fake.lock:
+                    fake.requests.append((chat_id, time.monotonic()))
+                    replies = fake.script.get(chat_id) or []
+                    status, headers, body = replies.pop(0) if replies else (200, {}, {"ok": True})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                return None
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def times(self, chat_id: str) -> list[float]:
+        return [ts for chat, ts in self.requests if chat == chat_id]
+
+
+@pytest.fixture
+def fake_telegram():
+    servers: list[FakeTelegram] = []
+
+    def start(script=None) -> FakeTelegram:
+        server = FakeTelegram(script or {})
+        server.thread.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.server.shutdown()
+        server.server.server_close()
+
+
+def _messages(*chat_ids: str) -> list[OutgoingMessage]:
+    return [OutgoingMessage(chat_id=chat_id, text=f"alert {chat_id}") for chat_id in chat_ids]
+
+
+def test_retry_after_delays_only_its_chat(fake_telegram):
+    server = fake_telegram(
+        {
+            "slow": [(429, {"Retry-After": "1"}, {"ok": False, "error_code": 429})],
+            "body": [(429, {}, {"ok": False, "parameters": {"retry_after": 1}})],
+            "gone": [(400, {}, {"ok": False, "description": "Bad Request: chat not found"})],
+        }
+    )
+    pool = TelegramDeliveryPool("token", api_base=server.api_base, max_workers=4)
+
+    results = pool.deliver(_messages("slow", "a", "body", "b", "gone", "c"))
+
+    assert [result.chat_id for result in results] == ["slow", "a", "body", "b", "gone", "c"]
+    assert [result.status for result in results] == ["sent", "sent", "sent", "sent", "failed", "sent"]
+    assert results[0].attempts == 2 and results[2].attempts == 2
+    assert results[4].attempts == 1 and "chat not found" in results[4].error
+
+    slow_first, slow_retry = server.times("slow")
+    assert slow_retry - slow_first >= 0.95
+    assert len(server.times("body")) == 2
+    assert max(server.times(chat)[0] for chat in ("a", "b", "c")) < slow_retry
+
+
+def test_long_retry_after_gives_up_without_waiting(fake_telegram):
+    server = fake_telegram({"flood": [(429, {"Retry-After": "3600"}, {"ok": False})]})
+    pool = TelegramDeliveryPool("token", api_base=server.api_base)
+
+    start = time.monotonic()
+    results = pool.deliver(_messages("flood", "ok"))
+
+    assert time.monotonic() - start < 5
+    assert results[0].status == "rate_limited" and results[0].attempts == 1
+    assert results[1].ok
+
+
+def test_per_chat_interval_spaces_messages_to_one_chat(fake_telegram):
+    server = fake_telegram()
+    pool = TelegramDeliveryPool("token", api_base=server.api_base, per_chat_interval=0.3)
+
+    results = pool.deliver(_messages("same", "same", "other"))
+
+    assert all(result.ok for result in results)
+    first, second = server.times("same")
+    assert second - first >= 0.28
+
+
+def test_token_bucket_refills_at_rate():
+    now = [0.0]
+    bucket = TokenBucket(2, clock=lambda: now[0])
+
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.try_acquire() == 0.0
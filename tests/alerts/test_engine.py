@@ -1,8 +1,18 @@
+from datetime import timedelta
 import math
 
+import numpy as np
 import pytest
 
-from alerts.engine import AlertComputation, compute_moving_average, evaluate_threshold
+from alerts.engine import (
+    AlertComputation,
+    RollingWindow,
+    StreamingEvaluator,
+    compute_moving_average,
+    evaluate_eligibility,
+    evaluate_threshold,
+    evaluate_thresholds,
+)
 
 
 def test_compute_moving_average_basic():
@@ -38,3 +48,122 @@ def test_evaluate_threshold_no_data():
     assert result.moving_average is None
     assert result.latest_value is None
     assert result.sample_size == 0
+
+
+def _series(values, start="2026-01-01T00:00:00"):
+    timestamps = np.datetime64(start, "ns") + np.arange(len(values)) * np.timedelta64(1, "m")
+    return timestamps, np.asarray(values, dtype="float64")
+
+
+def test_rolling_window_evicts_oldest_sample():
+    window = RollingWindow(3)
+    window.extend([1, 2, 3, 4, 5])
+    assert len(window) == 3
+    assert window.mean == pytest.approx(4.0)
+
+
+def test_streaming_evaluator_consumes_only_new_samples():
+    timestamps, values = _series([1, 2, 3, 4, 5, 6])
+    stream = StreamingEvaluator(3)
+
+    first = stream.advance(timestamps[:4], values[:4])
+    assert first.new_points == 4 and first.peak_value == 4.0
+    assert first.latest_ts == timestamps[3]
+
+    second = stream.advance(timestamps, values)
+    assert second.new_points == 2
+    assert second.peak_value == 6.0 and second.latest_value == 6.0
+    assert second.moving_average == pytest.approx(compute_moving_average(values, window=3))
+    assert stream.advance(timestamps, values).new_points == 0
+    assert stream.evaluate(4.5).triggered is True
+
+
+def test_streaming_evaluator_seed_matches_full_recompute():
+    timestamps, values = _series([1, float("nan"), 2, 3, 10, 11])
+    stream = StreamingEvaluator(3)
+    stream.seed(timestamps, values, timestamps[3])
+
+    update = stream.advance(timestamps, values)
+
+    assert update.new_points == 2 and update.peak_value == 11.0
+    assert update.moving_average == pytest.approx(evaluate_threshold([1, 2, 3, 10, 11], 3, 0).moving_average)
+
+
+def _reference_crossings(values, threshold, window, delta, armed):
+    crossings = []
+    for index in range(len(values)):
+        signal = compute_moving_average(values[: index + 1], window)
+        if signal >= threshold:
+            if armed:
+                crossings.append(index)
+            armed = False
+        elif signal <= threshold - delta:
+            armed = True
+    return crossings, armed
+
+
+def test_evaluate_thresholds_matches_per_user_loop():
+    rng = np.random.default_rng(7)
+    timestamps, values = _series(rng.uniform(0, 4, size=200).round(2))
+    thresholds = rng.uniform(1, 3, size=40)
+    windows = rng.integers(1, 6, size=40)
+    armed = rng.random(40) < 0.5
+
+    batch = evaluate_thresholds(timestamps, values, thresholds, windows, hysteresis_delta=0.3, armed=armed)
+
+    for user in range(40):
+        crossings, armed_after = _reference_crossings(
+            values.tolist(), thresholds[user], int(windows[user]), 0.3, bool(armed[user])
+        )
+        assert batch.triggered[user] == bool(crossings)
+        if crossings:
+            assert batch.crossing_ts[user] == timestamps[crossings[0]]
+        assert batch.armed[user] == armed_after
+        assert batch.moving_average[user] == pytest.approx(compute_moving_average(values, int(windows[user])))
+
+
+def test_evaluate_thresholds_single_sample_gates():
+    timestamps, values = _series([2.5])
+
+    batch = evaluate_thresholds(
+        timestamps, values, [2.0, 2.0, 3.0], hysteresis_delta=0.2, armed=[True, False, False]
+    )
+
+    assert batch.above.tolist() == [True, True, False]
+    assert batch.triggered.tolist() == [True, False, False]
+    assert batch.armed.tolist() == [False, False, True]
+
+
+def test_evaluate_eligibility_gates():
+    now = np.datetime64("2026-01-01T12:00")
+    nat = np.datetime64("NaT")
+    last_sent = np.array(
+        [nat, now - np.timedelta64(5, "m"), now - np.timedelta64(20, "m"), now - np.timedelta64(40, "m"), nat],
+        dtype="datetime64[ns]",
+    )
+    last_reset = np.full(5, nat, dtype="datetime64[ns]")
+    last_reset[2] = now - np.timedelta64(10, "m")
+
+    gates = evaluate_eligibility(
+        [2.0, 2.0, 2.0, 2.0, np.nan],
+        2.5,
+        now,
+        last_sent,
+        last_reset,
+        hysteresis_delta=0.2,
+        rate_limit=timedelta(minutes=15),
+        renotify_interval=timedelta(minutes=30),
+    )
+
+    assert gates.above.tolist() == [True, True, True, True, False]
+    assert gates.rate_limited.tolist() == [False, True, False, False, False]
+    assert gates.hysteresis_rearmed.tolist()[:4] == [True, False, True, False]
+    assert gates.renotify_due.tolist() == [False, False, False, True, False]
+    assert gates.send.tolist() == [True, False, True, True, False]
+    assert not gates.hysteresis_release.any()
+
+    released = evaluate_eligibility(
+        [2.0], 1.5, now, last_sent[1:2], last_reset[1:2],
+        hysteresis_delta=0.2, rate_limit=timedelta(minutes=15),
+    )
+    assert released.hysteresis_release.tolist() == [True]
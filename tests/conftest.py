@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def single_flight(monkeypatch):
+    """Replace ``module.<attr>`` with an idle ``SingleFlight`` with empty metrics.
+
+    Returns the new instance; ``flight.wait_idle(5)`` waits for the
+    background run a test started.
+    """
+    from app.utils.background import SingleFlight
+
+    def _replace(module, attr):
+        current = getattr(module, attr)
+        flight = SingleFlight(current.name, retry_interval=current.retry_interval)
+        monkeypatch.setattr(module, attr, flight)
+        return flight
+
+    return _replace
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pandas as pd
+import pytest
+
+from app import create_app
+import app.services.tremor_summary as tremor_summary
+
+AI_TEXT = {
+    "headline": "Tremore stabile",
+    "explain": "Valori bassi.",
+    "bullets": [],
+    "risk": "low",
+    "disclaimer": "Solo informativo.",
+}
+
+
+def _payload(ts_utc="2026-10-16T10:00:00Z", status="STABILE"):
+    return tremor_summary._ai_request_payload(status, "flat", 0.8, ts_utc, 60)
+
+
+@pytest.fixture
+def ai_env(tmp_path, monkeypatch, single_flight):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("FEATURE_AI_SUMMARY", "1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    monkeypatch.setattr(tremor_summary, "_AI_CACHE", dict.fromkeys(tremor_summary._AI_CACHE))
+    single_flight(tremor_summary, "_ai_refresh")
+
+    calls = []
+    release = threading.Event()
+    release.set()
+    failure = {}
+
+    def fake_fetch(payload):
+        calls.append(payload["ts_utc"])
+        release.wait(5)
+        if failure.get("error"):
+            raise TimeoutError(failure["error"])
+        return dict(AI_TEXT, headline=f"{AI_TEXT['headline']} {payload['status']}")
+
+    monkeypatch.setattr(tremor_summary, "_fetch_ai_summary", fake_fetch)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        yield calls, release, failure
+
+
+def _forget_process_cache():
+    """What another gunicorn worker sees: nothing in memory."""
+    for key in tremor_summary._AI_CACHE:
+        tremor_summary._AI_CACHE[key] = None
+
+
+def test_requests_never_wait_and_share_one_fetch(ai_env):
+    calls, release, _ = ai_env
+    release.clear()
+
+    started = time.monotonic()
+    results = [tremor_summary._get_ai_summary(_payload()) for _ in range(5)]
+    assert time.monotonic() - started < 1.0
+    assert results == [None] * 5
+
+    release.set()
+    assert tremor_summary._ai_refresh.wait_idle(5)
+    assert calls == ["2026-10-16T10:00:00Z"]
+    assert tremor_summary._get_ai_summary(_payload())["headline"] == "Tremore stabile STABILE"
+    assert tremor_summary.get_ai_cache_status()["key"] == "2026-10-16T10:00:00Z|STABILE"
+
+
+def test_other_workers_read_the_shared_entry(ai_env):
+    calls, _, _ = ai_env
+    tremor_summary.refresh_ai_summary(_payload())
+    _forget_process_cache()
+
+    assert tremor_summary._get_ai_summary(_payload())["risk"] == "low"
+    assert len(calls) == 1
+
+    # A new status for the same point is a different entry.
+    assert tremor_summary._get_ai_summary(_payload(status="IN_AUMENTO")) is None
+    assert tremor_summary._ai_refresh.wait_idle(5)
+    assert tremor_summary._get_ai_summary(_payload(status="IN_AUMENTO"))["headline"].endswith("IN_AUMENTO")
+    assert len(calls) == 2
+
+
+def test_expired_entry_is_served_while_it_refreshes(ai_env):
+    calls, release, _ = ai_env
+    tremor_summary.refresh_ai_summary(_payload())
+    tremor_summary._AI_CACHE["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    release.clear()
+
+    assert tremor_summary._get_ai_summary(_payload())["risk"] == "low"
+
+    release.set()
+    assert tremor_summary._ai_refresh.wait_idle(5)
+    assert len(calls) == 2
+
+
+def test_cross_worker_lock_skips_fetch_until_stale(ai_env):
+    calls, _, _ = ai_env
+    lock_path = tremor_summary._shared_cache_path().with_suffix(".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_path.write_text("4242", encoding="utf-8")
+
+    assert tremor_summary.refresh_ai_summary(_payload()) is None
+    assert calls == []
+
+    old = time.time() - tremor_summary.AI_LOCK_TIMEOUT.total_seconds() - 1
+    os.utime(lock_path, (old, old))
+    assert tremor_summary.refresh_ai_summary(_payload())["risk"] == "low"
+    assert calls == ["2026-10-16T10:00:00Z"]
+    assert not lock_path.exists()
+
+
+def test_failed_fetch_is_not_retried_on_every_request(ai_env):
+    calls, _, failure = ai_env
+    failure["error"] = "timed out"
+
+    assert tremor_summary._get_ai_summary(_payload()) is None
+    assert tremor_summary._ai_refresh.wait_idle(5)
+    assert tremor_summary._get_ai_summary(_payload()) is None
+    assert tremor_summary._ai_refresh.wait_idle(5)
+
+    assert len(calls) == 1
+    assert tremor_summary.get_ai_cache_status()["last_error"] == "timed out"
+
+
+def test_precompute_fills_cache_for_latest_point(ai_env, monkeypatch):
+    calls, _, _ = ai_env
+    timestamps = pd.date_range("2026-10-16T08:00:00Z", periods=121, freq="min")
+    df = pd.DataFrame({"timestamp": timestamps, "value": [1.0] * 121})
+    monkeypatch.setattr(tremor_summary, "load_tremor_dataframe", lambda: (df, None))
+
+    tremor_summary.precompute_ai_summary()
+    tremor_summary.precompute_ai_summary()
+
+    assert len(calls) == 1
+    trend = tremor_summary.calculate_trend(df)
+    assert tremor_summary.get_ai_cache_status()["key"] == f"{trend['ts_utc']}|STABILE"
+
+
+def test_cache_backend_path_uses_app_cache(ai_env, monkeypatch):
+    calls, _, _ = ai_env
+    # The app cache is Redis in production; SimpleCache stands in here.
+    monkeypatch.setattr(tremor_summary, "_shared_backend", lambda: "redis")
+
+    tremor_summary.refresh_ai_summary(_payload())
+    _forget_process_cache()
+
+    assert tremor_summary._get_ai_summary(_payload())["risk"] == "low"
+    assert tremor_summary.cache.get(tremor_summary._SHARED_LOCK_KEY) is None
+    assert not tremor_summary._shared_cache_path().exists()
+    assert len(calls) == 1
@@ -0,0 +1,230 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pytest
+
+from alerts.delivery import DeliveryResult
+from app import create_app
+from app.models import db
+from app.models.alert_outbox import AlertOutbox
+from app.models.event import Event
+from app.models.user import User
+from app.services.telegram_service import TelegramService
+from config import Config
+import app.services.alert_outbox as outbox_module
+import app.services.telegram_service as telegram_module
+
+
+@pytest.fixture
+def app_ctx(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(telegram_module, "get_curva_csv_path", lambda: tmp_path / "curva.csv")
+    monkeypatch.setattr(Config, "TELEGRAM_BOT_TOKEN", "test-token")
+    monkeypatch.setattr(Config, "ALERT_THRESHOLD_DEFAULT", 2.0)
+    monkeypatch.setattr(Config, "PREMIUM_DEFAULT_THRESHOLD", 2.0)
+    monkeypatch.setattr(Config, "ALERT_OUTBOX_MAX_ATTEMPTS", 3)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Scripted delivery: ``replies[chat_id]`` is consumed first, then messages succeed."""
+    calls: List[str] = []
+    replies: dict[str, list[DeliveryResult]] = {}
+
+    def fake_deliver(token, messages):
+        results = []
+        for message in messages:
+            calls.append(message.chat_id)
+            scripted = replies.get(message.chat_id) or []
+            results.append(
+                scripted.pop(0)
+                if scripted
+                else DeliveryResult(chat_id=message.chat_id, ok=True, status="sent", attempts=1)
+            )
+        return results
+
+    def no_direct_send(token, messages):
+        raise AssertionError("alerts must be queued, not sent inline")
+
+    monkeypatch.setattr(outbox_module, "deliver_telegram_messages", fake_deliver)
+    monkeypatch.setattr(telegram_module, "deliver_telegram_messages", no_direct_send)
+    return calls, replies
+
+
+def _premium(email: str, chat_id: int) -> User:
+    return User(
+        email=email,
+        plan_type="premium",
+        is_premium=True,
+        telegram_opt_in=True,
+        telegram_chat_id=chat_id,
+        threshold=2.0,
+    )
+
+
+def _enqueue(event_id: str, now: datetime, allow_free: bool = False) -> dict:
+    result = TelegramService()._dispatch_alerts(
+        event_id, 3.0, 3.0, None, now, window_size=None, allow_free=allow_free, use_outbox=True
+    )
+    db.session.commit()
+    return result
+
+
+def _retry_all_now() -> None:
+    AlertOutbox.query.update({"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db.session.commit()
+
+
+def test_enqueue_applies_state_once_per_event(app_ctx, telegram):
+    calls, _ = telegram
+    now = datetime.now(timezone.utc)
+    users = [_premium("a@example.com", 301), _premium("b@example.com", 302)]
+    db.session.add_all(users)
+    db.session.commit()
+
+    first = _enqueue("evt-1", now)
+    assert first["queued"] == 2 and first["sent"] == 0
+    assert {row.idempotency_key for row in AlertOutbox.query} == {
+        f"evt-1:{user.id}:premium_alert" for user in users
+    }
+    assert all(user.last_alert_sent_at is not None for user in users)
+
+    # A retried cron request for the same event enqueues nothing new.
+    User.query.update({"last_alert_sent_at": None})
+    db.session.commit()
+    second = _enqueue("evt-1", now)
+    assert second["queued"] == 0
+    assert second["skipped_by_reason"] == {"already_queued": 2}
+    assert AlertOutbox.query.count() == 2
+    assert calls == []
+
+
+def test_drain_delivers_and_marks_rows_sent(app_ctx, telegram):
+    calls, _ = telegram
+    db.session.add(_premium("a@example.com", 401))
+    db.session.commit()
+    _enqueue("evt-2", datetime.now(timezone.utc))
+
+    stats = outbox_module.drain_alert_outbox("test-token")
+
+    assert stats == {"claimed": 1, "sent": 1, "retried": 0, "dead": 0}
+    assert calls == ["401"]
+    row = AlertOutbox.query.one()
+    assert row.status == AlertOutbox.STATUS_SENT and row.attempts == 1
+    assert outbox_module.drain_alert_outbox("test-token")["claimed"] == 0
+
+
+def test_drain_retries_then_dead_letters(app_ctx, telegram):
+    calls, replies = telegram
+    db.session.add_all([_premium("flaky@example.com", 501), _premium("gone@example.com", 502)])
+    db.session.commit()
+    _enqueue("evt-3", datetime.now(timezone.utc))
+    replies["501"] = [
+        DeliveryResult(chat_id="501", ok=False, status="failed", attempts=3, error="HTTP 502", http_status=502)
+        for _ in range(3)
+    ]
+    replies["502"] = [
+        DeliveryResult(
+            chat_id="502", ok=False, status="failed", attempts=1, error="HTTP 403: blocked", http_status=403
+        )
+    ]
+
+    stats = outbox_module.drain_alert_outbox("test-token")
+    assert stats == {"claimed": 2, "sent": 0, "retried": 1, "dead": 1}
+    gone = AlertOutbox.query.filter_by(chat_id="502").one()
+    assert gone.status == AlertOutbox.STATUS_DEAD and "blocked" in gone.last_error
+
+    flaky = AlertOutbox.query.filter_by(chat_id="501").one()
+    assert flaky.status == AlertOutbox.STATUS_PENDING
+    assert outbox_module.drain_alert_outbox("test-token")["claimed"] == 0  # backing off
+
+    for _ in range(2):
+        _retry_all_now()
+        outbox_module.drain_alert_outbox("test-token")
+    db.session.refresh(flaky)
+    assert flaky.status == AlertOutbox.STATUS_DEAD and flaky.attempts == 3
+    assert calls.count("501") == 3 and calls.count("502") == 1
+
+
+def test_expired_lease_is_claimed_again(app_ctx, telegram):
+    calls, _ = telegram
+    db.session.add(_premium("a@example.com", 601))
+    db.session.commit()
+    _enqueue("evt-4", datetime.now(timezone.utc))
+
+    # A drain that died after claiming the row.
+    row = AlertOutbox.query.one()
+    row.status = AlertOutbox.STATUS_SENDING
+    row.attempts = 1
+    row.locked_until = datetime.now(timezone.utc) + timedelta(minutes=1)
+    db.session.commit()
+    assert outbox_module.drain_alert_outbox("test-token")["claimed"] == 0
+
+    row.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+    stats = outbox_module.drain_alert_outbox("test-token")
+
+    assert stats["sent"] == 1 and calls == ["601"]
+    db.session.refresh(row)
+    assert row.status == AlertOutbox.STATUS_SENT and row.attempts == 2
+
+
+def test_row_leased_by_another_drain_is_not_claimed_again(app_ctx, telegram, monkeypatch):
+    db.session.add_all([_premium("a@example.com", 701), _premium("b@example.com", 702)])
+    db.session.commit()
+    _enqueue("evt-5", datetime.now(timezone.utc))
+    now = datetime.now(timezone.utc)
+
+    # Both drains read the same candidates before either one leased them.
+    stale = outbox_module._due_candidates(now, 10)
+    assert [row.id for row in outbox_module._claim_due(now, 10)] == stale
+    monkeypatch.setattr(outbox_module, "_due_candidates", lambda now, limit: stale)
+
+    assert outbox_module._claim_due(now, 10) == []
+    assert [row.attempts for row in AlertOutbox.query] == [1, 1]
+
+
+def test_dead_letter_rolls_back_the_queued_state(app_ctx, telegram):
+    _, replies = telegram
+    free_user = User(email="free@example.com", telegram_opt_in=True, telegram_chat_id=801)
+    premium = _premium("p@example.com", 802)
+    db.session.add_all([free_user, premium])
+    db.session.commit()
+    _enqueue("evt_6", datetime.now(timezone.utc), allow_free=True)
+    assert free_user.free_alert_consumed == 1 and premium.alert_count_30d == 1
+    assert Event.query.count() == 3
+
+    for chat_id in ("801", "802"):
+        replies[chat_id] = [
+            DeliveryResult(chat_id=chat_id, ok=False, status="failed", attempts=1, error="HTTP 403", http_status=403)
+        ]
+    assert outbox_module.drain_alert_outbox("test-token")["dead"] == 2
+
+    types = sorted(event.event_type for event in Event.query)
+    assert types == [
+        "alert_undelivered",
+        "alert_undelivered",
+        "delivery_failed",
+        "delivery_failed",
+        "free_trial_consumed_undelivered",
+    ]
+    assert all(event.outbox_key for event in Event.query)
+    assert Event.query.filter_by(event_type="free_trial_consumed_undelivered").one().message == (
+        "Free Telegram alert consumed"
+    )
+    assert free_user.free_alert_consumed == 0 and free_user.free_alert_event_id is None
+    assert premium.last_alert_sent_at is None and premium.alert_count_30d == 0
+
+    # The free trial is still available for the next event.
+    assert _enqueue("evt_7", datetime.now(timezone.utc), allow_free=True)["free_trial_sent_count"] == 1
@@ -0,0 +1,85 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pandas as pd
+import pytest
+
+from app import create_app
+from app.models import db
+from app.models.alert_state import AlertState
+from app.services.telegram_service import TelegramService
+from config import Config
+import app.services.telegram_service as telegram_module
+
+
+@pytest.fixture
+def curva(tmp_path, monkeypatch):
+    path = tmp_path / "curva.csv"
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(telegram_module, "get_curva_csv_path", lambda: path)
+    monkeypatch.setattr(telegram_module, "_STREAMS", {})
+    monkeypatch.setattr(Config, "TELEGRAM_BOT_TOKEN", "test-token")
+    monkeypatch.setattr(TelegramService, "MOVING_AVG_WINDOW", 3)
+
+    start = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(hours=1)
+
+    def write(values):
+        pd.DataFrame(
+            {
+                "timestamp": [start + timedelta(minutes=index) for index in range(len(values))],
+                "value": values,
+            }
+        ).to_csv(path, index=False)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        yield write, start
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    calls = []
+
+    def fake_dispatch(self, event_id, current_value, peak_value, moving_avg_real, now, window_size, **_kwargs):
+        calls.append((current_value, peak_value, moving_avg_real))
+        return {"sent": 0, "skipped": 0, "reason": "completed"}
+
+    monkeypatch.setattr(TelegramService, "_dispatch_alerts", fake_dispatch)
+    return calls
+
+
+def test_check_evaluates_only_appended_samples(curva, dispatched):
+    write, start = curva
+    history = [1.0] * 500
+    write(history + [1.5, 2.5])
+
+    TelegramService().check_and_send_alerts()
+    assert dispatched == [(2.5, 2.5, pytest.approx(5.0 / 3))]
+    assert AlertState.query.one().last_checked_ts is not None
+
+    assert TelegramService().check_and_send_alerts()["reason"] == "no_new_points"
+
+    write(history + [1.5, 2.5, 4.0, 3.0])
+    TelegramService().check_and_send_alerts()
+    assert dispatched[-1] == (3.0, 4.0, pytest.approx(9.5 / 3))
+    checkpoint = AlertState.query.one().last_checked_ts.replace(tzinfo=timezone.utc)
+    assert checkpoint == start + timedelta(minutes=503)
+
+
+def test_check_reseeds_window_from_persisted_checkpoint(curva, dispatched):
+    write, start = curva
+    write([1.0, 2.0, 3.0, 4.0, 8.0])
+    state = AlertState(last_checked_ts=start + timedelta(minutes=3))
+    db.session.add(state)
+    db.session.commit()
+
+    # Another worker (or a cold process) resumes from the stored checkpoint.
+    TelegramService().check_and_send_alerts()
+
+    assert dispatched == [(8.0, 8.0, pytest.approx(5.0))]
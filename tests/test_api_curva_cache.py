@@ -0,0 +1,141 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+from app import create_app
+from app.models import db
+from app.models.user import User
+from app.routes import api as api_routes
+from app.utils.curva_payload import CurvaPayloadCache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    csv_path = tmp_path / "curva.csv"
+    monkeypatch.setattr(api_routes, "get_curva_csv_path", lambda: csv_path)
+    monkeypatch.setattr(
+        api_routes, "_CURVA_PAYLOADS", CurvaPayloadCache(max_rows=api_routes._MAX_LIMIT)
+    )
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "SQLALCHEMY_ENGINE_OPTIONS": {
+                "connect_args": {"check_same_thread": False},
+                "poolclass": StaticPool,
+            },
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        user = User(email="viewer@example.com")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        with app.test_client() as test_client:
+            with test_client.session_transaction() as sess:
+                sess["user_id"] = user_id
+            yield test_client, csv_path
+        db.drop_all()
+
+
+def _write_csv(csv_path, periods, offset=0.0):
+    timestamps = pd.date_range("2026-01-01", periods=periods, freq="5min", tz="UTC")
+    pd.DataFrame(
+        {
+            "timestamp": timestamps.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "value": [float(i % 10) + 0.1 + offset for i in range(periods)],
+        }
+    ).to_csv(csv_path, index=False)
+
+
+def test_curva_etag_revalidates_with_304(client):
+    test_client, csv_path = client
+    _write_csv(csv_path, 400)
+
+    first = test_client.get("/api/curva?range=24h")
+    assert first.status_code == 200
+    assert "no-store" not in first.headers["Cache-Control"]
+    etag = first.headers["ETag"]
+    payload = json.loads(first.data)
+    assert payload["ok"] is True
+    assert payload["rows"] == 288
+    assert payload["data"][-1]["timestamp"] == payload["last_ts"]
+
+    cached = test_client.get("/api/curva?range=24h", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    other_range = test_client.get("/api/curva?range=3d", headers={"If-None-Match": etag})
+    assert other_range.status_code == 200
+    assert json.loads(other_range.data)["rows"] == 400
+
+    _write_csv(csv_path, 401, offset=1.0)
+    updated = test_client.get("/api/curva?range=24h", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != etag
+    assert json.loads(updated.data)["data"][-1]["value"] == pytest.approx(1.1)
+
+
+def test_curva_payload_is_serialized_once_per_version(client):
+    test_client, csv_path = client
+    _write_csv(csv_path, 50)
+
+    for query in ("range=24h", "range=7d", "limit=20", "limit=20", ""):
+        assert test_client.get(f"/api/curva?{query}").status_code == 200
+    assert api_routes._CURVA_PAYLOADS.build_count == 1
+
+    limited = json.loads(test_client.get("/api/curva?limit=20").data)
+    assert limited["rows"] == 20
+    assert [row["value"] for row in limited["data"]][:2] == [0.1, 1.1]
+
+
+def test_curva_max_points_is_cached_per_range(client):
+    test_client, csv_path = client
+    _write_csv(csv_path, 3000)
+
+    raw = test_client.get("/api/curva?range=7d").get_json()
+    first = test_client.get("/api/curva?range=7d&max_points=200")
+    payload = first.get_json()
+    assert payload["rows"] <= 200
+    assert payload["source_rows"] == raw["rows"] == 2016
+    assert payload["downsampled"] == {"method": "minmax", "max_points": 200}
+    assert max(row["value"] for row in payload["data"]) == max(row["value"] for row in raw["data"])
+    assert payload["data"][-1] == raw["data"][-1]
+    assert first.headers["ETag"] != test_client.get("/api/curva?range=7d").headers["ETag"]
+
+    again = test_client.get(
+        "/api/curva?range=7d&max_points=200", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert again.status_code == 304
+
+    medium = test_client.get("/api/curva?range=7d&resolution=medium&downsample=lttb").get_json()
+    assert medium["rows"] == 1000
+    assert test_client.get("/api/curva?resolution=huge").status_code == 400
+    assert test_client.get("/api/curva?max_points=2&downsample=lttb").status_code == 400
+
+
+def test_curva_rollups_endpoint(client):
+    test_client, csv_path = client
+    _write_csv(csv_path, 600)
+
+    response = test_client.get("/api/curva/rollups?resolution=1h&range=1y")
+    payload = response.get_json()
+    assert payload["ok"] is True
+    assert payload["rows"] == 50
+    assert payload["data"][0]["count"] == 12
+    assert payload["data"][-1]["timestamp"] == payload["last_ts"]
+
+    cached = test_client.get(
+        "/api/curva/rollups?resolution=1h&range=1y",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+    assert test_client.get("/api/curva/rollups?resolution=5m").status_code == 400
@@ -0,0 +1,99 @@
+import csv
+from datetime import datetime, timedelta, timezone
+
+from backend.utils.extract_png import append_clean_data, compact_csv
+from scripts import csv_updater
+
+
+def _read_rows(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return list(csv.DictReader(handle))
+
+
+def _series(start, count, value=1.0):
+    return [
+        {"timestamp": start + timedelta(minutes=5 * idx), "value": value + idx}
+        for idx in range(count)
+    ]
+
+
+def test_append_clean_data_only_writes_new_rows(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=2)
+    compact_csv(str(csv_path), _series(start, 3))
+
+    _, cleaned, appended = append_clean_data(
+        _series(start, 5), str(csv_path), after=start + timedelta(minutes=10)
+    )
+
+    assert len(cleaned) == 5
+    assert len(appended) == 2
+    rows = _read_rows(csv_path)
+    assert [row["value"] for row in rows] == ["1.0", "2.0", "3.0", "4.0", "5.0"]
+
+
+def test_compact_csv_merges_dedups_and_trims(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=3)
+    compact_csv(str(csv_path), _series(start, 2))
+
+    newer = start + timedelta(days=2)
+    _, cleaned = compact_csv(
+        str(csv_path),
+        [{"timestamp": start, "value": 9.0}, *_series(newer, 2)],
+        retention=timedelta(days=1),
+    )
+
+    assert [row["timestamp"] for row in cleaned] == [newer, newer + timedelta(minutes=5)]
+    assert len(_read_rows(csv_path)) == 2
+
+
+def test_write_csv_incremental_appends_between_compactions(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=3)
+
+    first = csv_updater._write_csv_safely(_series(start, 4), csv_path)
+    assert first["write_mode"] == "compact"
+    assert first["rows"] == 4
+
+    second = csv_updater._write_csv_safely(_series(start + timedelta(minutes=10), 4), csv_path)
+    assert second["write_mode"] == "append"
+    assert second["appended"] == 2
+    assert second["rows"] == 6
+    assert len(_read_rows(csv_path)) == 6
+    assert csv_updater._read_csv_last_timestamp(csv_path) == start + timedelta(minutes=25)
+
+
+def test_incremental_append_after_new_year_does_not_duplicate(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    csv_path = tmp_path / "curva.csv"
+    new_year = datetime(datetime.now(timezone.utc).year, 1, 1, tzinfo=timezone.utc)
+    start = new_year - timedelta(minutes=30)
+
+    first = csv_updater._write_csv_safely(_series(start, 6), csv_path)
+    assert first["write_mode"] == "compact"
+    assert csv_updater._read_csv_last_timestamp(csv_path) is None  # tail is last year's
+
+    second = csv_updater._write_csv_safely(_series(start, 9), csv_path)
+
+    assert second["write_mode"] == "append"
+    assert second["appended"] == 3
+    timestamps = [row["timestamp"] for row in _read_rows(csv_path)]
+    assert len(timestamps) == 9 == len(set(timestamps))
+
+
+def test_incremental_write_compacts_when_tail_is_unreadable(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+    csv_updater._write_csv_safely(_series(start, 4), csv_path)
+    monkeypatch.setattr(csv_updater, "_read_csv_tail_timestamp", lambda path: None)
+
+    result = csv_updater._write_csv_safely(_series(start, 6), csv_path)
+
+    assert result["write_mode"] == "compact"
+    assert len(_read_rows(csv_path)) == 6
@@ -156,7 +156,17 @@ def test_csv_updater_runs_without_pandas(monkeypatch, tmp_path):
 
     csv_updater = importlib.import_module("scripts.csv_updater")
 
-    def fake_download_colored_png(_url):
+    def fake_fetch_png(url, _csv_path):
+        return csv_updater.FetchResult(
+            url=url,
+            status="changed",
+            content=b"png",
+            sha256="abc",
+            etag=None,
+            last_modified=None,
+        )
+
+    def fake_save_colored_png(_content):
         return tmp_path / "fake.png"
 
     def fake_extract_series_from_colored(_path):
@@ -166,7 +176,9 @@ def test_csv_updater_runs_without_pandas(monkeypatch, tmp_path):
             {},
         )
 
-    monkeypatch.setattr(csv_updater, "download_colored_png", fake_download_colored_png)
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setattr(csv_updater, "_fetch_png", fake_fetch_png)
+    monkeypatch.setattr(csv_updater, "save_colored_png", fake_save_colored_png)
     monkeypatch.setattr(csv_updater, "extract_series_from_colored", fake_extract_series_from_colored)
 
     csv_path = tmp_path / "curva.csv"
@@ -0,0 +1,178 @@
+import numpy as np
+
+from backend.utils.extract_colored import (
+    BASELINE_BOTTOM_MARGIN_PX,
+    BASELINE_THICKNESS_PX,
+    EDGE_GUARD_PX,
+    SPIKE_DELTA_ABS_PX,
+    THICKNESS_THRESHOLD_PX,
+    _pick_columns,
+)
+
+
+def _pick_column_y(
+    ys: np.ndarray,
+    previous_y: int | None,
+    height: int,
+) -> tuple[
+    int | None,
+    int | None,
+    int | None,
+    str | None,
+    bool,
+    int | None,
+    int | None,
+    int | None,
+    int | None,
+    int,
+    bool,
+]:
+    """Scalar picker the vectorized ``_pick_columns`` replaced, one column at a time."""
+    if ys.size == 0:
+        return None, None, None, None, False, None, None, None, None, 0, False
+    ys_sorted = np.sort(ys)
+    y_min = int(ys_sorted[0])
+    y_max = int(ys_sorted[-1])
+    thickness = int(y_max - y_min + 1)
+
+    y_top = y_min
+    y_mid = int(np.median(ys_sorted))
+    y_bot = y_max
+
+    runs = 1
+    if ys_sorted.size > 1:
+        diffs = np.diff(ys_sorted)
+        runs = int(np.sum(diffs > 1)) + 1
+
+    candidates = [
+        ("top", y_top),
+        ("mid", y_mid),
+        ("bot", y_bot),
+    ]
+
+    valid_candidates: list[tuple[str, int]] = []
+    for name, value in candidates:
+        if value <= EDGE_GUARD_PX or value >= height - EDGE_GUARD_PX - 1:
+            continue
+        if (
+            name == "bot"
+            and thickness >= BASELINE_THICKNESS_PX
+            and value >= height - BASELINE_BOTTOM_MARGIN_PX
+        ):
+            continue
+        valid_candidates.append((name, value))
+
+    if not valid_candidates:
+        return None, y_min, y_max, None, False, thickness, y_top, y_mid, y_bot, runs, False
+
+    if previous_y is not None and abs(y_top - previous_y) >= SPIKE_DELTA_ABS_PX:
+        return (
+            y_top,
+            y_min,
+            y_max,
+            "spike_top",
+            True,
+            thickness,
+            y_top,
+            y_mid,
+            y_bot,
+            runs,
+            True,
+        )
+
+    if previous_y is None:
+        pick_name, pick_value = (
+            ("top", y_top) if thickness <= THICKNESS_THRESHOLD_PX else ("mid", y_mid)
+        )
+        if pick_name not in {name for name, _ in valid_candidates}:
+            pick_name, pick_value = valid_candidates[0]
+        return (
+            pick_value,
+            y_min,
+            y_max,
+            pick_name,
+            False,
+            thickness,
+            y_top,
+            y_mid,
+            y_bot,
+            runs,
+            False,
+        )
+
+    pick_name, pick_value = min(
+        valid_candidates,
+        key=lambda item: abs(item[1] - previous_y),
+    )
+    return (
+        pick_value,
+        y_min,
+        y_max,
+        pick_name,
+        True,
+        thickness,
+        y_top,
+        y_mid,
+        y_bot,
+        runs,
+        False,
+    )
+
+
+def _reference_picks(mask, height):
+    points = []
+    modes = []
+    ranges = []
+    runs = []
+    mids = []
+    adjusted_count = 0
+    previous = None
+    for x in range(mask.shape[1]):
+        column = np.where(mask[:, x] == 255)[0]
+        pick, y_min, y_max, mode, adjusted, _, _, y_mid, _, run_count, _ = _pick_column_y(
+            column, previous, height
+        )
+        if pick is None or pick <= 0 or pick >= height - 1:
+            points.append(None)
+            modes.append(None)
+            ranges.append((None, None))
+            runs.append(None)
+            mids.append(None)
+            previous = None
+        else:
+            points.append(pick)
+            modes.append(mode)
+            ranges.append((y_min, y_max))
+            runs.append(run_count)
+            mids.append(y_mid)
+            previous = pick
+        if adjusted:
+            adjusted_count += 1
+    return points, modes, ranges, runs, mids, adjusted_count
+
+
+def test_pick_columns_matches_scalar_picker():
+    rng = np.random.default_rng(7)
+    height, width = 48, 400
+    mask = np.zeros((height, width), dtype=np.uint8)
+    y = height // 2
+    for x in range(width):
+        y = int(np.clip(y + rng.integers(-3, 4), 0, height - 1))
+        thickness = int(rng.integers(1, 8))
+        mask[y : y + thickness, x] = 255
+        if rng.random() < 0.15:
+            mask[int(rng.integers(0, height)), x] = 255
+        if rng.random() < 0.05:
+            mask[:, x] = 0
+        if rng.random() < 0.03:
+            mask[height - 6 :, x] = 255
+
+    picks = _pick_columns(mask, height)
+    points, modes, ranges, runs, mids, adjusted = _reference_picks(mask, height)
+
+    assert picks["points"] == points
+    assert picks["modes"] == modes
+    assert picks["ranges"] == ranges
+    assert picks["runs"] == runs
+    assert picks["mids"] == mids
+    assert picks["continuity_adjusted"] == adjusted
@@ -0,0 +1,55 @@
+import itertools
+from pathlib import Path
+
+from backend.utils import extract_colored
+
+CORPUS_PNG = (
+    Path(__file__).resolve().parents[1]
+    / "benchmarks"
+    / "corpus"
+    / "ecbd_rms_colored_20250513.png"
+)
+
+
+def test_debug_policy_decisions(monkeypatch):
+    monkeypatch.setattr(extract_colored, "DEBUG_SAMPLE_EVERY", 3)
+    monkeypatch.setattr(extract_colored, "_debug_run_counter", itertools.count(1))
+
+    assert extract_colored._should_write_debug_artifacts("always", [])
+    assert not extract_colored._should_write_debug_artifacts("off", ["tail_missing"])
+    assert not extract_colored._should_write_debug_artifacts("anomaly", [])
+    assert extract_colored._should_write_debug_artifacts("anomaly", ["low_coverage"])
+    sampled = [extract_colored._should_write_debug_artifacts("sampled", []) for _ in range(6)]
+    assert sampled == [False, False, True, False, False, True]
+    assert extract_colored._resolve_debug_policy("bogus") == "anomaly"
+
+
+def test_debug_anomaly_reasons_use_tail_and_column_error():
+    healthy = extract_colored._debug_anomaly_reasons(98.0, 2, {"mean_span": 4.0})
+    assert healthy == []
+    bad = extract_colored._debug_anomaly_reasons(
+        50.0,
+        extract_colored.DEBUG_ANOMALY_TAIL_MISSING,
+        {"mean_span": extract_colored.DEBUG_ANOMALY_MEAN_SPAN_PX + 1},
+    )
+    assert bad == ["tail_missing", "low_coverage", "wide_columns"]
+
+
+def test_extraction_skips_or_backgrounds_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setenv("INGV_COLORED_DEBUG_DIR", str(tmp_path))
+
+    _, values, debug_paths = extract_colored.extract_series_from_colored(
+        CORPUS_PNG, debug_artifacts="off"
+    )
+    assert values
+    assert debug_paths == {}
+    assert not any(tmp_path.iterdir())
+
+    _, _, debug_paths = extract_colored.extract_series_from_colored(
+        CORPUS_PNG, debug_artifacts="always", debug_background=True
+    )
+    assert debug_paths == {}
+    written = extract_colored.wait_for_debug_artifacts(timeout=30)
+    assert len(written) == 1
+    assert Path(written[0]["overlay"]).exists()
+    assert Path(written[0]["mask_polyline"]).exists()
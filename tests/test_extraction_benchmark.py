@@ -0,0 +1,28 @@
+from benchmarks.extraction import COLORED_STAGES, diff_series, run_benchmark
+
+
+def test_extraction_benchmark_matches_golden_corpus():
+    results = run_benchmark(repeat=1)
+
+    assert {(result["corpus"], result["extractor"]) for result in results} == {
+        ("ecbd_rms_green_20250513", "green"),
+        ("ecbd_rms_colored_20250513", "colored"),
+        ("ecbd_rms_colored_20250513", "bands"),
+    }
+    for result in results:
+        assert result["status"] == "ok", result.get("error")
+        assert result["diff"]["ok"], result["diff"]
+        assert result["peak_traced_bytes"] > 0
+
+    colored = next(result for result in results if result["extractor"] == "colored")
+    assert set(COLORED_STAGES) <= set(colored["timings"])
+
+
+def test_diff_series_reports_value_and_row_drift():
+    golden = [(-10.0, 1.0), (0.0, 2.0)]
+    diff = diff_series([(-10.0, 1.0), (0.0, 2.5), (5.0, 3.0)], golden)
+
+    assert not diff["ok"]
+    assert diff["extra"] == 1
+    assert diff["missing"] == 0
+    assert diff["max_abs_diff"] == 0.5
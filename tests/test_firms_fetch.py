@@ -0,0 +1,131 @@
+import csv
+import io
+import logging
+import threading
+
+import pytest
+import requests
+
+import backend.services.hotspots.firms_provider as firms_provider
+from backend.services.hotspots.config import HotspotsConfig
+from backend.services.hotspots.normalize import normalize_records
+
+CSV_BODY = (
+    "\ufefflatitude, longitude ,bright_ti4,acq_date,acq_time,satellite,confidence,frp\r\n"
+    "37.751, 14.993,340.1,2026-10-16,0112,N,h,12.5\r\n"
+    "\r\n"
+    " , , , , , , , \r\n"
+    "37.760,14.990,331.0,2026-10-16,0230,N,n\r\n"
+    "37.770,14.980,329.0,2026-10-16,0231,N,l,3.0,extra\r\n"
+)
+
+
+def _reference_records(text):
+    """Parser used before streaming: decode, split into lines, DictReader."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    records = []
+    for row in csv.DictReader(lines):
+        cleaned = {}
+        has_value = False
+        for key, value in row.items():
+            if key is None:
+                continue
+            cleaned_value = "" if value is None else str(value).strip()
+            has_value = has_value or bool(cleaned_value)
+            cleaned[str(key).strip()] = cleaned_value
+        if has_value:
+            records.append(cleaned)
+    return records
+
+
+def _response(body: str, status_code: int = 200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "OK" if status_code < 400 else "Error"
+    response.url = "https://firms.example/area"
+    response.raw = io.BytesIO(body.encode("utf-8"))
+    return response
+
+
+class _FakeSession:
+    def __init__(self, bodies, barrier=None):
+        self.bodies = bodies
+        self.barrier = barrier
+        self.urls = []
+
+    def get(self, url, timeout, stream):
+        assert stream
+        self.urls.append(url)
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        source = url.split("/")[-3]
+        body, status_code = self.bodies[source]
+        return _response(body, status_code)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setenv("FIRMS_MAP_KEY", "abcdef123456")
+    return HotspotsConfig.from_env()
+
+
+def test_streaming_parser_matches_buffered_parser():
+    lines = CSV_BODY.lstrip("\ufeff").splitlines()
+    parsed = list(firms_provider.iter_firms_records(line for line in lines if line.strip()))
+
+    assert parsed == _reference_records(CSV_BODY.lstrip("\ufeff"))
+    assert len(parsed) == 3 and parsed[1]["frp"] == "" and parsed[0]["longitude"] == "14.993"
+
+
+def test_fetch_streams_records_into_normalize(config, monkeypatch):
+    session = _FakeSession({"VIIRS_SNPP_NRT": (CSV_BODY, 200)})
+    monkeypatch.setattr(firms_provider, "_get_session", lambda: session)
+
+    result = firms_provider.fetch_firms_records(
+        config, logging.getLogger("test"), source="VIIRS_SNPP_NRT"
+    )
+
+    assert result.records == _reference_records(CSV_BODY.lstrip("\ufeff"))
+    assert result.body_preview.startswith("latitude, longitude")
+    items = normalize_records(iter(result.records), result.source, config)
+    assert [item["time_utc"] for item in items] == [
+        "2026-10-16T01:12:00Z",
+        "2026-10-16T02:30:00Z",
+        "2026-10-16T02:31:00Z",
+    ]
+
+
+def test_sources_are_fetched_concurrently_in_order(config, monkeypatch):
+    sources = ["VIIRS_SNPP_NRT", "VIIRS_NOAA20_NRT", "VIIRS_NOAA21_NRT"]
+    # Every request waits for the others: sequential fetching would time out.
+    session = _FakeSession(
+        {
+            "VIIRS_SNPP_NRT": (CSV_BODY, 200),
+            "VIIRS_NOAA20_NRT": ("latitude,longitude\n", 200),
+            "VIIRS_NOAA21_NRT": ("Invalid MAP_KEY", 403),
+        },
+        barrier=threading.Barrier(len(sources)),
+    )
+    monkeypatch.setattr(firms_provider, "_get_session", lambda: session)
+
+    results = firms_provider.fetch_firms_sources(
+        config, logging.getLogger("test"), sources, allow_error=True
+    )
+
+    assert [result.source for result in results] == sources
+    assert [len(result.records) for result in results] == [3, 0, 0]
+    assert results[2].status_code == 403 and results[2].body_preview == "Invalid MAP_KEY"
+
+
+def test_request_errors_propagate(config, monkeypatch):
+    session = _FakeSession({"VIIRS_SNPP_NRT": ("", 500), "VIIRS_NOAA20_NRT": (CSV_BODY, 200)})
+    monkeypatch.setattr(firms_provider, "_get_session", lambda: session)
+
+    with pytest.raises(requests.HTTPError):
+        firms_provider.fetch_firms_sources(
+            config, logging.getLogger("test"), ["VIIRS_SNPP_NRT", "VIIRS_NOAA20_NRT"]
+        )
+
+
+def test_session_is_shared():
+    assert firms_provider._get_session() is firms_provider._get_session()
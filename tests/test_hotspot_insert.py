@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.scripts import update_hotspots
+from backend.scripts.update_hotspots import HotspotRecord
+
+BASE = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+def _records(start, count):
+    return [
+        {
+            "fingerprint": f"fp-{index}",
+            "source": "VIIRS_SNPP_NRT",
+            "satellite": "N",
+            "instrument": "VIIRS",
+            "lat": 37.75,
+            "lon": 14.99,
+            "acq_datetime": BASE - timedelta(minutes=index),
+            "confidence": "nominal",
+            "brightness": 330.0,
+            "bright_ti4": 330.0,
+            "bright_ti5": None,
+            "frp": 4.0,
+            "intensity_unit": "MW",
+            "daynight": "N",
+            "version": "2.0NRT",
+            "status": "new",
+        }
+        for index in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hotspots.db'}")
+    update_hotspots.Base.metadata.create_all(engine)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            statements.append((len(parameters), executemany))
+
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    yield engine, Session, statements
+    engine.dispose()
+
+
+def _stored(Session):
+    with Session() as session:
+        return session.execute(select(func.count()).select_from(HotspotRecord)).scalar_one()
+
+
+def test_large_backfill_is_written_in_executemany_chunks(store, caplog):
+    engine, Session, statements = store
+    records = _records(0, 5000)  # 80k parameters: more than one VALUES statement allows
+
+    with Session() as session, caplog.at_level(logging.INFO):
+        inserted = update_hotspots._insert_records(session, engine, records, logging.getLogger("hotspots"))
+        session.commit()
+
+    assert inserted == 5000 and _stored(Session) == 5000
+    assert statements == [(update_hotspots.INSERT_CHUNK_SIZE, True)] * 5
+    assert "Inserted 5000/5000 records in 5 chunks" in caplog.text and "rows/s" in caplog.text
+
+
+def test_reinsert_skips_existing_fingerprints(store):
+    engine, Session, _ = store
+    with Session() as session:
+        update_hotspots._insert_records(session, engine, _records(0, 30))
+        session.commit()
+    with Session() as session:
+        assert update_hotspots._insert_records(session, engine, _records(20, 30)) == 20
+        session.commit()
+
+    assert _stored(Session) == 50
+
+
+def test_executemany_fallback_skips_duplicates(store):
+    engine, Session, statements = store
+    with Session() as session:
+        update_hotspots._insert_records(session, engine, _records(0, 10))
+        session.commit()
+    statements.clear()
+
+    chunk = _records(5, 10) + _records(12, 3)  # 5 stored, 3 repeated in the chunk
+    with Session() as session:
+        assert update_hotspots._insert_chunk_executemany(session, chunk) == 5
+        session.commit()
+
+    assert _stored(Session) == 15
+    assert statements == [(5, True)]
+
+
+def test_executemany_fallback_survives_concurrent_insert(store, monkeypatch):
+    engine, Session, _ = store
+    with Session() as session:
+        update_hotspots._insert_records(session, engine, _records(0, 3))
+        session.commit()
+
+    # Rows land between the lookup and the insert.
+    monkeypatch.setattr(update_hotspots, "_existing_fingerprints", lambda session, fingerprints: set())
+    with Session() as session:
+        assert update_hotspots._insert_chunk_executemany(session, _records(0, 6)) == 3
+        session.commit()
+
+    assert _stored(Session) == 6
@@ -0,0 +1,112 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.services.hotspots import normalize
+from backend.services.hotspots.config import HotspotsConfig
+from backend.services.hotspots.normalize import HotspotBatch, normalize_batch, normalize_records
+from backend.services.hotspots.significance import is_significant_item
+from backend.utils.time import to_iso_utc
+
+NOW = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+def _reference_item(record, source):
+    """Row-by-row normalization the batch path replaces."""
+    lat = normalize._parse_float(record.get("latitude"))
+    lon = normalize._parse_float(record.get("longitude"))
+    timestamp = normalize._parse_time(record)
+    if lat is None or lon is None or timestamp is None:
+        return None
+    satellite = (record.get("satellite") or "").strip().upper() or normalize._satellite_from_source(source)
+    frp = normalize._parse_float(record.get("frp"))
+    bright_ti4 = normalize._parse_float(record.get("bright_ti4"))
+    bright_ti5 = normalize._parse_float(record.get("bright_ti5"))
+    brightness = normalize._parse_float(record.get("brightness"))
+    if bright_ti4 is not None:
+        brightness = bright_ti4
+    elif brightness is None:
+        brightness = bright_ti5
+    unit = "MW" if frp is not None else "K" if brightness is not None else "unknown"
+    return {
+        "id": normalize._build_stable_id(lat, lon, timestamp, satellite, source),
+        "time_utc": to_iso_utc(timestamp),
+        "lat": lat,
+        "lon": lon,
+        "satellite": satellite,
+        "instrument": (record.get("instrument") or "").strip().upper() or None,
+        "source": source,
+        "confidence": normalize._normalize_confidence(record.get("confidence")),
+        "intensity": {"frp": frp, "brightness": brightness, "unit": unit},
+        "bright_ti4": bright_ti4,
+        "bright_ti5": bright_ti5,
+        "daynight": (record.get("daynight") or "").strip().upper() or None,
+        "version": (record.get("version") or "").strip() or None,
+        "status": "new",
+        "maps_url": f"https://www.google.com/maps?q={lat},{lon}",
+    }
+
+
+def _rows(rng, count):
+    passes = [NOW - timedelta(minutes=rng.randrange(3 * 24 * 60)) for _ in range(12)]
+    rows = []
+    for index in range(count):
+        acquired = rng.choice(passes)
+        row = {
+            "latitude": rng.choice([f"{rng.uniform(37.5, 38.0):.5f}", f" {rng.uniform(37.5, 38.0):.3f} ", "", "x"]),
+            "longitude": f"{rng.uniform(14.7, 15.3):.5f}",
+            "acq_date": rng.choice([acquired.strftime("%Y-%m-%d")] * 4 + ["", "2026-02-30", "2026-1-5"]),
+            "acq_time": rng.choice([acquired.strftime("%H%M").lstrip("0")] * 4 + ["", "12:30", "2460"]),
+            "satellite": rng.choice(["N", " n ", "", "Aqua"]),
+            "confidence": rng.choice(["l", "n", "h", "", " H ", "55", "99", "abc", None]),
+            "instrument": rng.choice(["VIIRS", "", " modis "]),
+            "daynight": rng.choice(["D", "N", "", " d"]),
+            "version": rng.choice(["2.0NRT", "", " 6.1 "]),
+            "frp": rng.choice([f"{rng.uniform(0, 40):.2f}", "", "bad", "0"]),
+            "bright_ti4": rng.choice([f"{rng.uniform(290, 367):.2f}", ""]),
+            "bright_ti5": rng.choice([f"{rng.uniform(280, 300):.2f}", ""]),
+        }
+        if index % 7 == 0:
+            row["timestamp"] = rng.choice(["2026-10-16T01:02:03.456Z", "2026-10-16T09:02:03+02:00", "bad", ""])
+        if index % 11 == 0:
+            row["brightness"] = "333.3"
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("source", ["VIIRS_SNPP_NRT", "MODIS_NRT", "OTHER"])
+def test_batch_matches_row_by_row_normalization(source):
+    rows = _rows(random.Random(source), 2000)
+    expected = [item for item in (_reference_item(row, source) for row in rows) if item is not None]
+
+    assert normalize_records(iter(rows), source, HotspotsConfig.from_env()) == expected
+    assert 0 < len(expected) < len(rows)
+
+
+def test_masks_match_item_filters():
+    config = HotspotsConfig.from_env()
+    rows = _rows(random.Random(3), 1500)
+    batch = HotspotBatch.concat([normalize_batch(rows[:700], "VIIRS_SNPP_NRT"), normalize_batch(rows[700:], "MODIS_NRT")])
+    items = batch.to_items()
+    west, south, east, north = bbox = (14.8, 37.6, 15.2, 37.9)
+
+    window_start = NOW - timedelta(hours=24)
+    expected = [
+        item
+        for item in items
+        if window_start <= datetime.fromisoformat(item["time_utc"].replace("Z", "+00:00")) <= NOW
+        and west <= item["lon"] <= east
+        and south <= item["lat"] <= north
+    ]
+    window = batch.select(batch.recent_mask(NOW, 24.0) & batch.bbox_mask(bbox))
+    assert window.to_items() == expected
+    assert window.significant_mask(config).tolist() == [is_significant_item(item, config) for item in expected]
+
+
+def test_empty_batches():
+    empty = HotspotBatch.concat([])
+
+    assert len(empty) == 0 and empty.to_items() == []
+    assert normalize_records([{"latitude": "", "longitude": "1"}], "VIIRS_SNPP_NRT", HotspotsConfig.from_env()) == []
+    assert not empty.recent_mask(NOW, 24.0).any()
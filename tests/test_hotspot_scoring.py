@@ -0,0 +1,77 @@
+import copy
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.services.hotspots.scoring import _is_same_event, apply_status, deduplicate_items
+
+
+def _items(rng, count, lat0, lon0, spread, now):
+    items = []
+    for index in range(count):
+        acquired = now - timedelta(minutes=rng.randrange(24 * 60))
+        item = {
+            "id": str(index),
+            "lat": lat0 + rng.uniform(-spread, spread),
+            "lon": lon0 + rng.uniform(-spread, spread),
+            "time_utc": acquired.isoformat().replace("+00:00", "Z"),
+        }
+        if index % 37 == 0:
+            item["lat"] = None
+        elif index % 41 == 0:
+            item["time_utc"] = "invalid"
+        items.append(item)
+    return items
+
+
+def _reference_dedup(items, max_km, max_hours):
+    deduped = []
+    for item in items:
+        if not any(_is_same_event(item, existing, max_km, max_hours) for existing in deduped):
+            deduped.append(item)
+    return deduped
+
+
+def _reference_status(items, previous, max_km, window_hours):
+    now = datetime.now(timezone.utc)
+    recent = [
+        prev
+        for prev in previous
+        if prev.get("time_utc") not in (None, "invalid")
+        and (now - datetime.fromisoformat(prev["time_utc"].replace("Z", "+00:00"))).total_seconds()
+        <= window_hours * 3600
+    ]
+    return [
+        "persistent" if any(_is_same_event(item, prev, max_km, window_hours) for prev in recent) else "new"
+        for item in items
+    ]
+
+
+@pytest.mark.parametrize(
+    "lat0, lon0, spread",
+    [(37.75, 14.99, 0.02), (37.75, 14.99, 0.3), (0.0, 179.99, 0.05), (89.99, 0.0, 0.05)],
+)
+@pytest.mark.parametrize("max_km, max_hours", [(0.0, 0.0), (1.0, 6.0), (5.0, 24.0)])
+def test_indexed_results_match_pairwise_reference(lat0, lon0, spread, max_km, max_hours):
+    rng = random.Random(f"{lat0}{lon0}{spread}{max_km}{max_hours}")
+    now = datetime.now(timezone.utc)
+    items = _items(rng, 300, lat0, lon0, spread, now)
+    previous = _items(rng, 200, lat0, lon0, spread, now)
+
+    assert deduplicate_items(items, max_km, max_hours) == _reference_dedup(items, max_km, max_hours)
+    scored = apply_status(copy.deepcopy(items), previous, max_km, max_hours)
+    assert [item["status"] for item in scored] == _reference_status(items, previous, max_km, max_hours)
+
+
+def test_dedup_keeps_first_detection_of_each_event():
+    base = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+    items = [
+        {"id": "a", "lat": 37.750, "lon": 14.990, "time_utc": base.isoformat()},
+        {"id": "b", "lat": 37.752, "lon": 14.991, "time_utc": (base + timedelta(hours=1)).isoformat()},
+        {"id": "c", "lat": 37.752, "lon": 14.991, "time_utc": (base + timedelta(hours=7)).isoformat()},
+        {"id": "d", "lat": 37.800, "lon": 14.990, "time_utc": base.isoformat()},
+        {"id": "e", "lat": None, "lon": 14.990, "time_utc": base.isoformat()},
+    ]
+
+    assert [item["id"] for item in deduplicate_items(items, 1.0, 6.0)] == ["a", "c", "d", "e"]
@@ -0,0 +1,146 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from app import create_app
+from app.models import db
+from backend.scripts import update_hotspots
+from backend.services.hotspots.config import HotspotsConfig
+from backend.services.hotspots.payload import latest_cache_key
+
+
+def _record(index: int, acquired: datetime, frp: float) -> dict:
+    return {
+        "fingerprint": f"fp-{index}",
+        "source": "VIIRS_SNPP_NRT",
+        "satellite": "N",
+        "instrument": "VIIRS",
+        "lat": 37.75 + index * 0.001,
+        "lon": 14.99,
+        "acq_datetime": acquired,
+        "confidence": "high" if index % 2 else "low",
+        "brightness": None,
+        "bright_ti4": 340.0,
+        "bright_ti5": None,
+        "frp": frp,
+        "intensity_unit": None,
+        "daynight": "N",
+        "version": "2.0NRT",
+        "status": "new",
+    }
+
+
+@pytest.fixture
+def hotspots_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOTSPOTS_ENABLED", "true")
+    db_url = f"sqlite:///{tmp_path / 'hotspots.db'}"
+    engine = create_engine(db_url)
+    update_hotspots.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": db_url, "TESTING": True})
+    with app.app_context():
+        yield app.test_client(), engine, Session
+        db.session.remove()
+    engine.dispose()
+
+
+def _ingest(engine, Session, records, generated_at):
+    with Session() as session:
+        update_hotspots._insert_records(session, engine, records)
+        update_hotspots._upsert_cache(
+            session,
+            {"last_fetch_at": generated_at.isoformat(), "last_fetch_count": len(records), "count": len(records)},
+            generated_at,
+        )
+        session.flush()
+        update_hotspots._materialize_latest_responses(
+            session,
+            HotspotsConfig.from_env(),
+            generated_at,
+            count_significant=2,
+            last_fetch_count=len(records),
+            last_nonzero_at=None,
+        )
+        session.commit()
+
+
+def test_materialized_response_is_served_with_etag(hotspots_db):
+    client, engine, Session = hotspots_db
+    now = datetime.now(timezone.utc)
+    records = [_record(index, now - timedelta(hours=index), frp=5.0 * index) for index in range(6)]
+    records.append(_record(99, now - timedelta(hours=30), frp=50.0))  # outside the window
+    _ingest(engine, Session, records, now)
+
+    response = client.get("/api/hotspots/latest?mode=all")
+    payload = response.get_json()
+    assert response.status_code == 200
+    assert payload["count_24h"] == 6
+    assert [item["id"] for item in payload["items"]] == [f"fp-{index}" for index in range(6)]
+    assert payload["items"][1]["intensity"] == {"frp": 5.0, "brightness": 340.0, "unit": "MW"}
+    assert response.headers["ETag"]
+
+    significant = client.get("/api/hotspots/latest?mode=significant").get_json()
+    assert significant["mode"] == "significant"
+    assert [item["id"] for item in significant["items"]] == [
+        item["id"] for item in payload["items_24h_significant"]
+    ]
+
+    # Served from the stored body: the records table is not read.
+    with Session() as session:
+        session.execute(delete(update_hotspots.HotspotRecord))
+        session.commit()
+    again = client.get("/api/hotspots/latest?mode=all", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_live_fallback_matches_materialized_items(hotspots_db):
+    client, engine, Session = hotspots_db
+    now = datetime.now(timezone.utc)
+    records = [_record(index, now - timedelta(hours=index), frp=5.0 * index) for index in range(4)]
+    _ingest(engine, Session, records, now)
+    materialized = client.get("/api/hotspots/latest?mode=significant").get_json()
+
+    with Session() as session:
+        for mode in ("all", "significant"):
+            session.execute(
+                delete(update_hotspots.HotspotsCache).where(
+                    update_hotspots.HotspotsCache.key == latest_cache_key(mode)
+                )
+            )
+        session.commit()
+    live = client.get("/api/hotspots/latest?mode=significant")
+
+    assert live.status_code == 200 and live.headers["ETag"]
+    live_payload = json.loads(live.data)
+    for key in ("items", "items_24h_raw", "count_24h", "mode"):
+        assert live_payload[key] == materialized[key]
+
+
+def test_stale_materialized_response_is_not_served(hotspots_db):
+    client, engine, Session = hotspots_db
+    old = datetime.now(timezone.utc) - timedelta(hours=30)
+    _ingest(engine, Session, [_record(1, old, frp=20.0)], old)
+
+    payload = client.get("/api/hotspots/latest").get_json()
+
+    assert payload["count_24h"] == 0 and payload["items"] == []
+
+
+def test_materialized_response_older_than_ingest_ttl_is_not_served(hotspots_db):
+    client, engine, Session = hotspots_db
+    now = datetime.now(timezone.utc)
+    generated = now - timedelta(minutes=HotspotsConfig.from_env().cache_ttl_min + 60)
+    # Inside the window when it was materialized, outside it now.
+    _ingest(engine, Session, [_record(1, generated - timedelta(hours=22), frp=20.0)], generated)
+
+    payload = client.get("/api/hotspots/latest").get_json()
+
+    assert payload["count_24h"] == 0 and payload["items"] == []
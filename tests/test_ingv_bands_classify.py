@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.utils import ingv_bands
+
+CORPUS_PNG = Path(__file__).resolve().parents[1] / "benchmarks" / "corpus" / "ecbd_rms_colored_20250513.png"
+
+# BGR colours of the INGV bands, plus grey/black that classify as unknown.
+RED = (0, 0, 230)
+ORANGE = (0, 140, 250)
+YELLOW = (0, 220, 230)
+GREEN = (0, 200, 0)
+GREY = (128, 128, 128)
+
+
+def _striped(rows: list[tuple[tuple[int, int, int], int]], width: int = 40) -> np.ndarray:
+    column = np.concatenate([np.tile(np.array(colour, dtype=np.uint8), (count, 1)) for colour, count in rows])
+    return np.repeat(column[:, np.newaxis, :], width, axis=1)
+
+
+def _reference_classes(hsv: np.ndarray) -> list:
+    classes = [ingv_bands._classify_band(pixel) for pixel in hsv]
+    last = None
+    for idx, value in enumerate(classes):
+        if value is None and last is not None:
+            classes[idx] = last
+        else:
+            last = value
+    first = next((value for value in classes if value is not None), None)
+    return [first if value is None else value for value in classes]
+
+
+def test_vectorized_classifier_matches_scalar_rules():
+    grid = np.stack(np.meshgrid(np.arange(180), [0, 39, 40, 255], [0, 39, 40, 255], indexing="ij"), axis=-1)
+    hsv = grid.reshape(-1, 3).astype(np.uint8)
+
+    codes = ingv_bands._classify_bands(hsv)
+
+    assert [ingv_bands._BAND_LABELS[code] for code in codes] == [
+        ingv_bands._classify_band(pixel) for pixel in hsv
+    ]
+    assert ingv_bands._classify_bands(hsv.reshape(180, 16, 3)).shape == (180, 16)
+
+
+def test_fill_matches_reference_forward_fill():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        hsv = rng.integers(0, 256, size=(rng.integers(1, 60), 3)).astype(np.uint8)
+        hsv[rng.random(len(hsv)) < 0.4, 1] = 0  # unknown rows
+        filled = ingv_bands._fill_missing_codes(ingv_bands._classify_bands(hsv))
+        assert [ingv_bands._BAND_LABELS[code] for code in filled] == _reference_classes(hsv)
+
+
+def test_boundaries_on_striped_image():
+    image = _striped([(GREY, 3), (RED, 20), (ORANGE, 15), (GREY, 2), (YELLOW, 25), (GREEN, 30)])
+
+    result = ingv_bands.detect_band_boundaries_px(image)
+
+    assert result["orange_red"] == 23
+    assert result["yellow_orange"] == 40
+    assert result["green_yellow"] == 65
+    assert result["classes_found"] == ["RED", "ORANGE", "YELLOW", "GREEN"]
+
+
+def test_yellow_red_transition_counts_as_orange_red():
+    result = ingv_bands.detect_band_boundaries_px(_striped([(RED, 10), (YELLOW, 10), (GREEN, 10)]))
+    assert (result["orange_red"], result["yellow_orange"], result["green_yellow"]) == (10, None, 20)
+
+
+def test_strip_vote_recovers_rows_hidden_by_the_curve():
+    image = _striped([(RED, 20), (ORANGE, 20), (YELLOW, 20), (GREEN, 20)], width=240)
+    # A dark stretch of the tremor curve covers just over half of the 30 px sample.
+    image[20:30, -30:-14] = (10, 10, 10)
+
+    single = ingv_bands.detect_band_boundaries_px(image, strips=1)
+    voted = ingv_bands.detect_band_boundaries_px(image, strips=3)
+
+    assert single["orange_red"] == 30  # hidden rows forward-filled with RED
+    assert (voted["orange_red"], voted["yellow_orange"], voted["green_yellow"]) == (20, 40, 60)
+
+
+@pytest.mark.skipif(not CORPUS_PNG.exists(), reason="benchmark corpus not available")
+@pytest.mark.parametrize("strips", [1, ingv_bands.DETECTION_STRIPS])
+def test_corpus_boundaries_are_unchanged(strips):
+    cropped, _, _ = ingv_bands._safe_crop_plot_area(cv2.imread(str(CORPUS_PNG)))
+
+    result = ingv_bands.detect_band_boundaries_px(cropped, strips=strips)
+
+    assert (result["green_yellow"], result["yellow_orange"], result["orange_red"]) == (130, 89, 48)
+    assert result["classes_found"] == ["RED", "ORANGE", "YELLOW", "GREEN"]
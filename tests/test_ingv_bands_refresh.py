@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.utils import ingv_bands
+
+
+def _payload(checked_at: datetime, t1: float = 1.0) -> dict:
+    return {
+        "thresholds_mv": {"t1": t1, "t2": 2.0, "t3": 4.0},
+        "bands_px": {"green_yellow": 10, "yellow_orange": 20, "orange_red": 30},
+        "detected_classes": ["GREEN", "YELLOW", "ORANGE", "RED"],
+        "plot_area": {},
+        "updated_at": checked_at.isoformat(),
+        "verification": {"status": "ok", "checked_at": checked_at.isoformat(), "notes": "ok"},
+        "source": "ingv_0png_bands",
+    }
+
+
+@pytest.fixture
+def bands(tmp_path, monkeypatch, single_flight):
+    cache_path = tmp_path / "ingv_bands.json"
+    monkeypatch.setattr(ingv_bands, "CACHE_PATH", cache_path)
+    monkeypatch.setattr(ingv_bands, "_snapshot", (None, None))
+    single_flight(ingv_bands, "_refresh")
+    monkeypatch.setenv("INGV_COLORED_URL", "https://example.invalid/colored.png")
+    monkeypatch.setattr(ingv_bands, "_safe_crop_plot_area", lambda image: (image, {}, None))
+
+    downloads = []
+    release = threading.Event()
+    release.set()
+
+    def fake_download(logger, purpose):
+        downloads.append(purpose)
+        release.wait(5)
+        return np.zeros((40, 40, 3), dtype=np.uint8)
+
+    monkeypatch.setattr(ingv_bands, "_download_colored_image", fake_download)
+
+    def write(payload):
+        cache_path.write_text(json.dumps(payload), encoding="utf-8")
+
+    return write, downloads, release
+
+
+def test_stale_bands_are_served_while_one_refresh_runs(bands, monkeypatch):
+    write, downloads, release = bands
+    stale = datetime.now(timezone.utc) - timedelta(hours=13)
+    write(_payload(stale))
+    monkeypatch.setattr(
+        ingv_bands,
+        "verify_cached_bands",
+        lambda crop, bands_px: {"status": "ok", "checked_at": datetime.now(timezone.utc).isoformat()},
+    )
+    release.clear()
+
+    started = time.monotonic()
+    results = [ingv_bands.get_ingv_band_thresholds() for _ in range(5)]
+    assert time.monotonic() - started < 1.0
+    assert all(result["thresholds_mv"]["t1"] == 1.0 for result in results)
+    assert all(result["verification"]["checked_at"] == stale.isoformat() for result in results)
+
+    release.set()
+    assert ingv_bands._refresh.wait_idle(5)
+    assert downloads == ["verification"]
+    refreshed = ingv_bands.get_ingv_band_thresholds()
+    assert refreshed["verification"]["checked_at"] != stale.isoformat()
+
+
+def test_failed_verification_redetects_on_the_same_download(bands, monkeypatch):
+    write, downloads, _ = bands
+    write(_payload(datetime.now(timezone.utc) - timedelta(days=1)))
+    monkeypatch.setattr(
+        ingv_bands,
+        "verify_cached_bands",
+        lambda crop, bands_px: {"status": "failed", "checked_at": datetime.now(timezone.utc).isoformat()},
+    )
+    detected_images = []
+
+    def fake_detect(logger, image=None):
+        detected_images.append(image)
+        return _payload(datetime.now(timezone.utc), t1=1.2)
+
+    monkeypatch.setattr(ingv_bands, "_detect_thresholds", fake_detect)
+
+    result = ingv_bands.refresh_ingv_bands()
+
+    assert downloads == ["verification"]
+    assert len(detected_images) == 1 and detected_images[0] is not None
+    assert result["thresholds_mv"]["t1"] == 1.2
+    assert ingv_bands.get_ingv_band_thresholds()["thresholds_mv"]["t1"] == 1.2
+
+
+def test_missing_cache_falls_back_without_blocking(bands):
+    _, downloads, release = bands
+    release.clear()
+
+    result = ingv_bands.get_ingv_band_thresholds()
+    assert result["source"] == "fallback_static"
+    # A second page view neither blocks nor starts another download.
+    ingv_bands.get_ingv_band_thresholds()
+
+    release.set()
+    assert ingv_bands._refresh.wait_idle(5)
+    assert downloads == ["PNG"]
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+from backend.utils import png_fetch
+from scripts import csv_updater
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+def test_png_fetch_cache_uses_validators_and_hash(tmp_path, monkeypatch):
+    sent_headers = []
+    responses = [
+        _Response(200, b"png-1", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        _Response(304),
+        _Response(200, b"png-1", {"ETag": '"v1b"'}),
+        _Response(200, b"png-2", {"ETag": '"v2"'}),
+    ]
+
+    def fake_get(url, headers=None, timeout=None):
+        sent_headers.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(png_fetch.requests, "get", fake_get)
+    cache = png_fetch.PngFetchCache(tmp_path / "state.json")
+    url = "https://example.com/2.png"
+
+    first = cache.fetch(url)
+    assert first.status == "changed"
+    assert "If-None-Match" not in sent_headers[0]
+    cache.commit(first)
+
+    second = cache.fetch(url)
+    assert second.status == "not_modified"
+    assert second.content is None
+    assert second.sha256 == first.sha256
+    assert sent_headers[1]["If-None-Match"] == '"v1"'
+    assert sent_headers[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+    assert cache.fetch(url).status == "unchanged"
+    assert cache.fetch(url).changed
+
+
+def test_update_skips_pipeline_when_png_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CURVA_PIPELINE_MODE", "colored")
+    monkeypatch.setattr(
+        png_fetch.requests,
+        "get",
+        lambda url, headers=None, timeout=None: _Response(200, b"same-png", {"ETag": '"e"'}),
+    )
+    monkeypatch.setattr(csv_updater, "save_colored_png", lambda content: tmp_path / "colored.png")
+    extractions = []
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+
+    def fake_extract(_path):
+        extractions.append(_path)
+        return [start, start + timedelta(minutes=5)], [1.0, 2.0], {}
+
+    monkeypatch.setattr(csv_updater, "extract_series_from_colored", fake_extract)
+    runs = []
+    monkeypatch.setattr(csv_updater, "_emit_cron_run", runs.append)
+    csv_path = tmp_path / "curva.csv"
+
+    first = csv_updater.update_with_retries("http://example.com", "http://example.com/c.png", csv_path)
+    second = csv_updater.update_with_retries("http://example.com", "http://example.com/c.png", csv_path)
+
+    assert first["ok"] and first["updated"]
+    assert second["ok"] and second["unchanged"] and not second["updated"]
+    assert len(extractions) == 1
+    assert [run["reason"] for run in runs] == ["completed", "unchanged"]
+    assert runs[1]["payload"]["fetch_status"] == "unchanged"
+
+    csv_path.unlink()
+    third = csv_updater.update_with_retries("http://example.com", "http://example.com/c.png", csv_path)
+    assert third["updated"]
+    assert len(extractions) == 2
@@ -0,0 +1,54 @@
+import threading
+from datetime import datetime, timedelta, timezone
+import time
+
+from app.utils.background import SingleFlight
+
+
+def test_one_run_at_a_time_and_retry_spacing_per_key():
+    flight = SingleFlight("test-refresh", retry_interval=timedelta(minutes=1))
+    release = threading.Event()
+    runs = []
+
+    assert flight.start(lambda: (runs.append("a"), release.wait(5)), key="a")
+    assert not flight.start(lambda: runs.append("b"), key="b")  # in flight
+    assert flight.running
+    release.set()
+    assert flight.wait_idle(5)
+
+    assert not flight.start(lambda: runs.append("a"), key="a")  # too soon
+    assert flight.start(lambda: runs.append("b"), key="b")
+    assert flight.wait_idle(5)
+    assert runs == ["a", "b"]
+    assert flight.status()["coalesced"] == 1
+
+
+def test_run_waits_for_the_run_in_flight():
+    flight = SingleFlight("test-refresh")
+    release = threading.Event()
+    flight.start(lambda: release.wait(5))
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+
+    assert flight.run(lambda: "own", joined=lambda: "joined") == "joined"
+    assert flight.run(lambda: "own", joined=lambda: "joined") == "own"
+    timer.join()
+
+
+def test_metrics_from_concurrent_threads_are_not_lost():
+    flight = SingleFlight("test-refresh")
+    started_at = datetime.now(timezone.utc)
+
+    def record(index):
+        for _ in range(200):
+            flight.record(started_at, time.monotonic(), "boom" if index % 2 else None)
+
+    threads = [threading.Thread(target=record, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    status = flight.status()
+    assert (status["attempts"], status["succeeded"], status["failed"]) == (1600, 800, 800)
+    assert status["last_outcome"] in {"ok", "failed"} and status["duration_ms_max"] is not None
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pytest
+import requests
+
+from app import create_app
+import app.services.copernicus_swir as swir
+
+
+@pytest.fixture
+def swir_env(tmp_path, monkeypatch, single_flight):
+    image_path = tmp_path / "copernicus" / "s2_latest.png"
+    monkeypatch.setattr(swir, "_swir_image_path", lambda: image_path)
+    single_flight(swir, "_refresh")
+
+    downloads = []
+    release = threading.Event()
+    release.set()
+    failure = {}
+
+    def fake_request(session, url, params):
+        downloads.append(session)
+        release.wait(5)
+        if failure.get("error"):
+            raise requests.ConnectionError(failure["error"])
+        return b"new-png"
+
+    monkeypatch.setattr(swir, "_request_with_retry", fake_request)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        yield image_path, downloads, release, failure
+
+
+def _write_stale(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"old-png")
+    old = time.time() - swir.MAX_CACHE_AGE.total_seconds() - 60
+    os.utime(path, (old, old))
+
+
+def test_stale_image_is_served_while_one_refresh_runs(swir_env):
+    image_path, downloads, release, _ = swir_env
+    _write_stale(image_path)
+    release.clear()
+
+    started = time.monotonic()
+    results = [swir.get_swir_image() for _ in range(5)]
+    assert time.monotonic() - started < 1.0
+    assert all(result.used_cache and result.refreshing and result.ok for result in results)
+    assert image_path.read_bytes() == b"old-png"
+
+    release.set()
+    assert swir._refresh.wait_idle(5)
+    assert len(downloads) == 1
+    assert image_path.read_bytes() == b"new-png"
+
+    fresh = swir.get_swir_image()
+    assert fresh.ok and not fresh.refreshing
+    status = swir.get_swir_refresh_status()
+    assert (status["attempts"], status["succeeded"], status["coalesced"]) == (1, 1, 4)
+    assert status["last_outcome"] == "ok" and status["last_duration_ms"] is not None
+
+
+def test_failed_refresh_keeps_cache_and_backs_off(swir_env):
+    image_path, downloads, _, failure = swir_env
+    _write_stale(image_path)
+    failure["error"] = "WMS down"
+
+    swir.get_swir_image()
+    assert swir._refresh.wait_idle(5)
+    result = swir.get_swir_image()
+    assert swir._refresh.wait_idle(5)
+
+    assert len(downloads) == 1  # no new attempt before REFRESH_RETRY_INTERVAL
+    assert not result.ok and result.used_cache and "WMS down" in result.error
+    assert image_path.read_bytes() == b"old-png"
+    assert swir.get_swir_refresh_status()["failed"] == 1
+
+
+def test_concurrent_sync_refreshes_share_one_download(swir_env):
+    image_path, downloads, release, _ = swir_env
+    release.clear()
+    results = []
+    flask_app = swir.current_app._get_current_object()
+
+    def run():
+        with flask_app.app_context():
+            results.append(swir.refresh_swir_image())
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(downloads) == 1
+    assert sum(result.updated for result in results) == 1
+    assert all(result.ok for result in results)
+    assert image_path.read_bytes() == b"new-png"
+
+
+def test_refreshes_reuse_one_http_session(swir_env):
+    image_path, downloads, _, _ = swir_env
+
+    swir.refresh_swir_image(force=True)
+    swir.refresh_swir_image(force=True)
+
+    assert len(downloads) == 2 and downloads[0] is downloads[1]
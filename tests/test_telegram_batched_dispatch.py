@@ -0,0 +1,166 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DISABLE_SCHEDULER", "1")
+
+import pytest
+from sqlalchemy import event
+
+from alerts.delivery import DeliveryResult
+from app import create_app
+from app.models import db
+from app.models.event import Event
+from app.models.user import User
+from app.services.telegram_service import TelegramService
+from config import Config
+import app.services.telegram_service as telegram_module
+
+
+@pytest.fixture
+def app_ctx(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(telegram_module, "get_curva_csv_path", lambda: tmp_path / "curva.csv")
+    monkeypatch.setattr(Config, "TELEGRAM_BOT_TOKEN", "test-token")
+    monkeypatch.setattr(Config, "ALERT_THRESHOLD_DEFAULT", 2.0)
+    monkeypatch.setattr(Config, "PREMIUM_DEFAULT_THRESHOLD", 2.0)
+    monkeypatch.setattr(Config, "ALERT_HYSTERESIS_DELTA", 0.2)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def message_spy(monkeypatch):
+    sent: List[str] = []
+
+    def fake_deliver(token, messages):
+        sent.extend(message.chat_id for message in messages)
+        return [
+            DeliveryResult(chat_id=message.chat_id, ok=True, status="sent", attempts=1)
+            for message in messages
+        ]
+
+    monkeypatch.setattr(telegram_module, "deliver_telegram_messages", fake_deliver)
+    return sent
+
+
+def _premium(email: str, chat_id: int, **kwargs) -> User:
+    return User(
+        email=email,
+        plan_type="premium",
+        is_premium=True,
+        telegram_opt_in=True,
+        telegram_chat_id=chat_id,
+        threshold=2.0,
+        **kwargs,
+    )
+
+
+def _naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def test_batched_dispatch_applies_every_gate(app_ctx, message_spy):
+    now = datetime.now(timezone.utc)
+    fresh = _premium("fresh@example.com", 101)
+    cooldown = _premium("cooldown@example.com", 102, last_alert_sent_at=_naive(now - timedelta(minutes=5)))
+    blocked = _premium("blocked@example.com", 103, last_alert_sent_at=_naive(now - timedelta(minutes=20)))
+    rearmed = _premium("rearmed@example.com", 104, last_alert_sent_at=_naive(now - timedelta(minutes=20)))
+    renotify = _premium("renotify@example.com", 105, last_alert_sent_at=_naive(now - timedelta(hours=2)))
+    high = _premium("high@example.com", 106)
+    high.threshold = 5.0
+    opted_out = _premium("optout@example.com", 107)
+    opted_out.telegram_opt_in = False
+    free = User(email="free@example.com", plan_type="free", telegram_opt_in=True, telegram_chat_id=108)
+    db.session.add_all([fresh, cooldown, blocked, rearmed, renotify, high, opted_out, free])
+    db.session.commit()
+
+    db.session.add_all(
+        [
+            Event(user_id=fresh.id, event_type="alert", value=2.5, timestamp=_naive(now - timedelta(days=3))),
+            Event(user_id=fresh.id, event_type="alert", value=2.6, timestamp=_naive(now - timedelta(days=45))),
+            Event(user_id=rearmed.id, event_type="hysteresis_reset", timestamp=_naive(now - timedelta(minutes=10))),
+            Event(user_id=blocked.id, event_type="hysteresis_reset", timestamp=_naive(now - timedelta(minutes=30))),
+        ]
+    )
+    db.session.commit()
+
+    service = TelegramService()
+    result = service._dispatch_alerts("evt-1", 3.0, 3.0, None, now, window_size=None)
+    db.session.commit()
+
+    assert sorted(message_spy) == ["101", "104", "105"]
+    assert result["sent"] == 3
+    assert result["cooldown_skipped"] == 1
+    assert result["skipped_by_reason"] == {
+        "cooldown": 1,
+        "already_sent_hysteresis": 1,
+        "below_threshold": 1,
+        "opt_in_false": 1,
+        "not_premium": 1,
+    }
+
+    db.session.refresh(fresh)
+    assert fresh.alert_count_30d == 2
+    assert Event.query.filter_by(event_type="alert").count() == 5
+
+
+def test_batched_dispatch_records_hysteresis_release_once(app_ctx, message_spy):
+    now = datetime.now(timezone.utc)
+    user = _premium("release@example.com", 201, last_alert_sent_at=_naive(now - timedelta(hours=1)))
+    db.session.add(user)
+    db.session.commit()
+
+    service = TelegramService()
+    service._dispatch_alerts("evt-low-1", 1.5, 1.5, None, now, window_size=None)
+    db.session.commit()
+    service._dispatch_alerts("evt-low-2", 1.4, 1.4, None, now + timedelta(minutes=1), window_size=None)
+    db.session.commit()
+
+    assert message_spy == []
+    assert Event.query.filter_by(user_id=user.id, event_type="hysteresis_reset").count() == 1
+
+
+def test_batched_dispatch_query_count_is_flat(app_ctx, message_spy):
+    statements: List[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    def _selects_for(user_count: int, offset: int) -> int:
+        users = [_premium(f"user{offset + index}@example.com", 1000 + offset + index) for index in range(user_count)]
+        db.session.add_all(users)
+        db.session.commit()
+        db.session.add_all(
+            Event(user_id=user.id, event_type="alert", value=2.5, timestamp=datetime.utcnow() - timedelta(days=1))
+            for user in users
+        )
+        db.session.commit()
+        db.session.expunge_all()
+
+        statements.clear()
+        event.listen(db.engine, "before_cursor_execute", _count)
+        try:
+            TelegramService()._dispatch_alerts(
+                f"evt-{offset}", 3.0, 3.0, None, datetime.now(timezone.utc), window_size=None
+            )
+            db.session.flush()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _count)
+        db.session.commit()
+        User.query.delete()
+        Event.query.delete()
+        db.session.commit()
+        return len(statements)
+
+    small = _selects_for(3, 0)
+    large = _selects_for(60, 100)
+    assert large == small
+    assert len(message_spy) == 63
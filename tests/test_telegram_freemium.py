@@ -7,6 +7,7 @@ os.environ.setdefault("DISABLE_SCHEDULER", "1")
 
 import pytest
 
+from alerts.delivery import DeliveryResult
 from app import create_app
 from decimal import Decimal
 
@@ -64,7 +65,19 @@ def message_spy(monkeypatch):
         })
         return True
 
+    def fake_deliver(token, messages):
+        return [
+            DeliveryResult(
+                chat_id=message.chat_id,
+                ok=fake_send(token, message.chat_id, message.text),
+                status="sent",
+                attempts=1,
+            )
+            for message in messages
+        ]
+
     monkeypatch.setattr(telegram_module, "send_telegram_alert", fake_send)
+    monkeypatch.setattr(telegram_module, "deliver_telegram_messages", fake_deliver)
     return sent
 
 
@@ -0,0 +1,144 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from backend.utils.extract_png import clean_and_save_data
+from backend.utils.tremor_archive import (
+    append_archive,
+    archive_path_for,
+    merge_archive,
+    open_archive,
+    write_archive,
+)
+from app.utils.config import load_curva_dataframe
+from app.utils.tremor_store import TremorSeriesStore, get_tremor_history
+from scripts import csv_updater
+
+
+def _rows(start, count):
+    return [
+        {
+            "timestamp": start + timedelta(minutes=5 * idx),
+            "value": 1.25 + idx,
+            "value_max": 1.5 + idx,
+            "value_avg": 1.0 + idx,
+        }
+        for idx in range(count)
+    ]
+
+
+def test_archive_roundtrip_and_torn_append(tmp_path):
+    archive_path = tmp_path / "curva.bin"
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    write_archive(archive_path, _rows(start, 2))
+    assert append_archive(archive_path, _rows(start + timedelta(minutes=10), 1)) == 1
+
+    with open(archive_path, "ab") as handle:
+        handle.write(b"\x01\x02\x03")
+
+    archive = open_archive(archive_path)
+    assert len(archive) == 3
+    assert archive["ts"][-1] == int((start + timedelta(minutes=10)).timestamp())
+    assert list(archive["value"]) == [1.25, 2.25, 1.25]
+
+
+def test_store_prefers_fresh_archive_over_csv(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = _rows(start, 3)
+    clean_and_save_data(rows, str(csv_path))
+    write_archive(archive_path_for(csv_path), rows)
+
+    store = TremorSeriesStore()
+    from_archive = store.get(csv_path, prefer_archive=True)
+    assert from_archive.source == "archive"
+    assert store.get(csv_path).source == "csv"
+
+    os.remove(archive_path_for(csv_path))
+    from_csv = store.get(csv_path, prefer_archive=True)
+    assert from_csv.source == "csv"
+
+    columns = ["timestamp", "value", "value_max", "value_avg"]
+    assert from_archive.frame[columns].equals(from_csv.frame[columns])
+    assert from_archive.tail_frame(2).equals(from_csv.tail_frame(2)[columns].reset_index(drop=True))
+    assert from_archive.last_timestamp == from_csv.last_timestamp
+
+
+def test_archive_snapshot_builds_frame_only_on_demand(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    rows = _rows(datetime(2026, 1, 1, tzinfo=timezone.utc), 4)
+    clean_and_save_data(rows, str(csv_path))
+    write_archive(archive_path_for(csv_path), rows)
+
+    snapshot = TremorSeriesStore().get(csv_path, prefer_archive=True)
+    assert snapshot.rows == 4 and snapshot.values[-1] == 4.25
+    assert not snapshot.values.flags.writeable
+    assert "frame" not in vars(snapshot)
+
+    tail = snapshot.tail_frame(2)
+    tail.loc[:, "value"] = 0.0
+    assert snapshot.values[-1] == 4.25
+    assert "frame" not in vars(snapshot)
+    assert snapshot.frame is snapshot.frame and len(snapshot.valid_frame) == 4
+
+
+def test_csv_updater_keeps_archive_in_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=3)
+
+    csv_updater._write_csv_safely(_rows(start, 3), csv_path)
+    csv_updater._write_csv_safely(_rows(start + timedelta(minutes=5), 4), csv_path)
+
+    archive = open_archive(archive_path_for(csv_path))
+    assert len(archive) == 5
+    assert archive["ts"][-1] == int((start + timedelta(minutes=20)).timestamp())
+
+
+def test_compaction_keeps_archive_history_beyond_csv_retention(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    monkeypatch.setenv("CSV_RETENTION_DAYS", "1")
+    csv_path = tmp_path / "curva.csv"
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    old_rows = _rows(now - timedelta(days=20), 2)
+    write_archive(archive_path_for(csv_path), old_rows)
+
+    csv_updater._compact_csv_output(_rows(now - timedelta(hours=1), 3), csv_path)
+
+    archive = open_archive(archive_path_for(csv_path))
+    assert len(archive) == 5
+    assert archive["ts"][0] == int(old_rows[0]["timestamp"].timestamp())
+    assert TremorSeriesStore().get(csv_path, prefer_archive=True).rows == 5
+
+
+def test_csv_readers_keep_the_csv_window_when_archive_is_longer(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    clean_and_save_data(_rows(start + timedelta(days=10), 3), str(csv_path))
+    write_archive(
+        archive_path_for(csv_path),
+        _rows(start, 2) + _rows(start + timedelta(days=10), 3),
+    )
+
+    df, reason = load_curva_dataframe(csv_path)
+    assert reason is None
+    assert len(df) == 3
+    assert df["timestamp"].iloc[0] == pd.Timestamp(start + timedelta(days=10))
+    assert get_tremor_history(csv_path).rows == 5
+
+
+def test_merge_archive_replaces_overlap_and_applies_retention(tmp_path):
+    archive_path = tmp_path / "curva.bin"
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    write_archive(archive_path, _rows(start, 4))
+
+    merge_archive(archive_path, _rows(start + timedelta(minutes=10), 3))
+    archive = open_archive(archive_path)
+    assert len(archive) == 5
+    assert list(archive["value"]) == [1.25, 2.25, 1.25, 2.25, 3.25]
+
+    merge_archive(archive_path, _rows(start + timedelta(days=2), 1), retention_days=1)
+    assert len(open_archive(archive_path)) == 1
@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.utils.downsample import lttb_indices, minmax_indices
+from app.utils.plotly_helpers import build_plotly_figure_from_pairs
+
+
+def _series(count=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    x = np.arange(count, dtype="float64") * 300.0
+    y = rng.random(count)
+    y[1234] = 40.0
+    y[4321] = -5.0
+    y[200:260] = np.nan
+    return x, y
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    _, y = _series()
+    picked = minmax_indices(y, 500)
+    assert len(picked) <= 500
+    assert picked[0] == 0 and picked[-1] == len(y) - 1
+    assert np.all(np.diff(picked) > 0)
+    assert {1234, 4321} <= set(picked.tolist())
+    assert np.nanmax(y[picked]) == np.nanmax(y)
+
+
+def test_minmax_respects_small_budgets():
+    _, y = _series()
+    for max_points in range(3, 12):
+        assert len(minmax_indices(y, max_points)) <= max_points
+    assert minmax_indices(y, 3).tolist() == [0, 1234, len(y) - 1]
+
+
+def test_lttb_keeps_spikes_and_endpoints():
+    x, y = _series()
+    picked = lttb_indices(x, y, 400)
+    assert len(picked) == 400
+    assert picked[0] == 0 and picked[-1] == len(y) - 1
+    assert np.all(np.diff(picked) > 0)
+    assert {1234, 4321} <= set(picked.tolist())
+    assert np.array_equal(lttb_indices(x[:100], y[:100], 400), np.arange(100))
+
+
+def test_plotly_pairs_are_decimated():
+    pairs = [(f"2026-01-01T00:{idx:05d}", float(idx % 50) + 0.5) for idx in range(6000)]
+    fig = build_plotly_figure_from_pairs(
+        pairs, line={"color": "#111"}, layout={}, max_points=600
+    )
+    assert len(fig.data[0].x) <= 600
+    assert max(fig.data[0].y) == 49.5
+    full = build_plotly_figure_from_pairs(pairs, line={"color": "#111"}, layout={})
+    assert len(full.data[0].x) == 6000
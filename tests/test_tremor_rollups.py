@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.utils.tremor_store import get_tremor_rollups
+from backend.utils.extract_png import clean_and_save_data
+from backend.utils.tremor_rollups import (
+    compute_rollups,
+    read_rollups,
+    rollup_path_for,
+    update_rollups,
+)
+from scripts import csv_updater
+
+
+def _series(start, count, seed=3):
+    rng = np.random.default_rng(seed)
+    epochs = int(start.timestamp()) + np.arange(count, dtype="int64") * 300
+    values = rng.random(count) * 4
+    return epochs, values
+
+
+def test_compute_rollups_matches_pandas():
+    epochs, values = _series(datetime(2026, 3, 1, 0, 20, tzinfo=timezone.utc), 2000)
+    values[10:20] = np.nan
+    rollups = compute_rollups(epochs, values, 3600)
+
+    frame = pd.DataFrame({"bucket": epochs // 3600 * 3600, "value": values}).dropna()
+    grouped = frame.groupby("bucket")["value"]
+    expected = pd.DataFrame(
+        {
+            "count": grouped.count(),
+            "min": grouped.min(),
+            "max": grouped.max(),
+            "mean": grouped.mean(),
+            "p95": grouped.quantile(0.95),
+        }
+    )
+    assert rollups["bucket_start"].tolist() == expected.index.tolist()
+    for field in ("count", "min", "max", "mean", "p95"):
+        np.testing.assert_allclose(rollups[field], expected[field].to_numpy())
+
+
+def test_rollups_outlive_raw_retention(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    epochs, values = _series(start, 288 * 10)
+    update_rollups(csv_path, epochs, values)
+    first = read_rollups(rollup_path_for(csv_path, "1d"))
+    assert len(first) == 10
+
+    # Raw retention now starts mid-way through day 6; days 1-6 stay as they were.
+    trimmed = slice(288 * 5 + 100, None)
+    new_epochs = np.r_[epochs[trimmed], epochs[-1] + 300 * np.arange(1, 289)]
+    new_values = np.r_[values[trimmed], np.full(288, 9.0)]
+    counts = update_rollups(csv_path, new_epochs, new_values)
+    daily = read_rollups(rollup_path_for(csv_path, "1d"))
+
+    assert counts["1d"] == 11
+    assert np.array_equal(daily[:6], first[:6])
+    assert daily[-1]["max"] == 9.0 and daily[-1]["count"] == 288
+    assert len(read_rollups(rollup_path_for(csv_path, "1h"))) == 11 * 24
+
+
+def test_csv_updater_refreshes_rollups(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_updater, "TMP_DATA_DIR", tmp_path / "state")
+    monkeypatch.setenv("CSV_WRITE_MODE", "incremental")
+    csv_path = tmp_path / "curva.csv"
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=6)
+    rows = [
+        {"timestamp": start + timedelta(minutes=5 * idx), "value": 1.0 + idx}
+        for idx in range(72)
+    ]
+    csv_updater._write_csv_safely(rows, csv_path)
+    csv_updater._sync_rollups(csv_path)
+
+    hourly = read_rollups(rollup_path_for(csv_path, "1h"))
+    assert hourly["count"].tolist() == [12] * 6
+    assert hourly["max"][0] == 12.0
+
+    rollups, version = get_tremor_rollups(csv_path, "1h")
+    assert np.array_equal(rollups, hourly)
+    assert not version.startswith("raw-")
+
+
+def test_store_falls_back_to_raw_rollups(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    clean_and_save_data(
+        [{"timestamp": start + timedelta(minutes=5 * idx), "value": 2.0} for idx in range(48)],
+        str(csv_path),
+    )
+    rollups, version = get_tremor_rollups(csv_path, "1h")
+    assert version.startswith("raw-")
+    assert rollups["count"].tolist() == [12, 12, 12, 12]
+    assert get_tremor_rollups(csv_path, "1h")[0] is rollups
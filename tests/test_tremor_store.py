@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.config import load_curva_dataframe
+from app.utils.tremor_store import TremorSeriesStore
+
+
+def _write_csv(path, timestamps, values):
+    pd.DataFrame({"timestamp": timestamps, "value": values}).to_csv(path, index=False)
+
+
+def test_store_parses_once_per_file_version(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    _write_csv(
+        csv_path,
+        ["2025-01-01T10:05:00Z", "2025-01-01T10:00:00Z", "bad"],
+        [2.0, 1.0, 3.0],
+    )
+    store = TremorSeriesStore()
+
+    first = store.get(csv_path)
+    second = store.get(csv_path)
+
+    assert first is second
+    assert store.parse_count == 1
+    assert first.reason is None
+    assert first.rows == 2
+    assert first.stats["invalid_timestamp_samples"] == ["bad"]
+    assert list(first.values) == [1.0, 2.0]
+    assert first.timestamps.dtype == np.dtype("datetime64[ns]")
+    with pytest.raises(ValueError):
+        first.values[0] = 5.0
+
+    _write_csv(csv_path, ["2025-01-01T10:00:00Z"], [4.0])
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    third = store.get(csv_path)
+    assert third is not first
+    assert store.parse_count == 2
+    assert list(third.values) == [4.0]
+
+
+def test_store_reports_missing_file_and_columns(tmp_path):
+    store = TremorSeriesStore()
+    assert store.get(tmp_path / "missing.csv") is None
+
+    csv_path = tmp_path / "curva.csv"
+    pd.DataFrame({"value": [1.0]}).to_csv(csv_path, index=False)
+    assert store.get(csv_path).reason == "missing_timestamp"
+
+
+def test_load_curva_dataframe_drops_invalid_values(tmp_path):
+    csv_path = tmp_path / "curva.csv"
+    pd.DataFrame(
+        {
+            "timestamp": ["2025-01-01T10:00:00Z", "2025-01-01T10:05:00Z"],
+            "value_max": [None, 1.5],
+        }
+    ).to_csv(csv_path, index=False)
+
+    df, reason = load_curva_dataframe(csv_path)
+
+    assert reason is None
+    assert df["value"].tolist() == [1.5]